@@ -0,0 +1,272 @@
+'''
+    Offline throughput and latency benchmark of the API clients and CLI commands.
+
+    Starts the fake Google API of `fake_google_api.py`, points the package at it (`setting.API_ENDPOINT`) with
+    generated credentials, and runs every scenario at each concurrency (threads sharing one client) and
+    payload size (rows read and written, list lengths, message and attachment sizes). The CLI scenarios run
+    the commands in-process one after the other, building their client on every call like a real CLI call.
+    No network is needed and the client-side rate limits are off, so the numbers measure the package itself.
+
+    Every result is printed as a JSON line. Its `relative` throughput is divided by the throughput of plain
+    `http.client` requests to the fake API measured in the same run, so results of different machines can be
+    compared. `--save` stores them as a baseline, `--compare` checks them against one and exits with status 1
+    when a scenario lost more than `--max-regression` of its relative throughput. Baselines are not committed,
+    save one on the machine first.
+
+    Usage:
+    ```
+    python benchmarks/bench_api.py --save benchmarks/results/baseline.json
+    python benchmarks/bench_api.py --compare benchmarks/results/baseline.json --max-regression 0.25
+    python benchmarks/bench_api.py --latency 0.05 --error-rate 0.05 --concurrency 1,8,32 --scenario calendar
+    ```
+'''
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# the debug records of thousands of requests go to a throw-away log directory, not the package's log/
+os.environ.setdefault('RED_OFFICE_LOG_DIR', tempfile.mkdtemp(prefix='red_office_bench_'))
+
+from benchmarks.fake_google_api import FakeAPIConfig, FakeGoogleAPI, write_fake_tokens  # noqa: E402
+from red_office_google_integration.src import setting  # noqa: E402
+
+# before the clients are imported: no client-side rate limits, short retry delays for the injected errors
+setting.RATE_LIMITS = {}
+setting.RETRY_BASE_DELAY = 0.01
+setting.RETRY_MAX_DELAY = 0.1
+
+from click.testing import CliRunner  # noqa: E402
+from red_office_google_integration.calendar.events.events import CalendarEvent  # noqa: E402
+from red_office_google_integration.gmail.mail import Gmail  # noqa: E402
+from red_office_google_integration.gmail.message_creation import EmailCreation  # noqa: E402
+from red_office_google_integration.spreadsheets.sheets import SpreadSheet  # noqa: E402
+from red_office_google_integration.src.utils import set_cli_mode  # noqa: E402
+
+
+DEFAULT_RESULTS = Path(__file__).resolve().parent / 'results' / 'baseline.json'
+
+
+def _rows(size: int) -> list[list]:
+    return [[f'r{i}', i, i * 0.5, 'x' * 8, True] for i in range(size)]
+
+
+def _event(i: int = 0) -> dict:
+    return {'summary': f'Benchmark {i}', 'start': {'dateTime': '2024-01-01T10:00:00Z'},
+            'end': {'dateTime': '2024-01-01T11:00:00Z'}}
+
+
+# scenario -> (client class, function(client, size) running one operation)
+SCENARIOS: dict[str, tuple[type, Callable[[Any, int], Any]]] = {
+    'sheets.get_data': (SpreadSheet, lambda c, size: c.get_data('sheet', f'A1:E{size}')),
+    'sheets.update_values': (SpreadSheet, lambda c, size: c.update_values('sheet', 'A1', 'RAW', _rows(size))),
+    'sheets.append_data': (SpreadSheet, lambda c, size: c.append_data('sheet', 'A1', 'RAW', _rows(size))),
+    'gmail.get_email': (Gmail, lambda c, size: c.get_email('m1')),
+    'gmail.get_email_list': (Gmail, lambda c, size: c.get_email_list('')),
+    'gmail.get_attachment': (Gmail, lambda c, size: c.get_attachment_encoded('m1', 'a1')),
+    'gmail.create_draft': (Gmail, lambda c, size: c.create_draft(EmailCreation(
+        {'to': 'someone@example.com', 'subject': 'Benchmark'}, 'x' * (size * 100)))),
+    'calendar.create_event': (CalendarEvent, lambda c, size: c.create_event('primary', _event())),
+    'calendar.get_event': (CalendarEvent, lambda c, size: c.get_event('primary', 'e1')),
+    'calendar.patch_event': (CalendarEvent, lambda c, size: c.patch_event('primary', 'e1', {'summary': 'x'})),
+    'calendar.list_event': (CalendarEvent, lambda c, size: c.list_event('primary', {})),
+    'calendar.bulk_create_events': (CalendarEvent, lambda c, size: list(c.bulk_create_events(
+        'primary', (_event(i) for i in range(size))))),
+}
+
+# CLI scenario -> arguments of main.py, the payload formatted with the key
+CLI_SCENARIOS: dict[str, list[str]] = {
+    'cli.spreadsheet.get-data': ['spreadsheet', 'get-data', '{{"key": "{key}", "spreadsheetId": "sheet", '
+                                                             '"range": "A1:E10"}}'],
+    'cli.calendar.event.get': ['calendar', 'event', 'get', '{{"key": "{key}", "calendarId": "primary", '
+                                                           '"eventId": "e1"}}'],
+    'cli.mail.get-email': ['mail', 'get-email', '{{"key": "{key}", "messageId": "m1"}}'],
+}
+
+
+def server_config(size: int, base: FakeAPIConfig) -> FakeAPIConfig:
+    '''
+        Scale the responses of the fake API to a payload size.
+    '''
+    return FakeAPIConfig(base.latency, base.jitter, base.error_rate, base.error_status, rows=size, columns=5,
+                         list_size=size, message_bytes=size * 100, attachment_bytes=size * 1000)
+
+
+def summarize(name: str, concurrency: int, size: int, latencies: list[float], errors: int, wall: float) -> dict:
+    latencies = sorted(latencies)
+
+    def percentile(fraction: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 2)
+
+    return {'scenario': name, 'concurrency': concurrency, 'size': size, 'ops': len(latencies), 'errors': errors,
+            'throughput_ops_s': round(len(latencies) / wall, 1), 'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+            'p50_ms': percentile(0.5), 'p95_ms': percentile(0.95), 'p99_ms': percentile(0.99)}
+
+
+def run_scenario(name: str, client, operation: Callable[[Any, int], Any], concurrency: int, size: int,
+                 ops: int) -> dict:
+    '''
+        Run `ops` operations on `concurrency` threads sharing the client.
+    '''
+    errors = 0
+
+    def timed(_) -> float:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            operation(client, size)
+        except Exception:
+            errors += 1
+        return time.perf_counter() - started
+
+    timed(None)  # warm up: connection and first response parsing
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, range(ops)))
+    return summarize(name, concurrency, size, latencies, errors, time.perf_counter() - started)
+
+
+def run_cli_scenario(name: str, args: list[str], key: str, ops: int) -> dict:
+    '''
+        Run a CLI command `ops` times in-process, as the daemon would without its client cache.
+    '''
+    from main import command_line_interface
+
+    runner = CliRunner()
+    args = [arg.format(key=key) for arg in args]
+    runner.invoke(command_line_interface, args)  # warm up: imports of the command
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(ops):
+        call_started = time.perf_counter()
+        result = runner.invoke(command_line_interface, args)
+        latencies.append(time.perf_counter() - call_started)
+        errors += result.exit_code != 0
+    set_cli_mode(False)
+    return summarize(name, 1, 10, latencies, errors, time.perf_counter() - started)
+
+
+def reference_throughput(server: FakeGoogleAPI, ops: int) -> float:
+    '''
+        Measure plain `http.client` requests to the fake API, without the package: the speed of the machine the
+        throughputs are divided by.
+    '''
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port)
+    try:
+        started = time.perf_counter()
+        for _ in range(ops):
+            connection.request('GET', '/calendar/v3/calendars/primary/events/e1')
+            connection.getresponse().read()
+        return ops / (time.perf_counter() - started)
+    finally:
+        connection.close()
+
+
+@contextmanager
+def offline_environment(config: FakeAPIConfig):
+    '''
+        Start the fake API and point the package at it with generated credentials. Yields the server and key.
+    '''
+    previous = setting.SECRET_DIRECTORY_PATH, setting.API_ENDPOINT
+    with tempfile.TemporaryDirectory() as secrets, FakeGoogleAPI(config) as server:
+        setting.SECRET_DIRECTORY_PATH = Path(secrets)
+        setting.API_ENDPOINT = server.url
+        try:
+            yield server, write_fake_tokens(Path(secrets))
+        finally:
+            setting.SECRET_DIRECTORY_PATH, setting.API_ENDPOINT = previous
+
+
+def compare(results: list[dict], baseline: list[dict], max_regression: float) -> list[str]:
+    '''
+        Return the scenarios whose relative throughput dropped by more than `max_regression` (a fraction) from the
+        baseline. Results without a relative throughput are not compared.
+    '''
+    def key(result: dict) -> tuple:
+        return result['scenario'], result['concurrency'], result['size']
+
+    previous = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(key(result))
+        if before and 'relative' in before and result['relative'] < before['relative'] * (1 - max_regression):
+            regressions.append(f'{result["scenario"]} (concurrency {result["concurrency"]}, size {result["size"]}): '
+                               f'{before["relative"]} -> {result["relative"]} of the reference throughput')
+    return regressions
+
+
+def _numbers(text: str) -> list[int]:
+    return [int(value) for value in text.split(',') if value]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=50, help='operations per scenario and level')
+    parser.add_argument('--concurrency', type=_numbers, default=[1, 4, 16], help='e.g. 1,4,16')
+    parser.add_argument('--sizes', type=_numbers, default=[10, 100], help='payload sizes, e.g. 10,100')
+    parser.add_argument('--scenario', action='append', help='run the scenarios starting with this, repeatable')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the fake API delays every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra delay, up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of the requests failing')
+    parser.add_argument('--error-status', type=int, default=503, choices=(429, 503))
+    parser.add_argument('--save', type=Path, nargs='?', const=DEFAULT_RESULTS, help='store the results')
+    parser.add_argument('--compare', type=Path, nargs='?', const=DEFAULT_RESULTS, help='baseline to compare to')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='allowed throughput loss, 0.25 = 25%%')
+    options = parser.parse_args()
+
+    def selected(name: str) -> bool:
+        return not options.scenario or any(name.startswith(prefix) for prefix in options.scenario)
+
+    base = FakeAPIConfig(options.latency, options.jitter, options.error_rate, options.error_status)
+    results = []
+    with offline_environment(base) as (server, key):
+        server.config = server_config(10, base)
+        reference = reference_throughput(server, max(200, options.ops * 4))
+
+        def report(result: dict) -> None:
+            result['relative'] = round(result['throughput_ops_s'] / reference, 4)
+            results.append(result)
+            print(json.dumps(result), flush=True)
+
+        clients = {}
+        for name, (cls, operation) in SCENARIOS.items():
+            if not selected(name):
+                continue
+            if cls not in clients:
+                clients[cls] = cls(key.encode())
+            for size in options.sizes:
+                server.config = server_config(size, base)
+                for concurrency in options.concurrency:
+                    report(run_scenario(name, clients[cls], operation, concurrency, size, options.ops))
+        server.config = server_config(10, base)
+        for name, args in CLI_SCENARIOS.items():
+            if selected(name):
+                report(run_cli_scenario(name, args, key, max(1, options.ops // 10)))
+
+    if options.save:
+        options.save.parent.mkdir(parents=True, exist_ok=True)
+        options.save.write_text(json.dumps({'python': sys.version.split()[0], 'options': {
+            'ops': options.ops, 'latency': options.latency, 'error_rate': options.error_rate},
+            'reference_ops_s': round(reference, 1), 'results': results}, indent=2) + '\n')
+    if options.compare:
+        regressions = compare(results, json.loads(options.compare.read_text())['results'], options.max_regression)
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
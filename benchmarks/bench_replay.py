@@ -0,0 +1,48 @@
+'''
+    Client-side load test replaying a recorded session.
+
+    Sends the requests of a cassette (see `red_office_google_integration/google_service/cassette.py`) again at
+    each concurrency, `--repeat` times, answered from the recorded responses. Nothing goes to the network, so
+    the numbers show what the package itself (executor, metrics, response parsing) costs under N times the
+    recorded load. `--speed 1` keeps the recorded latencies, `--rate-limited` the client-side rate limits.
+
+    Usage:
+    ```
+    RED_OFFICE_CASSETTE=session.jsonl RED_OFFICE_CASSETTE_MODE=record python main.py calendar event list '...'
+    python benchmarks/bench_replay.py session.jsonl --concurrency 1,8,32 --repeat 20
+    ```
+'''
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# the debug records of the replayed requests go to a throw-away log directory, not the package's log/
+os.environ.setdefault('RED_OFFICE_LOG_DIR', tempfile.mkdtemp(prefix='red_office_bench_'))
+
+from red_office_google_integration.google_service.cassette import load_replay  # noqa: E402
+
+
+def _numbers(text: str) -> list[int]:
+    return [int(value) for value in text.split(',') if value]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('cassette', type=Path, help='recorded session, a JSON lines file')
+    parser.add_argument('--concurrency', type=_numbers, default=[1, 8, 32], help='e.g. 1,8,32')
+    parser.add_argument('--repeat', type=int, default=10, help='times every recorded request is sent')
+    parser.add_argument('--speed', type=float, default=0.0, help='replay speed of the latencies, 0 for none')
+    parser.add_argument('--rate-limited', action='store_true', help='keep the client-side rate limits')
+    options = parser.parse_args()
+    for concurrency in options.concurrency:
+        print(json.dumps(load_replay(options.cassette, concurrency, options.repeat, options.speed,
+                                     options.rate_limited)), flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+'''
+    Startup time regression benchmark of the CLI.
+
+    Runs simple commands of `main.py` in fresh processes (no daemon) and reports the median and best wall
+    time of each. With `--max-ms` it exits with status 1 when a median is slower, so it can guard CI.
+
+    Usage:
+    ```
+    python benchmarks/bench_startup.py --runs 10 --max-ms 300
+    ```
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+MAIN = Path(__file__).resolve().parent.parent / 'main.py'
+
+COMMANDS = [
+    ['--help'],
+    ['daemon', 'status'],
+    ['batch', '--help'],
+    ['calendar', '--help'],
+    ['spreadsheet', '--help'],
+]
+
+
+def measure(args: list[str], runs: int) -> dict:
+    '''
+        Run `main.py args` `runs` times and return the timings in milliseconds.
+    '''
+    env = {'RED_OFFICE_LOG_DIR': tempfile.gettempdir(), **os.environ, 'RED_OFFICE_NO_DAEMON': '1'}
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, str(MAIN), *args], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'command': ' '.join(args), 'median_ms': round(statistics.median(timings), 1),
+            'min_ms': round(min(timings), 1)}
+
+
+def measure_python(runs: int) -> dict:
+    '''
+        Time the startup of a bare interpreter, the floor of any command.
+    '''
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'command': 'python -c pass', 'median_ms': round(statistics.median(timings), 1),
+            'min_ms': round(min(timings), 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='runs per command')
+    parser.add_argument('--max-ms', type=float, help='fail when the median of `main.py --help` is slower')
+    options = parser.parse_args()
+
+    baseline = measure_python(options.runs)
+    print(json.dumps(baseline))
+    results = [measure(args, options.runs) for args in COMMANDS]
+    for result in results:
+        print(json.dumps(result))
+    if options.max_ms is not None and results[0]['median_ms'] > options.max_ms:
+        print(f'main.py --help took {results[0]["median_ms"]} ms, more than {options.max_ms} ms', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,346 @@
+'''
+    Local fake of the Google API endpoints used by the package, for offline benchmarks.
+
+    Implements the Sheets values, Gmail messages, attachments and drafts, and Calendar events endpoints (and the
+    Calendar batch endpoint) with generated responses of a configurable size. Every response can be delayed
+    (`latency`, `jitter`) and a fraction of them fail (`error_rate`, `error_status`), to measure the clients
+    under slow or flaky APIs. Nothing is stored: a created event is echoed back with an id.
+
+    Point the package at it with `setting.API_ENDPOINT` (or `RED_OFFICE_API_ENDPOINT`).
+
+    Usage:
+    ```
+    with FakeGoogleAPI(FakeAPIConfig(latency=0.02, rows=1000)) as api:
+        setting.API_ENDPOINT = api.url
+        SpreadSheet(key).get_data('sheet-id', 'A1:J1000')
+    ```
+
+    Or standalone: `python benchmarks/fake_google_api.py --port 8765 --latency 0.05`.
+'''
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+@dataclass
+class FakeAPIConfig:
+    '''
+        Behaviour of the fake API.
+
+        Attributes:
+            latency (float): Seconds every response is delayed.
+            jitter (float): Up to this many seconds are added at random to the latency.
+            error_rate (float): Fraction of the requests answered with `error_status`.
+            error_status (int): 503 (retried as a server error) or 429 (retried as rate limited).
+            rows (int): Rows of the ranges read from Sheets.
+            columns (int): Columns of the ranges read from Sheets.
+            cell_bytes (int): Characters of every cell read.
+            list_size (int): Items of the event and message lists.
+            message_bytes (int): Size of the body of the messages.
+            attachment_bytes (int): Size of the attachments.
+    '''
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    rows: int = 10
+    columns: int = 5
+    cell_bytes: int = 8
+    list_size: int = 10
+    message_bytes: int = 1024
+    attachment_bytes: int = 10 * 1024
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode()
+
+
+class _Routes:
+    '''
+        Generate the response of a request: `(status, body)`, the body a JSON value or None.
+    '''
+
+    def __init__(self, config: FakeAPIConfig) -> None:
+        self.config = config
+        self.routes = [
+            ('GET', r'v4/spreadsheets/(?P<id>[^/]+)/values:batchGet', self.sheets_batch_get),
+            ('POST', r'v4/spreadsheets/(?P<id>[^/]+)/values:batchUpdate', self.sheets_batch_update),
+            ('POST', r'v4/spreadsheets/(?P<id>[^/]+)/values/(?P<a1>[^/]+):append', self.sheets_append),
+            ('GET', r'v4/spreadsheets/(?P<id>[^/]+)/values/(?P<a1>[^/]+)', self.sheets_get),
+            ('PUT', r'v4/spreadsheets/(?P<id>[^/]+)/values/(?P<a1>[^/]+)', self.sheets_update),
+            ('GET', r'gmail/v1/users/(?P<user>[^/]+)/messages', self.gmail_list),
+            ('GET', r'gmail/v1/users/(?P<user>[^/]+)/messages/(?P<id>[^/]+)/attachments/(?P<attachment>[^/]+)',
+             self.gmail_attachment),
+            ('GET', r'gmail/v1/users/(?P<user>[^/]+)/messages/(?P<id>[^/]+)', self.gmail_get),
+            ('POST', r'gmail/v1/users/(?P<user>[^/]+)/drafts', self.gmail_draft),
+            ('GET', r'calendar/v3/calendars/(?P<calendar>[^/]+)/events', self.events_list),
+            ('POST', r'calendar/v3/calendars/(?P<calendar>[^/]+)/events', self.events_insert),
+            ('GET', r'calendar/v3/calendars/(?P<calendar>[^/]+)/events/(?P<id>[^/]+)', self.events_get),
+            ('PATCH', r'calendar/v3/calendars/(?P<calendar>[^/]+)/events/(?P<id>[^/]+)', self.events_patch),
+            ('DELETE', r'calendar/v3/calendars/(?P<calendar>[^/]+)/events/(?P<id>[^/]+)', self.events_delete),
+        ]
+
+    def handle(self, method: str, target: str, body: bytes) -> tuple[int, object]:
+        url = urlsplit(target)
+        path = unquote(url.path).lstrip('/')
+        query = parse_qs(url.query)
+        data = json.loads(body) if body else {}
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                return handler(query=query, body=data, **match.groupdict())
+        return 404, {'error': {'code': 404, 'message': f'No fake for {method} /{path}', 'status': 'NOT_FOUND'}}
+
+    # ____________________________________________________sheets______________________________________________________
+    def values(self, a1: str) -> dict:
+        cell = 'x' * self.config.cell_bytes
+        return {'range': a1, 'majorDimension': 'ROWS',
+                'values': [[cell] * self.config.columns for _ in range(self.config.rows)]}
+
+    def sheets_get(self, id, a1, query, body):
+        return 200, self.values(a1)
+
+    def sheets_batch_get(self, id, query, body):
+        return 200, {'spreadsheetId': id, 'valueRanges': [self.values(r) for r in query.get('ranges', [])]}
+
+    @staticmethod
+    def updated(id: str, a1: str, values: list) -> dict:
+        return {'spreadsheetId': id, 'updatedRange': a1, 'updatedRows': len(values),
+                'updatedColumns': max((len(row) for row in values), default=0),
+                'updatedCells': sum(len(row) for row in values)}
+
+    def sheets_update(self, id, a1, query, body):
+        return 200, self.updated(id, a1, body.get('values', []))
+
+    def sheets_batch_update(self, id, query, body):
+        responses = [self.updated(id, data.get('range', ''), data.get('values', []))
+                     for data in body.get('data', [])]
+        return 200, {'spreadsheetId': id, 'totalUpdatedCells': sum(r['updatedCells'] for r in responses),
+                     'responses': responses}
+
+    def sheets_append(self, id, a1, query, body):
+        return 200, {'spreadsheetId': id, 'updates': self.updated(id, a1, body.get('values', []))}
+
+    # ____________________________________________________gmail_______________________________________________________
+    def page(self, query: dict) -> tuple[range, dict]:
+        '''
+            Indexes of the items of the requested page (`pageToken` and `maxResults`) and its `nextPageToken`.
+        '''
+        start = int(query.get('pageToken', ['0'])[0])
+        end = min(self.config.list_size, start + int(query.get('maxResults', [self.config.list_size])[0]))
+        return range(start, end), {'nextPageToken': str(end)} if end < self.config.list_size else {}
+
+    def gmail_list(self, user, query, body):
+        indexes, next_page = self.page(query)
+        return 200, {'messages': [{'id': f'm{i}', 'threadId': f't{i}'} for i in indexes],
+                     'resultSizeEstimate': self.config.list_size, **next_page}
+
+    def gmail_get(self, user, id, query, body):
+        return 200, {
+            'id': id, 'threadId': f't-{id}', 'labelIds': ['INBOX'], 'snippet': 'Fake message',
+            'payload': {
+                'mimeType': 'multipart/mixed',
+                'headers': [{'name': 'Subject', 'value': f'Message {id}'},
+                            {'name': 'From', 'value': 'sender@example.com'},
+                            {'name': 'Date', 'value': 'Mon, 1 Jan 2024 10:00:00 +0000'}],
+                'parts': [
+                    {'partId': '0', 'mimeType': 'text/plain', 'filename': '',
+                     'body': {'size': self.config.message_bytes, 'data': _b64(b'x' * self.config.message_bytes)}},
+                    {'partId': '1', 'mimeType': 'application/octet-stream', 'filename': 'report.bin',
+                     'body': {'size': self.config.attachment_bytes, 'attachmentId': 'a1'}},
+                ]},
+            'sizeEstimate': self.config.message_bytes + self.config.attachment_bytes}
+
+    def gmail_attachment(self, user, id, attachment, query, body):
+        return 200, {'attachmentId': attachment, 'size': self.config.attachment_bytes,
+                     'data': _b64(b'x' * self.config.attachment_bytes)}
+
+    def gmail_draft(self, user, query, body):
+        draft_id = uuid.uuid4().hex[:16]
+        return 200, {'id': draft_id, 'message': {'id': draft_id, 'threadId': draft_id, 'labelIds': ['DRAFT']}}
+
+    # ____________________________________________________calendar____________________________________________________
+    @staticmethod
+    def event(id: str, **fields) -> dict:
+        return {'kind': 'calendar#event', 'id': id, 'etag': f'"{id}"', 'status': 'confirmed',
+                'summary': f'Event {id}', 'start': {'dateTime': '2024-01-01T10:00:00Z'},
+                'end': {'dateTime': '2024-01-01T11:00:00Z'}, 'updated': '2024-01-01T00:00:00.000Z', **fields}
+
+    def events_list(self, calendar, query, body):
+        # an incremental sync has nothing new
+        if 'syncToken' in query:
+            return 200, {'kind': 'calendar#events', 'items': [], 'nextSyncToken': 'sync-token'}
+        indexes, next_page = self.page(query)
+        return 200, {'kind': 'calendar#events', 'items': [self.event(f'e{i}') for i in indexes],
+                     **(next_page or {'nextSyncToken': 'sync-token'})}
+
+    def events_insert(self, calendar, query, body):
+        return 200, self.event(uuid.uuid4().hex, **body)
+
+    def events_get(self, calendar, id, query, body):
+        return 200, self.event(id)
+
+    def events_patch(self, calendar, id, query, body):
+        return 200, self.event(id, **body)
+
+    def events_delete(self, calendar, id, query, body):
+        return 204, None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'FakeGoogleAPI'
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, Nagle's algorithm would hold the body for the client's ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self.answer()
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = do_GET
+
+    def answer(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.server.wait()
+        if self.path.startswith('/batch/'):
+            status, content, content_type = self.server.batch(body, self.headers.get('Content-Type', ''))
+        else:
+            status, value = self.server.respond(self.command, self.path, body)
+            content = json.dumps(value).encode() if value is not None else b''
+            content_type = 'application/json; charset=UTF-8'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class FakeGoogleAPI(ThreadingHTTPServer):
+    '''
+        The fake API server, serving on a thread once started.
+
+        Args:
+            config (FakeAPIConfig, optional): Latency, errors and response sizes. Can be changed while it runs.
+            host (str, optional): Defaults to 127.0.0.1.
+            port (int, optional): Defaults to 0, a free port.
+    '''
+    daemon_threads = True
+
+    def __init__(self, config: FakeAPIConfig | None = None, host: str = '127.0.0.1', port: int = 0) -> None:
+        self.config = config or FakeAPIConfig()
+        self.requests = 0
+        self.__lock = threading.Lock()
+        self.__thread: threading.Thread | None = None
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def wait(self) -> None:
+        delay = self.config.latency + random.uniform(0, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def respond(self, method: str, target: str, body: bytes) -> tuple[int, object]:
+        '''
+            Answer one request, failing it at the configured error rate.
+        '''
+        with self.__lock:
+            self.requests += 1
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            status = self.config.error_status
+            reason = 'rateLimitExceeded' if status == 429 else 'backendError'
+            return status, {'error': {'code': status, 'message': 'Injected error',
+                                      'errors': [{'reason': reason, 'message': 'Injected error'}]}}
+        return _Routes(self.config).handle(method, target, body)
+
+    def batch(self, body: bytes, content_type: str) -> tuple[int, bytes, str]:
+        '''
+            Answer a multipart batch request, every part as if it were sent on its own.
+        '''
+        boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1)
+        parts = []
+        for part in body.split(b'--' + boundary.encode())[1:]:
+            if part.strip() in (b'--', b''):
+                continue
+            part_headers, _, request = part.replace(b'\r\n', b'\n').strip(b'\n').partition(b'\n\n')
+            content_id = re.search(rb'Content-ID: <?([^>\n]+)>?', part_headers, re.IGNORECASE).group(1).decode()
+            head, _, request_body = request.partition(b'\n\n')
+            method, target = head.split(b'\n', 1)[0].decode().split(' ')[:2]
+            status, value = self.respond(method, target, request_body.strip())
+            content = json.dumps(value) if value is not None else ''
+            parts.append(f'Content-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n'
+                         f'HTTP/1.1 {status} OK\r\nContent-Type: application/json; charset=UTF-8\r\n'
+                         f'Content-Length: {len(content)}\r\n\r\n{content}\r\n')
+        answer_boundary = f'batch_{uuid.uuid4().hex}'
+        content = ''.join(f'--{answer_boundary}\r\n{part}' for part in parts) + f'--{answer_boundary}--\r\n'
+        return 200, content.encode(), f'multipart/mixed; boundary={answer_boundary}'
+
+    def start(self) -> 'FakeGoogleAPI':
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'FakeGoogleAPI':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def write_fake_tokens(directory: Path) -> str:
+    '''
+        Write encrypted, never expiring tokens of the three APIs to `directory` (`setting.SECRET_DIRECTORY_PATH`
+        of the benchmark), so the clients load credentials without OAuth. Returns the key decrypting them.
+    '''
+    from red_office_google_integration.google_service.file_handler import encrypt_and_save_file, generate_key
+    from red_office_google_integration.src import setting
+
+    key = generate_key()
+    token = {'token': 'fake-access-token', 'refresh_token': 'fake-refresh-token', 'client_id': 'fake',
+             'client_secret': 'fake', 'token_uri': 'http://127.0.0.1/token', 'expiry': '2099-01-01T00:00:00Z'}
+    for file_name, scope in ((setting.FILE_NAME_SPREADSHEETS_TOKEN, setting.SCOPE_SPREADSHEETS),
+                             (setting.FILE_NAME_GMAIL_TOKEN, setting.SCOPE_GMAIL),
+                             (setting.FILE_NAME_CALENDAR_TOKEN, setting.SCOPE_CALENDAR)):
+        encrypt_and_save_file(Path(directory) / file_name, json.dumps({**token, 'scopes': scope}), key)
+    return key.decode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds every response is delayed')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra delay, up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of the requests failing')
+    parser.add_argument('--error-status', type=int, default=503, choices=(429, 503))
+    options = parser.parse_args()
+    server = FakeGoogleAPI(FakeAPIConfig(options.latency, options.jitter, options.error_rate,
+                                         options.error_status), port=options.port)
+    print(f'Fake Google API on {server.url} (RED_OFFICE_API_ENDPOINT={server.url})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
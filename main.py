@@ -1,21 +1,50 @@
+import sys
 import click
-from red_office_google_integration.CLI_handler.calendar.events import calendar
-from red_office_google_integration.CLI_handler.credentials_management_cli.initialize_credentials import init_cred
-from red_office_google_integration.CLI_handler.spreadsheet.spreadsheetCLI import spreadsheet
-from red_office_google_integration.CLI_handler.gmail.gmail_cli import mail
+from red_office_google_integration.CLI_handler.lazy_group import LazyGroup
+from red_office_google_integration.src.daemon import forward_to_daemon
 
 
-@click.group()
-def command_line_interface():
-    pass
+# The CLI modules (and googleapiclient, pandas, ...) are only imported when their command runs
+SUBCOMMANDS = {
+    'batch': ('red_office_google_integration.CLI_handler.batch.batch_cli:batch',
+              'Run a JSONL file (or - for stdin) of operations in one process.'),
+    'calendar': ('red_office_google_integration.CLI_handler.calendar.events:calendar',
+                 'Calendar where you can perform actions on Google Calendar events.'),
+    'daemon': ('red_office_google_integration.CLI_handler.daemon.daemon_cli:daemon',
+               'Daemon keeping authenticated clients warm between CLI calls.'),
+    'init-cred': ('red_office_google_integration.CLI_handler.credentials_management_cli.initialize_credentials:init_cred',
+                  'Encrypts the credentials and saves the file.'),
+    'mail': ('red_office_google_integration.CLI_handler.gmail.gmail_cli:mail',
+             'Gmail Where you can perform mail action'),
+    'spreadsheet': ('red_office_google_integration.CLI_handler.spreadsheet.spreadsheetCLI:spreadsheet',
+                    'Spreadsheet where you can perform actions on Google Spreadsheet events.'),
+    # 'rmcred': ('red_office_google_integration.CLI_handler.credentials_management_cli.remove_credentials:rmcred', ...),
+}
 
 
-command_line_interface.add_command(calendar)
-command_line_interface.add_command(init_cred)
-command_line_interface.add_command(spreadsheet)
-command_line_interface.add_command(mail)
-# command_line_interface.add_command(rmcred)
+@click.group(cls=LazyGroup, lazy_subcommands=SUBCOMMANDS)
+@click.option('--trace', is_flag=True, help='Print how long each phase of the command took (on stderr).')
+@click.pass_context
+def command_line_interface(ctx, trace):
+    # print errors as JSON and exit with status 1 instead of raising them
+    from red_office_google_integration.src.utils import set_cli_mode
+    set_cli_mode()
+    if trace:
+        from red_office_google_integration.src import tracing
+        collector = tracing.add_exporter(tracing.TimingCollector())
+
+        def report():
+            tracing.remove_exporter(collector)
+            click.echo(collector.breakdown(), err=True)
+
+        # closed in reverse order: the span ends before the breakdown is printed
+        ctx.call_on_close(report)
+        ctx.with_resource(tracing.span('cli.command', command=ctx.invoked_subcommand))
 
 
 if __name__ == "__main__":
+    # run in the daemon when one is running (`py main.py daemon start`), in-process otherwise
+    exit_code = forward_to_daemon(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
     command_line_interface()
@@ -0,0 +1,58 @@
+import click
+from red_office_google_integration.CLI_handler.batch.operations import OPERATIONS, run_batch
+from red_office_google_integration.CLI_handler.output import write_jsonl
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.metrics import MetricsReporter
+from red_office_google_integration.src.utils import set_cli_mode
+"""
+# Batch CLI Module
+
+Runs many operations in one process: the clients are built once per key and shared, and the operations run
+concurrently. Every line of the input is a JSON object naming a command and giving its payload, the same
+payload the command takes on the command line:
+
+```
+{"command": "spreadsheet.append-data", "payload": {"key": "...", "spreadsheetId": "...", "range": "Sheet1", "valueInputOption": "RAW", "values": [[1, 2]]}}
+{"command": "calendar.event.create", "payload": {"key": "...", "calendarId": "primary", "event_data": {...}}, "id": "standup"}
+```
+
+One JSON line is printed per operation as soon as it finishes, with its `index`, its `id` if given, `status`
+(`Success` or `Error`) and `result` or `error`. A failed operation does not stop the batch. The request
+metrics of the batch are written to `setting.METRICS_SUMMARY_PATH` and `setting.METRICS_PROMETHEUS_PATH`.
+
+## Usage
+
+- `py main.py batch operations.jsonl`
+- `cat operations.jsonl | py main.py batch - --concurrency 16 --ordered -o results.jsonl`
+"""
+
+
+@click.command(help="Run a JSONL file (or - for stdin) of operations in one process.",
+               epilog="Commands: " + ", ".join(sorted(OPERATIONS)))
+@click.argument('input_file', type=click.File('r'), required=True)
+@click.option('-c', '--concurrency', type=click.IntRange(min=1), default=setting.BATCH_CONCURRENCY, show_default=True,
+              help='Operations running at the same time')
+@click.option('--ordered/--unordered', default=False, show_default=True,
+              help='Print the results in input order instead of as they finish')
+@click.option('-o', '--output', type=click.Path(writable=True, resolve_path=True), help='JSONL file receiving a copy of the results')
+def batch(input_file, concurrency, ordered, output):
+    """
+        Runs the operations of a JSONL file, printing one JSON line per operation.
+
+        Args:
+            input_file (file): The JSONL file of operations, or - for stdin.
+            concurrency (int): Operations running at the same time.
+            ordered (bool): Print the results in input order.
+            output (str): Path of a file receiving a copy of the results.
+
+        Returns:
+            None
+    """
+    # errors of an operation are reported in its result line instead of ending the batch
+    set_cli_mode(False)
+    reporter = MetricsReporter().start()
+    try:
+        write_jsonl(run_batch(input_file, concurrency, ordered), output)
+    finally:
+        reporter.stop()
+        set_cli_mode()
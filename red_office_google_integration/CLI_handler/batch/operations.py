@@ -0,0 +1,270 @@
+'''
+    Operations run by `py main.py batch`.
+
+    Every line of a batch names a command and gives the payload that command takes on the command line:
+
+    ```
+    {"command": "spreadsheet.append-data", "payload": {"key": "...", "spreadsheetId": "...", "range": "A1",
+     "valueInputOption": "RAW", "values": [[1, 2]]}, "id": "row-1"}
+    ```
+
+    `OPERATIONS` maps the command names to the client class they use and the function running them. The
+    clients are shared by all the operations of a batch with the same key, and `run_batch()` runs the
+    operations on a thread pool, yielding one result per operation:
+
+    ```
+    {"index": 0, "id": "row-1", "command": "spreadsheet.append-data", "status": "Success", "result": {...}}
+    {"index": 1, "command": "calendar.event.get", "status": "Error", "error": {"status": "NotFoundError", ...}}
+    ```
+'''
+import json
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator
+from red_office_google_integration.calendar.events.events import CalendarEvent
+from red_office_google_integration.gmail.mail import Gmail
+from red_office_google_integration.gmail.message_creation import EmailCreation
+from red_office_google_integration.google_service.batch import error_details
+from red_office_google_integration.spreadsheets.sheets import SpreadSheet
+from red_office_google_integration.CLI_handler.clients import get_client
+
+
+# command name -> (client class, function(client, payload) -> result)
+OPERATIONS: dict[str, tuple[type, Callable[[Any, dict], Any]]] = {}
+
+
+def operation(name: str, cls: type):
+    '''
+        Register the function running the command `name` with a client of `cls`.
+    '''
+    def register(func: Callable[[Any, dict], Any]):
+        OPERATIONS[name] = (cls, func)
+        return func
+    return register
+
+
+def _optionals(payload: dict, name: str = 'optionals') -> dict:
+    optionals = dict(payload.get(name, {}))
+    if 'fields' in payload:
+        optionals['fields'] = payload['fields']
+    return optionals
+
+
+def _required(payload: dict, *names: str) -> list:
+    missing = [name for name in names if name not in payload]
+    if missing:
+        raise ValueError(f'{", ".join(missing)} not found in the payload.')
+    return [payload[name] for name in names]
+
+
+# ______________________________________________spreadsheet_operations_________________________________________________
+@operation('spreadsheet.get-data', SpreadSheet)
+def _get_data(spreadsheet: SpreadSheet, payload: dict):
+    spreadsheetId, range = _required(payload, 'spreadsheetId', 'range')
+    return spreadsheet.get_data(spreadsheetId, range, **_optionals(payload))
+
+
+@operation('spreadsheet.get-batch-data', SpreadSheet)
+def _get_batch_data(spreadsheet: SpreadSheet, payload: dict):
+    spreadsheetId, ranges = _required(payload, 'spreadsheetId', 'ranges')
+    return spreadsheet.get_batch_data(spreadsheetId, ranges, **_optionals(payload))
+
+
+@operation('spreadsheet.update-values', SpreadSheet)
+def _update_values(spreadsheet: SpreadSheet, payload: dict):
+    spreadsheetId, range, valueInputOption, values = _required(
+        payload, 'spreadsheetId', 'range', 'valueInputOption', 'values')
+    return spreadsheet.update_values(spreadsheetId, range, valueInputOption, values, **payload.get('optionals', {}))
+
+
+@operation('spreadsheet.batch-update-values', SpreadSheet)
+def _batch_update_values(spreadsheet: SpreadSheet, payload: dict):
+    spreadsheetId, valueInputOption, data = _required(payload, 'spreadsheetId', 'valueInputOption', 'data')
+    return spreadsheet.batch_update_values(spreadsheetId, valueInputOption, data, **payload.get('optionals', {}))
+
+
+@operation('spreadsheet.append-data', SpreadSheet)
+def _append_data(spreadsheet: SpreadSheet, payload: dict):
+    spreadsheetId, range, valueInputOption, values = _required(
+        payload, 'spreadsheetId', 'range', 'valueInputOption', 'values')
+    return spreadsheet.append_data(spreadsheetId, range, valueInputOption, values, **payload.get('optionals', {}))
+
+
+# ______________________________________________calendar_operations____________________________________________________
+@operation('calendar.event.create', CalendarEvent)
+def _create_event(event: CalendarEvent, payload: dict):
+    calendarId, event_data = _required(payload, 'calendarId', 'event_data')
+    return event.create_event(calendarId, event_data)
+
+
+@operation('calendar.event.delete', CalendarEvent)
+def _delete_event(event: CalendarEvent, payload: dict):
+    calendarId, eventId = _required(payload, 'calendarId', 'eventId')
+    return event.delete_event(calendarId, eventId, **payload.get('optional_parameter', {}))
+
+
+@operation('calendar.event.patch', CalendarEvent)
+def _patch_event(event: CalendarEvent, payload: dict):
+    calendarId, eventId, event_data = _required(payload, 'calendarId', 'eventId', 'event_data')
+    return event.patch_event(calendarId, eventId, event_data, **payload.get('optional_parameter', {}))
+
+
+@operation('calendar.event.get', CalendarEvent)
+def _get_event(event: CalendarEvent, payload: dict):
+    calendarId, eventId = _required(payload, 'calendarId', 'eventId')
+    return event.get_event(calendarId, eventId, **_optionals(payload, 'optional_parameter'))
+
+
+@operation('calendar.event.list', CalendarEvent)
+def _list_event(event: CalendarEvent, payload: dict):
+    calendarId, = _required(payload, 'calendarId')
+    return event.list_event(calendarId, payload.get('optional_parameter', {}), payload.get('fields'),
+                            payload.get('all_pages', False))
+
+
+@operation('calendar.event.sync', CalendarEvent)
+def _sync_events(event: CalendarEvent, payload: dict):
+    calendarId, = _required(payload, 'calendarId')
+    return event.sync_events(calendarId, payload.get('optional_parameter', {}))
+
+
+# ______________________________________________mail_operations________________________________________________________
+@operation('mail.get-email', Gmail)
+def _get_email(mail: Gmail, payload: dict):
+    messageId, = _required(payload, 'messageId')
+    return mail.get_email(messageId, payload.get('userId', 'me'), **_optionals(payload))
+
+
+@operation('mail.get-email-list', Gmail)
+def _get_email_list(mail: Gmail, payload: dict):
+    return mail.get_email_list(payload.get('query', ''), payload.get('userId', 'me'), **_optionals(payload))
+
+
+@operation('mail.create-draft', Gmail)
+def _create_draft(mail: Gmail, payload: dict):
+    header, body = _required(payload, 'header', 'body')
+    email_message = EmailCreation(header, body, payload.get('subtype', 'plain'))
+    for attachment in payload.get('attachments', []):
+        email_message.add_file(attachment)
+    return mail.create_draft(email_message, payload.get('userId', 'me'))
+# _____________________________________________________________________________________________________________________
+
+
+class _Clients:
+    '''
+        Clients shared by the operations of a batch, one per class and key.
+    '''
+
+    def __init__(self) -> None:
+        self.__clients: dict[tuple[type, bytes], Any] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, cls: type, key: bytes):
+        # built under the lock so that concurrent operations of a new key load the credentials once
+        with self.__lock:
+            if (cls, key) not in self.__clients:
+                self.__clients[(cls, key)] = get_client(cls, key)
+            return self.__clients[(cls, key)]
+
+
+def parse_line(line: str) -> dict:
+    '''
+        Decode one line of a batch.
+
+        Raises:
+            ValueError: When the line is not a JSON object.
+    '''
+    try:
+        value = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'Invalid JSON: {e}')
+    if not isinstance(value, dict):
+        raise ValueError('Every line must be a JSON object with "command" and "payload".')
+    return value
+
+
+def run_operation(line: dict, clients: _Clients | None = None) -> Any:
+    '''
+        Run one operation and return the result of its command.
+
+        Args:
+            line (dict): `{"command": ..., "payload": {...}}`, the payload containing the `key`.
+            clients (optional): Clients shared with other operations.
+
+        Raises:
+            ValueError: When the command is unknown or the payload incomplete. Errors of the API are raised
+                as the typed exceptions of `src/exceptions.py`.
+    '''
+    command = line.get('command')
+    if command not in OPERATIONS:
+        raise ValueError(f'Unknown command {command!r}, expected one of {", ".join(sorted(OPERATIONS))}.')
+    payload = line.get('payload') or {}
+    key = payload.get('key')
+    if not key:
+        raise ValueError('Key not found! Please specify the key in the payload.')
+    cls, func = OPERATIONS[command]
+    client = clients.get(cls, key.encode()) if clients is not None else get_client(cls, key.encode())
+    return func(client, payload)
+
+
+def _run_line(index: int, text: str, clients: _Clients) -> dict:
+    result: dict[str, Any] = {'index': index}
+    try:
+        line = parse_line(text)
+        if 'id' in line:
+            result['id'] = line['id']
+        result['command'] = line.get('command')
+        result['result'] = run_operation(line, clients)
+        result['status'] = 'Success'
+    except Exception as e:
+        result['status'] = 'Error'
+        result['error'] = error_details(e)
+    return result
+
+
+def run_batch(lines: Iterable[str], concurrency: int = 8, ordered: bool = False) -> Iterator[dict]:
+    '''
+        Run the operations of a batch concurrently.
+
+        Args:
+            lines (Iterable[str]): JSON lines, read lazily. Blank lines are skipped.
+            concurrency (int, optional): Operations running at the same time. Defaults to 8.
+            ordered (bool, optional): Yield the results in the order of the lines instead of as soon as
+                they finish. Defaults to False.
+
+        Yields:
+            dict: One result per operation with its `index` (0-based, blank lines not counted), its `id` if
+            the line has one, `command`, `status` (`Success` or `Error`) and `result` or `error`.
+    '''
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1.')
+    clients = _Clients()
+    # at most this many operations are read ahead, so a batch of any size runs in bounded memory
+    window = concurrency * 2
+    pending: deque[Future] = deque()
+
+    def done() -> Iterator[dict]:
+        if ordered:
+            yield pending.popleft().result()
+            return
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            pending.remove(future)
+            yield future.result()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        index = 0
+        for text in lines:
+            if not text.strip():
+                continue
+            pending.append(pool.submit(_run_line, index, text, clients))
+            index += 1
+            while len(pending) >= window:
+                yield from done()
+        while pending:
+            yield from done()
+
+
+if __name__ == '__main__':
+    pass
@@ -6,10 +6,14 @@ This module provides functionalities to perform actions on Google Calendar event
 Commands:
     - calendar: Group command for performing actions on Google Calendar events.
     - event: Command to perform actions on Google Calendar events.
+    - ics: Command to import or export iCalendar (.ics) files.
+    - agenda: Command to list the events of many calendars merged in start time order.
 
 Usage:
     - calendar: Group command to interact with Google Calendar events.
     - event: Command to execute actions like create, delete, list, or get on Google Calendar events.
+    - ics: Command to import an .ics file into a calendar or export a calendar to an .ics file.
+    - agenda: Command to stream a combined agenda of many calendars ('calendarIds' in the payload) as JSON lines.
 
 Example Usage:
     To create an event:
@@ -24,19 +28,52 @@ Example Usage:
     ```bash
         $ python main.py calander event list path_to_payload.json
     ```
+    To list the events of every page:
+    ```bash
+        $ python main.py calander event list path_to_payload.json --all-pages
+    ```
+    To create or delete many events through batch requests (one JSON event body, or one eventId, per line):
+    ```bash
+        $ python main.py calander event bulk-create path_to_payload.json --input events.jsonl
+        $ python main.py calander event bulk-delete path_to_payload.json --input event_ids.jsonl
+    ```
+    To change only some fields of an event ('event_data' holds the desired fields), or of many events
+    (one JSON object with the event 'id' and its desired fields per line):
+    ```bash
+        $ python main.py calander event patch path_to_payload.json
+        $ python main.py calander event bulk-patch path_to_payload.json --input changes.jsonl
+    ```
+    To fetch only the events changed since the last sync:
+    ```bash
+        $ python main.py calander event sync path_to_payload.json
+    ```
     To get an event:
     
     ```bash
         $ python main.py calander event get path_to_payload.json
     ```
+    To import or export an iCalendar file (the import prints the result of every event as one JSON line):
+    ```bash
+        $ python main.py calander ics import path_to_payload.json --file calendar.ics
+        $ python main.py calander ics export path_to_payload.json --file calendar.ics
+    ```
+    To stream the combined agenda of many calendars as JSON lines:
+    ```bash
+        $ python main.py calander agenda path_to_payload.json
+    ```
     `path_to_payload or JSON String`
 Parameters:
-    - action: The action to perform. Must be one of 'create', 'delete', 'list', 'get'.
+    - action: The action to perform. Must be one of 'create', 'delete', 'list', 'get', 'sync',
+      'bulk-create', 'bulk-delete', 'patch', 'bulk-patch'.
     - payload: Path to a JSON file containing the payload or a JSON string representing the payload.
     - output: Optional parameter to specify an output directory for the result.
+    - all-pages: Optional flag for 'list' to follow nextPageToken and return every event.
+    - input: JSONL file for 'bulk-create', 'bulk-delete' and 'bulk-patch'. The result of every line is printed as one JSON line.
+      The payload may set 'batch_size', 'max_workers' and 'max_retries'.
 
 Note:
     The payload must contain necessary information like 'key' and 'calendarId' for the actions to be executed successfully.
+    For 'list' and 'get' the payload may contain 'fields', a list of event fields to return (partial response).
 
 """
 
@@ -44,6 +81,9 @@ import click
 import os
 import json
 from red_office_google_integration.calendar.events.events import CalendarEvent
+from red_office_google_integration.CLI_handler.clients import get_client
+from red_office_google_integration.CLI_handler.output import write_jsonl
+from red_office_google_integration.src.tracing import span
 
 
 @click.group(help="Calendar where you can perform actions on Google Calendar events.")
@@ -52,14 +92,17 @@ def calendar():
 
 
 @click.command(help="Perform actions on Google Calendar events.")
-@click.argument('action', type=click.Choice(['create', 'delete', 'list', 'get']))
+@click.argument('action', type=click.Choice(['create', 'delete', 'list', 'get', 'sync', 'bulk-create', 'bulk-delete', 'patch', 'bulk-patch']))
 @click.argument('payload', type=str, required=True)
 @click.option('-o', '--output', type=click.Path(writable=True, resolve_path=True), help='Output directory')
-def event(action, payload, output):
+@click.option('--all-pages', is_flag=True, help='List the events of every page')
+@click.option('--stream', is_flag=True, help='List the events of every page as JSON lines while they are read')
+@click.option('-i', '--input', 'input_file', type=click.Path(exists=True, dir_okay=False, resolve_path=True), help='JSONL file for bulk actions')
+def event(action, payload, output, all_pages, input_file, stream):
     """
-    ACTION: The action to perform. Must be one of 'create', 'delete', 'list', 'get'.
+    ACTION: The action to perform. Must be one of 'create', 'delete', 'list', 'get', 'sync', 'bulk-create', 'bulk-delete', 'patch', 'bulk-patch'.
     PAYLOAD: Path to a JSON file containing the payload or a JSON string representing the payload.
-    Use '--output' to specify an output directory.
+    Use '--output' to specify an output directory. 'list --stream' prints the events of every page as JSON lines.
     """
     # Load payload from file or string
     if os.path.isfile(payload):
@@ -83,7 +126,7 @@ def event(action, payload, output):
             "CalendarId not found! Please specify the calendarId in the payload.")
 
     # Initialize CalendarEvent event
-    event = CalendarEvent(key.encode())
+    event = get_client(CalendarEvent, key.encode())
 
     # Perform action based on user input
     if action == 'create':
@@ -99,28 +142,173 @@ def event(action, payload, output):
                 calendar_id, payload_data['eventId'], **optional_parameter)
         else:
             raise click.ClickException('EventId not found in the payload.')
+    elif action == 'patch':
+        if 'eventId' in payload_data and 'event_data' in payload_data:
+            optional_parameter = payload_data.get('optional_parameter', {})
+            result = event.patch_event(
+                calendar_id, payload_data['eventId'], payload_data['event_data'], **optional_parameter)
+        else:
+            raise click.ClickException('EventId or event_data not found in the payload.')
+    elif action == 'list' and stream:
+        write_jsonl(event.iter_events(calendar_id, payload_data.get('optional_parameter', {}),
+                                      payload_data.get('fields'), stream=True), output)
+        return
     elif action == 'list':
         optional_parameter = payload_data.get('optional_parameter', {})
-        result = event.list_event(calendar_id, optional_parameter)
+        result = event.list_event(
+            calendar_id, optional_parameter, payload_data.get('fields'), all_pages)
     elif action == 'get':
         if 'eventId' in payload_data:
             optional_parameter = payload_data.get('optional_parameter', {})
+            if 'fields' in payload_data:
+                optional_parameter['fields'] = payload_data['fields']
             result = event.get_event(
                 calendar_id, payload_data['eventId'], **optional_parameter)
         else:
             raise click.ClickException('EventId not found in the payload.')
+    elif action in ('bulk-create', 'bulk-delete', 'bulk-patch'):
+        if not input_file:
+            raise click.ClickException(
+                "Input file not found! Please specify the JSONL file with --input.")
+        batch_options = {k: payload_data[k] for k in (
+            'batch_size', 'max_workers', 'max_retries') if k in payload_data}
+        optional_parameter = payload_data.get('optional_parameter', {})
+        if action == 'bulk-create':
+            results = event.bulk_create_events(
+                calendar_id, read_jsonl(input_file), **batch_options, **optional_parameter)
+        elif action == 'bulk-patch':
+            results = event.bulk_patch_events(
+                calendar_id, read_jsonl(input_file), **batch_options, **optional_parameter)
+        else:
+            event_ids = (line if isinstance(line, str) else line['eventId']
+                         for line in read_jsonl(input_file))
+            results = event.bulk_delete_events(
+                calendar_id, event_ids, **batch_options, **optional_parameter)
+        write_jsonl(results, output)
+        return
+    elif action == 'sync':
+        optional_parameter = payload_data.get('optional_parameter', {})
+        result = event.sync_events(calendar_id, optional_parameter)
     else:
         raise click.ClickException('Event operation type not valid!')
     # Output result
-    if output:
-        with open(output, 'w') as f:
-            json.dump(result, f)
-        click.echo(json.dumps(result))
+    with span('output.write'):
+        if output:
+            with open(output, 'w') as f:
+                json.dump(result, f)
+            click.echo(json.dumps(result))
+        else:
+            click.echo(json.dumps(result, indent=2))
+
+
+def read_jsonl(path):
+    """
+    Lazily read a JSONL file, skipping blank lines.
+
+    Args:
+        path (str): Path to the JSONL file.
+
+    Yields:
+        The decoded JSON value of every line.
+    """
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                raise click.BadParameter(
+                    f'Line {number} of {path} is not valid JSON.')
+
+
+@click.command(help="Import or export iCalendar (.ics) files.")
+@click.argument('action', type=click.Choice(['import', 'export']))
+@click.argument('payload', type=str, required=True)
+@click.option('-f', '--file', 'ics_file', type=click.Path(dir_okay=False, resolve_path=True), required=True, help='The .ics file')
+@click.option('-o', '--output', type=click.Path(writable=True, resolve_path=True), help='JSONL file receiving a copy of the import results')
+def ics(action, payload, ics_file, output):
+    """
+    ACTION: 'import' to create the events of the file in the calendar, 'export' to write the events of the calendar to the file.
+    PAYLOAD: Path to a JSON file containing the payload or a JSON string representing the payload.
+    The payload may set 'default_timezone' and the batch options for 'import', and 'optional_parameter' for 'export'.
+    """
+    # Load payload from file or string
+    if os.path.isfile(payload):
+        with open(payload, 'r') as f:
+            payload_data = json.load(f)
+    else:
+        try:
+            payload_data = json.loads(payload)
+        except json.JSONDecodeError:
+            raise click.BadParameter(
+                'Payload must be a valid JSON string or a path to a JSON file.')
+
+    # Validate payload
+    key = payload_data.get('key')
+    calendar_id = payload_data.get('calendarId')
+    if not key:
+        raise click.ClickException(
+            "Key not found! Please specify the key in the payload.")
+    if not calendar_id:
+        raise click.ClickException(
+            "CalendarId not found! Please specify the calendarId in the payload.")
+
+    event = get_client(CalendarEvent, key.encode())
+
+    if action == 'import':
+        if not os.path.isfile(ics_file):
+            raise click.ClickException(f'File {ics_file} not found.')
+        options = {k: payload_data[k] for k in (
+            'default_timezone', 'batch_size', 'max_workers', 'max_retries') if k in payload_data}
+        write_jsonl(event.import_ics(calendar_id, ics_file, **options), output)
+    else:
+        result = event.export_ics(
+            calendar_id, ics_file, payload_data.get('optional_parameter', {}))
+        with span('output.write'):
+            click.echo(json.dumps(result, indent=2))
+
+
+@click.command(help="List the events of many calendars merged in start time order.")
+@click.argument('payload', type=str, required=True)
+@click.option('-o', '--output', type=click.Path(writable=True, resolve_path=True), help='JSONL file receiving a copy of the events')
+def agenda(payload, output):
+    """
+    PAYLOAD: Path to a JSON file containing the payload or a JSON string representing the payload.
+    The payload must contain 'key' and 'calendarIds', and may set 'optional_parameter', 'fields',
+    'max_concurrency', 'buffer_pages' and 'skip_errors'.
+    """
+    # Load payload from file or string
+    if os.path.isfile(payload):
+        with open(payload, 'r') as f:
+            payload_data = json.load(f)
     else:
-        click.echo(json.dumps(result, indent=2))
+        try:
+            payload_data = json.loads(payload)
+        except json.JSONDecodeError:
+            raise click.BadParameter(
+                'Payload must be a valid JSON string or a path to a JSON file.')
+
+    # Validate payload
+    key = payload_data.get('key')
+    calendar_ids = payload_data.get('calendarIds')
+    if not key:
+        raise click.ClickException(
+            "Key not found! Please specify the key in the payload.")
+    if not calendar_ids:
+        raise click.ClickException(
+            "CalendarIds not found! Please specify the calendarIds in the payload.")
+
+    event = get_client(CalendarEvent, key.encode())
+    options = {k: payload_data[k] for k in (
+        'fields', 'max_concurrency', 'buffer_pages', 'skip_errors') if k in payload_data}
+    write_jsonl(event.iter_merged_events(
+        calendar_ids, payload_data.get('optional_parameter', {}), **options), output)
 
 
 calendar.add_command(event)
+calendar.add_command(ics)
+calendar.add_command(agenda)
 
 if __name__ == "__main__":
     calendar()
@@ -0,0 +1,62 @@
+'''
+    Clients used by the CLI commands.
+
+    A CLI call normally builds its client (`SpreadSheet`, `Gmail`, `CalendarEvent`) and exits. Inside the
+    daemon (`py main.py daemon start`) the client cache is enabled, so the first command of an account builds
+    it and the following ones reuse it: the credentials are decrypted and the discovery service is built once.
+
+    Example:
+    ```
+    spreadsheet = get_client(SpreadSheet, key.encode())
+    ```
+'''
+import threading
+from typing import Any
+from red_office_google_integration.src.tracing import span
+
+
+_cache: dict[tuple[type, bytes], Any] | None = None
+_cache_lock = threading.Lock()
+
+
+def enable_client_cache(enabled: bool = True) -> None:
+    '''
+        Keep the clients built by `get_client()` for the following commands (daemon mode), or forget them.
+    '''
+    global _cache
+    with _cache_lock:
+        _cache = {} if enabled else None
+
+
+def cached_clients() -> list[str]:
+    '''
+        Return the class names of the cached clients, one entry per client.
+    '''
+    with _cache_lock:
+        return [cls.__name__ for cls, _ in _cache] if _cache is not None else []
+
+
+def get_client(cls: type, key: bytes):
+    '''
+        Return a client of `cls` for the key, reusing the cached one in daemon mode.
+
+        Args:
+            cls (type): `SpreadSheet`, `Gmail` or `CalendarEvent`.
+            key (bytes): The Fernet key decrypting the credentials.
+
+        Returns:
+            The client. It is only cached once it was built, so a wrong key is not remembered.
+    '''
+    with _cache_lock:
+        if _cache is not None and (cls, key) in _cache:
+            return _cache[(cls, key)]
+    with span('client.build', client=cls.__name__):
+        client = cls(key)
+    with _cache_lock:
+        if _cache is not None:
+            client = _cache.setdefault((cls, key), client)
+    return client
+
+
+if __name__ == '__main__':
+    pass
@@ -1,4 +1,5 @@
 from red_office_google_integration.google_service.file_handler import InitializeCredential
+from red_office_google_integration.google_service.google_credentials_service import secret_directory
 from red_office_google_integration.src import setting
 import click
 import json
@@ -14,7 +15,8 @@ NOTE:
 @click.argument('cred', type=str, required=True)
 @click.option('-o', '--output', type=click.Path(writable=True, resolve_path=True), help='Output directory to save key')
 @click.option('-k', '--key', type=click.STRING, help='Custom key in string')
-def init_cred(cred, output, key: str) -> None:
+@click.option('-a', '--account', type=click.STRING, help='Account id of a multi-account setup, e.g. its email address')
+def init_cred(cred, output, key: str, account: str) -> None:
     """
     Encrypts the credentials using a fernet key and saves the file.
 
@@ -22,6 +24,8 @@ def init_cred(cred, output, key: str) -> None:
         cred (str): Path to the credential file | in string.
         output (filepath,optional): Path to the output directory where the encrypted file will be saved.
         key (str,optional): Path to the key file used for encryption (fernet key by default).
+        account (str,optional): Save the file to the directory of this account, `setting.ACCOUNTS_DIRECTORY_PATH / account`,
+            for `ClientPool` (google_service/client_pool.py).
 
     Returns:
         None
@@ -36,13 +40,17 @@ def init_cred(cred, output, key: str) -> None:
         except json.JSONDecodeError:
             raise click.BadParameter(
                 'Payload must be a valid JSON string or a path to a JSON file.')
+    try:
+        directory = secret_directory(account)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
     if key:
         print(key)
         result = InitializeCredential(
-            cred, setting.DEFAULT_CREDENTIAL_FILE_NAME, key.encode())
+            cred, setting.DEFAULT_CREDENTIAL_FILE_NAME, key.encode(), directory=directory)
     else:
         result = InitializeCredential(
-            cred, setting.DEFAULT_CREDENTIAL_FILE_NAME)
+            cred, setting.DEFAULT_CREDENTIAL_FILE_NAME, directory=directory)
 
     result.initialize()
 
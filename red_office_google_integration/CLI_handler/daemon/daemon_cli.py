@@ -0,0 +1,135 @@
+import click
+import json
+import os
+import subprocess
+import sys
+import time
+from red_office_google_integration.CLI_handler.clients import cached_clients, enable_client_cache
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.daemon import DaemonError, daemon_request, serve
+from red_office_google_integration.src.metrics import MetricsReporter, start_metrics_server
+"""
+# Daemon CLI Module
+
+Runs a local daemon keeping the authenticated clients warm. While it runs, the other commands of `main.py`
+are sent to it instead of starting from scratch, and run in-process again once it is stopped.
+
+## Commands
+
+- `start`: Starts the daemon in the foreground, or in the background with `--detach`. `py main.py daemon start`
+- `stop`: Stops the running daemon. `py main.py daemon stop`
+- `status`: Shows the pid, uptime, commands run and cached clients of the daemon. `py main.py daemon status`
+- `metrics`: Prints the request metrics of the daemon in the Prometheus format, or as JSON with `--format json`.
+  `py main.py daemon metrics`
+"""
+
+
+@click.group(help="Daemon keeping authenticated clients warm between CLI calls.")
+def daemon():
+    pass
+
+
+# _____________________________________________________start_cli_section_______________________________________________________
+@click.command(help="Starts the daemon.")
+@click.option('-d', '--detach', is_flag=True, help='Run the daemon in the background')
+@click.option('--metrics-port', type=int, help='Serve the Prometheus metrics on http://127.0.0.1:PORT/metrics')
+@click.pass_context
+def start(ctx, detach, metrics_port):
+    """
+        Starts the daemon listening on `setting.DAEMON_SOCKET_PATH`.
+
+        Args:
+            detach (bool): Start the daemon as a background process and return once it listens.
+            metrics_port (int): Port serving the metrics. The metrics summary is also appended to
+                `setting.METRICS_SUMMARY_PATH` periodically.
+
+        Returns:
+            None
+    """
+    if daemon_request('status') is not None:
+        raise click.ClickException(f'A daemon is already running on {setting.DAEMON_SOCKET_PATH}.')
+    if detach:
+        args = ['--metrics-port', str(metrics_port)] if metrics_port else []
+        process = subprocess.Popen([sys.executable, os.path.abspath(sys.argv[0]), 'daemon', 'start', *args],
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL, start_new_session=True)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline and process.poll() is None:
+            status = daemon_request('status')
+            if status is not None:
+                click.echo(json.dumps(status, indent=2))
+                return
+            time.sleep(0.1)
+        raise click.ClickException('The daemon did not start, see the log file.')
+
+    enable_client_cache()
+    reporter = MetricsReporter().start()
+    metrics_server = start_metrics_server(metrics_port) if metrics_port else None
+    try:
+        serve(ctx.find_root().command, status=lambda: {'clients': cached_clients()})
+    except DaemonError as e:
+        raise click.ClickException(str(e))
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        reporter.stop()
+        enable_client_cache(False)
+# _______________________________________________________________________________________________________________________
+
+
+# _____________________________________________________stop_cli_section________________________________________________________
+@click.command(help="Stops the daemon.")
+def stop():
+    """
+        Stops the running daemon.
+
+        Returns:
+            None
+    """
+    answer = daemon_request('stop')
+    click.echo(json.dumps({'status': 'Stopping' if answer is not None else 'Not running'}, indent=2))
+# _______________________________________________________________________________________________________________________
+
+
+# _____________________________________________________status_cli_section______________________________________________________
+@click.command(help="Shows the status of the daemon.")
+def status():
+    """
+        Shows the pid, uptime, number of commands run and cached clients of the daemon.
+
+        Returns:
+            None
+    """
+    answer = daemon_request('status')
+    click.echo(json.dumps(answer['status'] if answer is not None else {'status': 'Not running'}, indent=2))
+# _______________________________________________________________________________________________________________________
+
+
+# _____________________________________________________metrics_cli_section_____________________________________________________
+@click.command(help="Shows the request metrics of the daemon.")
+@click.option('-f', '--format', 'output_format', type=click.Choice(['prometheus', 'json']), default='prometheus',
+              show_default=True, help='Prometheus text or JSON summary with latency percentiles')
+def metrics(output_format):
+    """
+        Prints the metrics of the requests sent by the daemon since it started.
+
+        Args:
+            output_format (str): 'prometheus' for the Prometheus text format, 'json' for the summary.
+
+        Returns:
+            None
+    """
+    answer = daemon_request('metrics')
+    if answer is None:
+        raise click.ClickException('No daemon is running.')
+    if output_format == 'json':
+        click.echo(json.dumps(answer['summary'], indent=2))
+    else:
+        click.echo(answer['prometheus'], nl=False)
+# _______________________________________________________________________________________________________________________
+
+
+daemon.add_command(start)
+daemon.add_command(stop)
+daemon.add_command(status)
+daemon.add_command(metrics)
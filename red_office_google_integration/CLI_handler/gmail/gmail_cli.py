@@ -5,9 +5,14 @@ import base64
 
 from pyparsing import Any
 from red_office_google_integration.gmail.mail import Gmail
+from red_office_google_integration.CLI_handler.clients import get_client
+from red_office_google_integration.CLI_handler.output import write_jsonl
 from red_office_google_integration.gmail.message_creation import EmailCreation
+from red_office_google_integration.gmail.search_index import MailSearchIndex
+from red_office_google_integration.src import setting
 
 from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src.tracing import span
 
 
 @click.group(help="Gmail Where you can perform mail action")
@@ -57,10 +62,11 @@ def create_draft(payload, attachment):
             else:
                 raise click.BadParameter(f"file dosent exist {a}")
 
-    gmail = Gmail(key.encode())
+    gmail = get_client(Gmail, key.encode())
 
     result = gmail.create_draft(email_message, userid)
-    print(json.dumps(result, indent=2))
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
 # _____________________________________________________________________________________________________________________
 
 # _____________________Get Email________________________________________
@@ -91,10 +97,13 @@ def get_email(payload):
     message_id = payload_data.get('messageId')
     user_id = payload_data.get('userId', 'me')
     optionals = payload_data.get('optionals', {})
+    if 'fields' in payload_data:
+        optionals['fields'] = payload_data['fields']
 
-    mail = Gmail(key.encode())
+    mail = get_client(Gmail, key.encode())
     result = mail.get_email(message_id, user_id, **optionals)
-    print(json.dumps(result, indent=2))
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
 
 # ______________________________________________________________________________________________________________________
 
@@ -129,7 +138,7 @@ def download_attachment(payload, output):
     user_id = payload_data.get('userId', 'me')
     optionals = payload_data.get('optionals', {})
 
-    mail = Gmail(key.encode())
+    mail = get_client(Gmail, key.encode())
 
     message = mail.get_email(message_id, user_id, **optionals)
 
@@ -167,12 +176,14 @@ def save_attachment(directory_name, filename, data: bytes):
 
 @click.command(help="List email through query parameter")
 @click.argument('payload', type=str, required=True)
-def get_email_list(payload):
+@click.option('--stream', is_flag=True, help='Print the messages of every page as JSON lines while they are read')
+def get_email_list(payload, stream):
     """
     List emails based on query parameters.
 
     Args:
         payload (str): Path to a JSON file or a JSON string containing the email data.
+        stream (bool): Follow the pages and print every message as a JSON line as soon as it is decoded.
 
     Returns:
         dict: The list of emails that match the query parameters.
@@ -191,13 +202,105 @@ def get_email_list(payload):
     query = payload_data.get('query', '')
     user_id = payload_data.get('userId', 'me')
     optionals = payload_data.get('optionals', {})
+    if 'fields' in payload_data:
+        optionals['fields'] = payload_data['fields']
 
-    mail = Gmail(key.encode())
+    mail = get_client(Gmail, key.encode())
+    if stream:
+        write_jsonl(mail.iter_email_list(query, user_id, **optionals), None)
+        return
     result = mail.get_email_list(query, user_id, **optionals)
-    print(json.dumps(result, indent=2))
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
+
+
+@click.command(help="Fetch emails into the local search index")
+@click.argument('payload', type=str, required=True)
+def sync_index(payload):
+    """
+    Fetch the emails matching a query into the local full-text search index.
+    Emails that are already indexed are not downloaded again.
+
+    Args:
+        payload (str): Path to a JSON file or a JSON string containing 'key' and optionally
+            'query', 'userId', 'max_messages' and 'index_path'.
+    """
+    if os.path.isfile(payload):
+        with open(payload, 'r') as f:
+            payload_data = json.load(f)
+    else:
+        try:
+            payload_data = json.loads(payload)
+        except json.JSONDecodeError:
+            raise click.BadParameter(
+                'Payload must be a valid JSON string or a path to a JSON file.')
+
+    key = payload_data.get('key')
+    query = payload_data.get('query', '')
+    user_id = payload_data.get('userId', 'me')
+    max_messages = payload_data.get('max_messages')
+    index = MailSearchIndex(payload_data.get(
+        'index_path', setting.MAIL_SEARCH_INDEX_PATH))
+
+    mail = Gmail(key.encode(), search_index=index)
+    result = mail.sync_search_index(query, user_id, max_messages)
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
+
+
+@click.command(help="Search the local email index (offline)")
+@click.argument('payload', type=str, required=True)
+def search(payload):
+    """
+    Search emails in the local full-text index without calling the Gmail API.
+    The index is filled by `get-email` and `sync-index`.
+
+    Args:
+        payload (str): Path to a JSON file or a JSON string containing 'query' (FTS5 syntax)
+            and optionally 'limit' and 'index_path'.
+    """
+    if os.path.isfile(payload):
+        with open(payload, 'r') as f:
+            payload_data = json.load(f)
+    else:
+        try:
+            payload_data = json.loads(payload)
+        except json.JSONDecodeError:
+            raise click.BadParameter(
+                'Payload must be a valid JSON string or a path to a JSON file.')
+
+    query = payload_data.get('query')
+    if not query:
+        raise click.ClickException(
+            "Query not found! Please specify the query in the payload.")
+    limit = payload_data.get('limit', 20)
+    index = MailSearchIndex(payload_data.get(
+        'index_path', setting.MAIL_SEARCH_INDEX_PATH))
+
+    result = search_index(index, query, limit)
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
+
+
+@handle_exception
+def search_index(index: MailSearchIndex, query: str, limit: int) -> list[dict]:
+    """
+        Run a query against the local search index.
+
+        Args:
+            index (MailSearchIndex): The index to search.
+            query (str): The FTS5 query.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list[dict]: The matching emails.
+    """
+    return index.search(query, limit)
 
 
 mail.add_command(create_draft)
 mail.add_command(download_attachment)
 mail.add_command(get_email)
 mail.add_command(get_email_list)
+mail.add_command(sync_index)
+mail.add_command(search)
@@ -0,0 +1,69 @@
+'''
+    Click group importing its subcommands only when they are used.
+
+    Importing every CLI module at startup pulls in googleapiclient, google-auth, cryptography and pandas,
+    which takes longer than most commands need. `LazyGroup` knows its subcommands by import path and short
+    help, so `main.py --help` lists them without importing anything, and `main.py calendar ...` imports the
+    calendar modules only.
+
+    Example:
+    ```
+    @click.group(cls=LazyGroup, lazy_subcommands={
+        'calendar': ('red_office_google_integration.CLI_handler.calendar.events:calendar', 'Calendar events.'),
+    })
+    def command_line_interface():
+        pass
+    ```
+'''
+import importlib
+import click
+
+
+class LazyGroup(click.Group):
+    '''
+        Group whose subcommands are imported on first use.
+
+        Args:
+            lazy_subcommands (dict): Command name to `(import path, short help)`, the import path being
+                `'package.module:attribute'`.
+    '''
+
+    def __init__(self, *args, lazy_subcommands: dict[str, tuple[str, str]] | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            self.add_command(self.__load(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        '''
+            List the subcommands with the short help given for them, without importing them.
+        '''
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str(formatter.width - 6 - len(name))))
+            else:
+                rows.append((name, self.lazy_subcommands[name][1]))
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+    def __load(self, cmd_name: str) -> click.Command:
+        module_name, attribute = self.lazy_subcommands[cmd_name][0].split(':')
+        command = getattr(importlib.import_module(module_name), attribute)
+        if not isinstance(command, click.Command):
+            raise TypeError(f'{module_name}:{attribute} is not a click command.')
+        return command
+
+
+if __name__ == '__main__':
+    pass
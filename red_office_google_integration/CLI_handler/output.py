@@ -0,0 +1,37 @@
+'''
+    Output helpers shared by the CLI commands.
+
+    Streaming commands (`--stream`, `batch`, `calendar agenda`, `calendar ics import`) print one JSON line per
+    result as soon as it is available instead of one JSON document at the end.
+
+    Example:
+    ```
+    write_jsonl(event.iter_events(calendar_id, optional_parameter), output)
+    ```
+'''
+import json
+import click
+
+
+def write_jsonl(results, output):
+    '''
+        Print every result as one JSON line as soon as it is available, optionally copying them to a file.
+
+        Args:
+            results (Iterable[dict]): The results to write.
+            output (str, optional): Path of a file receiving a copy of the lines.
+    '''
+    f = open(output, 'w') if output else None
+    try:
+        for result in results:
+            line = json.dumps(result)
+            click.echo(line)
+            if f:
+                f.write(line + '\n')
+    finally:
+        if f:
+            f.close()
+
+
+if __name__ == '__main__':
+    pass
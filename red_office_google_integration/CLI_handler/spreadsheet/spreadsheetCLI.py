@@ -2,9 +2,11 @@
 import click
 import os
 import json
-import pandas as pd
 from red_office_google_integration.spreadsheets.sheets import SpreadSheet
+from red_office_google_integration.CLI_handler.clients import get_client
+from red_office_google_integration.CLI_handler.output import write_jsonl
 from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src.tracing import span
 """
 # CLI Module
 
@@ -18,6 +20,9 @@ This module provides a command-line interface (CLI) for interacting with Google
 - `batch_update_values`: Updates values in multiple specified ranges in a Google Sheets spreadsheet. `py main.py spreadsheet batch-update-values`
 - `append_data`: Appends values to a specified range in a Google Sheets spreadsheet. `py main.py spreadsheet append-data`
 
+`get_data` and `get_batch_data` accept an optional `fields` list in the payload to request a partial response.
+`get_data --stream` prints the rows as JSON lines while the response is read.
+
 
 """
 
@@ -31,13 +36,16 @@ def spreadsheet():
 @click.command(help="Retrieves data from a specified range in a Google Sheets spreadsheet.")
 @click.argument('payload', type=str, required=True)
 @click.option('-o', '--output', type=click.Path(writable=True, resolve_path=True), help='Output directory')
-def get_data(payload, output):
+@click.option('--stream', is_flag=True, help='Print the rows as JSON lines while they are read')
+def get_data(payload, output, stream):
     """
         Retrieves data from a specified range in a Google Sheets spreadsheet.
 
         Args:
             payload (str): Path to a JSON file or a JSON string containing the request payload.
             output (str): Path to the output file where the retrieved data will be saved.
+            stream (bool): Print every row as a JSON line as soon as it is decoded, the range is never held in
+                memory. `output` then receives a copy of the lines.
 
         Returns:
             None
@@ -56,13 +64,20 @@ def get_data(payload, output):
     spreadsheetId = payload_data.get('spreadsheetId')
     range = payload_data.get('range')
     optionals = payload_data.get('optionals', {})
-    spreadsheet = SpreadSheet(key.encode())
-
+    if 'fields' in payload_data:
+        optionals['fields'] = payload_data['fields']
+    spreadsheet = get_client(SpreadSheet, key.encode())
+
+    if stream:
+        optionals.pop('fields', None)  # rows only
+        write_jsonl(spreadsheet.iter_rows(spreadsheetId, range, **optionals), output)
+        return
     res = spreadsheet.get_data(spreadsheetId, range, **optionals)
-    print(json.dumps(res, indent=2))
+    with span('output.write'):
+        print(json.dumps(res, indent=2))
 
-    if output:
-        save_to_file(res, output)
+        if output:
+            save_to_file(res, output)
 # _______________________________________________________________________________________________________________________
 
 # get batch_batch_data
@@ -96,13 +111,16 @@ def get_batch_data(payload, output):
     spreadsheetId = payload_data.get('spreadsheetId')
     ranges = payload_data.get('ranges')
     optionals = payload_data.get('optionals', {})
-    spreadsheet = SpreadSheet(key.encode())
+    if 'fields' in payload_data:
+        optionals['fields'] = payload_data['fields']
+    spreadsheet = get_client(SpreadSheet, key.encode())
 
     res = spreadsheet.get_batch_data(spreadsheetId, ranges, **optionals)
-    print(json.dumps(res, indent=2))
+    with span('output.write'):
+        print(json.dumps(res, indent=2))
 
-    if output:
-        save_to_file(res, output)
+        if output:
+            save_to_file(res, output)
 
 
 @click.command(help="update_values to specifed range in spreadsheet")
@@ -134,11 +152,12 @@ def update_values(payload):
     values = payload_data.get('values')
     optionals = payload_data.get('optionals', {})
 
-    spreadsheet = SpreadSheet(key.encode())
+    spreadsheet = get_client(SpreadSheet, key.encode())
     result = spreadsheet.update_values(
         spreadsheetId, range, valueInputOption, values, **optionals)
 
-    print(json.dumps(result, indent=2))
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
 
 
 @click.command(help="update_values to multiple specifed range in spreadsheet")
@@ -169,10 +188,11 @@ def batch_update_values(payload):
     valueInputOption = payload_data.get('valueInputOption')
     optionals = payload_data.get('optionals', {})
 
-    spreadsheet = SpreadSheet(key.encode())
+    spreadsheet = get_client(SpreadSheet, key.encode())
     result = spreadsheet.batch_update_values(
         spreadsheetId, valueInputOption, data, **optionals)
-    print(json.dumps(result, indent=2))
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
 
 
 @click.command(help="Append values to spreadsheet")
@@ -201,11 +221,12 @@ def append_data(payload):
     values = payload_data.get('values')
     optionals = payload_data.get('optionals', {})
 
-    spreadsheet = SpreadSheet(key.encode())
+    spreadsheet = get_client(SpreadSheet, key.encode())
     result = spreadsheet.append_data(
         spreadsheetId, range, valueInputOption, values, **optionals)
 
-    print(json.dumps(result, indent=2))
+    with span('output.write'):
+        print(json.dumps(result, indent=2))
 
 
 @handle_exception
@@ -220,6 +241,8 @@ def save_to_file(data, filename):
     Returns:
         None
     """
+    import pandas as pd  # only needed to save a file, slow to import
+
     df = pd.DataFrame(data)
     _, file_extension = os.path.splitext(filename)
     if file_extension.lower() == '.csv':
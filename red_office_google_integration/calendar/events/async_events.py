@@ -0,0 +1,230 @@
+'''
+    Asyncio counterpart of `CalendarEvent`.
+
+    `AsyncCalendarEvent` has the same methods and parameters as `CalendarEvent`, but they are coroutines
+    sent through an `AsyncTransport`, so thousands of calendar requests can be in flight on one event loop
+    while the number of concurrent requests stays bounded.
+
+    Example:
+    ```
+    async with AsyncCalendarEvent(key) as event:
+        pages = await asyncio.gather(*(event.list_event(calendarId, {}, all_pages=True) for calendarId in rooms))
+        async for item in event.iter_events('primary', {'timeMin': '2024-05-01T00:00:00Z'}):
+            print(item['summary'])
+    ```
+'''
+from typing import Any, AsyncIterator
+from googleapiclient.errors import HttpError
+from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService  # noqa: E203,E402
+from red_office_google_integration.google_service.async_transport import AsyncTransport, build_request_service
+from red_office_google_integration.src.metrics import account_label
+from red_office_google_integration.calendar.events.scheduling import ScheduleIndex
+from red_office_google_integration.calendar.events.cache import EventCache
+from red_office_google_integration.calendar.events.diff import event_diff
+from red_office_google_integration.src.singleflight import single_flight
+from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.log.log_handler import logger
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.fields import Fields, with_fields, CALENDAR_EVENTS_PAGE_FIELDS
+
+
+class AsyncCalendarEvent:
+    '''
+    Asyncio client for Google Calendar events.
+
+    Credentials are loaded when the object is created, as for `CalendarEvent`; create it once and share it.
+    Close it with `await event.aclose()` or use it as an async context manager.
+
+    Methods:
+    - create_event()
+    - delete_event()
+    - patch_event()
+    - list_event()
+    - iter_events()
+    - get_event()
+    '''
+
+    def __init__(self, key: bytes, schedule: ScheduleIndex | None = None, event_cache: EventCache | None = None,
+                 max_concurrency: int = setting.ASYNC_MAX_CONCURRENCY_CALENDAR, client=None):
+        '''
+        Initialize the AsyncCalendarEvent class.
+
+        Args:
+            key (bytes): The key used for authentication.
+            schedule (ScheduleIndex, optional): Local free/busy index kept up to date with the events.
+            event_cache (EventCache, optional): Cache of events and their ETags, see `CalendarEvent`.
+            max_concurrency (int, optional): Requests in flight at the same time.
+            client (httpx.AsyncClient, optional): HTTP client shared with other async clients.
+        '''
+        self.__key = key
+        self.schedule = schedule
+        self.event_cache = event_cache
+        self.service = self.__build_service(max_concurrency, client)
+
+    @handle_exception
+    def __build_service(self, max_concurrency: int, client):
+        '''
+        Load the credentials, create the transport and return the service used to build requests.
+        '''
+        cred = GoogleCredentialService(
+            self.__key, setting.SCOPE_CALENDAR, setting.FILE_NAME_CALENDAR_TOKEN, setting.FILE_NAME_CALENDAR_CREDENTIAL).get_service()
+        self.__transport = AsyncTransport(cred, max_concurrency, client=client, api='calendar',
+                                          account=account_label(self.__key))
+        return build_request_service("calendar", "v3")
+
+    def _remember(self, calendarId: str, events: list[dict], partial: bool = False) -> None:
+        '''
+        Add or replace events in the schedule index and the event cache, if there are any.
+        Partial responses (requested with a field mask) are neither cached nor indexed.
+        '''
+        if not events or partial:
+            return
+        if self.schedule is not None:
+            self.schedule.add_events(calendarId, events)
+        if self.event_cache is not None:
+            for event in events:
+                self.event_cache.put(calendarId, event)
+
+    def _forget(self, calendarId: str, eventIds: list[str]) -> None:
+        '''
+        Remove events from the schedule index and the event cache, if there are any.
+        '''
+        if self.schedule is not None and eventIds:
+            self.schedule.remove_events(calendarId, eventIds)
+        if self.event_cache is not None:
+            for eventId in eventIds:
+                self.event_cache.invalidate(calendarId, eventId)
+
+    async def __conditional_execute(self, request, calendarId: str, eventId: str, etag: str | None) -> Any:
+        '''
+        Send a write request with `If-Match`, dropping the cached copy when the API answers 412.
+        '''
+        if etag:
+            request.headers['If-Match'] = etag
+        try:
+            return await self.__transport.execute(request)
+        except HttpError as e:
+            if e.resp.status == 412:
+                self._forget(calendarId, [eventId])
+            raise
+
+    @handle_exception
+    async def create_event(self, calendarId: str, event_data: dict[str, Any]) -> dict:
+        '''
+        Create a new event in the specified calendar, see `CalendarEvent.create_event()`.
+        '''
+        event = await self.__transport.execute(self.service.events().insert(calendarId=calendarId, body=event_data))
+        logger.info({'event': 'event_created', 'calendar_id': calendarId, 'event_id': event.get('id')})
+        self._remember(calendarId, [event])
+        return event
+
+    @handle_exception
+    async def delete_event(self, calendarId: str, eventId: str, **kwargs) -> dict:
+        '''
+        Delete an event from the specified calendar, see `CalendarEvent.delete_event()`.
+        '''
+        etag = self.event_cache.etag(calendarId, eventId) if self.event_cache is not None else None
+        await self.__conditional_execute(self.service.events().delete(calendarId=calendarId, eventId=eventId,
+                                                                      **kwargs), calendarId, eventId, etag)
+        logger.warning(f'Event with ID {eventId} deleted Successfully.')
+        self._forget(calendarId, [eventId])
+        return {'status': 'Deleted', 'event_id': eventId}
+
+    @handle_exception
+    async def patch_event(self, calendarId: str, eventId: str, event_data: dict[str, Any],
+                          current: dict[str, Any] | None = None, **kwargs) -> dict:
+        '''
+        Change an event, sending only the fields that differ, see `CalendarEvent.patch_event()`.
+        '''
+        if current is None:
+            current = self.event_cache.get(calendarId, eventId) if self.event_cache is not None else None
+        if current is None:
+            current = await self.__transport.execute(self.service.events().get(calendarId=calendarId,
+                                                                                eventId=eventId))
+            self._remember(calendarId, [current])
+        body = event_diff(current, event_data)
+        if not body:
+            return {'status': 'Unchanged', 'event_id': eventId, 'fields': [], 'event': current}
+        event = await self.__conditional_execute(self.service.events().patch(
+            calendarId=calendarId, eventId=eventId, body=body, **kwargs), calendarId, eventId, current.get('etag'))
+        self._remember(calendarId, [event])
+        return {'status': 'Patched', 'event_id': eventId, 'fields': sorted(body), 'event': event}
+
+    @handle_exception
+    @single_flight()
+    async def list_event(self, calendarId: str, optional_parameter: dict, fields: Fields = None,
+                         all_pages: bool = False) -> dict:
+        '''
+        List events from the specified calendar, see `CalendarEvent.list_event()`.
+        '''
+        params = with_fields(dict(optional_parameter), fields, 'items', CALENDAR_EVENTS_PAGE_FIELDS)
+        if not all_pages:
+            events = await self.__transport.execute(self.service.events().list(calendarId=calendarId, **params))
+            self._remember(calendarId, events.get('items', []), 'fields' in params)
+            return events
+        items: list[dict] = []
+        async for page in self.__iter_pages(calendarId, params):
+            items.extend(page.get('items', []))
+        page['items'] = items
+        return page
+
+    async def __iter_pages(self, calendarId: str, params: dict) -> AsyncIterator[dict]:
+        params = dict(params)
+        page_token = params.pop('pageToken', None)
+        while True:
+            page = await self.__transport.execute(self.service.events().list(
+                calendarId=calendarId, pageToken=page_token, **params))
+            self._remember(calendarId, page.get('items', []), 'fields' in params)
+            yield page
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+
+    @handle_exception
+    async def iter_events(self, calendarId: str, optional_parameter: dict | None = None,
+                          fields: Fields = None) -> AsyncIterator[dict]:
+        '''
+        Iterate over all events of a calendar, following the pages, see `CalendarEvent.iter_events()`.
+        '''
+        params = with_fields(dict(optional_parameter or {}), fields, 'items', CALENDAR_EVENTS_PAGE_FIELDS)
+        async for page in self.__iter_pages(calendarId, params):
+            for item in page.get('items', []):
+                yield item
+
+    @handle_exception
+    @single_flight()
+    async def get_event(self, calendarId: str, eventId: str, fields: Fields = None, **kwargs) -> dict:
+        '''
+        Get details of a specific event, answering from the event cache on 304 Not Modified,
+        see `CalendarEvent.get_event()`.
+        '''
+        kwargs = with_fields(kwargs, fields)
+        partial = 'fields' in kwargs
+        request = self.service.events().get(calendarId=calendarId, eventId=eventId, **kwargs)
+        cached = self.event_cache.get(calendarId, eventId) if self.event_cache is not None and not partial else None
+        if cached is not None:
+            request.headers['If-None-Match'] = cached['etag']
+        try:
+            event = await self.__transport.execute(request)
+        except HttpError as e:
+            if cached is not None and e.resp.status == 304:
+                return cached
+            raise
+        self._remember(calendarId, [event], partial)
+        return event
+
+    async def aclose(self) -> None:
+        '''
+        Close the HTTP connections.
+        '''
+        await self.__transport.aclose()
+
+    async def __aenter__(self) -> 'AsyncCalendarEvent':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+if __name__ == '__main__':
+    pass
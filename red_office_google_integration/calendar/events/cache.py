@@ -0,0 +1,96 @@
+'''
+    In-memory cache of calendar events keyed by (calendarId, eventId).
+
+    Every cached event keeps the ETag returned by the API. `CalendarEvent.get_event()` sends it in an
+    `If-None-Match` header and serves the cached copy when the API answers 304 Not Modified, and writes
+    send it in an `If-Match` header so concurrent modifications are detected without reading first.
+'''
+import threading
+from collections import OrderedDict
+from typing import Any
+
+
+class EventCache:
+    '''
+        Thread-safe LRU cache of event resources and their ETags.
+
+        Args:
+            max_entries (int, optional): Maximum number of cached events. Defaults to 10000.
+
+        Methods:
+            get(calendarId, eventId): Return the cached event or None.
+            etag(calendarId, eventId): Return the ETag of the cached event or None.
+            put(calendarId, event): Cache an event.
+            invalidate(calendarId, eventId): Drop an event.
+            clear(): Drop every event.
+    '''
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self.__events: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, calendarId: str, eventId: str) -> dict[str, Any] | None:
+        '''
+            Return the cached event.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+                eventId (str): The ID of the event.
+
+            Returns:
+                (dict | None): The event, or None when it is not cached.
+        '''
+        with self.__lock:
+            event = self.__events.get((calendarId, eventId))
+            if event is not None:
+                self.__events.move_to_end((calendarId, eventId))
+            return event
+
+    def etag(self, calendarId: str, eventId: str) -> str | None:
+        '''
+            Return the ETag of the cached event, or None when it is not cached.
+        '''
+        event = self.get(calendarId, eventId)
+        return event.get('etag') if event is not None else None
+
+    def put(self, calendarId: str, event: dict[str, Any]) -> None:
+        '''
+            Cache an event. Events without id or ETag (e.g. partial responses) are ignored and
+            cancelled events are dropped.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+                event (dict): The event resource as returned by the API.
+        '''
+        if not event.get('id'):
+            return
+        if event.get('status') == 'cancelled' or not event.get('etag'):
+            self.invalidate(calendarId, event['id'])
+            return
+        with self.__lock:
+            self.__events[(calendarId, event['id'])] = event
+            self.__events.move_to_end((calendarId, event['id']))
+            while len(self.__events) > self.max_entries:
+                self.__events.popitem(last=False)
+
+    def invalidate(self, calendarId: str, eventId: str) -> None:
+        '''
+            Drop an event from the cache.
+        '''
+        with self.__lock:
+            self.__events.pop((calendarId, eventId), None)
+
+    def clear(self) -> None:
+        '''
+            Drop every event.
+        '''
+        with self.__lock:
+            self.__events.clear()
+
+    def __len__(self) -> int:
+        return len(self.__events)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,98 @@
+'''
+    Minimal patch bodies for calendar events.
+
+    `event_diff()` compares the desired state of an event with its current copy and returns only the
+    fields that change, ready to be sent with `events.patch`. Unchanged events need no request at all.
+
+    The body follows the patch semantics of the API: nested objects are merged, so only their changed
+    keys are sent, while lists (attendees, recurrence, ...) replace the current value and are sent whole.
+    `start` and `end` are sent whole with the unused one of `date`/`dateTime` cleared, so an event can move
+    between all-day and timed. Times are compared as instants, `09:00+02:00` equals `07:00Z`.
+
+    Example:
+    ```
+    current = event.get_event('primary', eventId)
+    event_diff(current, {'start': {'dateTime': '2024-05-02T10:00:00Z'}, 'end': {'dateTime': '2024-05-02T11:00:00Z'}})
+    ```
+'''
+from typing import Any
+from red_office_google_integration.calendar.events.scheduling import parse_datetime
+
+
+# Fields set by the API that are never sent in a patch
+READ_ONLY_FIELDS = frozenset({'kind', 'etag', 'id', 'htmlLink', 'created', 'updated', 'creator', 'iCalUID',
+                              'recurringEventId', 'originalStartTime', 'hangoutLink', 'privateCopy', 'locked'})
+TIME_FIELDS = ('start', 'end')
+
+
+def _same_time(current: dict[str, Any], desired: dict[str, Any]) -> bool:
+    '''
+        Compare two `start`/`end` objects, timestamps as instants.
+    '''
+    if 'date' in desired or 'date' in current:
+        return desired.get('date') == current.get('date')
+    if 'timeZone' in desired and desired['timeZone'] != current.get('timeZone'):
+        return False
+    try:
+        return parse_datetime(desired['dateTime']) == parse_datetime(current['dateTime'])
+    except (KeyError, ValueError):
+        return desired.get('dateTime') == current.get('dateTime')
+
+
+def contains(current: Any, desired: Any) -> bool:
+    '''
+        Tell whether `current` already has every value of `desired`.
+
+        Keys of a dict missing from `desired` are ignored, e.g. the `responseStatus` of an attendee
+        that the desired state does not mention. Lists must have the same length and match item by item.
+    '''
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(
+            key in current and contains(current[key], value) if value is not None else current.get(key) is None
+            for key, value in desired.items())
+    if isinstance(desired, list):
+        return isinstance(current, list) and len(current) == len(desired) and all(
+            contains(c, d) for c, d in zip(current, desired))
+    return current == desired
+
+
+def _diff_object(current: dict[str, Any], desired: dict[str, Any]) -> dict[str, Any]:
+    changes = {}
+    for key, value in desired.items():
+        if key not in current and value is None:
+            continue
+        if isinstance(value, dict) and isinstance(current.get(key), dict):
+            nested = _diff_object(current[key], value)
+            if nested:
+                changes[key] = nested
+        elif not contains(current.get(key), value):
+            changes[key] = value
+    return changes
+
+
+def event_diff(current: dict[str, Any], desired: dict[str, Any]) -> dict[str, Any]:
+    '''
+        Return the patch body that turns `current` into `desired`.
+
+        Args:
+            current (dict): The event as returned by the API.
+            desired (dict): The fields to set. Fields not mentioned are left unchanged and `None` clears a field.
+
+        Returns:
+            dict: The changed fields, empty when the event already matches.
+    '''
+    body: dict[str, Any] = {}
+    for key, value in desired.items():
+        if key in READ_ONLY_FIELDS:
+            continue
+        if key in TIME_FIELDS and isinstance(value, dict):
+            if not _same_time(current.get(key) or {}, value):
+                unused = 'dateTime' if 'date' in value else 'date'
+                body[key] = {**value, unused: None} if (current.get(key) or {}).get(unused) else dict(value)
+            continue
+        body.update(_diff_object(current, {key: value}))
+    return body
+
+
+if __name__ == '__main__':
+    pass
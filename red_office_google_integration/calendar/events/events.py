@@ -4,19 +4,39 @@
     
     - optional:
         - Implement update_event()
-        - patch_event() methods.
     NOTE:
         Features that can be added:
         - find and replace
         
 
 '''
-from typing import Any
-from googleapiclient.discovery import build
-from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService  # noqa: E203,E402
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator
+from googleapiclient.errors import HttpError
+from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService, secret_directory  # noqa: E203,E402
+from red_office_google_integration.google_service.transport import ThreadLocalHttp, build_service
+from red_office_google_integration.google_service.batch import BatchExecutor
+from red_office_google_integration.calendar.events.sync_store import SyncTokenStore
+from red_office_google_integration.calendar.events.scheduling import ScheduleIndex, Instant, parse_event_time
+from red_office_google_integration.calendar.events.fanout import merge_sorted
+from red_office_google_integration.calendar.events.cache import EventCache
+from red_office_google_integration.calendar.events.diff import event_diff
+from red_office_google_integration.calendar.events.ics import read_ics, write_ics
+from red_office_google_integration.calendar.events.recurrence import expand_events, window_parameters
+from red_office_google_integration.src.singleflight import single_flight
 from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src.executor import RequestExecutor
+from red_office_google_integration.src.metrics import account_label
+from red_office_google_integration.src.tracing import span
 from red_office_google_integration.log.log_handler import logger
 from red_office_google_integration.src import setting
+from red_office_google_integration.src.fields import Fields, with_fields, CALENDAR_EVENTS_PAGE_FIELDS
+
+
+# Query parameters the API rejects in combination with a syncToken
+SYNC_INCOMPATIBLE_PARAMETERS = ('iCalUID', 'orderBy', 'privateExtendedProperty', 'q',
+                                'sharedExtendedProperty', 'timeMin', 'timeMax', 'updatedMin')
 
 
 class CalendarEvent:
@@ -25,19 +45,48 @@ class CalendarEvent:
 
     Methods:
     - create_event()
+    - bulk_create_events()
     - delete_event()
+    - bulk_delete_events()
+    - patch_event()
+    - bulk_patch_events()
     - list_event()
+    - iter_events()
+    - iter_merged_events()
+    - list_expanded_events()
+    - sync_events()
+    - import_ics()
+    - export_ics()
     - get_event()
     '''
 
-    def __init__(self, key: bytes):
+    def __init__(self, key: bytes, sync_store: SyncTokenStore | None = None, schedule: ScheduleIndex | None = None,
+                 event_cache: EventCache | None = None, account: str | None = None):
         '''
         Initialize the CalendarEvent class.
 
         Args:
             key (bytes): The key used for authentication.
+            sync_store (SyncTokenStore, optional): Storage for the sync tokens used by `sync_events()`. Defaults
+                to `setting.CALENDAR_SYNC_TOKEN_PATH`, or to a file of the account's directory with `account`.
+            schedule (ScheduleIndex, optional): Local free/busy index kept up to date with the events
+                listed, fetched, created and deleted through this object.
+            event_cache (EventCache, optional): Cache of events and their ETags. `get_event()` then sends
+                conditional requests and writes send `If-Match` with the cached ETag.
+            account (str, optional): Account id of a multi-account setup: the credential and token files are
+                read from `setting.ACCOUNTS_DIRECTORY_PATH / account`, its sync tokens kept there and the metrics
+                labelled with its hash.
         '''
         self.__key = key
+        self.account = account
+        if sync_store is None:
+            # the tokens of one account do not work, or miss changes, for another account's calendars
+            sync_store = SyncTokenStore(secret_directory(account) / setting.FILE_NAME_CALENDAR_SYNC_TOKENS
+                                        if account is not None else setting.CALENDAR_SYNC_TOKEN_PATH)
+        self.sync_store = sync_store
+        self.schedule = schedule
+        self.event_cache = event_cache
+        self.executor = RequestExecutor('calendar', account=account_label(account if account is not None else key))
         self.service = self.__build_service()
 
     @handle_exception
@@ -48,9 +97,14 @@ class CalendarEvent:
         Returns:
             (cred): The Google Calendar service.
         '''
-        cred = GoogleCredentialService(
-            self.__key, setting.SCOPE_CALENDAR, setting.FILE_NAME_CALENDAR_TOKEN, setting.FILE_NAME_CALENDAR_CREDENTIAL).get_service()
-        return build("calendar", "v3", credentials=cred)
+        self.credential_service = GoogleCredentialService(
+            self.__key, setting.SCOPE_CALENDAR, setting.FILE_NAME_CALENDAR_TOKEN, setting.FILE_NAME_CALENDAR_CREDENTIAL,
+            secret_directory(self.account))
+        cred = self.credential_service.get_service()
+        self.__http = ThreadLocalHttp(cred)
+        self.executor.http = self.__http
+        with span('service.build', api='calendar'):
+            return build_service("calendar", "v3", credentials=cred)
 
     @handle_exception
     def create_event(self, calendarId: str, event_data: dict[str, Any]) -> dict:
@@ -101,9 +155,10 @@ class CalendarEvent:
                 ```
 
         '''
-        event = self.service.events().insert(
-            calendarId=calendarId, body=event_data).execute()
-        logger.info(f"Success: {event}")
+        event = self.executor.execute(self.service.events().insert(
+            calendarId=calendarId, body=event_data))
+        logger.info({'event': 'event_created', 'calendar_id': calendarId, 'event_id': event.get('id')})
+        self._remember(calendarId, [event])
         return event
 
     @handle_exception
@@ -118,6 +173,9 @@ class CalendarEvent:
         Returns:
             dict: A status message indicating the deletion was successful.
 
+        When the event is in the event cache the deletion is conditional on its ETag and fails with
+        412 Precondition Failed if the event was modified since it was cached.
+
         ## example
 
             event = GoogleCredentialService().delete_event(calendarId,eventId)
@@ -136,14 +194,333 @@ class CalendarEvent:
 
 
         '''
-        event = self.service.events().delete(calendarId=calendarId,
-                                             eventId=eventId, **kwargs).execute()
+        request = self.service.events().delete(calendarId=calendarId,
+                                               eventId=eventId, **kwargs)
+        try:
+            self.executor.execute(self._if_match(request, calendarId, eventId))
+        except HttpError as e:
+            if e.resp.status == 412:
+                # the cached copy is stale, the next read fetches the event again
+                self._forget(calendarId, [eventId])
+            raise
         logger.warning(f'Event with ID {eventId} deleted Successfully.')
+        self._forget(calendarId, [eventId])
 
         return {'status': 'Deleted', 'event_id': eventId}
 
     @handle_exception
-    def list_event(self, calendarId: str, optional_parameter: dict) -> dict:
+    def patch_event(self, calendarId: str, eventId: str, event_data: dict[str, Any],
+                    current: dict[str, Any] | None = None, **kwargs) -> dict:
+        '''
+        Change an event, sending only the fields that differ from its current state.
+
+        The current state is taken from `current`, the event cache or, when neither has it, fetched
+        with one `events.get`. When nothing changes no write request is made. The patch is conditional
+        on the ETag of the current state and fails with 412 Precondition Failed if the event was
+        modified in the meantime.
+
+        Args:
+            calendarId (str): The ID of the calendar containing the event.
+            eventId (str): The ID of the event to change.
+            event_data (dict): The desired fields, e.g. `start` and `end`. Fields not given are left unchanged.
+            current (dict, optional): The current event, if the caller already has it.
+            **kwargs: Optional query parameters of `events.patch`, e.g. `sendUpdates`.
+
+        Returns:
+            dict: `{'status': 'Patched' | 'Unchanged', 'event_id', 'fields', 'event'}`.
+
+        Example:
+            ```
+            event = CalendarEvent(key, event_cache=EventCache())
+            event.patch_event('primary', eventId, {
+                'start': {'dateTime': '2024-05-02T10:00:00Z'},
+                'end': {'dateTime': '2024-05-02T11:00:00Z'},
+            }, sendUpdates='all')
+            ```
+        '''
+        if current is None:
+            current = self.event_cache.get(calendarId, eventId) if self.event_cache is not None else None
+        if current is None:
+            current = self.executor.execute(self.service.events().get(calendarId=calendarId, eventId=eventId))
+            self._remember(calendarId, [current])
+        body = event_diff(current, event_data)
+        if not body:
+            return {'status': 'Unchanged', 'event_id': eventId, 'fields': [], 'event': current}
+
+        request = self.__conditional(self.service.events().patch(calendarId=calendarId, eventId=eventId,
+                                                                 body=body, **kwargs), current)
+        try:
+            event = self.executor.execute(request)
+        except HttpError as e:
+            if e.resp.status == 412:
+                self._forget(calendarId, [eventId])
+            raise
+        logger.info(f'Event with ID {eventId} patched: {sorted(body)}.')
+        self._remember(calendarId, [event])
+        return {'status': 'Patched', 'event_id': eventId, 'fields': sorted(body), 'event': event}
+
+    @staticmethod
+    def __conditional(request, current: dict[str, Any]):
+        '''
+        Make a write request conditional on the ETag of the copy its body was computed from.
+        '''
+        if current.get('etag'):
+            request.headers['If-Match'] = current['etag']
+        return request
+
+    def _remember(self, calendarId: str, events: list[dict], partial: bool = False, cache: bool = True) -> None:
+        '''
+        Add or replace events in the schedule index and the event cache, if there are any.
+        Partial responses (requested with a field mask) are neither cached nor indexed: the fields left out,
+        e.g. `transparency`, could change the busy time of the event. Events that are not API resources, e.g.
+        locally expanded instances, are indexed but not cached (`cache=False`).
+        '''
+        if not events or partial:
+            return
+        if self.schedule is not None:
+            self.schedule.add_events(calendarId, events)
+        if self.event_cache is not None and cache:
+            for event in events:
+                self.event_cache.put(calendarId, event)
+
+    def _forget(self, calendarId: str, eventIds: list[str]) -> None:
+        '''
+        Remove events from the schedule index and the event cache, if there are any.
+        '''
+        if self.schedule is not None and eventIds:
+            self.schedule.remove_events(calendarId, eventIds)
+        if self.event_cache is not None:
+            for eventId in eventIds:
+                self.event_cache.invalidate(calendarId, eventId)
+
+    def _if_match(self, request, calendarId: str, eventId: str):
+        '''
+        Make a write request conditional on the cached ETag of the event, if it is cached.
+        The API then answers 412 Precondition Failed when the event was changed by someone else.
+        '''
+        etag = self.event_cache.etag(calendarId, eventId) if self.event_cache is not None else None
+        if etag:
+            request.headers['If-Match'] = etag
+        return request
+
+    def _batch_executor(self, batch_size: int, max_workers: int, max_retries: int) -> BatchExecutor:
+        '''
+        Return a batch executor bound to this calendar service.
+        '''
+        return BatchExecutor(self.service, self.__http, batch_size=batch_size, max_workers=max_workers,
+                             max_retries=max_retries, limiter=self.executor.limiter, api='calendar',
+                             account=self.executor.account, quota=self.executor.quota)
+
+    @handle_exception
+    def bulk_create_events(self, calendarId: str, events: Iterable[dict[str, Any]], batch_size: int = 50,
+                           max_workers: int = 4, max_retries: int = 3, **kwargs) -> Iterator[dict]:
+        '''
+        Create many events through batch requests.
+
+        Events are sent in batches of `batch_size` with up to `max_workers` batches in flight.
+        Only the events that failed with a retryable error are sent again.
+
+        Args:
+            calendarId (str): The ID of the calendar in which to create the events.
+            events (Iterable[dict]): The event bodies, see `create_event()`. Consumed lazily.
+            batch_size (int, optional): Events per batch request. Defaults to 50.
+            max_workers (int, optional): Batch requests in flight at the same time. Defaults to 4.
+            max_retries (int, optional): Retries of a failed event. Defaults to 3.
+            **kwargs: Optional query parameters of `events.insert`, e.g. `sendUpdates`.
+
+        Yields:
+            dict: The result of every event as its batch completes, with the `index` of the event in the input.
+
+        Example:
+            ```
+            event = CalendarEvent(key)
+            for result in event.bulk_create_events('primary', events):
+                print(result['index'], result['status'])
+            ```
+        '''
+        requests = ((index, self.service.events().insert(calendarId=calendarId, body=body, **kwargs))
+                    for index, body in enumerate(events))
+        created = 0
+        for result in self._batch_executor(batch_size, max_workers, max_retries).run(requests):
+            if result['status'] == 'success':
+                created += 1
+                self._remember(calendarId, [result['response']])
+                yield {'index': result['tag'], 'status': 'Created', 'event_id': result['response'].get('id'),
+                       'event': result['response']}
+            else:
+                yield {'index': result['tag'], 'status': 'Error', 'error': result['error']}
+        logger.info(f'{created} events created in calendar {calendarId}.')
+
+    @handle_exception
+    def bulk_delete_events(self, calendarId: str, eventIds: Iterable[str], batch_size: int = 50,
+                           max_workers: int = 4, max_retries: int = 3, **kwargs) -> Iterator[dict]:
+        '''
+        Delete many events through batch requests.
+
+        Args:
+            calendarId (str): The ID of the calendar from which to delete the events.
+            eventIds (Iterable[str]): The IDs of the events to delete. Consumed lazily.
+            batch_size (int, optional): Events per batch request. Defaults to 50.
+            max_workers (int, optional): Batch requests in flight at the same time. Defaults to 4.
+            max_retries (int, optional): Retries of a failed deletion. Defaults to 3.
+            **kwargs: Optional query parameters of `events.delete`, e.g. `sendUpdates`.
+
+        Yields:
+            dict: The result of every deletion as its batch completes.
+        '''
+        requests = ((eventId, self._if_match(self.service.events().delete(calendarId=calendarId, eventId=eventId,
+                                                                          **kwargs), calendarId, eventId))
+                    for eventId in eventIds)
+        deleted = 0
+        for result in self._batch_executor(batch_size, max_workers, max_retries).run(requests):
+            if result['status'] == 'success':
+                deleted += 1
+                self._forget(calendarId, [result['tag']])
+                yield {'status': 'Deleted', 'event_id': result['tag']}
+            else:
+                yield {'status': 'Error', 'event_id': result['tag'], 'error': result['error']}
+        logger.warning(f'{deleted} events deleted from calendar {calendarId}.')
+
+    @handle_exception
+    def bulk_patch_events(self, calendarId: str, events: Iterable[dict[str, Any]], batch_size: int = 50,
+                          max_workers: int = 4, max_retries: int = 3, **kwargs) -> Iterator[dict]:
+        '''
+        Change many events through batch requests, sending only the fields that differ.
+
+        Events missing from the event cache are fetched first with batched `events.get` requests.
+        Unchanged events cost no write request. Every patch is conditional on the ETag it was computed from.
+
+        Args:
+            calendarId (str): The ID of the calendar containing the events.
+            events (Iterable[dict]): The desired fields of every event, with its `id`. Consumed lazily.
+            batch_size (int, optional): Requests per batch request. Defaults to 50.
+            max_workers (int, optional): Batch requests in flight at the same time. Defaults to 4.
+            max_retries (int, optional): Retries of a failed request. Defaults to 3.
+            **kwargs: Optional query parameters of `events.patch`, e.g. `sendUpdates`.
+
+        Yields:
+            dict: The result of every event, with the `index` of the event in the input.
+
+        Example:
+            ```
+            changes = ({'id': eventId, 'start': start, 'end': end} for eventId, start, end in moves)
+            for result in event.bulk_patch_events('primary', changes, sendUpdates='none'):
+                print(result['index'], result['status'])
+            ```
+        '''
+        executor = self._batch_executor(batch_size, max_workers, max_retries)
+        iterator = enumerate(events)
+        patched = 0
+        while chunk := list(islice(iterator, batch_size * max_workers)):
+            currents: dict[int, dict] = {}
+            missing = []
+            for index, desired in chunk:
+                cached = self.event_cache.get(calendarId, desired['id']) if self.event_cache is not None else None
+                if cached is not None:
+                    currents[index] = cached
+                else:
+                    missing.append((index, self.service.events().get(calendarId=calendarId, eventId=desired['id'])))
+            errors = {}
+            for result in executor.run(missing):
+                if result['status'] == 'success':
+                    currents[result['tag']] = result['response']
+                    self._remember(calendarId, [result['response']])
+                else:
+                    errors[result['tag']] = result['error']
+
+            requests = []
+            for index, desired in chunk:
+                eventId = desired['id']
+                if index in errors:
+                    yield {'index': index, 'status': 'Error', 'event_id': eventId, 'error': errors[index]}
+                    continue
+                body = event_diff(currents[index], desired)
+                if not body:
+                    yield {'index': index, 'status': 'Unchanged', 'event_id': eventId}
+                    continue
+                requests.append(((index, eventId), self.__conditional(self.service.events().patch(
+                    calendarId=calendarId, eventId=eventId, body=body, **kwargs), currents[index])))
+
+            for result in executor.run(requests):
+                index, eventId = result['tag']
+                if result['status'] == 'success':
+                    patched += 1
+                    self._remember(calendarId, [result['response']])
+                    yield {'index': index, 'status': 'Patched', 'event_id': eventId}
+                else:
+                    if result['error'].get('status_code') == 412:
+                        self._forget(calendarId, [eventId])
+                    yield {'index': index, 'status': 'Error', 'event_id': eventId, 'error': result['error']}
+        logger.info(f'{patched} events patched in calendar {calendarId}.')
+
+    @handle_exception
+    def import_ics(self, calendarId: str, file_path: str, default_timezone: str = 'UTC', batch_size: int = 50,
+                   max_workers: int = 4, max_retries: int = 3, **kwargs) -> Iterator[dict]:
+        '''
+        Import the events of an iCalendar (.ics) file through batch requests.
+
+        The file is read lazily, one VEVENT at a time, and sent in batches as it is read.
+        Events with a UID are sent to `events.import` so the iCalendar UID is kept and re-importing
+        the same file updates the events instead of duplicating them.
+
+        Args:
+            calendarId (str): The ID of the calendar in which to import the events.
+            file_path (str): Path to the `.ics` file.
+            default_timezone (str, optional): Time zone of floating times in the file. Defaults to UTC.
+            batch_size (int, optional): Events per batch request. Defaults to 50.
+            max_workers (int, optional): Batch requests in flight at the same time. Defaults to 4.
+            max_retries (int, optional): Retries of a failed event. Defaults to 3.
+            **kwargs: Optional query parameters of `events.import`, e.g. `supportsAttachments`.
+
+        Yields:
+            dict: The result of every event, with the `index` of the VEVENT in the file.
+
+        Example:
+            ```
+            event = CalendarEvent(key)
+            for result in event.import_ics('primary', 'calendar.ics'):
+                print(result['index'], result['status'])
+            ```
+        '''
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            requests = ((index, self.service.events().import_(calendarId=calendarId, body=body, **kwargs)
+                         if body.get('iCalUID') else self.service.events().insert(calendarId=calendarId, body=body))
+                        for index, body in enumerate(read_ics(f, default_timezone)))
+            imported = 0
+            for result in self._batch_executor(batch_size, max_workers, max_retries).run(requests):
+                if result['status'] == 'success':
+                    imported += 1
+                    self._remember(calendarId, [result['response']])
+                    yield {'index': result['tag'], 'status': 'Imported', 'event_id': result['response'].get('id')}
+                else:
+                    yield {'index': result['tag'], 'status': 'Error', 'error': result['error']}
+        logger.info(f'{imported} events imported into calendar {calendarId}.')
+
+    @handle_exception
+    def export_ics(self, calendarId: str, file_path: str, optional_parameter: dict | None = None) -> dict:
+        '''
+        Export the events of a calendar to an iCalendar (.ics) file.
+
+        Pages are streamed straight into the file, so memory use does not grow with the calendar size.
+        Recurring events are exported once with their RRULE, modified instances as RECURRENCE-ID events.
+
+        Args:
+            calendarId (str): The ID of the calendar to export.
+            file_path (str): Path of the `.ics` file to write.
+            optional_parameter (dict, optional): Optional parameters for listing events, e.g. `timeMin`.
+
+        Returns:
+            dict: The number of events exported.
+        '''
+        params = {'maxResults': 2500, **(optional_parameter or {})}
+        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+            written = write_ics(self.iter_events(calendarId, params), f, calendar_name=calendarId)
+        return {'status': 'Exported', 'calendarId': calendarId, 'events': written, 'file': str(file_path)}
+
+    @handle_exception
+    @single_flight()
+    def list_event(self, calendarId: str, optional_parameter: dict, fields: Fields = None,
+                   all_pages: bool = False) -> dict:
         '''
         List events from the specified calendar.
 
@@ -152,9 +529,12 @@ class CalendarEvent:
             optional_parameter (dict): Optional parameters for listing events. Refer to the
                 [Events: list documentation](https://developers.google.com/calendar/api/v3/reference/events/list)
                 for details on available parameters.
+            fields (list[str], optional): Fields of each event to return (e.g. `['id', 'start.dateTime']`).
+                `nextPageToken` and `nextSyncToken` are always kept. A string is sent as a raw field mask.
+            all_pages (bool, optional): Follow `nextPageToken` and return the events of every page. Defaults to False.
 
         Returns:
-            dict: The list of events.
+            dict: The list of events. With `all_pages` the `items` of every page are merged into the last page.
 
         Example:
             ```
@@ -168,20 +548,259 @@ class CalendarEvent:
             }
             event = CalendarEvent(key)
             data = event.list_event(calendarId, optional_parameter)
+
+            # Example with partial response
+            data = event.list_event(calendarId, {}, fields=['id', 'summary', 'start'])
             ```
         '''
-        events = self.service.events().list(
-            calendarId=calendarId, **optional_parameter).execute()
+        optional_parameter = with_fields(
+            optional_parameter, fields, 'items', CALENDAR_EVENTS_PAGE_FIELDS)
+        if all_pages:
+            items: list[dict] = []
+            for page in self._iter_pages(calendarId, optional_parameter):
+                items.extend(page.get('items', []))
+            page['items'] = items
+            return page
+        events = self.executor.execute(self.service.events().list(
+            calendarId=calendarId, **optional_parameter))
+        self._remember(calendarId, events.get('items', []), 'fields' in optional_parameter)
         return events
 
+    def _iter_pages(self, calendarId: str, optional_parameter: dict, prefetch: bool = True) -> Iterator[dict]:
+        '''
+        Yield every page of an events list request.
+
+        With `prefetch` the next page is requested on a background thread while the current one is consumed.
+        The background thread uses its own HTTP connection.
+
+        Args:
+            calendarId (str): The ID of the calendar from which to list events.
+            optional_parameter (dict): Query parameters of the list request.
+            prefetch (bool, optional): Fetch the next page ahead. Defaults to True.
+        '''
+        params = dict(optional_parameter)
+        page_token = params.pop('pageToken', None)
+        partial = 'fields' in params
+
+        def fetch(token):
+            return self.executor.execute(self.service.events().list(
+                calendarId=calendarId, pageToken=token, **params), http=self.__http.get())
+
+        if not prefetch:
+            while True:
+                page = fetch(page_token)
+                self._remember(calendarId, page.get('items', []), partial)
+                yield page
+                page_token = page.get('nextPageToken')
+                if not page_token:
+                    return
+
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = pool.submit(fetch, page_token)
+            while future is not None:
+                page = future.result()
+                page_token = page.get('nextPageToken')
+                future = pool.submit(fetch, page_token) if page_token else None
+                self._remember(calendarId, page.get('items', []), partial)
+                yield page
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @handle_exception
+    def iter_events(self, calendarId: str, optional_parameter: dict | None = None, fields: Fields = None,
+                    prefetch: bool = True, stream: bool = False) -> Iterator[dict]:
+        '''
+        Iterate over all events of a calendar, following the pages transparently.
+
+        Args:
+            calendarId (str): The ID of the calendar from which to list events.
+            optional_parameter (dict, optional): Optional parameters for listing events, see `list_event()`.
+            fields (list[str], optional): Fields of each event to return.
+            prefetch (bool, optional): Request the next page while the current one is consumed. Defaults to True.
+            stream (bool, optional): Yield every event as soon as it is decoded from the response, holding only
+                that event in memory instead of the page. Pages are then not prefetched. Defaults to False.
+
+        Yields:
+            dict: The events, page after page.
+
+        Example:
+            ```
+            event = CalendarEvent(key)
+            for item in event.iter_events('primary', {'maxResults': 250}):
+                print(item['summary'])
+            ```
+        '''
+        params = with_fields(dict(optional_parameter or {}), fields, 'items', CALENDAR_EVENTS_PAGE_FIELDS)
+        if not stream:
+            for page in self._iter_pages(calendarId, params, prefetch):
+                yield from page.get('items', [])
+            return
+        page_token = params.pop('pageToken', None)
+        partial = 'fields' in params
+        while True:
+            page = self.executor.stream(self.service.events().list(
+                calendarId=calendarId, pageToken=page_token, **params), 'items')
+            for item in page:
+                self._remember(calendarId, [item], partial)
+                yield item
+            page_token = page.fields.get('nextPageToken')
+            if not page_token:
+                return
+
     @handle_exception
-    def get_event(self, calendarId: str, eventId: str, **kwargs) -> dict:
+    def iter_merged_events(self, calendarIds: Iterable[str], optional_parameter: dict | None = None,
+                           fields: Fields = None, max_concurrency: int = 8, buffer_pages: int = 2,
+                           skip_errors: bool = False, default_timezone: str = 'UTC') -> Iterator[dict]:
+        '''
+        Stream the events of many calendars as one agenda ordered by start time.
+
+        The calendars are listed concurrently, page by page, and merged with a k-way heap merge. The first
+        events are returned as soon as every calendar delivered its first page, and at most `buffer_pages`
+        pages per calendar are held in memory. Recurring events are listed as single instances
+        (`singleEvents=True`, `orderBy=startTime`) so every calendar is already sorted.
+
+        Args:
+            calendarIds (Iterable[str]): The IDs of the calendars.
+            optional_parameter (dict, optional): Optional parameters for listing events, e.g. `timeMin`,
+                applied to every calendar.
+            fields (list[str], optional): Fields of each event to return. Must include `start`.
+            max_concurrency (int, optional): Calendars fetching a page at the same time. Defaults to 8.
+            buffer_pages (int, optional): Pages read ahead per calendar. Defaults to 2.
+            skip_errors (bool, optional): Log and leave out calendars that fail instead of stopping. Defaults to False.
+            default_timezone (str, optional): Time zone used to order all-day events. Defaults to UTC.
+
+        Yields:
+            dict: `{'calendarId', 'event'}` in start time order.
+
+        Example:
+            ```
+            event = CalendarEvent(key)
+            for item in event.iter_merged_events(room_ids, {'timeMin': '2024-05-01T00:00:00Z'}):
+                print(item['calendarId'], item['event']['start'])
+            ```
+        '''
+        params = with_fields({**(optional_parameter or {}), 'singleEvents': True, 'orderBy': 'startTime'},
+                             fields, 'items', CALENDAR_EVENTS_PAGE_FIELDS)
+        sources = {calendarId: (page.get('items', []) for page in self._iter_pages(calendarId, params, prefetch=False))
+                   for calendarId in dict.fromkeys(calendarIds)}
+
+        def start_time(event: dict) -> Any:
+            return parse_event_time(event.get('start') or event['originalStartTime'], default_timezone)
+
+        def log_error(calendarId: str, error: Exception) -> None:
+            logger.error(f'Skipping calendar {calendarId}: {error}')
+
+        for calendarId, event in merge_sorted(sources, start_time, max_concurrency, buffer_pages,
+                                              on_error=log_error if skip_errors else None):
+            yield {'calendarId': calendarId, 'event': event}
+
+    @handle_exception
+    def list_expanded_events(self, calendarId: str, time_min: Instant, time_max: Instant,
+                             optional_parameter: dict | None = None) -> Iterator[dict]:
+        '''
+        Iterate over the event instances of a window, expanding recurring events locally.
+
+        The recurring master events are listed once (`singleEvents=False`) and their RRULE/EXDATE lines
+        and modified or cancelled instances are expanded on the client, which needs far fewer and smaller
+        responses than `singleEvents=True`. Instances are yielded in start time order.
+
+        Args:
+            calendarId (str): The ID of the calendar from which to list events.
+            time_min (datetime | str): Start of the window.
+            time_max (datetime | str): End of the window (exclusive).
+            optional_parameter (dict, optional): Other optional parameters for listing events, see `list_event()`.
+
+        Yields:
+            dict: The event instances, shaped like the ones returned with `singleEvents=True`.
+
+        Example:
+            ```
+            event = CalendarEvent(key)
+            for item in event.list_expanded_events('primary', '2024-01-01T00:00:00Z', '2025-01-01T00:00:00Z'):
+                print(item['summary'], item['start'])
+            ```
+        '''
+        params = {**(optional_parameter or {}), **window_parameters(time_min, time_max), 'singleEvents': False}
+        params.pop('orderBy', None)
+        events = [item for page in self._iter_pages(calendarId, params) for item in page.get('items', [])]
+        for instance in expand_events(events, time_min, time_max):
+            self._remember(calendarId, [instance], cache=False)
+            yield instance
+
+    @handle_exception
+    def sync_events(self, calendarId: str, optional_parameter: dict | None = None) -> dict:
+        '''
+        Incrementally synchronize the events of a calendar.
+
+        The first call performs a full sync and stores the returned `nextSyncToken` in `sync_store`.
+        Later calls send the stored token and return only the events changed or deleted since.
+        When the token expired (HTTP 410 Gone) the token is dropped and a full sync is performed.
+
+        Args:
+            calendarId (str): The ID of the calendar to synchronize.
+            optional_parameter (dict, optional): Optional parameters for listing events. Filters such as
+                `timeMin` or `q` are only used for the full sync, the API rejects them with a sync token.
+
+        Returns:
+            dict: `full_sync` tells whether everything was re-downloaded, `changed` holds the new or updated
+                events and `deleted` the ids of the cancelled events.
+
+        Example:
+            ```
+            event = CalendarEvent(key)
+            changes = event.sync_events('primary')
+            ```
+        '''
+        optional_parameter = dict(optional_parameter or {})
+        sync_token = self.sync_store.get(calendarId)
+        try:
+            result = self.__collect_changes(calendarId, optional_parameter, sync_token)
+        except HttpError as e:
+            if sync_token is None or e.resp.status != 410:
+                raise
+            logger.warning(f'Sync token of calendar {calendarId} expired, performing a full sync.')
+            self.sync_store.delete(calendarId)
+            result = self.__collect_changes(calendarId, optional_parameter, None)
+
+        if result.get('nextSyncToken'):
+            self.sync_store.set(calendarId, result['nextSyncToken'])
+        return result
+
+    def __collect_changes(self, calendarId: str, optional_parameter: dict, sync_token: str | None) -> dict:
+        '''
+        Page through a full or incremental sync and split the events into changed and deleted.
+        '''
+        params = dict(optional_parameter)
+        if sync_token:
+            for name in SYNC_INCOMPATIBLE_PARAMETERS:
+                params.pop(name, None)
+            params['syncToken'] = sync_token
+
+        changed: list[dict] = []
+        deleted: list[str] = []
+        next_sync_token = None
+        for page in self._iter_pages(calendarId, params):
+            for item in page.get('items', []):
+                if item.get('status') == 'cancelled':
+                    deleted.append(item['id'])
+                else:
+                    changed.append(item)
+            next_sync_token = page.get('nextSyncToken', next_sync_token)
+
+        return {'calendarId': calendarId, 'full_sync': sync_token is None, 'changed': changed,
+                'deleted': deleted, 'nextSyncToken': next_sync_token}
+
+    @handle_exception
+    @single_flight()
+    def get_event(self, calendarId: str, eventId: str, fields: Fields = None, **kwargs) -> dict:
         '''
         Get details of a specific event from the specified calendar.
 
         Args:
             calendarId (str): The ID of the calendar containing the event.
             eventId (str): The ID of the event to retrieve.
+            fields (list[str], optional): Fields of the event to return. A string is sent as a raw field mask.
             **kwargs (**kwarg): Optional keyword arguments for additional parameters. Refer to the
                 [Events: get documentation](https://developers.google.com/calendar/api/v3/reference/events/get)
                 for details on available parameters.
@@ -189,14 +808,29 @@ class CalendarEvent:
         Returns:
             (dict): The event details.
 
+        When the event is in the event cache the request carries its ETag in `If-None-Match` and the
+        cached copy is returned if the API answers 304 Not Modified.
+
         Example:
             ```
             event = CalendarEvent(key)
             data = event.get_event(calendarId, eventId)
             ```
         '''
-        event = self.service.events().get(calendarId=calendarId,
-                                          eventId=eventId, **kwargs).execute()
+        kwargs = with_fields(kwargs, fields)
+        partial = 'fields' in kwargs
+        request = self.service.events().get(calendarId=calendarId,
+                                            eventId=eventId, **kwargs)
+        cached = self.event_cache.get(calendarId, eventId) if self.event_cache is not None and not partial else None
+        if cached is not None:
+            request.headers['If-None-Match'] = cached['etag']
+        try:
+            event = self.executor.execute(request)
+        except HttpError as e:
+            if cached is not None and e.resp.status == 304:
+                return cached
+            raise
+        self._remember(calendarId, [event], partial)
         return event
 
 
@@ -0,0 +1,140 @@
+'''
+    Concurrent fan-out over many sorted sources merged into one sorted stream.
+
+    The pages of the sources (e.g. of one calendar each) are read by a `ThreadPoolExecutor` of
+    `max_concurrency` workers, one page per task, so however many sources there are, at most `max_concurrency`
+    threads talk to the API and, with the per-thread connections of `ThreadLocalHttp`, at most as many
+    connections are opened. A source reads ahead at most `buffer_pages` pages and fetches one page at a time.
+    The consumer merges the pages with a k-way heap merge, so the first items come out as soon as every source
+    delivered its first page, and memory stays bounded by `sources x buffer_pages` pages whatever the total size.
+
+    Example:
+    ```
+    sources = {calendarId: (page['items'] for page in pages(calendarId)) for calendarId in calendarIds}
+    for calendarId, item in merge_sorted(sources, key=lambda item: item['start']['dateTime']):
+        print(calendarId, item['summary'])
+    ```
+'''
+import heapq
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+
+
+class _Source:
+    '''
+        The pages of one source read so far, and how many more it may read ahead.
+    '''
+
+    def __init__(self, pages: Iterable[list], buffer_pages: int) -> None:
+        self.iterator = iter(pages)
+        self.pages: queue.Queue = queue.Queue()
+        self.credit = buffer_pages
+        self.fetching = False
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def schedule(self, pool: ThreadPoolExecutor, stop: threading.Event) -> None:
+        '''
+            Submit the fetch of the next page, unless one is running, the buffer is full or the source is done.
+        '''
+        with self.lock:
+            if self.fetching or self.finished or self.credit == 0 or stop.is_set():
+                return
+            self.fetching = True
+            self.credit -= 1
+        try:
+            pool.submit(self.fetch, pool, stop)
+        except RuntimeError:  # the pool was shut down, the consumer stopped
+            pass
+
+    def fetch(self, pool: ThreadPoolExecutor, stop: threading.Event) -> None:
+        '''
+            Read one page on a worker thread, then schedule the next one.
+        '''
+        try:
+            page = next(self.iterator, _DONE)
+            page = page if page is _DONE else list(page)
+        except Exception as e:  # reported to the consumer
+            page = _Failure(e)
+        with self.lock:
+            self.fetching = False
+            self.finished = page is _DONE or isinstance(page, _Failure)
+        self.pages.put(page)
+        self.schedule(pool, stop)
+
+    def take(self, pool: ThreadPoolExecutor, stop: threading.Event) -> Any:
+        '''
+            Wait for the next page and let the source read another one ahead.
+        '''
+        page = self.pages.get()
+        with self.lock:
+            self.credit += 1
+        self.schedule(pool, stop)
+        return page
+
+
+def merge_sorted(sources: dict[Hashable, Iterable[list]], key: Callable[[Any], Any], max_concurrency: int = 8,
+                 buffer_pages: int = 2, on_error: Callable[[Hashable, Exception], None] | None = None
+                 ) -> Iterator[tuple[Hashable, Any]]:
+    '''
+        Merge sorted sources concurrently into one sorted stream.
+
+        Args:
+            sources (dict): Source name to an iterable of pages (lists of items), each source sorted by `key`.
+            key (Callable): Sort key of an item.
+            max_concurrency (int, optional): Worker threads fetching pages, and so sources fetching a page at
+                the same time. Defaults to 8.
+            buffer_pages (int, optional): Pages read ahead per source. Defaults to 2.
+            on_error (Callable, optional): Called with the source name and the error when a source fails;
+                the source is then dropped. Without it the error is raised.
+
+        Yields:
+            tuple: `(source name, item)` in `key` order, ties in the order of `sources`.
+    '''
+    if max_concurrency < 1 or buffer_pages < 1:
+        raise ValueError('max_concurrency and buffer_pages must be at least 1.')
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='merge_sorted')
+    states = {name: _Source(pages, buffer_pages) for name, pages in sources.items()}
+    for state in states.values():
+        state.schedule(pool, stop)
+
+    def entries(order: int, name: Hashable) -> Iterator[tuple[Any, int, Hashable, Any]]:
+        while True:
+            page = states[name].take(pool, stop)
+            if page is _DONE:
+                return
+            if isinstance(page, _Failure):
+                if on_error is None:
+                    raise page.error
+                on_error(name, page.error)
+                return
+            for item in page:
+                yield key(item), order, name, item
+
+    try:
+        streams = [entries(order, name) for order, name in enumerate(states)]
+        for _, _, name, item in heapq.merge(*streams, key=lambda entry: entry[:2]):
+            yield name, item
+    finally:
+        stop.set()
+        # the pages being fetched are waited for, the sources cannot be closed while a worker reads them
+        pool.shutdown(wait=True, cancel_futures=True)
+        for state in states.values():
+            close = getattr(state.iterator, 'close', None)
+            if close is not None:
+                close()
+
+
+if __name__ == '__main__':
+    pass
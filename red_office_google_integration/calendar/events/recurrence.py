@@ -0,0 +1,251 @@
+'''
+    Local expansion of recurring calendar events.
+
+    Instead of asking the API for every instance (`singleEvents=True`), list the recurring master events
+    once and expand their `recurrence` lines (RRULE, EXRULE, RDATE and EXDATE) locally for the window
+    you need. Modified and cancelled instances returned next to the masters are applied as exceptions.
+
+    Expansion is lazy: `expand_events()` merges the occurrences of all events in start time order and only
+    computes occurrences inside the requested window. Rules are evaluated in the event's own time zone,
+    so occurrences keep their wall-clock time across daylight saving changes.
+
+    Example:
+    ```
+    event = CalendarEvent(key)
+    for instance in event.list_expanded_events('primary', '2024-01-01T00:00:00Z', '2025-01-01T00:00:00Z'):
+        print(instance['id'], instance['start'])
+    ```
+'''
+import heapq
+from datetime import date, datetime, timezone
+from itertools import count
+from typing import Any, Iterable, Iterator
+from zoneinfo import ZoneInfo
+from dateutil.rrule import rruleset, rrulestr
+from red_office_google_integration.calendar.events.scheduling import Instant, parse_datetime, parse_event_time
+
+
+def _event_start(value: dict[str, str]) -> tuple[datetime, bool]:
+    '''
+        Return the start of an event in its own time zone and whether it is an all-day event.
+
+        All-day events use naive datetimes, timed events aware ones.
+    '''
+    if 'date' in value:
+        return datetime.fromisoformat(value['date']), True
+    start = parse_event_time(value)
+    if value.get('timeZone'):
+        start = start.astimezone(ZoneInfo(value['timeZone']))
+    return start, False
+
+
+def _parse_dates(line: str, all_day: bool, tz) -> list[datetime]:
+    '''
+        Parse the values of an RDATE or EXDATE line, e.g. `EXDATE;TZID=Europe/Berlin:20240502T090000`.
+    '''
+    head, _, values = line.partition(':')
+    params = dict(p.split('=', 1) for p in head.split(';')[1:] if '=' in p)
+    line_tz = ZoneInfo(params['TZID']) if 'TZID' in params else tz
+    dates = []
+    for value in values.split(','):
+        value = value.strip()
+        if not value:
+            continue
+        if len(value) == 8:  # VALUE=DATE
+            parsed = datetime.strptime(value, '%Y%m%d')
+        elif value.endswith('Z'):
+            parsed = datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+        else:
+            parsed = datetime.strptime(value, '%Y%m%dT%H%M%S').replace(tzinfo=line_tz)
+        if all_day:
+            parsed = parsed.replace(tzinfo=None) if parsed.tzinfo is None else parsed.astimezone(
+                tz).replace(tzinfo=None)
+            parsed = parsed.replace(hour=0, minute=0, second=0)
+        elif parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=tz)
+        dates.append(parsed)
+    return dates
+
+
+def _fix_until(rule: str, all_day: bool) -> str:
+    '''
+        Make the UNTIL part of a rule compatible with the type of DTSTART.
+    '''
+    parts = []
+    for part in rule.split(';'):
+        if part.upper().startswith('UNTIL='):
+            value = part[6:]
+            if all_day:
+                value = value[:8]
+            elif not value.endswith('Z'):
+                value = (value + 'T235959' if len(value) == 8 else value) + 'Z'
+            part = 'UNTIL=' + value
+        parts.append(part)
+    return ';'.join(parts)
+
+
+def build_ruleset(event: dict[str, Any]) -> rruleset:
+    '''
+        Build the set of occurrence start times of a recurring event.
+
+        Args:
+            event (dict): The recurring master event, with `start` and `recurrence`.
+
+        Returns:
+            rruleset: The occurrence starts, naive for all-day events and aware otherwise.
+    '''
+    dtstart, all_day = _event_start(event['start'])
+    tz = None if all_day else dtstart.tzinfo
+    rules = rruleset()
+    rules.rdate(dtstart)
+    for line in event.get('recurrence', []):
+        name = line.split(':', 1)[0].split(';', 1)[0].upper()
+        if name == 'RRULE':
+            rules.rrule(rrulestr(_fix_until(line.split(':', 1)[1], all_day), dtstart=dtstart))
+        elif name == 'EXRULE':
+            rules.exrule(rrulestr(_fix_until(line.split(':', 1)[1], all_day), dtstart=dtstart))
+        elif name == 'RDATE':
+            for value in _parse_dates(line, all_day, tz):
+                rules.rdate(value)
+        elif name == 'EXDATE':
+            for value in _parse_dates(line, all_day, tz):
+                rules.exdate(value)
+    return rules
+
+
+def _format_time(value: datetime, all_day: bool, time_zone: str | None) -> dict[str, str]:
+    if all_day:
+        return {'date': value.date().isoformat()}
+    result = {'dateTime': value.isoformat()}
+    if time_zone:
+        result['timeZone'] = time_zone
+    return result
+
+
+def _instance_id(eventId: str, start: datetime, all_day: bool) -> str:
+    '''
+        Build the instance id the API uses, e.g. `abc_20240502T070000Z` or `abc_20240502`.
+    '''
+    if all_day:
+        return f"{eventId}_{start.strftime('%Y%m%d')}"
+    return f"{eventId}_{start.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+
+
+def _original_key(value: dict[str, str]) -> datetime | date:
+    '''
+        Key identifying an occurrence by its original start.
+    '''
+    if 'date' in value:
+        return date.fromisoformat(value['date'])
+    return parse_event_time(value).astimezone(timezone.utc)
+
+
+def expand_event(event: dict[str, Any], time_min: Instant, time_max: Instant,
+                 exceptions: Iterable[dict[str, Any]] = ()) -> Iterator[dict[str, Any]]:
+    '''
+        Lazily yield the instances of an event that overlap a window, in start time order.
+
+        Args:
+            event (dict): The event. Events without `recurrence` yield themselves if they overlap the window.
+            time_min (datetime | str): Start of the window.
+            time_max (datetime | str): End of the window (exclusive).
+            exceptions (Iterable[dict]): Modified or cancelled instances of the event
+                (events with `recurringEventId` and `originalStartTime`).
+
+        Yields:
+            dict: Instances shaped like the ones returned with `singleEvents=True`.
+    '''
+    window_start, window_end = parse_datetime(time_min), parse_datetime(time_max)
+    if event.get('status') == 'cancelled':
+        return
+    if not event.get('recurrence'):
+        start, end = parse_event_time(event['start']), parse_event_time(event['end'])
+        if start < window_end and end > window_start:
+            yield event
+        return
+
+    _, all_day = _event_start(event['start'])
+    duration = parse_event_time(event['end']) - parse_event_time(event['start'])
+    time_zone = event['start'].get('timeZone')
+    overrides = {_original_key(e['originalStartTime']): e for e in exceptions}
+
+    # modified instances replace their original occurrence wherever they were moved to
+    moved = sorted((e for e in overrides.values() if e.get('status') != 'cancelled'
+                    and parse_event_time(e['start']) < window_end and parse_event_time(e['end']) > window_start),
+                   key=lambda e: parse_event_time(e['start']))
+
+    if all_day:
+        # all-day occurrences are floating dates, the window is compared in UTC like the schedule index does
+        first = window_start.astimezone(timezone.utc).replace(tzinfo=None)
+        last = window_end.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        first, last = window_start, window_end
+    template = {k: v for k, v in event.items() if k not in ('recurrence', 'id', 'start', 'end', 'etag')}
+
+    def occurrences() -> Iterator[dict[str, Any]]:
+        for start in build_ruleset(event).xafter(first - duration, inc=True):
+            if start >= last:
+                return
+            if start + duration <= first:
+                continue
+            if (start.date() if all_day else start.astimezone(timezone.utc)) in overrides:
+                continue
+            yield {
+                **template,
+                'id': _instance_id(event['id'], start, all_day),
+                'recurringEventId': event['id'],
+                'originalStartTime': _format_time(start, all_day, time_zone),
+                'start': _format_time(start, all_day, time_zone),
+                'end': _format_time(start + duration, all_day, time_zone),
+            }
+
+    yield from heapq.merge(occurrences(), moved, key=lambda e: parse_event_time(e['start']))
+
+
+def expand_events(events: Iterable[dict[str, Any]], time_min: Instant,
+                  time_max: Instant) -> Iterator[dict[str, Any]]:
+    '''
+        Expand a list of events, as returned with `singleEvents=False`, into instances ordered by start time.
+
+        Modified and cancelled instances (events with `recurringEventId`) are applied to their master.
+
+        Args:
+            events (Iterable[dict]): Single events, recurring masters and their exceptions.
+            time_min (datetime | str): Start of the window.
+            time_max (datetime | str): End of the window (exclusive).
+
+        Yields:
+            dict: The instances overlapping the window.
+    '''
+    masters: list[dict[str, Any]] = []
+    exceptions: dict[str, list[dict[str, Any]]] = {}
+    for event in events:
+        if event.get('recurringEventId'):
+            exceptions.setdefault(event['recurringEventId'], []).append(event)
+        else:
+            masters.append(event)
+
+    known = {event.get('id') for event in masters}
+    streams = [expand_event(event, time_min, time_max, exceptions.get(event.get('id'), ()))
+               for event in masters]
+    # exceptions whose master was not listed are plain events
+    streams.extend(expand_event(e, time_min, time_max)
+                   for eventId, items in exceptions.items() if eventId not in known for e in items)
+
+    order = count()
+    keyed = (((parse_event_time(e['start']), next(order), e) for e in stream) for stream in streams)
+    for _, _, instance in heapq.merge(*keyed, key=lambda item: (item[0], item[1])):
+        yield instance
+
+
+def window_parameters(time_min: Instant, time_max: Instant) -> dict[str, str]:
+    '''
+        Return the `timeMin`/`timeMax` query parameters of a window in RFC 3339.
+    '''
+    def rfc3339(value: Instant) -> str:
+        return parse_datetime(value).astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+    return {'timeMin': rfc3339(time_min), 'timeMax': rfc3339(time_max)}
+
+
+if __name__ == '__main__':
+    pass
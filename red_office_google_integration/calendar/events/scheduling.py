@@ -0,0 +1,342 @@
+'''
+    Local free/busy and conflict detection over cached calendar events.
+
+    `ScheduleIndex` keeps, for every calendar, the busy intervals of its events in arrays sorted by start
+    time. Queries locate the events of a window with a binary search, so free/busy lookups, conflict checks
+    and "first free slot of N minutes across these calendars" run locally without calling the API.
+
+    The index is filled by `CalendarEvent` when it is constructed with `schedule=ScheduleIndex()`:
+    listed, created and synced events are added and deleted events are removed.
+
+    Events marked as free (`transparency: transparent`), cancelled events and recurring masters are not
+    indexed. List recurring events with `singleEvents=True` to index their occurrences.
+
+    Example:
+    ```
+    schedule = ScheduleIndex()
+    event = CalendarEvent(key, schedule=schedule)
+    event.list_event('room-a', {'timeMin': '2024-05-01T00:00:00Z', 'singleEvents': True}, all_pages=True)
+    schedule.conflicts(['room-a'], '2024-05-02T10:00:00Z', '2024-05-02T11:00:00Z')
+    ```
+'''
+import bisect
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+from zoneinfo import ZoneInfo
+
+Instant = datetime | str
+
+
+def parse_datetime(value: Instant) -> datetime:
+    '''
+        Parse an RFC 3339 timestamp (or accept a datetime) into an aware datetime.
+
+        Naive values are taken as UTC.
+
+        Args:
+            value (datetime | str): The timestamp, e.g. `2024-05-02T10:00:00Z`.
+
+        Returns:
+            datetime: The aware datetime.
+    '''
+    if isinstance(value, str):
+        if value.endswith(('Z', 'z')):
+            value = value[:-1] + '+00:00'
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def parse_event_time(value: dict[str, str], default_timezone: str | None = None) -> datetime:
+    '''
+        Parse the `start` or `end` object of an event.
+
+        Args:
+            value (dict): `{'dateTime': ...}` for timed events or `{'date': 'YYYY-MM-DD'}` for all-day events.
+            default_timezone (str, optional): Time zone of all-day events when the object has no `timeZone`.
+                Defaults to UTC.
+
+        Returns:
+            datetime: The aware datetime. All-day dates start at midnight.
+    '''
+    if 'dateTime' in value:
+        return parse_datetime(value['dateTime'])
+    tz_name = value.get('timeZone') or default_timezone
+    tz = ZoneInfo(tz_name) if tz_name else timezone.utc
+    return datetime.fromisoformat(value['date']).replace(tzinfo=tz)
+
+
+def event_interval(event: dict[str, Any]) -> tuple[float, float] | None:
+    '''
+        Return the busy interval of an event as POSIX timestamps.
+
+        Args:
+            event (dict): The event resource.
+
+        Returns:
+            (tuple[float, float] | None): `(start, end)`, or None when the event does not block time.
+    '''
+    if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+        return None
+    if event.get('recurrence') or 'start' not in event or 'end' not in event:
+        return None
+    start = parse_event_time(event['start']).timestamp()
+    end = parse_event_time(event['end']).timestamp()
+    return (start, end) if end > start else None
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+# Events longer than this (e.g. a multi-week leave) are kept apart, so that they do not widen every query
+LONG_EVENT_DURATION = 24 * 3600.0
+
+
+class CalendarIndex:
+    '''
+        Busy intervals of one calendar sorted by start time.
+
+        Overlap queries bisect the sorted start times. Since no event of the sorted arrays is longer than
+        `max_duration`, only events starting within that duration before the window can overlap it. Events
+        longer than `LONG_EVENT_DURATION` are kept in a separate list checked on every query instead, so a
+        single long event does not make the queries scan back over weeks of events.
+    '''
+
+    def __init__(self) -> None:
+        self.starts: list[float] = []
+        self.entries: list[tuple[float, float, str]] = []
+        self.long_entries: dict[str, tuple[float, float, str]] = {}
+        self.events: dict[str, dict[str, Any]] = {}
+        self.max_duration = 0.0
+        # number of sorted entries of each duration, to lower `max_duration` when the longest ones are removed
+        self.__durations: dict[float, int] = {}
+
+    def add(self, event: dict[str, Any]) -> None:
+        '''
+            Add or replace an event. An event without start or end, e.g. fetched with a field mask leaving them
+            out, says nothing about its busy time and leaves the index unchanged, unless it is cancelled.
+        '''
+        if not event.get('id'):
+            return
+        if event.get('status') != 'cancelled' and ('start' not in event or 'end' not in event):
+            return
+        self.remove(event['id'])
+        interval = event_interval(event)
+        if interval is None:
+            return
+        start, end = interval
+        entry = (start, end, event['id'])
+        self.events[event['id']] = event
+        duration = end - start
+        if duration > LONG_EVENT_DURATION:
+            self.long_entries[event['id']] = entry
+            return
+        position = bisect.bisect_left(self.entries, entry)
+        self.entries.insert(position, entry)
+        self.starts.insert(position, start)
+        self.__durations[duration] = self.__durations.get(duration, 0) + 1
+        self.max_duration = max(self.max_duration, duration)
+
+    def remove(self, eventId: str | None) -> bool:
+        '''
+            Remove an event, returning whether it was indexed.
+        '''
+        event = self.events.pop(eventId, None) if eventId else None
+        if event is None:
+            return False
+        if self.long_entries.pop(eventId, None) is not None:
+            return True
+        start, end = event_interval(event)
+        position = bisect.bisect_left(self.entries, (start, end, eventId))
+        del self.entries[position]
+        del self.starts[position]
+        duration = end - start
+        self.__durations[duration] -= 1
+        if not self.__durations[duration]:
+            del self.__durations[duration]
+            if duration == self.max_duration:
+                self.max_duration = max(self.__durations, default=0.0)
+        return True
+
+    def overlapping(self, start: float, end: float) -> list[tuple[float, float, str]]:
+        '''
+            Return the entries overlapping the half-open window `[start, end)`, sorted by start time.
+        '''
+        low = bisect.bisect_left(self.starts, start - self.max_duration)
+        high = bisect.bisect_left(self.starts, end)
+        found = [entry for entry in self.entries[low:high] if entry[1] > start]
+        long_found = [entry for entry in self.long_entries.values() if entry[0] < end and entry[1] > start]
+        return sorted(found + long_found) if long_found else found
+
+
+def _merge(intervals: Iterable[tuple[float, float]]) -> list[tuple[float, float]]:
+    '''
+        Merge intervals sorted by start into disjoint busy blocks.
+    '''
+    merged: list[list[float]] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+class ScheduleIndex:
+    '''
+        Interval index of cached events for many calendars.
+
+        Methods:
+            load(calendarId, events): Replace the events of a calendar.
+            add_events(calendarId, events): Add or replace events.
+            remove_events(calendarId, eventIds): Remove events.
+            free_busy(calendarIds, start, end): Busy blocks of every calendar in a window.
+            conflicts(calendarIds, start, end): Events overlapping a window.
+            is_free(calendarIds, start, end): Whether a window is free in every calendar.
+            first_free_slot(calendarIds, minutes, start, end): Earliest common free slot.
+    '''
+
+    def __init__(self) -> None:
+        self.__calendars: dict[str, CalendarIndex] = {}
+        self.__lock = threading.RLock()
+
+    def __calendar(self, calendarId: str) -> CalendarIndex:
+        if calendarId not in self.__calendars:
+            self.__calendars[calendarId] = CalendarIndex()
+        return self.__calendars[calendarId]
+
+    def load(self, calendarId: str, events: Iterable[dict[str, Any]]) -> None:
+        '''
+            Replace all cached events of a calendar.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+                events (Iterable[dict]): The event resources.
+        '''
+        index = CalendarIndex()
+        for event in events:
+            index.add(event)
+        with self.__lock:
+            self.__calendars[calendarId] = index
+
+    def add_events(self, calendarId: str, events: Iterable[dict[str, Any]]) -> None:
+        '''
+            Add or replace events of a calendar. Cancelled events are removed.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+                events (Iterable[dict]): The event resources.
+        '''
+        with self.__lock:
+            index = self.__calendar(calendarId)
+            for event in events:
+                index.add(event)
+
+    def remove_events(self, calendarId: str, eventIds: Iterable[str]) -> None:
+        '''
+            Remove events of a calendar.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+                eventIds (Iterable[str]): The IDs of the events.
+        '''
+        with self.__lock:
+            index = self.__calendar(calendarId)
+            for eventId in eventIds:
+                index.remove(eventId)
+
+    def calendar_ids(self) -> list[str]:
+        '''
+            Return the IDs of the indexed calendars.
+        '''
+        with self.__lock:
+            return list(self.__calendars)
+
+    def __busy(self, calendarId: str, start: float, end: float) -> list[tuple[float, float]]:
+        index = self.__calendars.get(calendarId)
+        if index is None:
+            return []
+        return _merge((max(s, start), min(e, end)) for s, e, _ in index.overlapping(start, end))
+
+    def free_busy(self, calendarIds: Iterable[str], start: Instant, end: Instant) -> dict[str, list[dict]]:
+        '''
+            Return the busy blocks of every calendar within a window, like the free/busy API.
+
+            Args:
+                calendarIds (Iterable[str]): The calendars to query.
+                start (datetime | str): Start of the window.
+                end (datetime | str): End of the window.
+
+            Returns:
+                dict: `{calendarId: [{'start': datetime, 'end': datetime}, ...]}`.
+        '''
+        low, high = parse_datetime(start).timestamp(), parse_datetime(end).timestamp()
+        with self.__lock:
+            return {calendarId: [{'start': _to_datetime(s), 'end': _to_datetime(e)}
+                                 for s, e in self.__busy(calendarId, low, high)]
+                    for calendarId in calendarIds}
+
+    def conflicts(self, calendarIds: Iterable[str], start: Instant, end: Instant) -> list[dict[str, Any]]:
+        '''
+            Return the events that overlap a window.
+
+            Args:
+                calendarIds (Iterable[str]): The calendars to check.
+                start (datetime | str): Start of the window.
+                end (datetime | str): End of the window.
+
+            Returns:
+                list[dict]: `{'calendarId', 'event'}` for every overlapping event, ordered by start time.
+        '''
+        low, high = parse_datetime(start).timestamp(), parse_datetime(end).timestamp()
+        found = []
+        with self.__lock:
+            for calendarId in calendarIds:
+                index = self.__calendars.get(calendarId)
+                if index is None:
+                    continue
+                found.extend((s, calendarId, index.events[eventId])
+                             for s, _, eventId in index.overlapping(low, high))
+        found.sort(key=lambda item: item[0])
+        return [{'calendarId': calendarId, 'event': event} for _, calendarId, event in found]
+
+    def is_free(self, calendarIds: Iterable[str], start: Instant, end: Instant) -> bool:
+        '''
+            Tell whether a window is free in every calendar.
+        '''
+        return not self.conflicts(calendarIds, start, end)
+
+    def first_free_slot(self, calendarIds: Iterable[str], minutes: int | float, start: Instant,
+                        end: Instant) -> dict[str, datetime] | None:
+        '''
+            Find the earliest slot of `minutes` that is free in all calendars.
+
+            Args:
+                calendarIds (Iterable[str]): The calendars that must all be free.
+                minutes (int | float): Length of the slot.
+                start (datetime | str): Earliest start of the slot.
+                end (datetime | str): Latest end of the slot.
+
+            Returns:
+                (dict | None): `{'start': datetime, 'end': datetime}`, or None when no slot fits.
+        '''
+        low, high = parse_datetime(start).timestamp(), parse_datetime(end).timestamp()
+        length = timedelta(minutes=minutes).total_seconds()
+        with self.__lock:
+            busy = heapq.merge(*(self.__busy(calendarId, low, high) for calendarId in calendarIds))
+            cursor = low
+            for block_start, block_end in busy:
+                if block_start - cursor >= length:
+                    break
+                cursor = max(cursor, block_end)
+        if high - cursor < length:
+            return None
+        return {'start': _to_datetime(cursor), 'end': _to_datetime(cursor + length)}
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,87 @@
+'''
+    Persistent storage of Calendar sync tokens.
+
+    `CalendarEvent.sync_events()` stores the `nextSyncToken` of every calendar here so the next run only
+    fetches the events that changed since. Tokens are kept in a small JSON file that is replaced atomically.
+'''
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from red_office_google_integration.src import setting
+
+
+class SyncTokenStore:
+    '''
+        JSON file backed mapping of calendarId to its last sync token.
+
+        Args:
+            path (pathlib.Path | str, optional): Location of the token file.
+                Defaults to `setting.CALENDAR_SYNC_TOKEN_PATH`.
+
+        Methods:
+            get(calendarId): Return the stored token or None.
+            set(calendarId, token): Store a token.
+            delete(calendarId): Forget the token, forcing a full sync.
+    '''
+
+    def __init__(self, path: pathlib.Path | str = setting.CALENDAR_SYNC_TOKEN_PATH) -> None:
+        self.path = pathlib.Path(path)
+        self.__lock = threading.Lock()
+
+    def __load(self) -> dict[str, str]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def __save(self, tokens: dict[str, str]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(tokens, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def get(self, calendarId: str) -> str | None:
+        '''
+            Return the stored sync token of a calendar.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+
+            Returns:
+                (str | None): The sync token, or None if the calendar was never synced.
+        '''
+        with self.__lock:
+            return self.__load().get(calendarId)
+
+    def set(self, calendarId: str, token: str) -> None:
+        '''
+            Store the sync token of a calendar.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+                token (str): The `nextSyncToken` returned by the last sync.
+        '''
+        with self.__lock:
+            tokens = self.__load()
+            tokens[calendarId] = token
+            self.__save(tokens)
+
+    def delete(self, calendarId: str) -> None:
+        '''
+            Forget the sync token of a calendar so the next sync is a full sync.
+
+            Args:
+                calendarId (str): The ID of the calendar.
+        '''
+        with self.__lock:
+            tokens = self.__load()
+            if tokens.pop(calendarId, None) is not None:
+                self.__save(tokens)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,116 @@
+'''
+    Asyncio counterpart of `Gmail`.
+
+    `AsyncGmail` has the same methods and parameters as `Gmail`, but they are coroutines sent through an
+    `AsyncTransport`, so many messages can be fetched concurrently on one event loop.
+
+    Example:
+    ```
+    async with AsyncGmail(key) as mail:
+        listed = await mail.get_email_list('has:attachment', fields=['id'])
+        messages = await asyncio.gather(*(mail.get_email(m['id']) for m in listed.get('messages', [])))
+    ```
+'''
+from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService  # noqa: E203,E402
+from red_office_google_integration.google_service.async_transport import AsyncTransport, build_request_service
+from red_office_google_integration.src.metrics import account_label
+from red_office_google_integration.src.singleflight import single_flight
+from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src import setting
+from red_office_google_integration.gmail.message_creation import EmailCreation
+from red_office_google_integration.gmail.search_index import MailSearchIndex
+from red_office_google_integration.src.fields import Fields, with_fields, GMAIL_MESSAGES_PAGE_FIELDS
+
+
+class AsyncGmail:
+    '''
+        Asyncio client for the Gmail API.
+
+        Credentials are loaded when the object is created, as for `Gmail`; create it once and share it.
+        Close it with `await mail.aclose()` or use it as an async context manager.
+
+        Args:
+            key (bytes): The key used for authentication.
+            search_index (MailSearchIndex, optional): Local search index updated with every fetched message.
+            max_concurrency (int, optional): Requests in flight at the same time.
+            client (httpx.AsyncClient, optional): HTTP client shared with other async clients.
+    '''
+
+    def __init__(self, key: bytes, search_index: MailSearchIndex | None = None,
+                 max_concurrency: int = setting.ASYNC_MAX_CONCURRENCY_GMAIL, client=None) -> None:
+        self.__key = key
+        self.search_index = search_index
+        self.__service = self.__build_service(max_concurrency, client)
+
+    @handle_exception
+    def __build_service(self, max_concurrency: int, client):
+        '''
+        Load the credentials, create the transport and return the service used to build requests.
+        '''
+        cred = GoogleCredentialService(self.__key, setting.SCOPE_GMAIL,
+                                       setting.FILE_NAME_GMAIL_TOKEN, setting.FILE_NAME_GMAIL_CREDENTIAL).get_service()
+        self.__transport = AsyncTransport(cred, max_concurrency, client=client, api='gmail',
+                                          account=account_label(self.__key))
+        return build_request_service("gmail", "v1")
+
+    @handle_exception
+    async def create_draft(self, email: EmailCreation, userId: str = 'me') -> dict:
+        '''
+        Create a draft email in Gmail, see `Gmail.create_draft()`.
+        '''
+        create_message = {
+            'message': {"raw": email.get_mime_message_encoded()}
+        }
+        return await self.__transport.execute(
+            self.__service.users().drafts().create(userId=userId, body=create_message))
+
+    @handle_exception
+    @single_flight()
+    async def get_email_list(self, query: str, userId: str = 'me', fields: Fields = None, **kwargs) -> dict:
+        '''
+        Get a list of emails based on a query, see `Gmail.get_email_list()`.
+        '''
+        kwargs = with_fields(kwargs, fields, 'messages',
+                             GMAIL_MESSAGES_PAGE_FIELDS)
+        return await self.__transport.execute(
+            self.__service.users().messages().list(userId=userId, q=query, **kwargs))
+
+    @handle_exception
+    @single_flight()
+    async def get_email(self, id: str, userId: str = 'me', fields: Fields = None, **kwargs) -> dict:
+        '''
+        Get an email by ID, see `Gmail.get_email()`.
+        '''
+        kwargs = with_fields(kwargs, fields)
+        result = await self.__transport.execute(
+            self.__service.users().messages().get(userId=userId, id=id, **kwargs))
+        # only full messages: metadata, minimal and raw ones would replace the indexed body
+        if self.search_index is not None and 'fields' not in kwargs and kwargs.get('format', 'full') == 'full':
+            self.search_index.add_message(result)
+        return result
+
+    @handle_exception
+    @single_flight()
+    async def get_attachment_encoded(self, messageId: str, attachmentId: str, userId: str = 'me') -> str:
+        '''
+        Get the base64-encoded data of an attachment, see `Gmail.get_attachment_encoded()`.
+        '''
+        attachment = await self.__transport.execute(self.__service.users().messages().attachments().get(
+            userId=userId, messageId=messageId, id=attachmentId))
+        return attachment['data']
+
+    async def aclose(self) -> None:
+        '''
+        Close the HTTP connections.
+        '''
+        await self.__transport.aclose()
+
+    async def __aenter__(self) -> 'AsyncGmail':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+if __name__ == '__main__':
+    pass
@@ -1,11 +1,18 @@
-from googleapiclient.discovery import build
-from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService  # noqa: E203,E402
+from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService, secret_directory  # noqa: E203,E402
+from red_office_google_integration.src.singleflight import single_flight
 from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src.executor import RequestExecutor
+from red_office_google_integration.src.metrics import account_label
+from red_office_google_integration.src.tracing import span
+from red_office_google_integration.google_service.transport import ThreadLocalHttp, build_service
 from red_office_google_integration.src import setting
 from red_office_google_integration.gmail.message_creation import EmailCreation
+from red_office_google_integration.gmail.search_index import MailSearchIndex
+from red_office_google_integration.src.fields import Fields, with_fields, GMAIL_MESSAGES_PAGE_FIELDS
 import json
 import pathlib
 import base64
+from typing import Iterator
 
 
 class Gmail:
@@ -14,20 +21,28 @@ class Gmail:
 
         Args:
             key (bytes): The key used for authentication.
+            search_index (MailSearchIndex, optional): Local search index updated with every fetched message.
 
         Attributes:
             __key (bytes): The key used for authentication.
             __service: The Google service.
+            search_index (MailSearchIndex | None): The local search index.
     '''
 
-    def __init__(self, key: bytes) -> None:
+    def __init__(self, key: bytes, search_index: MailSearchIndex | None = None, account: str | None = None) -> None:
         '''
         Initialize the Gmail class.
 
         Args:
             key (bytes): The key used for authentication.
+            search_index (MailSearchIndex, optional): Local search index updated with every fetched message.
+            account (str, optional): Account id of a multi-account setup: the credential and token files are
+                read from `setting.ACCOUNTS_DIRECTORY_PATH / account` and the metrics labelled with its hash.
         '''
         self.__key = key
+        self.search_index = search_index
+        self.account = account
+        self.__executor = RequestExecutor('gmail', account=account_label(account if account is not None else key))
         self.__service = self.__build_service()
 
     @handle_exception
@@ -38,9 +53,13 @@ class Gmail:
         Returns:
             (cred): The Google service.
         '''
-        cred = GoogleCredentialService(self.__key, setting.SCOPE_GMAIL,
-                                       setting.FILE_NAME_GMAIL_TOKEN, setting.FILE_NAME_GMAIL_CREDENTIAL).get_service()
-        return build("gmail", "v1", credentials=cred)
+        self.credential_service = GoogleCredentialService(self.__key, setting.SCOPE_GMAIL,
+                                                          setting.FILE_NAME_GMAIL_TOKEN, setting.FILE_NAME_GMAIL_CREDENTIAL,
+                                                          secret_directory(self.account))
+        cred = self.credential_service.get_service()
+        self.__executor.http = ThreadLocalHttp(cred)
+        with span('service.build', api='gmail'):
+            return build_service("gmail", "v1", credentials=cred)
 
     @handle_exception
     def create_draft(self, email: EmailCreation, userId: str = 'me'):
@@ -59,50 +78,134 @@ class Gmail:
             'message': {"raw": email.get_mime_message_encoded()}
         }
 
-        draft = (self.__service.users()
-                 .drafts()
-                 .create(userId=userId, body=create_message)
-                 .execute()
-                 )
+        draft = self.__executor.execute(self.__service.users()
+                                        .drafts()
+                                        .create(userId=userId, body=create_message))
         return draft
 
     @handle_exception
-    def get_email_list(self, query: str, userId: str = 'me', **kwargs):
+    @single_flight()
+    def get_email_list(self, query: str, userId: str = 'me', fields: Fields = None, **kwargs):
         '''
             Get a list of emails based on a query.
 
             Args:
                 query (str): The query to filter emails.
                 userId (str, optional): The user ID. Defaults to 'me'.
+                fields (list[str], optional): Fields of each message to return (e.g. `['id']`).
+                    `nextPageToken` and `resultSizeEstimate` are always kept. A string is sent as a raw field mask.
                 **kwargs: Additional query parameters.
 
             Returns:
                 dict: The list of emails matching the query.
         '''
-        results = self.__service.users().messages().list(
-            userId=userId, q=query, **kwargs).execute()
+        kwargs = with_fields(kwargs, fields, 'messages',
+                             GMAIL_MESSAGES_PAGE_FIELDS)
+        results = self.__executor.execute(self.__service.users().messages().list(
+            userId=userId, q=query, **kwargs))
         return results
         # print(json.dumps(results, indent=2))
 
     @handle_exception
-    def get_email(self, id: str, userId: str = 'me', **kwargs):
+    def iter_email_list(self, query: str, userId: str = 'me', fields: Fields = None, **kwargs) -> Iterator[dict]:
+        '''
+            Iterate over the emails matching a query, page after page, yielding every message as soon as it is
+            decoded from the response. Only the message being decoded is held in memory.
+
+            Args:
+                query (str): The query to filter emails.
+                userId (str, optional): The user ID. Defaults to 'me'.
+                fields (list[str], optional): Fields of each message to return (e.g. `['id']`).
+                **kwargs: Additional query parameters, e.g. `maxResults`, the page size.
+
+            Yields:
+                dict: The messages, `id` and `threadId` unless other fields are requested.
+
+            Example:
+            ```
+            for message in Gmail(key).iter_email_list('has:attachment', maxResults=500):
+                print(message['id'])
+            ```
+        '''
+        kwargs = with_fields(kwargs, fields, 'messages', GMAIL_MESSAGES_PAGE_FIELDS)
+        page_token = kwargs.pop('pageToken', None)
+        while True:
+            page = self.__executor.stream(self.__service.users().messages().list(
+                userId=userId, q=query, pageToken=page_token, **kwargs), 'messages')
+            yield from page
+            page_token = page.fields.get('nextPageToken')
+            if not page_token:
+                return
+
+    @handle_exception
+    @single_flight()
+    def get_email(self, id: str, userId: str = 'me', fields: Fields = None, **kwargs):
         '''
             Get an email by ID.
 
             Args:
                 id (str): The ID of the email.
                 userId (str, optional): The user ID. Defaults to 'me'.
+                fields (list[str], optional): Fields of the message to return (e.g. `['id', 'snippet', 'payload.headers']`).
+                    A string is sent as a raw field mask.
                 **kwargs: Additional query parameters.
 
             Returns:
                 dict: The email matching the ID.
         '''
-        result = self.__service.users().messages().get(
-            userId=userId, id=id, **kwargs).execute()
+        kwargs = with_fields(kwargs, fields)
+        result = self.__executor.execute(self.__service.users().messages().get(
+            userId=userId, id=id, **kwargs))
+        # only full messages: metadata, minimal and raw ones would replace the indexed body
+        if self.search_index is not None and 'fields' not in kwargs and kwargs.get('format', 'full') == 'full':
+            self.search_index.add_message(result)
         return result
         # print(json.dumps(result, indent=2))
 
     @handle_exception
+    def sync_search_index(self, query: str = '', userId: str = 'me', max_messages: int | None = None) -> dict:
+        '''
+            Fetch the messages matching a query into the local search index.
+
+            Only messages that are not indexed yet are downloaded, so repeated syncs are incremental.
+
+            Args:
+                query (str, optional): Gmail query limiting the messages to sync. Defaults to all messages.
+                userId (str, optional): The user ID. Defaults to 'me'.
+                max_messages (int, optional): Stop after listing this many messages.
+
+            Returns:
+                dict: The number of messages listed and newly indexed.
+
+            Raises:
+                ValueError: If the Gmail object has no search index.
+        '''
+        if self.search_index is None:
+            raise ValueError('No search index configured for this Gmail object.')
+
+        listed = indexed = 0
+        page_token = None
+        while True:
+            page = self.__executor.execute(self.__service.users().messages().list(
+                userId=userId, q=query, pageToken=page_token,
+                fields='nextPageToken,messages(id)'))
+            ids = [m['id'] for m in page.get('messages', [])]
+            if max_messages is not None:
+                ids = ids[:max_messages - listed]
+            listed += len(ids)
+
+            known = self.search_index.known_ids(ids)
+            messages = [self.__executor.execute(self.__service.users().messages().get(userId=userId, id=i, format='full'))
+                        for i in ids if i not in known]
+            indexed += self.search_index.add_messages(messages)
+
+            page_token = page.get('nextPageToken')
+            if not page_token or (max_messages is not None and listed >= max_messages):
+                break
+        return {'listed': listed, 'indexed': indexed}
+
+    @handle_exception
+    @single_flight()
     def get_attachment_encoded(self, messageId: str, attachmentId: str, userId: str = 'me'):
         '''
             Get an attachment by its ID.
@@ -115,8 +218,8 @@ class Gmail:
             Returns:
                 bytes: The base64-encoded attachment data.
         '''
-        attachment = self.__service.users().messages().attachments().get(
-            userId=userId, messageId=messageId, id=attachmentId).execute()
+        attachment = self.__executor.execute(self.__service.users().messages().attachments().get(
+            userId=userId, messageId=messageId, id=attachmentId))
         file_data = attachment['data']
         return file_data
 
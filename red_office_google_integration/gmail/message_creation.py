@@ -1,4 +1,9 @@
-from email.message import EmailMessage
+from email.message import EmailMessage, MIMEPart
+from collections import OrderedDict
+from string import Template
+from typing import Iterable
+import threading
+import hashlib
 import pathlib
 import mimetypes
 import base64
@@ -6,6 +11,111 @@ import os
 from red_office_google_integration.src.utils import handle_exception
 
 
+def guess_mime_type(file_path: pathlib.Path | str) -> tuple[str, str]:
+    '''
+        Guess the MIME type of a file from its name.
+
+        Args:
+            file_path (pathlib.Path | str): The path to the file.
+
+        Returns:
+            tuple[str, str]: The maintype and subtype, `application/octet-stream` when the type can't be guessed.
+    '''
+    mime_type, _ = mimetypes.guess_type(file_path)
+    if mime_type:  # Check if MIME type was successfully guessed
+        maintype, subtype = mime_type.split("/")
+        return maintype, subtype
+    # Use a default MIME type in case guess_type fails
+    return 'application', 'octet-stream'
+
+
+class AttachmentCache:
+    '''
+        Cache of prepared attachment parts shared across many messages.
+
+        A file is read, typed and base64-encoded once per content hash; every message that
+        attaches the same file reuses the already encoded MIME part. Files are re-read only
+        when their size or modification time changes. The content hashes of the files are
+        forgotten with their evicted parts, so the cache stays bounded.
+
+        Args:
+            max_entries (int, optional): Maximum number of prepared parts kept in memory. Defaults to 128.
+
+        Example:
+        ```
+        cache = AttachmentCache()
+        for header in recipients:
+            email = EmailCreation(header, body)
+            email.add_file(pathlib.Path('brochure.pdf'), cache=cache)
+        ```
+    '''
+
+    def __init__(self, max_entries: int = 128) -> None:
+        self.max_entries = max_entries
+        self.__parts: OrderedDict[tuple, MIMEPart] = OrderedDict()
+        # path -> size, modification time and content hash of the file
+        self.__digests: dict[str, tuple[int, int, str]] = {}
+        self.__lock = threading.Lock()
+
+    def get_part(self, file_path: pathlib.Path | str) -> MIMEPart:
+        '''
+            Return the prepared attachment part for a file, building it on the first request.
+
+            Args:
+                file_path (pathlib.Path | str): The path to the file.
+
+            Returns:
+                MIMEPart: The encoded attachment part. It is shared, do not modify it.
+        '''
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        filename = os.path.basename(path)
+        maintype, subtype = guess_mime_type(path)
+
+        with self.__lock:
+            known = self.__digests.get(path)
+            digest = known[2] if known and known[:2] == (stat.st_size, stat.st_mtime_ns) else None
+            part = self.__parts.get((digest, filename, maintype, subtype)) if digest else None
+            if part is not None:
+                self.__parts.move_to_end((digest, filename, maintype, subtype))
+                return part
+
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        digest = hashlib.sha256(data).hexdigest()
+        key = (digest, filename, maintype, subtype)
+
+        with self.__lock:
+            self.__digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+            part = self.__parts.get(key)
+            if part is None:
+                part = MIMEPart()
+                part.set_content(data, maintype, subtype, filename=filename)
+                self.__parts[key] = part
+                while len(self.__parts) > self.max_entries:
+                    (evicted, *_), _ = self.__parts.popitem(last=False)
+                    self.__forget(evicted)
+            self.__parts.move_to_end(key)
+            return part
+
+    def __forget(self, digest: str) -> None:
+        # the hash stays known while another part (other file name or type) holds the same content
+        if not any(key[0] == digest for key in self.__parts):
+            for path in [path for path, known in self.__digests.items() if known[2] == digest]:
+                del self.__digests[path]
+
+    def clear(self) -> None:
+        '''
+            Drop every cached part.
+        '''
+        with self.__lock:
+            self.__parts.clear()
+            self.__digests.clear()
+
+    def __len__(self) -> int:
+        return len(self.__parts)
+
+
 class EmailCreation:
     '''
         Class for creating an email message.
@@ -23,7 +133,8 @@ class EmailCreation:
 
         Methods:
             __build(): Build the MIME message.
-            add_file(file_path: pathlib.Path): Add a file as an attachment to the email.
+            add_file(file_path: pathlib.Path, cache: AttachmentCache | None): Add a file as an attachment to the email.
+            add_part(part: MIMEPart): Attach an already prepared MIME part.
             get_mime_message(): Get the MIME message object.
             get_mime_message_encoded(): Get the MIME message as a base64-encoded string.
     '''
@@ -53,29 +164,39 @@ class EmailCreation:
         self.__mime_message.set_content(self.__body, subtype=self.__subtype)
 
     @handle_exception
-    def add_file(self, file_path: pathlib.Path) -> None:
+    def add_file(self, file_path: pathlib.Path, cache: AttachmentCache | None = None) -> None:
         '''
             Add a file as an attachment to the email.
 
             Args:
                 file_path (pathlib.Path): The path to the file.
+                cache (AttachmentCache, optional): Cache of prepared parts. When given, the file is
+                    encoded once and the part is shared with every other message using the same cache.
         '''
+        if cache is not None:
+            self.add_part(cache.get_part(file_path))
+            return
+
         # Guessing the MIME type
         attachment_filename = file_path
-        mime_type, _ = mimetypes.guess_type(attachment_filename)
-
-        if mime_type:  # Check if MIME type was successfully guessed
-            maintype, subtype = mime_type.split("/")
-        else:
-            # Use a default MIME type in case guess_type fails
-            maintype = 'application'
-            subtype = 'octet-stream'
+        maintype, subtype = guess_mime_type(attachment_filename)
 
         with open(attachment_filename, "rb") as fp:
             attachment_data = fp.read()
             self.__mime_message.add_attachment(
                 attachment_data, maintype, subtype, filename=os.path.basename(attachment_filename))
 
+    def add_part(self, part: MIMEPart) -> None:
+        '''
+            Attach an already prepared MIME part to the email.
+
+            Args:
+                part (MIMEPart): The attachment part, e.g. from `AttachmentCache.get_part()`.
+        '''
+        if not self.__mime_message.is_multipart():
+            self.__mime_message.make_mixed()
+        self.__mime_message.attach(part)
+
     def get_mime_message(self) -> EmailMessage:
         '''
             Get the MIME message object.
@@ -97,6 +218,72 @@ class EmailCreation:
         return encoded_message
 
 
+class EmailTemplate:
+    '''
+        Precompiled email template for generating many similar messages.
+
+        Header values and the body may contain `string.Template` placeholders (`$name` or `${name}`).
+        Placeholders are compiled once; static header values are copied as-is. Attachments are
+        prepared once through an `AttachmentCache` and shared by every rendered message.
+
+        Args:
+            header (dict): The email headers, values may contain placeholders.
+            body (str): The email body, may contain placeholders.
+            subtype (str, optional): The MIME subtype. Defaults to 'plain'.
+            attachments (Iterable[pathlib.Path], optional): Files attached to every message.
+            cache (AttachmentCache, optional): Cache used for the attachments. A private cache is created if omitted.
+
+        Example:
+        ```
+        template = EmailTemplate({'To': '$email', 'Subject': 'Hello $name'},
+                                 'Dear $name, please find the brochure attached.',
+                                 attachments=[pathlib.Path('brochure.pdf')])
+        for row in recipients:
+            gmail.create_draft(template.render(row))
+        ```
+    '''
+
+    def __init__(self, header: dict, body: str, subtype: str = 'plain',
+                 attachments: Iterable[pathlib.Path] = (), cache: AttachmentCache | None = None) -> None:
+        self.__static_header: dict[str, str] = {}
+        self.__template_header: dict[str, Template] = {}
+        for k, v in header.items():
+            if '$' in str(v):
+                self.__template_header[k] = Template(str(v))
+            else:
+                self.__static_header[k] = v
+        self.__body = Template(body) if '$' in body else None
+        self.__raw_body = body
+        self.__subtype = subtype
+        self.__cache = cache if cache is not None else AttachmentCache()
+        self.__attachments = [self.__cache.get_part(a) for a in attachments]
+
+    def render(self, context: dict | None = None, **kwargs) -> EmailCreation:
+        '''
+            Build an email from the template.
+
+            Args:
+                context (dict, optional): Values for the placeholders.
+                **kwargs: Additional values for the placeholders.
+
+            Returns:
+                EmailCreation: The rendered email with the shared attachments.
+
+            Raises:
+                KeyError: If a placeholder has no value.
+        '''
+        values = {**(context or {}), **kwargs}
+        header = dict(self.__static_header)
+        for k, t in self.__template_header.items():
+            header[k] = t.substitute(values)
+        body = self.__body.substitute(values) if self.__body else self.__raw_body
+
+        email = EmailCreation(header, body, self.__subtype)
+        for part in self.__attachments:
+            email.add_part(part)
+        return email
+
+
 if __name__ == '__main__':
     # header = {
     #     'To': 'techsage@gmail.com',
@@ -0,0 +1,230 @@
+'''
+    Local full-text search index over Gmail messages.
+
+    Messages fetched through `Gmail` can be stored in a SQLite FTS5 index and searched offline.
+    The index covers the subject, from/to, snippet and the decoded plain-text body of each message
+    and is updated incrementally: messages already present are skipped by `Gmail.sync_search_index()`
+    and re-fetched messages simply replace their previous entry.
+
+    Query syntax is the SQLite FTS5 syntax, e.g. `invoice AND sender:acme`, `"project update"` or `subject:report*`.
+
+    Example:
+    ```
+    index = MailSearchIndex()
+    gmail = Gmail(key, search_index=index)
+    gmail.sync_search_index('newer_than:7d')
+    index.search('invoice')
+    ```
+'''
+import base64
+import html
+import pathlib
+import re
+import sqlite3
+import threading
+from red_office_google_integration.src import setting
+
+
+# The message ids are kept in a keyed table whose rowid is the rowid of the message text in the FTS5 table,
+# so a message is found by its id through an index instead of a scan of the full-text table.
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS message_ids (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    thread_id TEXT,
+    internal_date INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS message_text USING fts5(
+    subject,
+    sender,
+    recipients,
+    snippet,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+'''
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _decode_body(data: str) -> str:
+    '''
+        Decode a base64url message part body to text.
+    '''
+    raw = base64.urlsafe_b64decode(data.encode() + b'=' * (-len(data) % 4))
+    return raw.decode('utf-8', errors='replace')
+
+
+def _collect_text(part: dict, plain: list[str], rich: list[str]) -> None:
+    '''
+        Walk a message payload and collect the decoded text/plain and text/html bodies.
+    '''
+    mime_type = part.get('mimeType', '')
+    data = part.get('body', {}).get('data')
+    if data and not part.get('filename'):
+        if mime_type == 'text/plain':
+            plain.append(_decode_body(data))
+        elif mime_type == 'text/html':
+            rich.append(_decode_body(data))
+    for child in part.get('parts', []):
+        _collect_text(child, plain, rich)
+
+
+def message_text(message: dict) -> str:
+    '''
+        Extract the searchable plain text body of a Gmail message resource.
+
+        Args:
+            message (dict): The message as returned by `Gmail.get_email()` with `format='full'`.
+
+        Returns:
+            str: The decoded text/plain body, or the text/html body stripped of tags when there is no plain part.
+    '''
+    plain: list[str] = []
+    rich: list[str] = []
+    _collect_text(message.get('payload', {}), plain, rich)
+    if plain:
+        return '\n'.join(plain)
+    text = html.unescape(_TAG_RE.sub(' ', ' '.join(rich)))
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def message_headers(message: dict) -> dict[str, str]:
+    '''
+        Return the headers of a Gmail message resource keyed by lower-case name.
+    '''
+    headers = message.get('payload', {}).get('headers', [])
+    return {h['name'].lower(): h['value'] for h in headers}
+
+
+class MailSearchIndex:
+    '''
+        SQLite FTS5 index of Gmail messages.
+
+        Args:
+            path (pathlib.Path | str, optional): Location of the index database.
+                Defaults to `setting.MAIL_SEARCH_INDEX_PATH`. Use ':memory:' for a throw-away index.
+
+        Methods:
+            add_message(message): Add or replace a message.
+            add_messages(messages): Add or replace many messages in one transaction.
+            known_ids(ids): Return the ids that are already indexed.
+            search(query, limit): Search the index.
+            close(): Close the database.
+    '''
+
+    def __init__(self, path: pathlib.Path | str = setting.MAIL_SEARCH_INDEX_PATH) -> None:
+        if str(path) != ':memory:':
+            pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.__conn.execute('PRAGMA journal_mode=WAL')
+        self.__conn.executescript(_SCHEMA)
+        self.__conn.commit()
+
+    def __write(self, rows: list[tuple]) -> None:
+        for row in rows:
+            found = self.__conn.execute('SELECT rowid FROM message_ids WHERE id = ?', (row[0],)).fetchone()
+            if found is None:
+                rowid = self.__conn.execute('INSERT INTO message_ids (id, thread_id, internal_date) VALUES (?, ?, ?)',
+                                            row[:3]).lastrowid
+            else:
+                rowid = found[0]
+                self.__conn.execute('UPDATE message_ids SET thread_id = ?, internal_date = ? WHERE rowid = ?',
+                                    (row[1], row[2], rowid))
+                self.__conn.execute('DELETE FROM message_text WHERE rowid = ?', (rowid,))
+            self.__conn.execute('INSERT INTO message_text (rowid, subject, sender, recipients, snippet, body) '
+                                'VALUES (?, ?, ?, ?, ?, ?)', (rowid, *row[3:]))
+
+    @staticmethod
+    def _row(message: dict) -> tuple:
+        headers = message_headers(message)
+        recipients = ', '.join(filter(None, (headers.get('to'), headers.get('cc'))))
+        return (message['id'], message.get('threadId'), int(message.get('internalDate', 0)),
+                headers.get('subject', ''), headers.get('from', ''), recipients,
+                html.unescape(message.get('snippet', '')), message_text(message))
+
+    def add_messages(self, messages) -> int:
+        '''
+            Add or replace messages in the index.
+
+            Args:
+                messages (Iterable[dict]): Gmail message resources, ideally fetched with `format='full'`.
+
+            Returns:
+                int: The number of messages written.
+        '''
+        rows = [self._row(m) for m in messages if m.get('id')]
+        if not rows:
+            return 0
+        with self.__lock, self.__conn:
+            self.__write(rows)
+        return len(rows)
+
+    def add_message(self, message: dict) -> None:
+        '''
+            Add or replace a single message in the index.
+
+            Args:
+                message (dict): A Gmail message resource.
+        '''
+        self.add_messages([message])
+
+    def known_ids(self, ids) -> set[str]:
+        '''
+            Return the subset of message ids that are already indexed.
+
+            Args:
+                ids (Iterable[str]): Message ids.
+
+            Returns:
+                set[str]: The ids present in the index.
+        '''
+        ids = list(ids)
+        found: set[str] = set()
+        with self.__lock:
+            # stay below SQLite's host parameter limit
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ','.join('?' * len(chunk))
+                found.update(row[0] for row in self.__conn.execute(
+                    f'SELECT id FROM message_ids WHERE id IN ({marks})', chunk))
+        return found
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        '''
+            Search the index.
+
+            Args:
+                query (str): An FTS5 query. Columns can be targeted with `subject:`, `sender:`, `recipients:`,
+                    `snippet:` and `body:`.
+                limit (int, optional): Maximum number of results. Defaults to 20.
+
+            Returns:
+                list[dict]: Matching messages, best match first, with a highlighted `match` excerpt.
+        '''
+        with self.__lock:
+            rows = self.__conn.execute(
+                '''SELECT message_ids.id, thread_id, internal_date, subject, sender, recipients, snippet,
+                          snippet(message_text, -1, '[', ']', '...', 16)
+                   FROM message_text JOIN message_ids ON message_ids.rowid = message_text.rowid
+                   WHERE message_text MATCH ? ORDER BY rank LIMIT ?''', (query, limit)).fetchall()
+        keys = ('id', 'threadId', 'internalDate', 'subject', 'from', 'to', 'snippet', 'match')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__conn.execute('SELECT count(*) FROM message_ids').fetchone()[0]
+
+    def close(self) -> None:
+        '''
+            Close the index database.
+        '''
+        with self.__lock:
+            self.__conn.close()
+
+
+if __name__ == '__main__':
+    pass
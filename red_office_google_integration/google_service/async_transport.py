@@ -0,0 +1,195 @@
+'''
+    Asynchronous execution of Google API requests on an asyncio event loop.
+
+    Requests are still built by the discovery service (`service.events().list(...)`), so the async clients
+    take the same parameters as the blocking ones. Instead of `request.execute()` they are sent with
+    `await transport.execute(request)` over a pooled `httpx.AsyncClient`. A semaphore bounds the requests
+    in flight per transport, so thousands of coroutines can share one client without opening thousands of
+    connections. Like `RequestExecutor` on the blocking path, requests take a token from the rate limiter of
+    their API, are retried following the retry policy and fail with the typed exceptions of `src/exceptions.py`.
+
+    Credentials come from `GoogleCredentialService`. When the access token expires it is refreshed once,
+    on a worker thread, while the other requests wait for it.
+
+    `httpx` is an optional dependency: `pip install httpx`.
+
+    Example:
+    ```
+    transport = AsyncTransport(credentials, max_concurrency=100)
+    request = service.events().list(calendarId='primary')
+    page = await transport.execute(request)
+    await transport.aclose()
+    ```
+'''
+import asyncio
+import time
+from typing import Any
+import httplib2
+from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from red_office_google_integration.google_service.transport import build_service
+from red_office_google_integration.src.exceptions import TransportError, as_typed_error, is_quota_error
+from red_office_google_integration.src.quota import shared_quota
+from red_office_google_integration.src.rate_limit import TokenBucket, rate_limiter
+from red_office_google_integration.src.retry import DEFAULT_RETRY_POLICY, RetryPolicy, is_idempotent
+from red_office_google_integration.src.metrics import metrics
+from red_office_google_integration.src.tracing import span
+from red_office_google_integration.log.log_handler import logger
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+
+def build_request_service(serviceName: str, version: str):
+    '''
+        Build a discovery service used only to build requests; they are never executed through it.
+
+        Args:
+            serviceName (str): The API name, e.g. `calendar`.
+            version (str): The API version, e.g. `v3`.
+    '''
+    with span('service.build', api=serviceName):
+        return build_service(serviceName, version, http=httplib2.Http(), static_discovery=True)
+
+
+class AsyncTransport:
+    '''
+        Send discovery requests through a shared `httpx.AsyncClient` with bounded concurrency.
+
+        Args:
+            credentials: The Google credentials used to authorize the requests.
+            max_concurrency (int, optional): Requests in flight at the same time. Defaults to 100.
+            timeout (float, optional): Timeout of a request in seconds. Defaults to 60.
+            client (httpx.AsyncClient, optional): A client shared with other transports. It is not closed
+                by `aclose()`.
+            api (str, optional): `calendar`, `sheets` or `gmail`, selects the shared rate limiter of the API,
+                replaced by the quota shared by the processes when `setting.QUOTA_DB_PATH` is set.
+            policy (RetryPolicy, optional): Retry policy. Defaults to the one configured in `setting`.
+            account (str, optional): Account label of the metrics, see `metrics.account_label()`.
+    '''
+
+    def __init__(self, credentials, max_concurrency: int = 100, timeout: float = 60.0, client=None,
+                 api: str | None = None, policy: RetryPolicy | None = None, account: str | None = None) -> None:
+        if httpx is None:
+            raise ImportError('The async clients need httpx, install it with `pip install httpx`.')
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1.')
+        self.credentials = credentials
+        self.max_concurrency = max_concurrency
+        self.__owns_client = client is None
+        self.__client = client if client is not None else httpx.AsyncClient(
+            timeout=timeout, limits=httpx.Limits(max_connections=max_concurrency,
+                                                 max_keepalive_connections=max_concurrency))
+        self.quota = shared_quota() if api else None
+        self.limiter: TokenBucket | None = rate_limiter(api, account) if api and self.quota is None else None
+        self.policy = policy if policy is not None else DEFAULT_RETRY_POLICY
+        self.api = api
+        self.account = account
+        self.__slots = asyncio.Semaphore(max_concurrency)
+        self.__refresh_lock = asyncio.Lock()
+
+    async def __authorize(self, headers: dict[str, str], force_refresh: bool = False) -> None:
+        '''
+            Add the Authorization header, refreshing the token first when it is no longer valid.
+        '''
+        if force_refresh or not self.credentials.valid:
+            token = self.credentials.token
+            async with self.__refresh_lock:
+                # another request may have refreshed the token while this one waited
+                if force_refresh and self.credentials.token == token or not self.credentials.valid:
+                    with span('credentials.refresh'):
+                        await asyncio.to_thread(self.credentials.refresh, Request())
+        self.credentials.apply(headers)
+
+    async def execute(self, request: HttpRequest) -> Any:
+        '''
+            Send a request built by a discovery service and return its parsed response.
+
+            Args:
+                request (HttpRequest): The request, e.g. `service.events().get(calendarId=..., eventId=...)`.
+
+            Returns:
+                Any: The deserialized response, like `request.execute()`.
+
+            Raises:
+                GoogleAPIError: A subclass matching the error status, once retries are exhausted.
+                TransportError: When the request could not be sent.
+        '''
+        with span('request.execute', api=self.api, operation=request.methodId):
+            for attempt in range(self.policy.max_retries + 1):
+                try:
+                    return await self.__send(request, attempt)
+                except Exception as e:
+                    if not self.policy.should_retry(e, attempt, is_idempotent(request)):
+                        typed = as_typed_error(e)
+                        if typed is e:
+                            raise
+                        raise typed from e
+                    delay = self.policy.delay(attempt, e)
+                    logger.warning(f'Retrying {request.methodId} in {delay:.2f}s after {type(e).__name__} '
+                                   f'(attempt {attempt + 1}).')
+                    await asyncio.sleep(delay)
+
+    async def __send(self, request: HttpRequest, retry: int = 0) -> Any:
+        '''
+            Send a request once, refreshing the token and sending it again if the API answers 401.
+        '''
+        throttled = 0.0
+        if self.limiter is not None:
+            throttled = self.limiter.reserve()
+        if self.quota is not None:
+            throttled += await asyncio.to_thread(self.quota.reserve, [request.methodId], self.account)
+        if throttled > 0:
+            await asyncio.sleep(throttled)
+        body = request.body.encode() if isinstance(request.body, str) else (request.body or b'')
+        async with self.__slots:
+            for attempt in range(2):
+                headers = dict(request.headers)
+                await self.__authorize(headers, force_refresh=attempt > 0)
+                started = time.perf_counter()
+                try:
+                    with span('http.attempt', attempt=retry) as attempt_span:
+                        response = await self.__client.request(request.method, request.uri,
+                                                               content=request.body, headers=headers)
+                        if attempt_span is not None:
+                            attempt_span.set(status=response.status_code)
+                except httpx.TransportError as e:
+                    self.__record(request, 'TransportError', started, len(body), 0, throttled, retry)
+                    raise TransportError(f'{type(e).__name__}: {e}') from e
+                quota_error = response.status_code in (403, 429) and is_quota_error(
+                    HttpError(httplib2.Response({'status': response.status_code}), response.content))
+                self.__record(request, response.status_code, started, len(body), len(response.content),
+                              throttled, retry or attempt, quota_error)
+                # an expired token is refreshed and the request sent once more
+                if response.status_code != 401 or attempt:
+                    break
+        resp = httplib2.Response({**response.headers, 'status': response.status_code})
+        resp.reason = response.reason_phrase
+        with span('response.parse', bytes=len(response.content)):
+            return request.postproc(resp, response.content)
+
+    def __record(self, request: HttpRequest, status: int | str, started: float, request_bytes: int,
+                 response_bytes: int, throttled: float, retry: int, quota_error: bool = False) -> None:
+        if self.api is not None:
+            metrics.record(self.api, request.methodId, self.account, status, time.perf_counter() - started,
+                           request_bytes, response_bytes, throttled, bool(retry), quota_error)
+
+    async def aclose(self) -> None:
+        '''
+            Close the HTTP client if this transport created it.
+        '''
+        if self.__owns_client:
+            await self.__client.aclose()
+
+    async def __aenter__(self) -> 'AsyncTransport':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+if __name__ == '__main__':
+    pass
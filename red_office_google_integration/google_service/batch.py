@@ -0,0 +1,166 @@
+'''
+    Execution of many API requests through multipart batch requests.
+
+    `BatchExecutor` groups requests into batches (one HTTP round trip each), runs a bounded number of
+    batches concurrently and retries only the sub-requests that failed with a retryable error
+    (429, 5xx and rate limit 403s), waiting at least as long as their `Retry-After` header asks. Every
+    sub-request takes a token from the rate limiter, if one is given. A result is reported for every request.
+
+    Example:
+    ```
+    executor = BatchExecutor(service, ThreadLocalHttp(credentials))
+    requests = ((event['id'], service.events().delete(calendarId='primary', eventId=event['id']))
+                for event in events)
+    for result in executor.run(requests):
+        print(result['tag'], result['status'])
+    ```
+'''
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import Any, Iterable, Iterator
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from red_office_google_integration.google_service.transport import ThreadLocalHttp
+from red_office_google_integration.src.exceptions import as_typed_error, is_quota_error
+from red_office_google_integration.src.metrics import metrics
+from red_office_google_integration.src.quota import QuotaTracker
+from red_office_google_integration.src.rate_limit import TokenBucket
+from red_office_google_integration.src.retry import RetryPolicy, is_idempotent
+from red_office_google_integration.src.tracing import span
+from red_office_google_integration.log.log_handler import logger
+
+
+def error_details(error: Exception) -> dict:
+    '''
+        Describe an error in the same format used by `handle_exception`.
+    '''
+    if isinstance(error, HttpError):
+        typed = as_typed_error(error)
+        return {'status': type(typed).__name__, 'status_code': error.resp.status, 'message': error._get_reason()}
+    return {'status': type(error).__name__, 'message': str(error)}
+
+
+class BatchExecutor:
+    '''
+        Run requests in multipart batches with bounded concurrency and per sub-request retries.
+
+        Args:
+            service: The Google API service the requests were built from.
+            http (ThreadLocalHttp, optional): Per-thread connections, required when `max_workers` > 1.
+            batch_size (int, optional): Requests per batch. Defaults to 50, the Calendar API recommendation.
+            max_workers (int, optional): Batches in flight at the same time. Defaults to 4.
+            max_retries (int, optional): Retries of a failed sub-request. Defaults to 3.
+            backoff (float, optional): Base delay in seconds between retries, doubled on every attempt. Defaults to 1.
+            limiter (TokenBucket, optional): Rate limiter; every sub-request takes one token.
+            quota (QuotaTracker, optional): Quota shared by the processes; every sub-request takes its cost.
+            api (str, optional): `calendar`, `sheets` or `gmail`. When given, every sub-request is recorded in
+                the metrics (`src/metrics.py`) with the latency of its batch; response sizes are not measured.
+            account (str, optional): Account label of the metrics.
+    '''
+
+    def __init__(self, service, http: ThreadLocalHttp | None = None, batch_size: int = 50,
+                 max_workers: int = 4, max_retries: int = 3, backoff: float = 1.0,
+                 limiter: TokenBucket | None = None, api: str | None = None, account: str | None = None,
+                 quota: QuotaTracker | None = None) -> None:
+        if batch_size < 1 or max_workers < 1:
+            raise ValueError('batch_size and max_workers must be at least 1.')
+        self.service = service
+        self.http = http
+        self.batch_size = batch_size
+        self.max_workers = max_workers if http is not None else 1
+        self.max_retries = max_retries
+        self.policy = RetryPolicy(max_retries=max_retries, base_delay=backoff)
+        self.limiter = limiter
+        self.quota = quota
+        self.api = api
+        self.account = account
+
+    def run(self, requests: Iterable[tuple[Any, HttpRequest]]) -> Iterator[dict]:
+        '''
+            Execute the requests and yield one result per request as its batch completes.
+
+            Args:
+                requests (Iterable[tuple[Any, HttpRequest]]): Pairs of a tag identifying the request and
+                    the request itself. The iterable is consumed lazily, one batch at a time.
+
+            Yields:
+                dict: `{'tag', 'status': 'success', 'response'}` or `{'tag', 'status': 'error', 'error'}`.
+        '''
+        iterator = iter(requests)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = set()
+
+            def submit_next() -> None:
+                chunk = list(islice(iterator, self.batch_size))
+                if chunk:
+                    pending.add(pool.submit(self._run_batch, chunk))
+
+            for _ in range(self.max_workers):
+                submit_next()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    submit_next()
+                    yield from future.result()
+
+    def _run_batch(self, chunk: list[tuple[Any, HttpRequest]]) -> list[dict]:
+        '''
+            Execute one batch, sending the retryable failures again until they succeed or retries run out.
+        '''
+        results: dict[int, dict] = {}
+        todo = list(enumerate(chunk))
+        for attempt in range(self.max_retries + 1):
+            responses: dict[str, tuple[Any, Exception | None]] = {}
+
+            def callback(request_id, response, exception):
+                responses[request_id] = (response, exception)
+
+            batch = self.service.new_batch_http_request(callback=callback)
+            for position, (_, request) in todo:
+                batch.add(request, request_id=str(position))
+            throttled = self.limiter.acquire(len(todo)) if self.limiter is not None else 0.0
+            if self.quota is not None:
+                throttled += self.quota.acquire((request.methodId for _, (_, request) in todo), self.account)
+            started = time.perf_counter()
+            try:
+                with span('http.batch', api=self.api, requests=len(todo), attempt=attempt):
+                    batch.execute(http=self.http.get() if self.http is not None else None)
+            except Exception as e:  # the whole batch failed, e.g. a connection error
+                for position, _ in todo:
+                    responses.setdefault(str(position), (None, e))
+            if self.api is not None:
+                self.__record(todo, responses, time.perf_counter() - started, throttled, attempt)
+
+            retry, delay = [], 0.0
+            for position, (tag, request) in todo:
+                response, exception = responses.get(str(position), (None, None))
+                if exception is None:
+                    results[position] = {'tag': tag, 'status': 'success', 'response': response}
+                elif self.policy.should_retry(exception, attempt, is_idempotent(request)):
+                    retry.append((position, (tag, request)))
+                    delay = max(delay, self.policy.delay(attempt, exception))
+                else:
+                    results[position] = {'tag': tag, 'status': 'error', 'error': error_details(exception)}
+            if not retry:
+                break
+            logger.warning(f'Retrying {len(retry)} of {len(chunk)} batched requests (attempt {attempt + 1}).')
+            todo = retry
+            time.sleep(delay)
+        return [results[position] for position in range(len(chunk))]
+
+    def __record(self, todo: list, responses: dict, latency: float, throttled: float, attempt: int) -> None:
+        for position, (_, request) in todo:
+            _, exception = responses.get(str(position), (None, None))
+            if exception is None:
+                status = 200
+            else:
+                status = exception.resp.status if isinstance(exception, HttpError) else type(exception).__name__
+            body = request.body.encode() if isinstance(request.body, str) else (request.body or b'')
+            metrics.record(self.api, request.methodId, self.account, status, latency, len(body), 0,
+                           throttled / len(todo), attempt > 0, exception is not None and is_quota_error(exception))
+
+
+if __name__ == '__main__':
+    pass
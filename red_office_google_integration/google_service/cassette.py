@@ -0,0 +1,409 @@
+'''
+    Record and replay of the HTTP exchanges of the API clients.
+
+    In record mode every request sent by `SpreadSheet`, `Gmail` and `CalendarEvent` (single and batch requests)
+    is appended to a cassette, a JSON lines file, with its response and latency. Secrets are scrubbed before
+    anything is written: authorization, cookie and API key headers (also inside batch bodies), credential
+    query parameters and token fields of JSON bodies. Message contents are recorded as they are.
+
+    In replay mode no request leaves the process: each one is answered with the recorded response of the same
+    method, URL and JSON body, in recording order, after its recorded latency divided by `speed` (0: at once).
+    A request that was not recorded raises `CassetteMismatchError`.
+
+    `load_replay()` sends the requests of a recorded session again from many threads, through the executor
+    and the response parsing of the package, to profile the client side under N times the recorded load.
+
+    Record or replay a CLI call with `RED_OFFICE_CASSETTE=session.jsonl RED_OFFICE_CASSETTE_MODE=record` (or
+    `replay`, with `RED_OFFICE_CASSETTE_SPEED`), or in code:
+
+    ```
+    with use_cassette('session.jsonl', mode='record'):
+        CalendarEvent(key).list_event('primary', {})
+    with use_cassette('session.jsonl', mode='replay', speed=0):
+        CalendarEvent(key).list_event('primary', {})   # same response, offline
+    ```
+
+    Streamed lists (`RequestExecutor.stream()`) are sent with `execute()` while a cassette is active, so they
+    are recorded and replayed too. Async clients send their requests with httpx and are not recorded.
+'''
+import base64
+import hashlib
+import json
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import httplib2
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.exceptions import CassetteMismatchError
+
+
+REDACTED = 'REDACTED'
+# headers never written to a cassette
+SECRET_HEADERS = frozenset({'authorization', 'proxy-authorization', 'cookie', 'set-cookie', 'x-goog-api-key'})
+# query parameters and JSON fields whose value is replaced
+SECRET_FIELDS = frozenset({'access_token', 'refresh_token', 'id_token', 'client_secret', 'key', 'oauth_token',
+                           'password'})
+_SECRET_LINES = re.compile(r'^(authorization|proxy-authorization|cookie|x-goog-api-key):[^\r\n]*',
+                           re.IGNORECASE | re.MULTILINE)
+# random parts of a batch body: the MIME boundary and the Content-ID prefix of its parts
+_BOUNDARY = re.compile(r'=+\d+=+')
+_CONTENT_ID = re.compile(r'Content-ID: <([^>+]*?) ?\+', re.IGNORECASE)
+
+
+# _______________________________________________________scrubbing______________________________________________________
+def scrub_uri(uri: str) -> str:
+    '''
+        Replace the credentials in the query of a URL.
+    '''
+    parts = urlsplit(uri)
+    if not parts.query:
+        return uri
+    query = [(name, REDACTED if name in SECRET_FIELDS else value)
+             for name, value in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def scrub_headers(headers: dict | None) -> dict:
+    return {name: value for name, value in (headers or {}).items() if name.lower() not in SECRET_HEADERS}
+
+
+def _scrub_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SECRET_FIELDS else _scrub_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_scrub_value(v) for v in value]
+    return value
+
+
+def scrub_body(body: str | None) -> str | None:
+    '''
+        Replace the token fields of a JSON body, or the secret header lines of a batch (multipart) body.
+    '''
+    if not body:
+        return body
+    try:
+        return json.dumps(_scrub_value(json.loads(body)))
+    except ValueError:
+        return _SECRET_LINES.sub(lambda match: f'{match.group(1)}: {REDACTED}', body)
+
+
+def _text(body: bytes | str | None) -> str | None:
+    if body is None or isinstance(body, str):
+        return body
+    return body.decode('utf-8', 'replace')
+
+
+def _content_id(body: str | None) -> str | None:
+    match = _CONTENT_ID.search(body) if body else None
+    return match.group(1) if match else None
+
+
+def _match_key(method: str, uri: str, body: str | None) -> tuple[str, str, str]:
+    '''
+        What a replayed request must have in common with the recorded one: method, URL and body, JSON bodies
+        compared by content and batch bodies without their random boundary and Content-ID prefix.
+    '''
+    if body:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True)
+        except ValueError:
+            body = _CONTENT_ID.sub('Content-ID: <+', _BOUNDARY.sub('', scrub_body(body)))
+    return method.upper(), scrub_uri(uri), hashlib.sha256((body or '').encode()).hexdigest()
+
+
+# _______________________________________________________cassette_______________________________________________________
+class Cassette:
+    '''
+        A JSON lines file of recorded exchanges.
+
+        Every line holds `method`, `uri`, `request_headers`, `body`, `status`, `response_headers`, `content`
+        (base64 when `binary`), `started` (seconds since the first recorded request) and `duration` (seconds).
+
+        Args:
+            path (Path | str): The file. Recording appends to it.
+    '''
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.__lock = threading.Lock()
+        self.__origin: float | None = None
+        self.interactions: list[dict] = []
+        self.__pending: dict[tuple, deque[dict]] = defaultdict(deque)
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self.interactions = [json.loads(line) for line in f if line.strip()]
+        self.rewind()
+
+    def rewind(self) -> None:
+        '''
+            Make every recorded response available to replay again, in recording order.
+        '''
+        with self.__lock:
+            self.__pending.clear()
+            for interaction in self.interactions:
+                key = _match_key(interaction['method'], interaction['uri'], interaction.get('body'))
+                self.__pending[key].append(interaction)
+
+    def record(self, method: str, uri: str, headers: dict | None, body, resp, content: bytes, started: float,
+               duration: float) -> dict:
+        '''
+            Scrub and append one exchange. `started` is a `time.perf_counter()` value.
+        '''
+        try:
+            text, binary = content.decode('utf-8'), False
+        except UnicodeDecodeError:
+            text, binary = base64.b64encode(content).decode(), True
+        if not binary and 'json' in resp.get('content-type', ''):
+            text = scrub_body(text)
+        with self.__lock:
+            if self.__origin is None:
+                self.__origin = started
+            interaction = {
+                'method': method.upper(), 'uri': scrub_uri(uri), 'request_headers': scrub_headers(headers),
+                'body': scrub_body(_text(body)), 'status': resp.status,
+                'response_headers': scrub_headers({k: v for k, v in resp.items() if k != 'status'}),
+                'content': text, 'binary': binary, 'started': round(started - self.__origin, 6),
+                'duration': round(duration, 6)}
+            self.interactions.append(interaction)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(interaction) + '\n')
+        return interaction
+
+    def take(self, method: str, uri: str, body, cycle: bool = False) -> dict:
+        '''
+            Return the next recorded exchange matching the request.
+
+            Args:
+                cycle (bool, optional): Put it back at the end of its queue instead of using it up, so a
+                    session can be replayed any number of times.
+
+            Raises:
+                CassetteMismatchError: When no recorded exchange is left for the request.
+        '''
+        key = _match_key(method, uri, _text(body))
+        with self.__lock:
+            pending = self.__pending.get(key)
+            if not pending:
+                raise CassetteMismatchError(f'No recorded response for {key[0]} {key[1]} in {self.path}.')
+            interaction = pending.popleft()
+            if cycle:
+                pending.append(interaction)
+        return interaction
+
+
+def response_of(interaction: dict) -> tuple[httplib2.Response, bytes]:
+    '''
+        Rebuild the `(response, content)` pair of a recorded exchange, as returned by `httplib2.Http.request()`.
+    '''
+    resp = httplib2.Response({**interaction['response_headers'], 'status': str(interaction['status'])})
+    content = interaction['content'] or ''
+    return resp, base64.b64decode(content) if interaction.get('binary') else content.encode('utf-8')
+
+
+class RecordingHttp:
+    '''
+        Wrap an HTTP connection (e.g. `AuthorizedHttp`) to record what it sends and receives.
+    '''
+
+    def __init__(self, http, cassette: Cassette) -> None:
+        self.http = http
+        self.cassette = cassette
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        started = time.perf_counter()
+        resp, content = self.http.request(uri, method, body, headers, *args, **kwargs)
+        self.cassette.record(method, uri, headers, body, resp, content, started, time.perf_counter() - started)
+        return resp, content
+
+    def __getattr__(self, name: str):
+        # credentials, timeout, ... of the wrapped connection
+        return getattr(self.http, name)
+
+
+class ReplayHttp:
+    '''
+        HTTP connection answering from a cassette.
+
+        Args:
+            cassette (Cassette): The recorded exchanges.
+            speed (float, optional): Recorded latencies are divided by it; 1 replays at recorded speed,
+                0 (default) answers at once.
+            cycle (bool, optional): Reuse the responses instead of using them up.
+    '''
+
+    def __init__(self, cassette: Cassette, speed: float = 0.0, cycle: bool = False) -> None:
+        self.cassette = cassette
+        self.speed = speed
+        self.cycle = cycle
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        interaction = self.cassette.take(method, uri, body, self.cycle)
+        if self.speed > 0:
+            time.sleep(interaction['duration'] / self.speed)
+        resp, content = response_of(interaction)
+        recorded, current = _content_id(interaction.get('body')), _content_id(_text(body))
+        if recorded and current and recorded != current:
+            # a batch response refers to its parts by the Content-ID prefix of the request
+            content = content.replace(recorded.encode(), current.encode())
+        return resp, content
+
+
+# _____________________________________________________activation_____________________________________________________
+_active: tuple[str, Cassette, float] | None = None
+_active_lock = threading.Lock()
+_configured = False
+
+
+def use(path: Path | str | None, mode: str = 'replay', speed: float = 0.0) -> Cassette | None:
+    '''
+        Record or replay the requests of all the clients from now on, or stop (`path` None).
+
+        Args:
+            path (Path | str | None): The cassette.
+            mode (str, optional): `record` or `replay`. Defaults to `replay`.
+            speed (float, optional): Replay speed, see `ReplayHttp`.
+    '''
+    global _active, _configured
+    if mode not in ('record', 'replay'):
+        raise ValueError("mode must be 'record' or 'replay'.")
+    with _active_lock:
+        _configured = True
+        _active = (mode, Cassette(path), speed) if path else None
+        return _active[1] if _active else None
+
+
+@contextmanager
+def use_cassette(path: Path | str, mode: str = 'replay', speed: float = 0.0) -> Iterator[Cassette]:
+    '''
+        Record or replay the requests sent in the block, see `use()`.
+    '''
+    global _active
+    with _active_lock:
+        previous = _active
+    try:
+        yield use(path, mode, speed)
+    finally:
+        with _active_lock:
+            _active = previous
+
+
+def _current() -> tuple[str, Cassette, float] | None:
+    if not _configured and setting.HTTP_CASSETTE_PATH:
+        use(setting.HTTP_CASSETTE_PATH, setting.HTTP_CASSETTE_MODE, setting.HTTP_CASSETTE_SPEED)
+    return _active
+
+
+def is_active() -> bool:
+    '''
+        Tell whether a cassette records or replays the requests. The cassette of `setting.HTTP_CASSETTE_PATH`
+        is activated on first use.
+    '''
+    return _current() is not None
+
+
+def wrap_http(http):
+    '''
+        Return `http` recording to, or replaced by, the active cassette; `http` itself when there is none.
+        The cassette of `setting.HTTP_CASSETTE_PATH` is activated on first use.
+    '''
+    active = _current()
+    if active is None:
+        return http
+    mode, cassette, speed = active
+    return RecordingHttp(http, cassette) if mode == 'record' else ReplayHttp(cassette, speed)
+
+
+# _____________________________________________________load_replay_____________________________________________________
+def _api_of(uri: str) -> str:
+    path = urlsplit(uri).path
+    if 'gmail' in path:
+        return 'gmail'
+    if 'calendar' in path:
+        return 'calendar'
+    return 'sheets'
+
+
+def load_replay(cassette: Cassette | Path | str, concurrency: int = 8, repeat: int = 1, speed: float = 0.0,
+                rate_limited: bool = False) -> dict:
+    '''
+        Send the requests of a recorded session `repeat` times from `concurrency` threads against their
+        recorded responses, through `RequestExecutor` and the JSON parsing of the discovery client.
+
+        Args:
+            cassette (Cassette | Path | str): The recorded session.
+            concurrency (int, optional): Threads sending requests. Defaults to 8.
+            repeat (int, optional): Times every request is sent. Defaults to 1.
+            speed (float, optional): Replay speed of the recorded latencies, 0 (default) for none: only the
+                client side is measured.
+            rate_limited (bool, optional): Go through the client-side rate limiters and shared quota. Defaults
+                to False.
+
+        Returns:
+            dict: `requests`, `errors`, `wall_s`, `throughput_rps`, `p50_ms`, `p95_ms`, `p99_ms` and
+            `client_ms`, the mean latency minus the replayed one.
+
+        Example:
+        ```
+        print(load_replay('production.jsonl', concurrency=32, repeat=10))
+        ```
+    '''
+    from googleapiclient.http import HttpRequest
+    from googleapiclient.model import JsonModel
+    from red_office_google_integration.src.executor import RequestExecutor
+    from red_office_google_integration.src.retry import RetryPolicy
+
+    if not isinstance(cassette, Cassette):
+        cassette = Cassette(cassette)
+    if not cassette.interactions:
+        raise ValueError(f'{cassette.path} has no recorded requests.')
+    http = ReplayHttp(cassette, speed, cycle=True)
+    executors = {}
+    for api in ('calendar', 'gmail', 'sheets'):
+        # recorded errors are part of the session, not retried
+        executors[api] = RequestExecutor(api, RetryPolicy(max_retries=0), account='load-replay')
+        if not rate_limited:
+            executors[api].limiter = executors[api].quota = None
+    json_model = JsonModel(data_wrapper=False)
+    errors = 0
+    errors_lock = threading.Lock()
+
+    def send(interaction: dict) -> float:
+        nonlocal errors
+        is_json = 'json' in interaction['response_headers'].get('content-type', '')
+        request = HttpRequest(http, json_model.response if is_json else (lambda resp, content: content),
+                              interaction['uri'], method=interaction['method'], body=interaction.get('body'),
+                              headers=dict(interaction['request_headers']))
+        started = time.perf_counter()
+        try:
+            executors[_api_of(interaction['uri'])].execute(request)
+        except Exception:
+            with errors_lock:
+                errors += 1
+        return time.perf_counter() - started
+
+    session = sorted(cassette.interactions, key=lambda interaction: interaction['started']) * repeat
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(send, session))
+    wall = time.perf_counter() - started
+    replayed = statistics.mean(i['duration'] for i in session) / speed if speed > 0 else 0.0
+
+    def percentile(fraction: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 2)
+
+    return {'requests': len(session), 'errors': errors, 'concurrency': concurrency, 'wall_s': round(wall, 3),
+            'throughput_rps': round(len(session) / wall, 1), 'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95), 'p99_ms': percentile(0.99),
+            'client_ms': round((statistics.mean(latencies) - replayed) * 1000, 3)}
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,199 @@
+'''
+    Clients of many Google accounts served from one process.
+
+    Every account has an id (e.g. its email address) and a key; its encrypted credential and token files are in
+    `setting.ACCOUNTS_DIRECTORY_PATH / <id>` (`main.py init-cred --account <id> ...`). `ClientPool` builds the
+    `SpreadSheet`, `Gmail` and `CalendarEvent` clients of an account on first use and keeps them for the
+    following calls, so the credentials are decrypted and the discovery service built once per account.
+
+    - At most `max_size` clients are kept; taking one more drops the least recently used. A dropped client still
+      works for the threads holding it, it is only built again on the next `get()`.
+    - Tokens are refreshed per account: a client taken from the pool whose token expires within
+      `refresh_margin` seconds is refreshed first and the new token saved to the account's directory.
+    - It is safe to use from threads. Threads asking for the same client of a new account wait for one build
+      instead of each decrypting the credentials and building the service.
+
+    Example:
+    ```
+    pool = ClientPool({'alice@example.com': alice_key, 'bob@example.com': bob_key})
+    pool.get(SpreadSheet, 'alice@example.com').get_data(spreadsheetId, 'Sheet1')
+    pool.get(Gmail, 'bob@example.com').get_email_list('is:unread')
+    ```
+'''
+import threading
+from collections import OrderedDict
+from typing import Any, TypeVar
+from red_office_google_integration.google_service.google_credentials_service import secret_directory
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.metrics import account_label
+from red_office_google_integration.src.tracing import span
+
+Client = TypeVar('Client')
+
+
+class ClientPool:
+    '''
+        Lazily built clients of registered accounts with least recently used eviction.
+
+        Args:
+            accounts (dict[str, bytes], optional): Keys of the accounts, by account id.
+            max_size (int, optional): Clients kept at most. Defaults to `setting.CLIENT_POOL_SIZE`.
+            refresh_margin (float, optional): Seconds before its expiry from which a token is refreshed by
+                `get()`. Defaults to `setting.TOKEN_REFRESH_MARGIN`.
+
+        Attributes:
+            hits, misses, evictions (int): Counters of `get()`, see `stats()`.
+    '''
+
+    def __init__(self, accounts: dict[str, bytes] | None = None, max_size: int | None = None,
+                 refresh_margin: float | None = None) -> None:
+        self.max_size = max_size if max_size is not None else setting.CLIENT_POOL_SIZE
+        if self.max_size < 1:
+            raise ValueError('max_size must be at least 1.')
+        self.refresh_margin = refresh_margin if refresh_margin is not None else setting.TOKEN_REFRESH_MARGIN
+        self.hits = self.misses = self.evictions = 0
+        self.__keys: dict[str, bytes] = {}
+        self.__clients: OrderedDict[tuple[type, str], Any] = OrderedDict()
+        # one lock per client being built, so that only one thread builds it
+        self.__building: dict[tuple[type, str], threading.Lock] = {}
+        self.__lock = threading.Lock()
+        for account, key in (accounts or {}).items():
+            self.add_account(account, key)
+
+    def add_account(self, account: str, key: bytes | str) -> None:
+        '''
+            Register an account, or change its key (dropping the clients built with the old one).
+
+            Raises:
+                ValueError: When the account id is not a plain file name.
+        '''
+        secret_directory(account)
+        key = key.encode() if isinstance(key, str) else key
+        with self.__lock:
+            if self.__keys.get(account, key) != key:
+                self.__drop(account)
+            self.__keys[account] = key
+
+    def remove_account(self, account: str) -> None:
+        '''
+            Forget an account and drop its clients.
+        '''
+        with self.__lock:
+            self.__keys.pop(account, None)
+            self.__drop(account)
+
+    def accounts(self) -> list[str]:
+        '''
+            Return the ids of the registered accounts.
+        '''
+        with self.__lock:
+            return list(self.__keys)
+
+    def get(self, cls: type[Client], account: str) -> Client:
+        '''
+            Return the client of `cls` for the account, building it on first use.
+
+            Args:
+                cls (type): `SpreadSheet`, `Gmail` or `CalendarEvent`.
+                account (str): A registered account id.
+
+            Returns:
+                The client, its token refreshed when it was about to expire.
+
+            Raises:
+                KeyError: When the account is not registered.
+        '''
+        slot = (cls, account)
+        client = self.__take(slot)
+        if client is None:
+            with self.__lock:
+                building = self.__building.setdefault(slot, threading.Lock())
+            try:
+                with building:
+                    # another thread may have built it while this one waited
+                    client = self.__take(slot, count=False)
+                    if client is None:
+                        client = self.__build(slot)
+            finally:
+                with self.__lock:
+                    if self.__building.get(slot) is building and not building.locked():
+                        del self.__building[slot]
+        self.__refresh(client)
+        return client
+
+    def refresh(self, account: str, margin: float | None = None) -> int:
+        '''
+            Refresh the tokens of the account's pooled clients expiring within `margin` seconds.
+
+            Args:
+                account (str): The account id.
+                margin (float, optional): Defaults to the `refresh_margin` of the pool.
+
+            Returns:
+                int: Number of tokens refreshed.
+        '''
+        with self.__lock:
+            clients = [client for (_, owner), client in self.__clients.items() if owner == account]
+        return sum(self.__refresh(client, margin) for client in clients)
+
+    def evict(self, account: str | None = None) -> None:
+        '''
+            Drop the clients of the account, or all of them.
+        '''
+        with self.__lock:
+            if account is None:
+                self.__clients.clear()
+            else:
+                self.__drop(account)
+
+    def stats(self) -> dict[str, int]:
+        '''
+            Return the number of accounts and pooled clients, and the hit, miss and eviction counters.
+        '''
+        with self.__lock:
+            return {'accounts': len(self.__keys), 'clients': len(self.__clients), 'max_size': self.max_size,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__clients)
+
+    def __take(self, slot: tuple[type, str], count: bool = True):
+        with self.__lock:
+            client = self.__clients.get(slot)
+            if client is not None:
+                self.__clients.move_to_end(slot)
+                self.hits += count
+            return client
+
+    def __build(self, slot: tuple[type, str]):
+        cls, account = slot
+        with self.__lock:
+            if account not in self.__keys:
+                raise KeyError(f'Unknown account {account!r}, register it with add_account().')
+            key = self.__keys[account]
+            self.misses += 1
+        with span('client.build', client=cls.__name__, account=account_label(account)):
+            client = cls(key, account=account)
+        with self.__lock:
+            # the account may have been removed or given a new key during the build
+            if self.__keys.get(account) == key:
+                self.__clients[slot] = client
+                while len(self.__clients) > self.max_size:
+                    self.__clients.popitem(last=False)
+                    self.evictions += 1
+        return client
+
+    def __drop(self, account: str) -> None:
+        for slot in [slot for slot in self.__clients if slot[1] == account]:
+            del self.__clients[slot]
+
+    def __refresh(self, client, margin: float | None = None) -> bool:
+        service = getattr(client, 'credential_service', None)
+        if service is None:
+            return False
+        return service.refresh(self.refresh_margin if margin is None else margin)
+
+
+if __name__ == '__main__':
+    pass
@@ -23,6 +23,7 @@ import os
 import pathlib
 from typing import Any, Callable
 from red_office_google_integration.src import setting
+from red_office_google_integration.src.tracing import span
 
 
 class FileError(Exception):
@@ -80,14 +81,15 @@ def provide_temp_decrypted_file_path(encrypted_file_path: pathlib.Path, key: byt
             temp_file_path = None
             cipher = Fernet(key)
             try:
-                with open(encrypted_file_path, 'rb') as f:
-                    data = f.read()
-                    decrypted_data = cipher.decrypt(data)
+                with span('credentials.decrypt', file=os.path.basename(encrypted_file_path)):
+                    with open(encrypted_file_path, 'rb') as f:
+                        data = f.read()
+                        decrypted_data = cipher.decrypt(data)
 
-                # Write the decrypted data to the temporary file
-                temp_decrypted_file.write(decrypted_data)
-                temp_decrypted_file.flush()
-                temp_file_path = temp_decrypted_file.name
+                    # Write the decrypted data to the temporary file
+                    temp_decrypted_file.write(decrypted_data)
+                    temp_decrypted_file.flush()
+                    temp_file_path = temp_decrypted_file.name
 
                 # Inject the temporary file path to the decorated function
                 return func(pathlib.Path(temp_file_path), *args, **kwargs)
@@ -172,7 +174,8 @@ class InitializeCredential:
     ```
     """
 
-    def __init__(self, cred_data: str, file_name: str, key: bytes = generate_key()) -> None:
+    def __init__(self, cred_data: str, file_name: str, key: bytes = generate_key(),
+                 directory: pathlib.Path | None = None) -> None:
         """
         Initialize the InitializeCredential class.
 
@@ -180,6 +183,8 @@ class InitializeCredential:
             cred_data (str): The credential data to be encrypted.
             file_name (str): The name of the file to save the encrypted data.
             key (bytes, optional): The encryption key. Defaults to a randomly generated key.
+            directory (pathlib.Path, optional): Directory of the file, created if missing. Defaults to
+                `setting.SECRET_DIRECTORY_PATH`.
 
         Attributes:
             encrypted_data (bytes): The encrypted credential data.
@@ -188,7 +193,7 @@ class InitializeCredential:
         self.__key = key
         self.__cred_data = cred_data
         self.encrypted_data: bytes
-        self.__file_path = setting.SECRET_DIRECTORY_PATH / file_name
+        self.__file_path = (directory if directory is not None else setting.SECRET_DIRECTORY_PATH) / file_name
         self.status = 'pending'
 
     def initialize(self):
@@ -196,6 +201,7 @@ class InitializeCredential:
         Encrypts the credential data, saves it to the specified file, and updates the `encrypted_data`
         attribute with the encrypted data. It also sets the `status` attribute to 'success'.
         """
+        self.__file_path.parent.mkdir(parents=True, exist_ok=True)
         encrypt_and_save_file(self.__file_path, self.__cred_data, self.__key)
 
         def get_raw_data(file_path: pathlib.Path) -> bytes:
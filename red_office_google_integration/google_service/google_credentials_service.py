@@ -1,4 +1,7 @@
+import datetime
 import pathlib
+import re
+import threading
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -6,8 +9,32 @@ from red_office_google_integration.google_service.file_handler import (provide_t
                                                                        encrypt_and_save_file, FileError)
 from red_office_google_integration.src import setting
 from red_office_google_integration.src import utils
+from red_office_google_integration.src.tracing import span
 from typing import Any
 
+_ACCOUNT_ID = re.compile(r'[A-Za-z0-9@._+-]+')
+
+
+def secret_directory(account: str | None = None) -> pathlib.Path:
+    '''
+        Return the directory holding the encrypted credential and token files of an account.
+
+        Args:
+            account (str, optional): Account id of a multi-account setup, e.g. its email address. None: the
+                single account of `setting.SECRET_DIRECTORY_PATH`.
+
+        Returns:
+            pathlib.Path: `setting.ACCOUNTS_DIRECTORY_PATH / account`, or `setting.SECRET_DIRECTORY_PATH`.
+
+        Raises:
+            ValueError: When the account id is not a plain file name.
+    '''
+    if account is None:
+        return setting.SECRET_DIRECTORY_PATH
+    if not _ACCOUNT_ID.fullmatch(account) or account.strip('.') == '':
+        raise ValueError(f'Invalid account id {account!r}: letters, digits and "@._+-" only.')
+    return setting.ACCOUNTS_DIRECTORY_PATH / account
+
 
 class GoogleCredentialService:
     '''
@@ -18,12 +45,15 @@ class GoogleCredentialService:
             scope (list[str]): The Google API scope.
             token_file_name (str): The name of the file containing the token.
             credential_file_name (str): The name of the file containing the credentials.
+            directory (pathlib.Path, optional): Directory of the two files, `secret_directory()` of the account.
+                Defaults to `setting.SECRET_DIRECTORY_PATH`.
 
         Methods:
             get_service(): Retrieves the Google Calendar service.
             load_credentials(): Loads the Google Calendar API credentials.
             refresh_or_acquire_new_token(): Refreshes or acquires a new Google Calendar API token.
             save_token(): Saves the Google Calendar API token.
+            refresh(): Refreshes the loaded credentials ahead of their expiry.
 
         Example:
         ```
@@ -38,7 +68,8 @@ class GoogleCredentialService:
             - Optimize the code.
     '''
 
-    def __init__(self, key: bytes, scope: list[str], token_file_name: str, credential_file_name: str) -> None:
+    def __init__(self, key: bytes, scope: list[str], token_file_name: str, credential_file_name: str,
+                 directory: pathlib.Path | None = None) -> None:
         """
             Initializes a new instance of the GoogleCalendarService class.
 
@@ -47,14 +78,19 @@ class GoogleCredentialService:
                 scope (list[str]): The Google API scope.
                 token_file_name (str): The name of the file containing the token.
                 credential_file_name (str): The name of the file containing the credentials.
+                directory (pathlib.Path, optional): Directory of the two files.
 
             Returns:
                 None
         """
+        directory = directory if directory is not None else setting.SECRET_DIRECTORY_PATH
         self.key = key
         self.scope = scope
-        self.token_file_path = setting.SECRET_DIRECTORY_PATH / token_file_name
-        self.credential_file_path = setting.SECRET_DIRECTORY_PATH / credential_file_name
+        self.token_file_path = directory / token_file_name
+        self.credential_file_path = directory / credential_file_name
+        # the credentials returned by load_credentials(), refreshed in place by refresh()
+        self.credentials: Credentials | None = None
+        self.__refresh_lock = threading.Lock()
 
     @utils.handle_exception
     def get_service(self) -> Credentials:
@@ -85,7 +121,9 @@ class GoogleCredentialService:
             if not creds or not creds.valid:
                 creds = self.refresh_or_acquire_new_token(creds)
             return creds
-        return inner_func()
+        with span('credentials.load', token=self.token_file_path.name):
+            self.credentials = inner_func()
+            return self.credentials
 
     @utils.handle_exception
     def refresh_or_acquire_new_token(self, creds):
@@ -94,12 +132,16 @@ class GoogleCredentialService:
             if type(file_path) == FileError:
                 raise FileError(f"{file_path}")
             if inner_creds and inner_creds.expired and inner_creds.refresh_token:
-                inner_creds.refresh(Request())
+                with span('credentials.refresh'):
+                    inner_creds.refresh(Request())
+                self.save_token(inner_creds.to_json())
 
             else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    file_path, self.scope)
-                inner_creds = flow.run_local_server(port=0)
+                # waits for the user to give consent in the browser
+                with span('credentials.authorize'):
+                    flow = InstalledAppFlow.from_client_secrets_file(
+                        file_path, self.scope)
+                    inner_creds = flow.run_local_server(port=0)
                 self.save_token(inner_creds.to_json())
             return inner_creds
 
@@ -109,6 +151,40 @@ class GoogleCredentialService:
     def save_token(self, creds):
         encrypt_and_save_file(self.token_file_path, creds, self.key)
 
+    def expires_within(self, seconds: float) -> bool:
+        '''
+            Return whether the loaded credentials expire within `seconds` and can be refreshed.
+        '''
+        creds = self.credentials
+        if creds is None or creds.expiry is None or not creds.refresh_token:
+            return False
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return creds.expiry - datetime.timedelta(seconds=seconds) <= now
+
+    @utils.handle_exception
+    def refresh(self, margin: float = 0) -> bool:
+        '''
+            Refresh the loaded credentials when they expire within `margin` seconds, and save the new token.
+
+            The clients share the credentials object, so they send the new access token from then on. Threads
+            refreshing at the same time refresh once: the others wait and find the token fresh.
+
+            Args:
+                margin (float, optional): Seconds before the expiry from which the token is refreshed.
+
+            Returns:
+                bool: Whether the token was refreshed.
+        '''
+        if not self.expires_within(margin):
+            return False
+        with self.__refresh_lock:
+            if not self.expires_within(margin):
+                return False
+            with span('credentials.refresh', token=self.token_file_path.name):
+                self.credentials.refresh(Request())
+            self.save_token(self.credentials.to_json())
+            return True
+
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,98 @@
+'''
+    HTTP transport helpers shared by the Google API classes.
+
+    `httplib2.Http` objects are not thread-safe, so a service object built by `discovery.build` must not
+    execute requests from several threads at once. `ThreadLocalHttp` hands every thread its own authorized
+    connection built from the same credentials; pass it to `request.execute(http=...)` when a request runs
+    on a worker thread.
+
+    Example:
+    ```
+    http = ThreadLocalHttp(credentials)
+    request = service.events().list(calendarId='primary')
+    request.execute(http=http.get())
+    ```
+
+    `build_service()` builds the discovery services of the API classes. When `setting.API_ENDPOINT` is set
+    (`RED_OFFICE_API_ENDPOINT`), their requests go to that server instead of Google, e.g. the fake API of
+    `benchmarks/fake_google_api.py`.
+'''
+import json
+import threading
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import build_http
+from red_office_google_integration.google_service.cassette import wrap_http
+from red_office_google_integration.src import setting
+
+
+class ThreadLocalHttp:
+    '''
+        Per-thread authorized HTTP connections sharing one set of credentials.
+
+        Args:
+            credentials: The Google credentials used to authorize the requests.
+    '''
+
+    def __init__(self, credentials) -> None:
+        self.credentials = credentials
+        self.__local = threading.local()
+
+    def get(self) -> AuthorizedHttp:
+        '''
+            Return the authorized HTTP connection of the calling thread, creating it on first use. While a
+            cassette is active it records the exchanges, or replaces the connection, see `cassette.py`.
+
+            Returns:
+                AuthorizedHttp: The connection.
+        '''
+        http = getattr(self.__local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=build_http())
+            self.__local.http = http
+        return wrap_http(http)
+
+    def session(self):
+        '''
+            Return the authorized `requests` session of the calling thread, creating it on first use. Streamed
+            responses (`RequestExecutor.stream()`) are read from it, as httplib2 reads whole bodies. Cassettes
+            do not see its requests, so `stream()` does not use it while one is active.
+
+            Returns:
+                AuthorizedSession: The session.
+        '''
+        session = getattr(self.__local, 'session', None)
+        if session is None:
+            from google.auth.transport.requests import AuthorizedSession  # imports requests, only when streaming
+
+            session = AuthorizedSession(self.credentials)
+            self.__local.session = session
+        return session
+
+
+def build_service(serviceName: str, version: str, **kwargs):
+    '''
+        Build a discovery service, sending its requests to `setting.API_ENDPOINT` when it is set.
+
+        Args:
+            serviceName (str): The API name, e.g. `calendar`.
+            version (str): The API version, e.g. `v3`.
+            kwargs: Passed to `discovery.build()`, e.g. `credentials`.
+
+        Example:
+        ```
+        service = build_service('calendar', 'v3', credentials=cred)
+        ```
+    '''
+    if not setting.API_ENDPOINT:
+        return build(serviceName, version, **kwargs)
+    # the root URL of the discovery document is replaced, so the batch requests go to the endpoint too
+    document = json.loads(get_static_doc(serviceName, version))
+    document['rootUrl'] = setting.API_ENDPOINT.rstrip('/') + '/'
+    kwargs.pop('static_discovery', None)
+    return build_from_document(document, **kwargs)
+
+
+if __name__ == '__main__':
+    pass
@@ -1,9 +1,24 @@
-
 """
 Module for handling logging functionality.
 
-This module sets up logging configuration using a custom JSONLinesFormatter and a RotatingFileHandler.
-It provides a structured way to log messages with timestamps, log levels, messages, module names, and line numbers.
+Records are written as JSON lines with timestamps, log levels, messages, module names and line numbers.
+A message may also be a dict of structured fields, which are written as top-level fields of the line:
+
+```
+    logger.debug({'event': 'api_request', 'operation': 'calendar.events.get', 'status': 200, 'latency_ms': 85.2})
+```
+
+Logging never blocks the caller: the `QueueHandler` of the logger only samples the record and puts it on a
+bounded queue, and a `QueueListener` thread encodes and writes it. When the queue is full, because the disk
+cannot keep up, records are dropped rather than slowing down API calls, and the number dropped is logged later.
+
+- Sampling: `setting.LOG_SAMPLE_RATES` keeps a fraction of the DEBUG and INFO records; WARNING and above
+  are always kept.
+- Truncation: strings longer than `setting.LOG_MAX_FIELD_LENGTH` (e.g. a whole event body) are cut.
+- Rotation: the file rotates when it reaches `setting.LOG_MAX_BYTES` or is older than
+  `setting.LOG_ROTATE_INTERVAL` seconds, keeping `setting.LOG_BACKUP_COUNT` files.
+- Location: `log.jsonl` in `setting.LOG_DIRECTORY_PATH`, the package's `log/` unless `RED_OFFICE_LOG_DIR` is set.
+- Encoding uses `orjson` when it is installed (`pip install orjson`), the standard `json` module otherwise.
 
 Example Usage:
 ```
@@ -14,15 +29,56 @@ Example Usage:
     logger.info("Info message")
 ```
 """
+import atexit
+import copy
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import json
 from red_office_google_integration.src import setting
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 
 LOG_FILE = setting.LOG_DIRECTORY_PATH / 'log.jsonl'
 
 
+def _dumps(value) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str).decode()
+        except TypeError:  # e.g. integers beyond 64 bits
+            pass
+    return json.dumps(value, default=str, separators=(',', ':'))
+
+
+def truncate(value, limit: int | None = None):
+    '''
+        Cut the strings of a log field longer than `limit` characters, in nested dicts and lists too.
+
+        Args:
+            value: The field value.
+            limit (int, optional): Maximum length. Defaults to `setting.LOG_MAX_FIELD_LENGTH`.
+    '''
+    limit = setting.LOG_MAX_FIELD_LENGTH if limit is None else limit
+    if isinstance(value, str):
+        if len(value) > limit:
+            return f'{value[:limit]}...[{len(value) - limit} more characters]'
+        return value
+    if isinstance(value, dict):
+        return {k: truncate(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(v, limit) for v in value]
+    return value
+
+
 class JSONLinesFormatter(logging.Formatter):
     """
     A custom formatter for logging that formats records as JSON lines.
@@ -45,11 +101,118 @@ class JSONLinesFormatter(logging.Formatter):
         message = {
             'timestamp': self.formatTime(record),
             'level': record.levelname,
-            'message': record.getMessage(),
             'module': record.module,
             'line': record.lineno
         }
-        return json.dumps(message)
+        if isinstance(record.msg, dict):
+            message.update(truncate(record.msg))
+        else:
+            message['message'] = truncate(record.getMessage())
+        if record.exc_info:
+            message['exception'] = truncate(self.formatException(record.exc_info))
+        return _dumps(message)
+
+
+class SamplingFilter(logging.Filter):
+    '''
+        Keep a fraction of the records of some levels.
+
+        Args:
+            rates (dict): Level name to the fraction of records kept, e.g. `{'DEBUG': 0.1}`. Levels not listed,
+                and WARNING and above, are always kept.
+    '''
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = {logging.getLevelName(level): rate for level, rate in rates.items()}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    '''
+        Queue handler that drops records instead of waiting when the queue is full.
+    '''
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.__lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        '''
+            Copy the record for the listener thread, leaving the encoding to it.
+        '''
+        record = copy.copy(record)
+        if not isinstance(record.msg, dict):
+            # the arguments may change once the call returns
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.__lock:
+                self.dropped += 1
+
+    def take_dropped(self) -> int:
+        '''
+            Return the number of records dropped since the last call.
+        '''
+        with self.__lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    '''
+        Rotating file handler rotating when the file reaches `maxBytes` or is older than `interval` seconds.
+    '''
+
+    def __init__(self, filename, maxBytes: int = 0, backupCount: int = 0, interval: float = 0,
+                 delay: bool = False) -> None:
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, delay=delay)
+        self.interval = interval
+        self.rollover_at = self.__next_rollover(os.path.getmtime(filename) if os.path.exists(filename)
+                                                else time.time())
+
+    def __next_rollover(self, start: float) -> float:
+        return start + self.interval if self.interval > 0 else float('inf')
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at and os.path.exists(self.baseFilename) \
+                and os.path.getsize(self.baseFilename) > 0:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = self.__next_rollover(time.time())
+
+
+class _DroppedRecords(logging.Filter):
+    '''
+        Report on the listener thread how many records the queue handler dropped.
+    '''
+
+    def __init__(self, handler: NonBlockingQueueHandler, target: logging.Handler) -> None:
+        super().__init__()
+        self.handler = handler
+        self.target = target
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        dropped = self.handler.take_dropped()
+        if dropped:
+            notice = logging.LogRecord(logger.name, logging.WARNING, __file__, 0,
+                                       {'event': 'log_records_dropped', 'count': dropped}, None, None)
+            self.target.handle(notice)
+        return True
 
 
 # Configure logging
@@ -57,17 +220,28 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
-# Create a RotatingFileHandler with max size 1 MB
-file_handler = RotatingFileHandler(
-    LOG_FILE, maxBytes=1*1024*1024, backupCount=10)
+# Rotate by size and age; delay: the file is opened by the first record, not when the module is imported
+file_handler = SizeAndTimeRotatingFileHandler(
+    LOG_FILE, maxBytes=setting.LOG_MAX_BYTES, backupCount=setting.LOG_BACKUP_COUNT,
+    interval=setting.LOG_ROTATE_INTERVAL, delay=True)
 file_handler.setLevel(logging.DEBUG)
 
 # Set the formatter
 formatter = JSONLinesFormatter()
 file_handler.setFormatter(formatter)
 
-# Add the file handler to the logger
-logger.addHandler(file_handler)
+# The logger only queues the records, the listener thread formats and writes them
+log_queue: queue.Queue = queue.Queue(maxsize=setting.LOG_QUEUE_SIZE)
+queue_handler = NonBlockingQueueHandler(log_queue)
+queue_handler.addFilter(SamplingFilter(setting.LOG_SAMPLE_RATES))
+file_handler.addFilter(_DroppedRecords(queue_handler, file_handler))
+listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+listener.start()
+# write the queued records before the interpreter exits
+atexit.register(listener.stop)
+
+# Add the queue handler to the logger
+logger.addHandler(queue_handler)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,127 @@
+'''
+    Asyncio counterpart of `SpreadSheet`.
+
+    `AsyncSpreadSheet` has the same methods and parameters as `SpreadSheet`, but they are coroutines
+    sent through an `AsyncTransport`, so a web service can run many of them on one event loop.
+
+    Example:
+    ```
+    async with AsyncSpreadSheet(key) as sheet:
+        results = await asyncio.gather(*(sheet.get_data(spreadsheetId, name) for name in sheet_names))
+    ```
+'''
+from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService  # noqa: E203,E402
+from red_office_google_integration.google_service.async_transport import AsyncTransport, build_request_service
+from red_office_google_integration.src.metrics import account_label
+from red_office_google_integration.spreadsheets.sheets import valueOption
+from red_office_google_integration.src.singleflight import single_flight
+from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.fields import Fields, with_fields, SHEETS_BATCH_GET_PAGE_FIELDS
+
+
+class AsyncSpreadSheet:
+    """
+    Asyncio client for reading, updating and appending Google Sheets data.
+
+    Credentials are loaded when the object is created, as for `SpreadSheet`; create it once and share it.
+    Close it with `await sheet.aclose()` or use it as an async context manager.
+
+    Methods:
+    - get_data(spreadsheetId, range, fields, **kwargs)
+    - get_batch_data(spreadsheetId, ranges, fields, **kwargs)
+    - update_values(spreadsheetId, range, valueInputOption, values, **kwargs)
+    - batch_update_values(spreadsheet_id, valueInputOption, data, **kwargs)
+    - append_data(spreadsheetId, range, valueInputOption, values, **kwargs)
+    """
+
+    def __init__(self, key: bytes, max_concurrency: int = setting.ASYNC_MAX_CONCURRENCY_SPREADSHEETS,
+                 client=None) -> None:
+        '''
+        Initialize the AsyncSpreadSheet class.
+
+        Args:
+            key (bytes): The key used for authentication.
+            max_concurrency (int, optional): Requests in flight at the same time.
+            client (httpx.AsyncClient, optional): HTTP client shared with other async clients.
+        '''
+        self.__key = key
+        self.__service = self.__build_service(max_concurrency, client)
+
+    @handle_exception
+    def __build_service(self, max_concurrency: int, client):
+        '''
+        Load the credentials, create the transport and return the service used to build requests.
+        '''
+        cred = GoogleCredentialService(self.__key, setting.SCOPE_SPREADSHEETS,
+                                       setting.FILE_NAME_SPREADSHEETS_TOKEN, setting.FILE_NAME_SPREADSHEETS_CREDENTIAL).get_service()
+        self.__transport = AsyncTransport(cred, max_concurrency, client=client, api='sheets',
+                                          account=account_label(self.__key))
+        return build_request_service("sheets", "v4")
+
+    @handle_exception
+    @single_flight()
+    async def get_data(self, spreadsheetId: str, range: str, fields: Fields = None, **kwargs) -> dict:
+        """
+        Retrieves data from a specified range in a Google Sheets spreadsheet, see `SpreadSheet.get_data()`.
+        """
+        kwargs = with_fields(kwargs, fields)
+        return await self.__transport.execute(self.__service.spreadsheets().values().get(
+            spreadsheetId=spreadsheetId, range=range, **kwargs))
+
+    @handle_exception
+    @single_flight()
+    async def get_batch_data(self, spreadsheetId: str, ranges: list[str], fields: Fields = None, **kwargs) -> dict:
+        """
+        Retrieves data from multiple ranges in a Google Sheets spreadsheet, see `SpreadSheet.get_batch_data()`.
+        """
+        kwargs = with_fields(kwargs, fields, 'valueRanges',
+                             SHEETS_BATCH_GET_PAGE_FIELDS)
+        return await self.__transport.execute(self.__service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheetId, ranges=ranges, **kwargs))
+
+    @handle_exception
+    async def update_values(self, spreadsheetId, range: str, valueInputOption: valueOption, values: list[list],
+                            **kwargs) -> dict:
+        """
+        Updates values in a Google Sheet within the specified range, see `SpreadSheet.update_values()`.
+        """
+        body = {'values': values}
+        return await self.__transport.execute(self.__service.spreadsheets().values().update(
+            spreadsheetId=spreadsheetId, range=range, valueInputOption=valueInputOption, body=body, **kwargs))
+
+    @handle_exception
+    async def batch_update_values(self, spreadsheet_id: str, valueInputOption: valueOption, data: list[dict],
+                                  **kwargs) -> dict:
+        """
+        Updates multiple ranges in a single API call, see `SpreadSheet.batch_update_values()`.
+        """
+        body = {"data": data, 'valueInputOption': valueInputOption}
+        return await self.__transport.execute(self.__service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id, body=body, **kwargs))
+
+    @handle_exception
+    async def append_data(self, spreadsheetId: str, range: str, valueInputOption: valueOption, values: list[list],
+                          **kwargs) -> dict:
+        """
+        Appends values to a Google Sheet starting from the specified range, see `SpreadSheet.append_data()`.
+        """
+        body = {'values': values}
+        return await self.__transport.execute(self.__service.spreadsheets().values().append(
+            spreadsheetId=spreadsheetId, range=range, valueInputOption=valueInputOption, body=body, **kwargs))
+
+    async def aclose(self) -> None:
+        '''
+        Close the HTTP connections.
+        '''
+        await self.__transport.aclose()
+
+    async def __aenter__(self) -> 'AsyncSpreadSheet':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+if __name__ == '__main__':
+    pass
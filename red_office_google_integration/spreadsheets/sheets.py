@@ -1,10 +1,15 @@
 
-from typing import Any, Literal
-from googleapiclient.discovery import build
-from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService  # noqa: E203,E402
+from typing import Any, Iterator, Literal
+from red_office_google_integration.google_service.google_credentials_service import GoogleCredentialService, secret_directory  # noqa: E203,E402
+from red_office_google_integration.src.singleflight import single_flight
 from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src.executor import RequestExecutor
+from red_office_google_integration.src.metrics import account_label
+from red_office_google_integration.src.tracing import span
+from red_office_google_integration.google_service.transport import ThreadLocalHttp, build_service
 from red_office_google_integration.log.log_handler import logger
 from red_office_google_integration.src import setting
+from red_office_google_integration.src.fields import Fields, with_fields, SHEETS_BATCH_GET_PAGE_FIELDS
 import json
 
 valueOption = Literal['RAW', 'USER_ENTERED']
@@ -27,14 +32,18 @@ class SpreadSheet:
     - append_data(self, spreadsheetId: str, range: str, valueInputOption: str, values: list[list], **kwargs) -> dict: Appends values to a Google Sheet starting from the specified range.
     """
 
-    def __init__(self, key: bytes) -> None:
+    def __init__(self, key: bytes, account: str | None = None) -> None:
         '''
         Initialize the CalendarEvent class.
 
         Args:
             key (bytes): The key used for authentication.
+            account (str, optional): Account id of a multi-account setup: the credential and token files are
+                read from `setting.ACCOUNTS_DIRECTORY_PATH / account` and the metrics labelled with its hash.
         '''
         self.__key = key
+        self.account = account
+        self.__executor = RequestExecutor('sheets', account=account_label(account if account is not None else key))
         self.__service = self.__build_service()
 
     @handle_exception
@@ -45,18 +54,24 @@ class SpreadSheet:
         Returns:
             (cred): The Google service.
         '''
-        cred = GoogleCredentialService(self.__key, setting.SCOPE_SPREADSHEETS,
-                                       setting.FILE_NAME_SPREADSHEETS_TOKEN, setting.FILE_NAME_SPREADSHEETS_CREDENTIAL).get_service()
-        return build("sheets", "v4",  credentials=cred)
+        self.credential_service = GoogleCredentialService(self.__key, setting.SCOPE_SPREADSHEETS,
+                                                          setting.FILE_NAME_SPREADSHEETS_TOKEN, setting.FILE_NAME_SPREADSHEETS_CREDENTIAL,
+                                                          secret_directory(self.account))
+        cred = self.credential_service.get_service()
+        self.__executor.http = ThreadLocalHttp(cred)
+        with span('service.build', api='sheets'):
+            return build_service("sheets", "v4",  credentials=cred)
 
     @handle_exception
-    def get_data(self, spreadsheetId: str, range: str, **kwargs):
+    @single_flight()
+    def get_data(self, spreadsheetId: str, range: str, fields: Fields = None, **kwargs):
         """
         Retrieves data from a specified range in a Google Sheets spreadsheet.
 
         Parameters:
         - spreadsheetId (str): The ID of the spreadsheet to retrieve data from.
         - range (str): The A1 notation or R1C1 notation of the range to retrieve values from. just giving sheet name will return all the data from sheet
+        - fields (list[str], optional): Fields of the response to return (e.g. `['values']`). A string is sent as a raw field mask.
         - kwargs: Additional query parameters.
 
         Query Parameters:
@@ -78,17 +93,38 @@ class SpreadSheet:
         Raises:
         - Exception: If there is an error while retrieving the data.
     """
-        return self.__service.spreadsheets().values().get(spreadsheetId=spreadsheetId,
-                                                          range=range, **kwargs).execute()
+        kwargs = with_fields(kwargs, fields)
+        return self.__executor.execute(self.__service.spreadsheets().values().get(spreadsheetId=spreadsheetId,
+                                                                                  range=range, **kwargs))
 
     @handle_exception
-    def get_batch_data(self, spreadsheetId: str, ranges: list[str], **kwargs) -> dict:
+    def iter_rows(self, spreadsheetId: str, range: str, **kwargs) -> Iterator[list]:
+        """
+        Yields the rows of a range one at a time as they are decoded from the response, without holding the
+        whole range in memory.
+
+        Parameters:
+        - spreadsheetId (str): The ID of the spreadsheet to retrieve data from.
+        - range (str): The A1 notation or R1C1 notation of the range to retrieve values from.
+        - kwargs: Additional query parameters, see `get_data`.
+
+        Yields:
+        - list: The values of a row (of a column with majorDimension='COLUMNS').
+        """
+        yield from self.__executor.stream(self.__service.spreadsheets().values().get(
+            spreadsheetId=spreadsheetId, range=range, **kwargs), 'values')
+
+    @handle_exception
+    @single_flight()
+    def get_batch_data(self, spreadsheetId: str, ranges: list[str], fields: Fields = None, **kwargs) -> dict:
         """
         Retrieves data from multiple specified ranges in a Google Sheets spreadsheet.
 
         Parameters:
         - spreadsheetId (str): The ID of the spreadsheet to retrieve data from.
         - ranges (list[str]): A list of A1 notation or R1C1 notation of the ranges to retrieve values from.
+        - fields (list[str], optional): Fields of each value range to return (e.g. `['range', 'values']`).
+        `spreadsheetId` is always kept. A string is sent as a raw field mask.
         - kwargs: Additional query parameters.
 
         Query Parameters:
@@ -108,7 +144,9 @@ class SpreadSheet:
         - dict: A dictionary containing the retrieved values for each range specified.
 
     """
-        return self.__service.spreadsheets().values().batchGet(spreadsheetId=spreadsheetId, ranges=ranges, **kwargs).execute()
+        kwargs = with_fields(kwargs, fields, 'valueRanges',
+                             SHEETS_BATCH_GET_PAGE_FIELDS)
+        return self.__executor.execute(self.__service.spreadsheets().values().batchGet(spreadsheetId=spreadsheetId, ranges=ranges, **kwargs))
 
     @handle_exception
     def update_values(self, spreadsheetId, range: str, valueInputOption: valueOption, values: list[list], **kwargs):
@@ -141,7 +179,7 @@ class SpreadSheet:
         body = {
             'values': values
         }
-        return self.__service.spreadsheets().values().update(spreadsheetId=spreadsheetId, range=range, valueInputOption=valueInputOption, body=body, **kwargs).execute()
+        return self.__executor.execute(self.__service.spreadsheets().values().update(spreadsheetId=spreadsheetId, range=range, valueInputOption=valueInputOption, body=body, **kwargs))
 
     @handle_exception
     def batch_update_values(self, spreadsheet_id: str, valueInputOption: valueOption, data: list[dict], **kwargs) -> dict:
@@ -175,8 +213,8 @@ class SpreadSheet:
 
         body = {"data": data, 'valueInputOption': valueInputOption}
 
-        res = self.__service.spreadsheets().values().batchUpdate(
-            spreadsheetId=spreadsheet_id, body=body, **kwargs).execute()
+        res = self.__executor.execute(self.__service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id, body=body, **kwargs))
         return res
 
     @handle_exception
@@ -208,8 +246,8 @@ class SpreadSheet:
             ```
         """
         body = {'values': values}
-        res = self.__service.spreadsheets().values().append(
-            spreadsheetId=spreadsheetId, range=range, valueInputOption=valueInputOption, body=body, **kwargs).execute()
+        res = self.__executor.execute(self.__service.spreadsheets().values().append(
+            spreadsheetId=spreadsheetId, range=range, valueInputOption=valueInputOption, body=body, **kwargs))
         return res
 
 
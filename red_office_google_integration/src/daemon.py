@@ -0,0 +1,380 @@
+'''
+    Local daemon running CLI commands with warm clients.
+
+    Every CLI call pays for starting Python, importing the Google client libraries, decrypting the credentials
+    and building the discovery service before sending its first request. `py main.py daemon start` starts a
+    long-running process listening on a Unix socket (`setting.DAEMON_SOCKET_PATH`). While it runs, `main.py`
+    sends its arguments and working directory to the daemon, which runs the command with the clients it already
+    built, streams back the output and returns the exit status. When no daemon answers, the command runs
+    in-process as before.
+
+    Commands run one at a time in the daemon, in the working directory of the caller, so relative payload and
+    output paths work as usual. The settings read from `RED_OFFICE_*` environment variables (API endpoint,
+    cassette, quota database, trace file, ...) are read once by the daemon, so a command whose variables differ
+    from those of the daemon runs in-process. Set `RED_OFFICE_NO_DAEMON=1` to always run in-process.
+
+    Requests carry credential keys: the socket is created in a directory of the user running the daemon that
+    nobody else may write to, with mode 0600, and both ends check that the other runs as the same user before
+    anything is sent.
+
+    Protocol: the client sends one JSON line, `{"action": "run", "argv": [...], "cwd": "...", "env": {...}}`,
+    `{"action": "status"}`, `{"action": "metrics"}` or `{"action": "stop"}`. The daemon answers with JSON lines,
+    `{"stdout": "..."}` and `{"stderr": "..."}` while the command runs, then `{"exit_code": 0}` (or
+    `{"status": {...}}`), or `{"in_process": "<reason>"}` when the command must run in the client.
+'''
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, TextIO
+from red_office_google_integration.src import setting
+from red_office_google_integration.log.log_handler import logger
+
+
+# variables that only concern the client, not how the command runs
+_CLIENT_VARIABLES = frozenset({'RED_OFFICE_NO_DAEMON', 'RED_OFFICE_DAEMON_SOCKET'})
+_current_uid = getattr(os, 'getuid', lambda: 0)
+
+
+class DaemonError(Exception):
+    '''
+        The daemon could not be started, e.g. because another one is listening on the socket.
+    '''
+
+
+def settings_environment() -> dict[str, str]:
+    '''
+        Return the `RED_OFFICE_*` environment variables the settings are read from.
+    '''
+    return {name: value for name, value in os.environ.items()
+            if name.startswith('RED_OFFICE_') and name not in _CLIENT_VARIABLES}
+
+
+def peer_uid(sock: socket.socket) -> int | None:
+    '''
+        Return the user id of the process at the other end of a Unix socket, None when the platform cannot tell.
+    '''
+    if hasattr(socket, 'SO_PEERCRED'):
+        _, uid, _ = struct.unpack('3i', sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i')))
+        return uid
+    if hasattr(os, 'getpeereid'):
+        return os.getpeereid(sock.fileno())[1]  # pragma: no cover
+    return None
+
+
+def _same_user(sock: socket.socket, socket_path: Path) -> bool:
+    uid = peer_uid(sock)
+    if uid is None:
+        # no peer credentials: the owner of the socket file is the user who created it
+        uid = os.stat(socket_path).st_uid
+    return uid == _current_uid()
+
+
+def _private_directory(directory: Path) -> None:
+    '''
+        Create the directory of the socket accessible to the current user only, or check that an existing one
+        belongs to the user and nobody else may write to it.
+
+        Raises:
+            DaemonError: When another user could replace the socket.
+    '''
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = directory.stat()
+    if info.st_uid != _current_uid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise DaemonError(f'{directory} must belong to the current user and not be writable by others.')
+
+
+def _connect(socket_path: Path, timeout: float) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _send(sock: socket.socket, message: dict) -> None:
+    sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+
+def _request(message: dict, socket_path: Path | None = None):
+    '''
+        Connect to the daemon and send a message. Returns the socket and the reader of the answer,
+        or None when no daemon is listening.
+    '''
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    socket_path = Path(socket_path or setting.DAEMON_SOCKET_PATH)
+    try:
+        sock = _connect(socket_path, setting.DAEMON_CONNECT_TIMEOUT)
+    except OSError:
+        return None
+    try:
+        if not _same_user(sock, socket_path):
+            # another user bound the socket first, do not send it the command and its keys
+            logger.warning(f'Ignoring {socket_path}: it is not served by the current user.')
+            sock.close()
+            return None
+        _send(sock, message)
+    except OSError:
+        sock.close()
+        return None
+    # the command may run for long, only connecting is bounded
+    sock.settimeout(None)
+    return sock, sock.makefile('r', encoding='utf-8')
+
+
+def forward_to_daemon(argv: list[str], socket_path: Path | None = None, stdout: TextIO | None = None,
+                      stderr: TextIO | None = None) -> int | None:
+    '''
+        Run a CLI command in the daemon if one is running.
+
+        Args:
+            argv (list[str]): The command line arguments, without the program name.
+            socket_path (Path, optional): The socket of the daemon. Defaults to `setting.DAEMON_SOCKET_PATH`.
+            stdout (TextIO, optional): Where to write the output of the command. Defaults to `sys.stdout`.
+            stderr (TextIO, optional): Where to write the errors of the command. Defaults to `sys.stderr`.
+
+        Returns:
+            int | None: The exit status of the command, or None when it was not run because no daemon of the
+            current user is running, `RED_OFFICE_NO_DAEMON` is set, the command reads the standard input (`-`),
+            it manages the daemon itself, or the `RED_OFFICE_*` settings differ from those of the daemon.
+
+        Example:
+        ```
+        exit_code = forward_to_daemon(sys.argv[1:])
+        if exit_code is not None:
+            sys.exit(exit_code)
+        ```
+    '''
+    # the daemon cannot read the standard input of the client, commands reading `-` run in-process
+    if os.environ.get('RED_OFFICE_NO_DAEMON') or (argv and argv[0] == 'daemon') or '-' in argv:
+        return None
+    connection = _request({'action': 'run', 'argv': list(argv), 'cwd': os.getcwd(), 'env': settings_environment()},
+                          socket_path)
+    if connection is None:
+        return None
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    sock, reader = connection
+    with sock, reader:
+        try:
+            for line in reader:
+                frame = json.loads(line)
+                if 'exit_code' in frame:
+                    return frame['exit_code']
+                if 'in_process' in frame:
+                    return None
+                if 'stdout' in frame:
+                    stdout.write(frame['stdout'])
+                    stdout.flush()
+                if 'stderr' in frame:
+                    stderr.write(frame['stderr'])
+                    stderr.flush()
+        except (OSError, ValueError) as e:
+            stderr.write(f'Lost the connection to the daemon: {e}\n')
+            return 1
+    stderr.write('The daemon closed the connection before the command finished.\n')
+    return 1
+
+
+def daemon_request(action: str, socket_path: Path | None = None) -> dict | None:
+    '''
+        Send `status`, `metrics` or `stop` to the daemon.
+
+        Returns:
+            dict | None: The answer of the daemon, or None when no daemon is running.
+    '''
+    connection = _request({'action': action}, socket_path)
+    if connection is None:
+        return None
+    sock, reader = connection
+    with sock, reader:
+        try:
+            line = reader.readline()
+        except OSError:
+            return None
+    return json.loads(line) if line else None
+
+
+class _FrameWriter(io.TextIOBase):
+    '''
+        Text stream sending what is written to the client as `{name: text}` frames.
+    '''
+
+    def __init__(self, send: Callable[[dict], None], name: str) -> None:
+        super().__init__()
+        self.__send = send
+        self.__name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if isinstance(text, (bytes, bytearray)):
+            text = text.decode('utf-8', 'replace')
+        if text:
+            self.__send({self.__name: text})
+        return len(text)
+
+
+def _exit_code(code: Any) -> int:
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: 'DaemonServer'
+
+    def handle(self) -> None:
+        if peer_uid(self.connection) not in (None, _current_uid()):
+            return
+        connected = True
+
+        def send(frame: dict) -> None:
+            # keep running the command when the client went away, just stop sending
+            nonlocal connected
+            if connected:
+                try:
+                    _send(self.connection, frame)
+                except OSError:
+                    connected = False
+
+        try:
+            message = json.loads(self.rfile.readline() or b'{}')
+        except ValueError:
+            message = {}
+        action = message.get('action')
+        if action == 'run' and message.get('env', {}) != self.server.environment:
+            send({'in_process': 'The RED_OFFICE_* settings differ from those of the daemon.'})
+        elif action == 'run':
+            send({'exit_code': self.server.run(message.get('argv', []), message.get('cwd'), send)})
+        elif action == 'status':
+            send({'status': self.server.status()})
+        elif action == 'metrics':
+            # imported here, the thin client importing this module does not need it
+            from red_office_google_integration.src.metrics import metrics
+            send({'prometheus': metrics.to_prometheus(), 'summary': metrics.summary()})
+        elif action == 'stop':
+            send({'status': 'Stopping'})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            send({'stderr': f'Unknown daemon action: {action!r}\n'})
+            send({'exit_code': 2})
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    '''
+        Unix socket server running the commands of a click group.
+
+        Args:
+            cli (click.Group): The root command group, `command_line_interface` of `main.py`.
+            socket_path (Path, optional): Where to listen. Defaults to `setting.DAEMON_SOCKET_PATH`.
+            status (Callable, optional): Returns extra fields for the `status` answer, e.g. the cached clients.
+
+        Raises:
+            DaemonError: When a daemon is already listening on the socket.
+    '''
+    daemon_threads = True
+
+    def __init__(self, cli, socket_path: Path | None = None, status: Callable[[], dict] | None = None) -> None:
+        self.cli = cli
+        self.socket_path = Path(socket_path or setting.DAEMON_SOCKET_PATH)
+        self.started = time.time()
+        self.commands = 0
+        # the variables the settings of this process were read from
+        self.environment = settings_environment()
+        self.__status = status
+        self.__lock = threading.Lock()
+        _private_directory(self.socket_path.parent)
+        if self.socket_path.exists():
+            try:
+                _connect(self.socket_path, setting.DAEMON_CONNECT_TIMEOUT).close()
+            except OSError:
+                # left behind by a daemon that did not stop cleanly
+                self.socket_path.unlink()
+            else:
+                raise DaemonError(f'A daemon is already listening on {self.socket_path}.')
+        # the socket is created accessible to the owner only, requests carry credential keys
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.socket_path), _Handler)
+        finally:
+            os.umask(umask)
+
+    def run(self, argv: list[str], cwd: str | None, send: Callable[[dict], None]) -> int:
+        '''
+            Run a command in the working directory of the client, streaming its output. Returns its exit status.
+        '''
+        with self.__lock:
+            self.commands += 1
+            previous = os.getcwd()
+            with redirect_stdout(_FrameWriter(send, 'stdout')), redirect_stderr(_FrameWriter(send, 'stderr')):
+                try:
+                    if cwd:
+                        os.chdir(cwd)
+                    self.cli.main(args=argv, prog_name='main.py')
+                    return 0
+                except SystemExit as e:
+                    return _exit_code(e.code)
+                except Exception:
+                    traceback.print_exc()
+                    return 1
+                finally:
+                    os.chdir(previous)
+
+    def status(self) -> dict:
+        '''
+            Describe the running daemon.
+        '''
+        status = {'pid': os.getpid(), 'socket': str(self.socket_path),
+                  'uptime': round(time.time() - self.started, 1), 'commands': self.commands}
+        if self.__status is not None:
+            status.update(self.__status())
+        return status
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def serve(cli, socket_path: Path | None = None, status: Callable[[], dict] | None = None) -> None:
+    '''
+        Run the daemon until it is sent `stop` or interrupted.
+
+        Args:
+            cli (click.Group): The root command group.
+            socket_path (Path, optional): Where to listen. Defaults to `setting.DAEMON_SOCKET_PATH`.
+            status (Callable, optional): Returns extra fields for the `status` answer.
+    '''
+    server = DaemonServer(cli, socket_path, status)
+    logger.info(f'Daemon listening on {server.socket_path} (pid {os.getpid()}).')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info('Daemon stopped.')
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,207 @@
+'''
+    Typed exceptions raised by the API classes when they are used as a library.
+
+    API errors are subclasses of `googleapiclient.errors.HttpError`, so existing `except HttpError` code keeps
+    working, while callers can catch the cases they care about:
+
+    ```
+    try:
+        event.get_event('primary', eventId)
+    except NotFoundError:
+        ...
+    except RateLimitError as e:
+        time.sleep(e.retry_after or 60)
+    ```
+
+    `from_http_error()` maps an `HttpError` to the most specific class.
+'''
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from googleapiclient.errors import HttpError
+
+
+# 403 reasons meaning "slow down" rather than "not allowed"
+RATE_LIMIT_REASONS = frozenset({'rateLimitExceeded', 'userRateLimitExceeded'})
+# 403 reasons meaning a daily or project quota is used up; retrying soon does not help
+QUOTA_REASONS = frozenset({'dailyLimitExceeded', 'quotaExceeded'})
+
+
+class GoogleIntegrationError(Exception):
+    '''
+        Base class of the errors raised by this package.
+    '''
+
+
+class TransportError(GoogleIntegrationError):
+    '''
+        The request could not be sent or no response was received (connection reset, timeout, ...).
+    '''
+
+
+class CassetteMismatchError(GoogleIntegrationError):
+    '''
+        A request was sent while replaying a cassette that has no (more) recorded response for it.
+    '''
+
+
+class GoogleAPIError(GoogleIntegrationError, HttpError):
+    '''
+        The API answered with an error status.
+
+        Attributes:
+            status_code (int): The HTTP status.
+            reason (str): The error message of the API.
+            error_reason (str | None): The error reason code of the API, e.g. `rateLimitExceeded`, if any.
+            retry_after (float | None): Seconds to wait from the `Retry-After` header, if any.
+    '''
+
+    def __init__(self, resp, content, uri=None) -> None:
+        HttpError.__init__(self, resp, content, uri=uri)
+        self.error_reason = error_reason(self)
+        self.retry_after = retry_after(resp)
+
+    def to_dict(self) -> dict:
+        '''
+            Describe the error in the format printed by `handle_exception`.
+        '''
+        return {'status': type(self).__name__, 'status_code': self.status_code, 'message': self._get_reason()}
+
+
+class InvalidRequestError(GoogleAPIError):
+    '''400 Bad Request: invalid parameters or body.'''
+
+
+class AuthenticationError(GoogleAPIError):
+    '''401 Unauthorized: missing, invalid or revoked credentials.'''
+
+
+class PermissionDeniedError(GoogleAPIError):
+    '''403 Forbidden: the credentials may not access the resource.'''
+
+
+class QuotaExceededError(PermissionDeniedError):
+    '''403 with a daily or project quota reason; waiting a few seconds does not help.'''
+
+
+class RateLimitError(GoogleAPIError):
+    '''429 Too Many Requests, or 403 with a rate limit reason; retry later.'''
+
+
+class NotFoundError(GoogleAPIError):
+    '''404 Not Found.'''
+
+
+class ConflictError(GoogleAPIError):
+    '''409 Conflict, e.g. an identifier already in use.'''
+
+
+class GoneError(GoogleAPIError):
+    '''410 Gone, e.g. an expired sync token.'''
+
+
+class PreconditionFailedError(GoogleAPIError):
+    '''412 Precondition Failed: the resource changed since its ETag was read.'''
+
+
+class ServerError(GoogleAPIError):
+    '''5xx: the API failed; usually temporary.'''
+
+
+_STATUS_CLASSES = {400: InvalidRequestError, 401: AuthenticationError, 403: PermissionDeniedError,
+                   404: NotFoundError, 409: ConflictError, 410: GoneError, 412: PreconditionFailedError,
+                   429: RateLimitError}
+
+
+def error_reason(error: HttpError) -> str | None:
+    '''
+        Return the first error reason of an API error, e.g. `rateLimitExceeded`.
+    '''
+    try:
+        details = error.error_details
+    except Exception:  # error_details is only set once the content was parsed
+        details = None
+    if isinstance(details, list):
+        for detail in details:
+            if isinstance(detail, dict) and detail.get('reason'):
+                return detail['reason']
+    return None
+
+
+def retry_after(resp) -> float | None:
+    '''
+        Return the delay of a `Retry-After` header in seconds, given as seconds or as an HTTP date.
+    '''
+    value = resp.get('retry-after') if hasattr(resp, 'get') else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def from_http_error(error: HttpError) -> GoogleAPIError:
+    '''
+        Convert an `HttpError` to the matching typed exception.
+
+        Args:
+            error (HttpError): The error raised by the client library.
+
+        Returns:
+            GoogleAPIError: The typed error, or `error` itself when it already is one.
+    '''
+    if isinstance(error, GoogleAPIError):
+        return error
+    status = error.resp.status
+    cls = _STATUS_CLASSES.get(status, ServerError if status >= 500 else GoogleAPIError)
+    if status == 403:
+        reason = error_reason(error)
+        if reason in RATE_LIMIT_REASONS:
+            cls = RateLimitError
+        elif reason in QUOTA_REASONS:
+            cls = QuotaExceededError
+    typed = cls(error.resp, error.content, uri=error.uri)
+    typed.__cause__ = error
+    return typed
+
+
+def is_quota_error(error: Exception) -> bool:
+    '''
+        Tell whether the API refused a request because of a rate limit or a quota (429, rate limit or quota 403).
+    '''
+    if not isinstance(error, HttpError):
+        return False
+    return isinstance(from_http_error(error), (RateLimitError, QuotaExceededError))
+
+
+def is_transport_error(error: Exception) -> bool:
+    '''
+        Tell whether an error means that the request could not be sent or answered (connection, timeout).
+    '''
+    if isinstance(error, TransportError):
+        return True
+    return isinstance(error, (OSError, TimeoutError)) and not isinstance(error, (FileNotFoundError, PermissionError))
+
+
+def as_typed_error(error: Exception) -> Exception:
+    '''
+        Return the typed counterpart of an error raised while executing a request.
+
+        `HttpError` becomes a `GoogleAPIError` subclass and connection errors and timeouts a `TransportError`.
+        Any other error is returned unchanged.
+    '''
+    if isinstance(error, HttpError):
+        return from_http_error(error)
+    if is_transport_error(error) and not isinstance(error, TransportError):
+        typed = TransportError(f'{type(error).__name__}: {error}')
+        typed.__cause__ = error
+        return typed
+    return error
+
+
+if __name__ == '__main__':
+    pass
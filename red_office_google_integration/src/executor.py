@@ -0,0 +1,246 @@
+'''
+    Execution of single API requests with rate limiting, retries and typed errors.
+
+    Every API class sends its requests through a `RequestExecutor` instead of calling `request.execute()`:
+
+    - the request first takes a token from the rate limiter of its API (`src/rate_limit.py`), or its quota
+      cost from the quota shared by the processes when `setting.QUOTA_DB_PATH` is set (`src/quota.py`),
+    - rate limited, failed (5xx) and unsent requests are retried following the retry policy (`src/retry.py`);
+      POST and PATCH requests only when rate limited, as they may have been applied,
+    - errors are raised as the typed exceptions of `src/exceptions.py`,
+    - every attempt is logged with its status and latency, and recorded in the metrics (`src/metrics.py`),
+    - the request, its attempts and the parsing of the response are traced as spans (`src/tracing.py`).
+
+    `stream()` sends list requests whose items are decoded while the response is read (`src/json_stream.py`).
+
+    Example:
+    ```
+    executor = RequestExecutor('calendar')
+    event = executor.execute(service.events().get(calendarId='primary', eventId=eventId))
+    ```
+'''
+import json
+import time
+from typing import Any, Iterator
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import DEFAULT_HTTP_TIMEOUT_SEC, HttpRequest
+from red_office_google_integration.google_service import cassette
+from red_office_google_integration.google_service.transport import ThreadLocalHttp
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.exceptions import as_typed_error, is_quota_error
+from red_office_google_integration.src.json_stream import JsonArrayStream
+from red_office_google_integration.src.metrics import metrics
+from red_office_google_integration.src.quota import QuotaTracker, shared_quota
+from red_office_google_integration.src.rate_limit import TokenBucket, rate_limiter
+from red_office_google_integration.src.retry import DEFAULT_RETRY_POLICY, RetryPolicy, is_idempotent
+from red_office_google_integration.src.tracing import span
+from red_office_google_integration.log.log_handler import logger
+
+
+class RequestExecutor:
+    '''
+        Send requests of one API with rate limiting and retries.
+
+        Args:
+            api (str): The API, `calendar`, `sheets` or `gmail`. Selects the shared rate limiter.
+            policy (RetryPolicy, optional): Retry policy. Defaults to the one configured in `setting`.
+            limiter (TokenBucket, optional): Rate limiter. Defaults to the process-wide limiter of the API and
+                account, or none when a shared quota is used.
+            http (ThreadLocalHttp, optional): Per-thread connections. When set, requests executed without an
+                explicit `http` are sent on the connection of the calling thread, so one client can be used
+                from several threads. The API classes set it once their credentials are loaded.
+            account (str, optional): Account label of the metrics, see `metrics.account_label()`. The rate limits
+                and per-user quotas are counted per account.
+            quota (QuotaTracker, optional): Quota shared with other processes. Defaults to the one of
+                `setting.QUOTA_DB_PATH`, if set.
+    '''
+
+    def __init__(self, api: str, policy: RetryPolicy | None = None, limiter: TokenBucket | None = None,
+                 http: ThreadLocalHttp | None = None, account: str | None = None,
+                 quota: QuotaTracker | None = None) -> None:
+        self.api = api
+        self.policy = policy if policy is not None else DEFAULT_RETRY_POLICY
+        self.quota = quota if quota is not None else shared_quota()
+        self.limiter = limiter if limiter is not None or self.quota is not None else rate_limiter(api, account)
+        self.http = http
+        self.account = account
+
+    def execute(self, request: HttpRequest, http=None, cost: float = 1) -> Any:
+        '''
+            Send a request and return its parsed response.
+
+            Args:
+                request (HttpRequest): The request built by the discovery service.
+                http (optional): Connection to send the request on, e.g. `ThreadLocalHttp.get()`.
+                cost (float, optional): Tokens the request takes from the rate limiter. Defaults to 1.
+
+            Returns:
+                Any: The response, like `request.execute()`.
+
+            Raises:
+                GoogleAPIError: A subclass matching the error status, once retries are exhausted.
+                TransportError: When the request could not be sent.
+        '''
+        method = getattr(request, 'methodId', None)
+        with span('request.execute', api=self.api, operation=method):
+            return self.__execute(request, method, http, cost)
+
+    def __execute(self, request: HttpRequest, method: str | None, http, cost: float) -> Any:
+        if http is None and self.http is not None:
+            http = self.http.get()
+        request_bytes = _size(getattr(request, 'body', None))
+        received = _measure_response(request)
+        for attempt in range(self.policy.max_retries + 1):
+            throttled = self.__throttle(method, cost)
+            started = time.perf_counter()
+            try:
+                with span('http.attempt', attempt=attempt) as attempt_span:
+                    response = request.execute(http=http)
+                    if attempt_span is not None:
+                        attempt_span.set(status=received.get('status', 200))
+            except Exception as e:
+                self.__failed(e, method, started, attempt, throttled, request_bytes, is_idempotent(request))
+                continue
+            self.log_attempt(method, received.get('status', 200), started, attempt, throttled, request_bytes,
+                             received.get('bytes', 0))
+            return response
+
+    def stream(self, request: HttpRequest, key: str, cost: float = 1,
+               chunk_size: int | None = None) -> JsonArrayStream:
+        '''
+            Send a list request and return the items of the array `key` of its response as they are read,
+            instead of the parsed response. The request is sent on the `requests` session of the calling thread
+            (`ThreadLocalHttp.session()`), rate limited and retried like `execute()` until the response
+            headers are received; an error while reading the body is raised by the iteration. While a cassette
+            is active the session is not used: the request is sent with `execute()`, so that it is recorded or
+            replayed, and the items are read from the whole response.
+
+            Args:
+                request (HttpRequest): The request built by the discovery service.
+                key (str): The array of the response, e.g. `values`, `messages` or `items`.
+                cost (float, optional): Tokens the request takes from the rate limiter. Defaults to 1.
+                chunk_size (int, optional): Bytes read at a time. Defaults to `setting.STREAM_CHUNK_SIZE`.
+
+            Returns:
+                JsonArrayStream: The items; its `fields` hold the other members, e.g. `nextPageToken`, once
+                the items have been iterated.
+
+            Raises:
+                GoogleAPIError: A subclass matching the error status, once retries are exhausted.
+                TransportError: When the request could not be sent.
+
+            Example:
+            ```
+            stream = executor.stream(service.events().list(calendarId='primary'), 'items')
+            for event in stream:
+                ...
+            ```
+        '''
+        if self.http is None:
+            raise ValueError('Streaming needs the per-thread connections of the executor (http).')
+        if cassette.is_active():
+            # the requests session bypasses the cassette, which would send replayed requests to Google
+            return JsonArrayStream([json.dumps(self.execute(request, cost=cost))], key)
+        method = getattr(request, 'methodId', None)
+        with span('request.execute', api=self.api, operation=method, stream=True):
+            session = self.http.session()
+            request_bytes = _size(getattr(request, 'body', None))
+            for attempt in range(self.policy.max_retries + 1):
+                throttled = self.__throttle(method, cost)
+                started = time.perf_counter()
+                try:
+                    with span('http.attempt', attempt=attempt) as attempt_span:
+                        response = session.request(request.method, request.uri, data=request.body,
+                                                   headers=request.headers, stream=True,
+                                                   timeout=DEFAULT_HTTP_TIMEOUT_SEC)
+                        if attempt_span is not None:
+                            attempt_span.set(status=response.status_code)
+                        if response.status_code >= 300:
+                            raise HttpError(httplib2.Response({**response.headers, 'status': response.status_code}),
+                                            response.content, uri=request.uri)
+                except Exception as e:
+                    self.__failed(e, method, started, attempt, throttled, request_bytes, is_idempotent(request))
+                    continue
+                self.log_attempt(method, response.status_code, started, attempt, throttled, request_bytes)
+                return JsonArrayStream(_iter_body(response, chunk_size or setting.STREAM_CHUNK_SIZE), key)
+
+    def __throttle(self, method: str | None, cost: float) -> float:
+        '''
+            Wait for the rate limiter and the shared quota, return the seconds waited.
+        '''
+        throttled = self.limiter.acquire(cost) if self.limiter is not None else 0.0
+        if self.quota is not None:
+            throttled += self.quota.acquire([method], self.account)
+        return throttled
+
+    def __failed(self, e: Exception, method: str | None, started: float, attempt: int, throttled: float,
+                 request_bytes: int, idempotent: bool = True) -> None:
+        '''
+            Log a failed attempt, then wait before the next one or raise the typed error when it is not retried.
+            Must be called while `e` is being handled.
+        '''
+        http_error = isinstance(e, HttpError)
+        self.log_attempt(method, e.resp.status if http_error else type(e).__name__, started, attempt,
+                         throttled, request_bytes, _size(e.content) if http_error else 0, is_quota_error(e))
+        if not self.policy.should_retry(e, attempt, idempotent):
+            typed = as_typed_error(e)
+            if typed is e:
+                raise
+            raise typed from e
+        delay = self.policy.delay(attempt, e)
+        logger.warning(f'Retrying {method} in {delay:.2f}s after {type(e).__name__} (attempt {attempt + 1}).')
+        time.sleep(delay)
+
+    def log_attempt(self, method: str | None, status: int | str, started: float, attempt: int,
+                    throttled: float, request_bytes: int = 0, response_bytes: int = 0,
+                    quota_error: bool = False) -> None:
+        '''
+            Log one attempt as a structured record and add it to the metrics.
+        '''
+        latency = time.perf_counter() - started
+        logger.debug({'event': 'api_request', 'api': self.api, 'operation': method, 'status': status,
+                      'latency_ms': round(latency * 1000, 1), 'attempt': attempt,
+                      'throttled_ms': round(throttled * 1000, 1), 'request_bytes': request_bytes,
+                      'response_bytes': response_bytes})
+        metrics.record(self.api, method, self.account, status, latency, request_bytes, response_bytes,
+                       throttled, attempt > 0, quota_error)
+
+
+def _iter_body(response, chunk_size: int) -> Iterator[bytes]:
+    '''
+        Yield the body of a streamed `requests` response, closing it when done or abandoned.
+    '''
+    try:
+        yield from response.iter_content(chunk_size)
+    finally:
+        response.close()
+
+
+def _size(body) -> int:
+    if body is None:
+        return 0
+    return len(body.encode() if isinstance(body, str) else body)
+
+
+def _measure_response(request: HttpRequest) -> dict:
+    '''
+        Wrap the response parser of a request to note the status and size of the successful response.
+    '''
+    received: dict = {}
+    postproc = getattr(request, 'postproc', None)
+    if postproc is None:
+        return received
+
+    def measured(resp, content):
+        received['status'] = getattr(resp, 'status', 200)
+        received['bytes'] = _size(content)
+        with span('response.parse', bytes=received['bytes']):
+            return postproc(resp, content)
+
+    request.postproc = measured
+    return received
+
+
+if __name__ == '__main__':
+    pass
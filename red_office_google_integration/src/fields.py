@@ -0,0 +1,89 @@
+'''
+    Helpers for requesting partial responses (field masks) from the Google APIs.
+
+    Every Google API accepts a `fields` query parameter that limits the response to the named fields.
+    The functions in this module turn a list of field names into such a mask. For list methods the
+    names refer to the items of the collection and the pagination fields are added automatically,
+    so callers can keep paging with a projected response.
+
+    Example:
+    ```
+    field_mask(['id', 'summary', 'start.dateTime'], collection='items',
+               page_fields=CALENDAR_EVENTS_PAGE_FIELDS)
+    # 'nextPageToken,nextSyncToken,items(id,summary,start/dateTime)'
+    ```
+'''
+from typing import Iterable
+
+
+# Top level fields needed to keep paging through list responses
+CALENDAR_EVENTS_PAGE_FIELDS = ('nextPageToken', 'nextSyncToken')
+GMAIL_MESSAGES_PAGE_FIELDS = ('nextPageToken', 'resultSizeEstimate')
+SHEETS_BATCH_GET_PAGE_FIELDS = ('spreadsheetId',)
+
+Fields = str | Iterable[str] | None
+
+
+def _path(name: str) -> str:
+    '''
+        Convert a dotted field name (`start.dateTime`) into field mask syntax (`start/dateTime`).
+    '''
+    return name.strip().replace('.', '/')
+
+
+def field_mask(fields: Fields, collection: str | None = None, page_fields: Iterable[str] = ()) -> str | None:
+    '''
+        Build a `fields` mask from a list of field names.
+
+        Args:
+            fields (str | Iterable[str] | None): The fields to keep. A string is treated as a ready-made mask
+                and returned unchanged. Nested fields can be named with dots, e.g. `start.dateTime`.
+            collection (str, optional): Name of the collection in a list response (e.g. `items`). When given,
+                `fields` select the fields of each item.
+            page_fields (Iterable[str], optional): Top level fields always kept for list responses,
+                such as `nextPageToken`.
+
+        Returns:
+            (str | None): The field mask, or None when no fields were requested.
+    '''
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        return fields
+
+    names = list(dict.fromkeys(_path(f) for f in fields if f and f.strip()))
+    if not names:
+        return None
+    if collection is None:
+        return ','.join(names)
+
+    top_level = [f for f in page_fields if f not in names]
+    item_fields = [n for n in names if n not in page_fields]
+    mask = top_level + [n for n in names if n in page_fields]
+    if item_fields:
+        mask.append(f"{collection}({','.join(item_fields)})")
+    return ','.join(mask)
+
+
+def with_fields(params: dict, fields: Fields, collection: str | None = None,
+                page_fields: Iterable[str] = ()) -> dict:
+    '''
+        Return a copy of the query parameters with the field mask added.
+
+        Args:
+            params (dict): The query parameters of the request.
+            fields (str | Iterable[str] | None): The fields to keep, see `field_mask()`.
+            collection (str, optional): Name of the collection in a list response.
+            page_fields (Iterable[str], optional): Top level fields always kept for list responses.
+
+        Returns:
+            dict: The parameters, unchanged when no fields were requested.
+    '''
+    mask = field_mask(fields, collection, page_fields)
+    if mask is None:
+        return params
+    return {**params, 'fields': mask}
+
+
+if __name__ == '__main__':
+    pass
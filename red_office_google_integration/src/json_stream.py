@@ -0,0 +1,145 @@
+'''
+    Incremental parsing of the list responses of the Google APIs.
+
+    A list response is a JSON object with one large array, `values` of a Sheets range, `messages` of a Gmail
+    list, `items` of a Calendar events list, next to a few small members such as `nextPageToken`.
+    `JsonArrayStream` reads such a response in chunks as they arrive and yields the items of the array one at
+    a time, so only the item being decoded and one network chunk are held in memory instead of the whole body,
+    its text and the parsed dict. The other members are collected in `fields`, complete once the items have
+    been iterated.
+
+    Outside the array the scanner jumps from one structural character to the next with regular expressions;
+    every item of the array is decoded by the C decoder of `json`, so the cost per byte stays close to parsing
+    the whole body at once.
+
+    Example:
+    ```
+    stream = JsonArrayStream(response.iter_content(65536), 'items')
+    for event in stream:
+        print(event['summary'])
+    stream.fields.get('nextPageToken')
+    ```
+'''
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_STRUCTURE = re.compile(r'["{}\[\],]')
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_WHITESPACE = re.compile(r'\s*')
+_DECODER = json.JSONDecoder()
+# consumed text is dropped from the buffer once it is longer than this
+_KEEP = 1 << 16
+
+
+class JsonArrayStream:
+    '''
+        Items of an array member of a JSON object read in chunks.
+
+        Args:
+            chunks (Iterable[bytes | str]): The body, e.g. `requests.Response.iter_content()`. Bytes are
+                decoded as UTF-8.
+            key (str): The top-level member holding the array, e.g. `values`, `messages` or `items`.
+
+        Raises:
+            ValueError: When the body ends before the object does, or is not valid JSON.
+    '''
+
+    def __init__(self, chunks: Iterable[bytes | str], key: str) -> None:
+        self.chunks = chunks
+        self.key = key
+        self.fields: dict[str, Any] = {}
+        self.__iterated = False
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.__iterated:
+            raise RuntimeError('A JsonArrayStream can only be iterated once.')
+        self.__iterated = True
+        buffer, pos = '', 0
+        depth = 0                     # 1 inside the top-level object
+        expect_key = False            # the next string at depth 1 is a member name
+        member = None                 # top-level member being read
+        value_start = None            # where its value starts (after the name)
+        in_array = False              # reading the items of the array
+        for chunk in self.__text(self.chunks):
+            buffer += chunk
+            while True:
+                if in_array:
+                    # items are decoded whole by the C decoder; one not complete yet waits for more text
+                    pos = _WHITESPACE.match(buffer, pos).end()
+                    if pos == len(buffer):
+                        break
+                    if buffer[pos] == ']':
+                        in_array, depth, pos = False, 1, pos + 1
+                        continue
+                    if buffer[pos] == ',':
+                        pos += 1
+                        continue
+                    try:
+                        item, end = _DECODER.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        break
+                    # a decoded prefix, e.g. `-25` of `-25.0` split by a chunk, is not followed by `,` or `]`
+                    after = _WHITESPACE.match(buffer, end).end()
+                    if after == len(buffer):
+                        break
+                    if buffer[after] not in ',]':
+                        if isinstance(item, (int, float)):
+                            break  # the number goes on in the next chunk
+                        raise ValueError(f'Invalid JSON response, reading {self.key!r}.')
+                    yield item
+                    pos = end
+                    continue
+                match = _STRUCTURE.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                char, index = match.group(), match.start()
+                if char == '"':
+                    end = _STRING_END.match(buffer, index + 1)
+                    if end is None:  # the string goes on in the next chunk
+                        pos = index
+                        break
+                    pos = end.end()
+                    if depth == 1 and expect_key:
+                        member, value_start, expect_key = json.loads(buffer[index:pos]), pos, False
+                    continue
+                pos = index + 1
+                if char in '{[':
+                    depth += 1
+                    if depth == 1:
+                        expect_key = True
+                    elif depth == 2 and char == '[' and member == self.key:
+                        in_array, value_start = True, None
+                elif depth == 1 and char in ',}':  # end of a member
+                    if value_start is not None:
+                        self.fields[member] = json.loads(buffer[value_start:index].strip().lstrip(':'))
+                    member, value_start, expect_key = None, None, char == ','
+                    if char == '}':
+                        depth = 0
+                elif char != ',':
+                    depth -= 1
+            # drop the consumed text, keeping the value being read
+            keep = pos if value_start is None else min(pos, value_start)
+            if keep > _KEEP:
+                buffer = buffer[keep:]
+                pos -= keep
+                value_start = value_start - keep if value_start is not None else None
+        if depth != 0 or in_array or buffer[pos:].strip():
+            raise ValueError(f'Truncated or invalid JSON response, reading {self.key!r}.')
+
+    @staticmethod
+    def __text(chunks: Iterable[bytes | str]) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for chunk in chunks:
+            text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+if __name__ == '__main__':
+    pass
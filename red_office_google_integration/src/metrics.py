@@ -0,0 +1,330 @@
+'''
+    Metrics of the Google API requests sent by the package.
+
+    Every attempt of a request (`RequestExecutor`, `BatchExecutor`, `AsyncTransport`) is recorded per API,
+    operation (the API method, e.g. `calendar.events.get`) and account (a hash of the credential key or account
+    id, never the key or id itself):
+
+    - `google_api_requests_total`: attempts by HTTP status (or error class when no response was received),
+    - `google_api_request_duration_seconds`: latency histogram of the attempts,
+    - `google_api_request_bytes_total` / `google_api_response_bytes_total`: bodies sent and received,
+    - `google_api_retries_total`: attempts that were retries,
+    - `google_api_quota_errors_total`: attempts answered with a rate limit or quota error,
+    - `google_api_throttled_seconds_total`: time spent waiting for the client-side rate limiter.
+
+    The metrics are exposed in the Prometheus text format (`metrics.to_prometheus()`, written to a file for the
+    node exporter textfile collector or served over HTTP with `start_metrics_server()`), and summarized with
+    latency percentiles as JSON lines by `MetricsReporter`.
+
+    Example:
+    ```
+    print(metrics.to_prometheus())
+    for line in metrics.summary():
+        print(line['operation'], line['count'], line['p95_ms'])
+    ```
+'''
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from red_office_google_integration.src import setting
+
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def account_label(key: bytes | str | None) -> str:
+    '''
+        Return the label identifying an account in the metrics: a short hash of its credential key, or of its
+        account id (e.g. an email address) in multi-account setups, never the key or id itself.
+    '''
+    if not key:
+        return 'unknown'
+    if isinstance(key, str):
+        key = key.encode()
+    return hashlib.sha256(key).hexdigest()[:12]
+
+
+class _Series:
+    '''
+        The metrics of one API, operation and account.
+    '''
+
+    def __init__(self) -> None:
+        self.statuses: dict[str, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.quota_errors = 0
+        self.throttled = 0.0
+
+    def percentile(self, fraction: float) -> float | None:
+        '''
+            Estimate a latency percentile in seconds from the histogram, interpolating inside the bucket.
+        '''
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                if index == len(LATENCY_BUCKETS):
+                    return lower
+                return lower + (LATENCY_BUCKETS[index] - lower) * (rank - seen) / count
+            seen += count
+        return LATENCY_BUCKETS[-1]
+
+
+class MetricsRegistry:
+    '''
+        Thread-safe store of the request metrics of the process.
+    '''
+
+    def __init__(self) -> None:
+        self.__series: dict[tuple[str, str, str], _Series] = {}
+        self.__lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, api: str, operation: str | None, account: str | None, status: int | str, latency: float,
+               request_bytes: int = 0, response_bytes: int = 0, throttled: float = 0.0, retry: bool = False,
+               quota_error: bool = False) -> None:
+        '''
+            Record one attempt of a request.
+
+            Args:
+                api (str): `calendar`, `sheets` or `gmail`.
+                operation (str): The API method, e.g. `calendar.events.get`.
+                account (str): The account label, see `account_label()`.
+                status (int | str): The HTTP status, or the error class when no response was received.
+                latency (float): Duration of the attempt in seconds.
+                request_bytes (int, optional): Size of the request body.
+                response_bytes (int, optional): Size of the response body.
+                throttled (float, optional): Seconds waited for the rate limiter before the attempt.
+                retry (bool, optional): Whether the attempt retried a failed one.
+                quota_error (bool, optional): Whether the API answered with a rate limit or quota error.
+        '''
+        if not setting.METRICS_ENABLED:
+            return
+        key = (api, operation or 'unknown', account or 'unknown')
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+        with self.__lock:
+            series = self.__series.get(key)
+            if series is None:
+                series = self.__series[key] = _Series()
+            series.statuses[str(status)] = series.statuses.get(str(status), 0) + 1
+            series.buckets[bucket] += 1
+            series.latency_sum += latency
+            series.count += 1
+            series.request_bytes += request_bytes
+            series.response_bytes += response_bytes
+            series.retries += retry
+            series.quota_errors += quota_error
+            series.throttled += throttled
+
+    def reset(self) -> None:
+        '''
+            Forget every recorded metric.
+        '''
+        with self.__lock:
+            self.__series.clear()
+            self.started = time.time()
+
+    def __snapshot(self) -> list[tuple[tuple[str, str, str], _Series]]:
+        with self.__lock:
+            snapshot = []
+            for key, series in sorted(self.__series.items()):
+                copy = _Series()
+                copy.__dict__.update({k: (v.copy() if isinstance(v, (dict, list)) else v)
+                                      for k, v in series.__dict__.items()})
+                snapshot.append((key, copy))
+            return snapshot
+
+    def summary(self) -> list[dict]:
+        '''
+            Summarize the metrics, one dict per API, operation and account.
+
+            Returns:
+                list[dict]: `api`, `operation`, `account`, `count`, `errors` (non-2xx attempts), `statuses`,
+                `retries`, `quota_errors`, `mean_ms`, `p50_ms`, `p95_ms`, `p99_ms` (estimated from the
+                histogram), `request_bytes`, `response_bytes` and `throttled_ms`.
+        '''
+        lines = []
+        for (api, operation, account), series in self.__snapshot():
+            def ms(seconds: float | None) -> float | None:
+                return None if seconds is None else round(seconds * 1000, 1)
+            errors = sum(count for status, count in series.statuses.items()
+                         if not (status.isdigit() and 200 <= int(status) < 400))
+            lines.append({
+                'api': api, 'operation': operation, 'account': account, 'count': series.count, 'errors': errors,
+                'statuses': series.statuses, 'retries': series.retries, 'quota_errors': series.quota_errors,
+                'mean_ms': ms(series.latency_sum / series.count if series.count else None),
+                'p50_ms': ms(series.percentile(0.5)), 'p95_ms': ms(series.percentile(0.95)),
+                'p99_ms': ms(series.percentile(0.99)), 'request_bytes': series.request_bytes,
+                'response_bytes': series.response_bytes, 'throttled_ms': ms(series.throttled),
+            })
+        return lines
+
+    def to_prometheus(self) -> str:
+        '''
+            Return the metrics in the Prometheus text exposition format.
+        '''
+        snapshot = self.__snapshot()
+        out: list[str] = []
+
+        def family(name: str, kind: str, help: str, samples) -> None:
+            out.append(f'# HELP {name} {help}')
+            out.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                out.append(f'{name}{suffix}{{{_labels(labels)}}} {_number(value)}')
+
+        def labels(key, **extra) -> dict:
+            return {'api': key[0], 'operation': key[1], 'account': key[2], **extra}
+
+        family('google_api_requests_total', 'counter', 'Attempts of Google API requests by status.',
+               [('', labels(key, status=status), count)
+                for key, series in snapshot for status, count in sorted(series.statuses.items())])
+        histogram = []
+        for key, series in snapshot:
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, float('inf')), series.buckets):
+                cumulative += count
+                histogram.append(('_bucket', labels(key, le='+Inf' if bound == float('inf') else _number(bound)),
+                                  cumulative))
+            histogram.append(('_sum', labels(key), series.latency_sum))
+            histogram.append(('_count', labels(key), series.count))
+        family('google_api_request_duration_seconds', 'histogram', 'Latency of the Google API request attempts.',
+               histogram)
+        for name, attribute, help in (
+                ('google_api_request_bytes_total', 'request_bytes', 'Bytes of request bodies sent.'),
+                ('google_api_response_bytes_total', 'response_bytes', 'Bytes of response bodies received.'),
+                ('google_api_retries_total', 'retries', 'Attempts retrying a failed request.'),
+                ('google_api_quota_errors_total', 'quota_errors', 'Attempts answered with a rate limit or quota error.'),
+                ('google_api_throttled_seconds_total', 'throttled', 'Seconds waited for the client-side rate limiter.')):
+            family(name, 'counter', help, [('', labels(key), getattr(series, attribute)) for key, series in snapshot])
+        return '\n'.join(out) + '\n'
+
+    def write_prometheus(self, path: Path | str | None = None) -> None:
+        '''
+            Write the Prometheus text to a file atomically, e.g. for the node exporter textfile collector.
+
+            Args:
+                path (Path, optional): Defaults to `setting.METRICS_PROMETHEUS_PATH`.
+        '''
+        path = Path(path or setting.METRICS_PROMETHEUS_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(path.name + '.tmp')
+        temporary.write_text(self.to_prometheus())
+        os.replace(temporary, path)
+
+    def write_summary(self, path: Path | str | None = None) -> None:
+        '''
+            Append one JSON line per API, operation and account to the summary file.
+
+            Args:
+                path (Path, optional): Defaults to `setting.METRICS_SUMMARY_PATH`.
+        '''
+        lines = self.summary()
+        if not lines:
+            return
+        path = Path(path or setting.METRICS_SUMMARY_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        window = round(time.time() - self.started, 1)
+        with open(path, 'a') as f:
+            for line in lines:
+                f.write(json.dumps({'timestamp': timestamp, 'window_s': window, **line}) + '\n')
+
+
+def _labels(labels: dict) -> str:
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Metrics of the whole process
+metrics = MetricsRegistry()
+
+
+class MetricsReporter:
+    '''
+        Write the JSONL summary and the Prometheus file periodically on a background thread.
+
+        The summaries are cumulative since the process started. The files are written once more by `stop()`.
+
+        Args:
+            interval (float, optional): Seconds between two writes. Defaults to `setting.METRICS_SUMMARY_INTERVAL`.
+            registry (MetricsRegistry, optional): Defaults to the process-wide `metrics`.
+    '''
+
+    def __init__(self, interval: float | None = None, registry: MetricsRegistry | None = None) -> None:
+        self.interval = interval if interval is not None else setting.METRICS_SUMMARY_INTERVAL
+        self.registry = registry if registry is not None else metrics
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self) -> 'MetricsReporter':
+        self.__thread.start()
+        return self
+
+    def __run(self) -> None:
+        while not self.__stop.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> None:
+        '''
+            Write the summary and the Prometheus file now.
+        '''
+        self.registry.write_summary()
+        self.registry.write_prometheus()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+        self.flush()
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1', registry: MetricsRegistry | None = None
+                         ) -> ThreadingHTTPServer:
+    '''
+        Serve the metrics in the Prometheus format at `http://host:port/metrics` on a background thread.
+
+        Returns:
+            ThreadingHTTPServer: The server, stop it with `shutdown()`.
+    '''
+    registry = registry if registry is not None else metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,212 @@
+'''
+    Quota accounting shared by all the processes of a machine.
+
+    The token buckets of `src/rate_limit.py` only see the requests of their own process, so several workers
+    using the same Google project together go over its quotas and get 429s. A `QuotaTracker` keeps the buckets
+    in a SQLite database instead: every process reserves the quota cost of a request in the same table before
+    sending it, and waits when the bucket is empty. Reservations are taken in turn and may go ahead of time,
+    so a burst of requests from many workers is spread over time at the quota rate.
+
+    Every operation has a cost in one bucket (`operation_cost()`):
+
+    - `sheets.read` and `sheets.write`: one request; Sheets counts reads and writes separately,
+    - `gmail`: the Gmail quota units of the method, e.g. 5 for `messages.get` and 100 for `messages.send`,
+    - `calendar`: one query.
+
+    The buckets are sized by `setting.QUOTA_LIMITS`. Per-user quotas (`setting.QUOTA_ACCOUNT_BUCKETS`, Gmail and
+    Calendar) are counted per account, the other buckets are shared by the accounts of the project. The executors use the tracker of `setting.QUOTA_DB_PATH`
+    (`RED_OFFICE_QUOTA_DB`) instead of their per-process rate limiters when it is set:
+
+    ```
+    RED_OFFICE_QUOTA_DB=/var/tmp/red_office_quota.db python worker.py   # in every worker
+    ```
+
+    ```
+    tracker = QuotaTracker('/var/tmp/red_office_quota.db')
+    tracker.acquire(['gmail.users.messages.send'])   # blocks until 100 Gmail units are available
+    tracker.available()                              # {'gmail': 150.0, ...}
+    ```
+'''
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+from red_office_google_integration.src import setting
+
+
+# Gmail quota units per method, https://developers.google.com/gmail/api/reference/quota
+GMAIL_UNITS = {
+    'users.getProfile': 1, 'users.drafts.create': 10, 'users.drafts.delete': 10, 'users.drafts.get': 5,
+    'users.drafts.list': 5, 'users.drafts.send': 100, 'users.drafts.update': 15, 'users.history.list': 2,
+    'users.labels.create': 5, 'users.labels.delete': 5, 'users.labels.get': 1, 'users.labels.list': 1,
+    'users.labels.patch': 5, 'users.labels.update': 5, 'users.messages.attachments.get': 5,
+    'users.messages.batchDelete': 50, 'users.messages.batchModify': 50, 'users.messages.delete': 10,
+    'users.messages.get': 5, 'users.messages.import': 25, 'users.messages.insert': 25, 'users.messages.list': 5,
+    'users.messages.modify': 5, 'users.messages.send': 100, 'users.messages.trash': 5,
+    'users.messages.untrash': 5, 'users.threads.delete': 20, 'users.threads.get': 10, 'users.threads.list': 10,
+    'users.threads.modify': 10, 'users.threads.trash': 10, 'users.threads.untrash': 10,
+}
+# cost of the Gmail methods missing above
+GMAIL_DEFAULT_UNITS = 5
+# Sheets methods counted as read requests, the others are write requests
+SHEETS_READS = frozenset({
+    'spreadsheets.get', 'spreadsheets.getByDataFilter', 'spreadsheets.values.get', 'spreadsheets.values.batchGet',
+    'spreadsheets.values.batchGetByDataFilter', 'spreadsheets.developerMetadata.get',
+    'spreadsheets.developerMetadata.search',
+})
+
+
+def operation_cost(method: str | None) -> tuple[str, float]:
+    '''
+        Return the bucket and the quota cost of an operation.
+
+        Args:
+            method (str | None): The method id of the request, e.g. `gmail.users.messages.get`.
+
+        Returns:
+            tuple[str, float]: The bucket, a key of `setting.QUOTA_LIMITS`, and the cost.
+
+        Example:
+        ```
+        operation_cost('gmail.users.messages.send')      # ('gmail', 100)
+        operation_cost('sheets.spreadsheets.values.get') # ('sheets.read', 1)
+        ```
+    '''
+    api, _, name = (method or '').partition('.')
+    if api == 'gmail':
+        return 'gmail', GMAIL_UNITS.get(name, GMAIL_DEFAULT_UNITS)
+    if api == 'sheets':
+        return ('sheets.read' if name in SHEETS_READS else 'sheets.write'), 1
+    return api or 'unknown', 1
+
+
+class QuotaTracker:
+    '''
+        Token buckets stored in a SQLite database, shared by every process using the same file.
+
+        Args:
+            path (Path | str): The database, created on first use.
+            limits (dict, optional): `{bucket: {'rate': per second, 'capacity': largest burst}}`.
+                Defaults to `setting.QUOTA_LIMITS`. Buckets missing from it are not limited.
+            account_buckets (Iterable[str], optional): Buckets kept per account. Defaults to
+                `setting.QUOTA_ACCOUNT_BUCKETS`.
+    '''
+
+    def __init__(self, path: Path | str, limits: dict[str, dict] | None = None,
+                 account_buckets: Iterable[str] | None = None) -> None:
+        self.path = Path(path)
+        self.limits = limits if limits is not None else setting.QUOTA_LIMITS
+        self.account_buckets = frozenset(account_buckets if account_buckets is not None
+                                         else setting.QUOTA_ACCOUNT_BUCKETS)
+        for bucket, limit in self.limits.items():
+            if limit['rate'] <= 0 or limit['capacity'] <= 0:
+                raise ValueError(f'rate and capacity of {bucket} must be positive.')
+        self.__local = threading.local()
+
+    def __connection(self) -> sqlite3.Connection:
+        '''
+            Return the connection of the calling thread. A forked process opens its own.
+        '''
+        pid, connection = getattr(self.__local, 'connection', (None, None))
+        if pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS buckets '
+                               '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self.__local.connection = os.getpid(), connection
+        return connection
+
+    def reserve(self, methods: Iterable[str | None], account: str | None = None) -> float:
+        '''
+            Take the cost of operations from their buckets, possibly ahead of time, and return how long to wait
+            before sending them.
+
+            Args:
+                methods (Iterable[str | None]): Method ids of the requests, e.g. the sub-requests of a batch.
+                account (str, optional): The account label (`metrics.account_label()`) sending them.
+
+            Returns:
+                float: Seconds to wait, 0 when the quota was available.
+        '''
+        costs: dict[str, float] = {}
+        for method in methods:
+            bucket, cost = operation_cost(method)
+            if bucket in self.limits:
+                costs[bucket] = costs.get(bucket, 0) + cost
+        if not costs:
+            return 0.0
+        connection = self.__connection()
+        wait = 0.0
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()  # the wall clock is shared by the processes, time.monotonic() is not
+            for bucket, cost in sorted(costs.items()):
+                limit = self.limits[bucket]
+                name = self.__name(bucket, account)
+                tokens = self.__tokens(connection, bucket, name, now) - cost
+                connection.execute('INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+                                   (name, tokens, now))
+                if tokens < 0:
+                    wait = max(wait, -tokens / limit['rate'])
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return wait
+
+    def acquire(self, methods: Iterable[str | None], account: str | None = None) -> float:
+        '''
+            Take the cost of operations, sleeping until it is available.
+
+            Returns:
+                float: Seconds waited.
+        '''
+        wait = self.reserve(methods, account)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def available(self, account: str | None = None) -> dict[str, float]:
+        '''
+            Return the tokens left in every bucket of the account, negative when reserved ahead of time.
+        '''
+        connection = self.__connection()
+        now = time.time()
+        return {bucket: round(self.__tokens(connection, bucket, self.__name(bucket, account), now), 3)
+                for bucket in self.limits}
+
+    def __name(self, bucket: str, account: str | None) -> str:
+        return f'{bucket}/{account}' if account and bucket in self.account_buckets else bucket
+
+    def __tokens(self, connection: sqlite3.Connection, bucket: str, name: str, now: float) -> float:
+        limit = self.limits[bucket]
+        row = connection.execute('SELECT tokens, updated FROM buckets WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return limit['capacity']
+        tokens, updated = row
+        return min(limit['capacity'], tokens + max(0.0, now - updated) * limit['rate'])
+
+
+_tracker: QuotaTracker | None = None
+_tracker_lock = threading.Lock()
+
+
+def shared_quota() -> QuotaTracker | None:
+    '''
+        Return the process-wide tracker of `setting.QUOTA_DB_PATH`, or None when it is not set.
+    '''
+    global _tracker
+    if not setting.QUOTA_DB_PATH:
+        return None
+    with _tracker_lock:
+        if _tracker is None or _tracker.path != Path(setting.QUOTA_DB_PATH):
+            _tracker = QuotaTracker(setting.QUOTA_DB_PATH)
+        return _tracker
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,91 @@
+'''
+    Client-side token bucket rate limiters sized to the Google API quotas.
+
+    Every request takes a token from the bucket of its API. Tokens refill at `rate` per second up to
+    `capacity`, so short bursts go through immediately while the long-term rate stays under the quota and
+    the API never has to answer 429. The quotas are per user, so every account has its own buckets, shared by
+    its clients in the process (`rate_limiter('gmail', account)`); their sizes come from `setting.RATE_LIMITS`.
+
+    Example:
+    ```
+    bucket = rate_limiter('sheets')
+    bucket.acquire()            # blocking, for threads
+    await asyncio.sleep(bucket.reserve())   # for coroutines
+    ```
+'''
+import threading
+import time
+from red_office_google_integration.src import setting
+
+
+class TokenBucket:
+    '''
+        Thread-safe token bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens, i.e. the largest burst.
+    '''
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        if rate <= 0 or capacity <= 0:
+            raise ValueError('rate and capacity must be positive.')
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        '''
+            Take tokens, possibly ahead of time, and return how long to wait before using them.
+
+            Args:
+                tokens (float, optional): Tokens to take, e.g. the quota cost of the request. Defaults to 1.
+
+            Returns:
+                float: Seconds to wait, 0 when the tokens were available.
+        '''
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= tokens
+            return 0.0 if self.__tokens >= 0 else -self.__tokens / self.rate
+
+    def acquire(self, tokens: float = 1) -> float:
+        '''
+            Take tokens, sleeping until they are available.
+
+            Returns:
+                float: Seconds waited.
+        '''
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_limiters: dict[tuple[str, str | None], TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(api: str, account: str | None = None) -> TokenBucket | None:
+    '''
+        Return the process-wide bucket of an API for an account, or None when the API is not rate limited.
+
+        Args:
+            api (str): `calendar`, `sheets` or `gmail`, the keys of `setting.RATE_LIMITS`.
+            account (str, optional): The account label (`metrics.account_label()`) of the client.
+    '''
+    with _limiters_lock:
+        if (api, account) not in _limiters:
+            limit = setting.RATE_LIMITS.get(api)
+            if limit is None:
+                return None
+            _limiters[(api, account)] = TokenBucket(limit['rate'], limit['capacity'])
+        return _limiters[(api, account)]
+
+
+if __name__ == '__main__':
+    pass
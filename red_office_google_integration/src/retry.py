@@ -0,0 +1,112 @@
+'''
+    Retry policy for Google API requests.
+
+    Rate limit responses (429 and rate limit 403s), server errors (5xx) and transport errors are retried with
+    exponential backoff and full jitter: the n-th retry waits a random time between 0 and
+    `min(max_delay, base_delay * 2**n)`. When the API sends a `Retry-After` header the wait is at least that.
+    Other errors, e.g. 404 or 412, are never retried.
+
+    Requests that are not idempotent (POST, PATCH: `values().append`, `events().insert`, `drafts().create`, ...)
+    may have been applied before a server error or a lost connection, so sending them again could duplicate
+    rows, events or drafts. They are only retried after rate limit responses, which are rejected unapplied.
+
+    Example:
+    ```
+    policy = RetryPolicy(max_retries=5)
+    for attempt in range(policy.max_retries + 1):
+        try:
+            return request.execute()
+        except Exception as e:
+            if not policy.should_retry(e, attempt, is_idempotent(request)):
+                raise
+            time.sleep(policy.delay(attempt, e))
+    ```
+'''
+import random
+from dataclasses import dataclass
+from typing import Any
+from googleapiclient.errors import HttpError
+from red_office_google_integration.src import setting
+from red_office_google_integration.src.exceptions import (RATE_LIMIT_REASONS, error_reason, is_transport_error,
+                                                          retry_after)
+
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# HTTP methods whose requests have the same effect when sent twice
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+def is_idempotent(request: Any) -> bool:
+    '''
+        Tell whether a request (`HttpRequest`) can be sent again without changing its effect.
+    '''
+    return str(getattr(request, 'method', 'GET')).upper() in IDEMPOTENT_METHODS
+
+
+def is_rate_limited(error: Exception) -> bool:
+    '''
+        Tell whether a request was rejected by a rate limit (429, or 403 with a rate limit reason).
+    '''
+    if not isinstance(error, HttpError):
+        return False
+    return error.resp.status == 429 or error.resp.status == 403 and error_reason(error) in RATE_LIMIT_REASONS
+
+
+def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+    '''
+        Tell whether a failed request may succeed when sent again.
+
+        Args:
+            error (Exception): The error raised for the request.
+            idempotent (bool, optional): Whether the request can be applied twice safely, see `is_idempotent()`.
+
+        Returns:
+            bool: True for rate limit responses; for idempotent requests also 5xx responses and transport errors.
+    '''
+    if is_rate_limited(error):
+        return True
+    if not idempotent:
+        return False
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUS_CODES
+    return is_transport_error(error)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    '''
+        How often and how long to wait before a failed request is sent again.
+
+        Args:
+            max_retries (int, optional): Retries after the first attempt. Defaults to 5.
+            base_delay (float, optional): Upper bound of the first wait in seconds. Defaults to 1.
+            max_delay (float, optional): Upper bound of any backoff wait in seconds. Defaults to 64.
+                A longer `Retry-After` is still honored.
+    '''
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 64.0
+
+    def should_retry(self, error: Exception, attempt: int, idempotent: bool = True) -> bool:
+        '''
+            Tell whether to retry after the failure of attempt number `attempt` (0 for the first) of a request,
+            idempotent or not.
+        '''
+        return attempt < self.max_retries and is_retryable(error, idempotent)
+
+    def delay(self, attempt: int, error: Exception | None = None) -> float:
+        '''
+            Return the seconds to wait before the retry following attempt number `attempt`.
+        '''
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if isinstance(error, HttpError):
+            return max(backoff, retry_after(error.resp) or 0.0)
+        return backoff
+
+
+# Policy used when none is given, set RETRY_MAX_RETRIES to 0 to turn retrying off
+DEFAULT_RETRY_POLICY = RetryPolicy(setting.RETRY_MAX_RETRIES, setting.RETRY_BASE_DELAY, setting.RETRY_MAX_DELAY)
+
+
+if __name__ == '__main__':
+    pass
@@ -1,6 +1,8 @@
 '''
     Contains Settings for this project
 '''
+import os
+import tempfile
 from pathlib import Path
 
 
@@ -12,9 +14,22 @@ DEFAULT_CREDENTIAL_FILE_NAME = 'credential.enc'
 
 # directory Path for storing encrypted credentials and token
 SECRET_DIRECTORY_PATH = BASE_DIR / 'google_service' / 'secrets'
+# Multi-account setups keep the credential and token files of account <id> in ACCOUNTS_DIRECTORY_PATH / <id>,
+# see google_service/client_pool.py
+ACCOUNTS_DIRECTORY_PATH = SECRET_DIRECTORY_PATH / 'accounts'
 
-# Directory path for storing log files
-LOG_DIRECTORY_PATH = BASE_DIR / 'log'
+# Directory path for storing log files and metrics summaries, override it with RED_OFFICE_LOG_DIR
+LOG_DIRECTORY_PATH = Path(os.environ.get('RED_OFFICE_LOG_DIR') or BASE_DIR / 'log')
+# The log file rotates at this size or age, whichever comes first, keeping LOG_BACKUP_COUNT old files
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_ROTATE_INTERVAL = 24 * 60 * 60   # seconds
+LOG_BACKUP_COUNT = 10
+# Records waiting to be written; when the disk cannot keep up further records are dropped, never waited for
+LOG_QUEUE_SIZE = 10000
+# Fraction of the records kept per level, e.g. {'DEBUG': 0.1}; WARNING and above are always kept
+LOG_SAMPLE_RATES = {'DEBUG': 1.0, 'INFO': 1.0}
+# Longer strings in a log record (e.g. request or response bodies) are truncated
+LOG_MAX_FIELD_LENGTH = 2000
 
 
 # Settings for Calander Events
@@ -22,6 +37,10 @@ LOG_DIRECTORY_PATH = BASE_DIR / 'log'
 SCOPE_CALENDAR = ["https://www.googleapis.com/auth/calendar.events"]
 FILE_NAME_CALENDAR_TOKEN = 'calendar_token.enc'
 FILE_NAME_CALENDAR_CREDENTIAL = DEFAULT_CREDENTIAL_FILE_NAME
+# File storing the nextSyncToken of every synced calendar
+CALENDAR_SYNC_TOKEN_PATH = BASE_DIR / 'calendar' / 'sync' / 'sync_tokens.json'
+# File name of the sync tokens of an account of a multi-account setup, in its directory of ACCOUNTS_DIRECTORY_PATH
+FILE_NAME_CALENDAR_SYNC_TOKENS = 'sync_tokens.json'
 
 
 # Sheets Setting
@@ -33,6 +52,90 @@ FILE_NAME_SPREADSHEETS_CREDENTIAL = DEFAULT_CREDENTIAL_FILE_NAME
 SCOPE_GMAIL = ["https://mail.google.com/"]
 FILE_NAME_GMAIL_TOKEN = 'gmail_token.enc'
 FILE_NAME_GMAIL_CREDENTIAL = DEFAULT_CREDENTIAL_FILE_NAME
+# Local full-text search index of fetched messages
+MAIL_SEARCH_INDEX_PATH = BASE_DIR / 'gmail' / 'index' / 'mail_index.sqlite3'
+
+# Async clients: requests in flight at the same time per client
+ASYNC_MAX_CONCURRENCY_CALENDAR = 100
+ASYNC_MAX_CONCURRENCY_SPREADSHEETS = 50
+ASYNC_MAX_CONCURRENCY_GMAIL = 50
+
+# Send the requests to this server instead of the Google APIs, e.g. 'http://127.0.0.1:8765/' for the fake API
+# of benchmarks/fake_google_api.py. None: the Google APIs.
+API_ENDPOINT = os.environ.get('RED_OFFICE_API_ENDPOINT') or None
+
+# Record the HTTP exchanges of the clients to this cassette, or answer them from it, see google_service/cassette.py.
+# None: neither. Mode 'record' or 'replay'; replay speed 1 waits the recorded latencies, 0 answers at once.
+HTTP_CASSETTE_PATH = os.environ.get('RED_OFFICE_CASSETTE') or None
+HTTP_CASSETTE_MODE = os.environ.get('RED_OFFICE_CASSETTE_MODE', 'replay')
+HTTP_CASSETTE_SPEED = float(os.environ.get('RED_OFFICE_CASSETTE_SPEED', '0'))
+
+# Retries of rate limited (429, rate limit 403), failed (5xx) and unsent requests, see src/retry.py
+RETRY_MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0   # seconds, doubled on every retry
+RETRY_MAX_DELAY = 64.0   # seconds
+
+# Client-side rate limits shared by the clients of an account in the process, see src/rate_limit.py
+# rate: requests per second, capacity: largest burst. Sized to the default per-user quotas:
+# Calendar 600 requests/minute, Sheets 60 read and 60 write requests/minute,
+# Gmail 250 quota units/second (messages.get costs 5 units).
+RATE_LIMITS = {
+    'calendar': {'rate': 10, 'capacity': 60},
+    'sheets': {'rate': 2, 'capacity': 60},
+    'gmail': {'rate': 50, 'capacity': 50},
+}
+
+# Quota shared by the processes of the machine, see src/quota.py. When set, the clients reserve the quota cost of
+# every request in this SQLite database instead of using the per-process RATE_LIMITS. None: per process.
+QUOTA_DB_PATH = os.environ.get('RED_OFFICE_QUOTA_DB') or None
+# Buckets of the shared quota, per project: Sheets 300 read and 300 write requests/minute, Gmail 250 quota
+# units/second per user, Calendar 600 queries/minute per user.
+QUOTA_LIMITS = {
+    'sheets.read': {'rate': 5, 'capacity': 50},
+    'sheets.write': {'rate': 5, 'capacity': 50},
+    'gmail': {'rate': 250, 'capacity': 250},
+    'calendar': {'rate': 10, 'capacity': 60},
+}
+# Buckets of per-user quotas, kept per account; the others are shared by all the accounts of the project
+QUOTA_ACCOUNT_BUCKETS = ('gmail', 'calendar')
+
+# Concurrent identical calls of the read methods (get_data, get_event, get_email, ...) share one request, see
+# src/singleflight.py.
+SINGLE_FLIGHT_ENABLED = True
+
+# Bytes read at a time from streamed list responses (`--stream`), see src/json_stream.py.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Request metrics, see src/metrics.py. The daemon and `main.py batch` write a cumulative JSONL summary every
+# METRICS_SUMMARY_INTERVAL seconds and the Prometheus text file next to the log.
+METRICS_ENABLED = True
+METRICS_SUMMARY_INTERVAL = 60   # seconds
+METRICS_SUMMARY_PATH = LOG_DIRECTORY_PATH / 'metrics.jsonl'
+METRICS_PROMETHEUS_PATH = LOG_DIRECTORY_PATH / 'metrics.prom'
+
+# Tracing of the credential, service build, request and output phases, see src/tracing.py.
+# Spans are appended as JSON lines to TRACE_FILE_PATH when set, and sent to the OpenTelemetry tracer provider
+# when TRACE_OPENTELEMETRY is on. `main.py --trace ...` prints the breakdown of one command.
+TRACE_FILE_PATH = os.environ.get('RED_OFFICE_TRACE_FILE') or None
+TRACE_OPENTELEMETRY = os.environ.get('RED_OFFICE_TRACE_OTEL', '') == '1'
+
+# Multi-account client pool, see google_service/client_pool.py: at most CLIENT_POOL_SIZE clients are kept, the
+# least recently used is dropped. Tokens expiring within TOKEN_REFRESH_MARGIN seconds are refreshed when their
+# client is taken from the pool.
+CLIENT_POOL_SIZE = 256
+TOKEN_REFRESH_MARGIN = 300
+
+# `main.py batch`: operations running at the same time
+BATCH_CONCURRENCY = 8
+
+# Local daemon keeping authenticated clients warm between CLI calls, see src/daemon.py
+# `main.py` forwards its commands to the daemon when it is running, unless RED_OFFICE_NO_DAEMON=1 is set.
+# The socket is in a directory only its user may access: $XDG_RUNTIME_DIR, or a mode 0700 directory of the temp dir.
+DAEMON_SOCKET_PATH = Path(os.environ.get('RED_OFFICE_DAEMON_SOCKET') or (
+    Path(os.environ['XDG_RUNTIME_DIR']) / 'red_office_google_integration.sock' if os.environ.get('XDG_RUNTIME_DIR')
+    else Path(tempfile.gettempdir()) / f'red_office_google_integration-{getattr(os, "getuid", lambda: 0)()}'
+    / 'daemon.sock'))
+DAEMON_CONNECT_TIMEOUT = 0.5   # seconds to wait for the daemon before running the command in-process
 
 if __name__ == '__main__':
     # print(type(LOG_DIRECTORY_PATH))
@@ -0,0 +1,208 @@
+'''
+    Single-flight deduplication of concurrent identical reads.
+
+    When several threads (or coroutines) call the same read method with the same arguments at the same time,
+    e.g. every panel of a dashboard refreshing `SpreadSheet.get_data(spreadsheetId, 'A1:Z100')`, only the first
+    call sends a request. The others wait for it and get its result, or its error. Calls made after it
+    finished send a new request: nothing is cached.
+
+    Calls are identified by the method, the client instance and the arguments bound to the signature, with
+    defaults applied, so `get_event('primary', 'e1')` and `get_event(calendarId='primary', eventId='e1')`
+    share a request. A `key` function replaces that normalization, e.g. to ignore the case of a range:
+
+    ```
+    @handle_exception
+    @single_flight(key=lambda self, spreadsheetId, range, **kwargs: (spreadsheetId, range.upper()))
+    def get_data(self, spreadsheetId, range, **kwargs):
+        ...
+    ```
+
+    Followers get a deep copy of the result, so a caller changing it does not change what the others see.
+    `setting.SINGLE_FLIGHT_ENABLED = False` turns the deduplication off.
+'''
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Hashable
+from red_office_google_integration.src import setting
+
+
+def _freeze(value: Any) -> Hashable:
+    '''
+        Return a hashable form of an argument, dicts and lists included.
+    '''
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(v) for v in value))
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def default_key(signature: inspect.Signature, args: tuple, kwargs: dict) -> Hashable:
+    '''
+        Key of a call: its arguments bound to the signature with defaults applied, the instance by identity.
+    '''
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    key = []
+    for position, (name, value) in enumerate(bound.arguments.items()):
+        if position == 0 and name == 'self':
+            value = id(value)
+        key.append((name, _freeze(value)))
+    return tuple(key)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    '''
+        Group of in-flight calls, keyed by any hashable value.
+
+        Args:
+            copy_result (bool, optional): Give followers a deep copy of the result. Defaults to True.
+
+        Example:
+        ```
+        group = SingleFlight()
+        data = group.do(('sheet', 'A1:B2'), spreadsheet.get_data, 'sheet', 'A1:B2')
+        data = await group.do_async(('primary', 'e1'), event.get_event, 'primary', 'e1')
+        ```
+    '''
+
+    def __init__(self, copy_result: bool = True) -> None:
+        self.copy_result = copy_result
+        self.shared = 0  # calls answered by another call's request
+        self.__calls: dict[Hashable, _Call] = {}
+        self.__futures: dict[tuple[int, Hashable], asyncio.Future] = {}
+        self.__lock = threading.Lock()
+
+    def __follow(self, result: Any) -> Any:
+        return copy.deepcopy(result) if self.copy_result else result
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        '''
+            Call `func`, or wait for the call of the same key already in flight on another thread.
+
+            Returns:
+                Any: The result of the call.
+        '''
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return self.__follow(call.result)
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        '''
+            Await `func`, or the call of the same key already in flight in the same event loop.
+
+            Returns:
+                Any: The result of the call.
+        '''
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        future = self.__futures.get(loop_key)
+        if future is not None:
+            self.shared += 1
+            # a cancelled follower must not cancel the call of the others
+            return self.__follow(await asyncio.shield(future))
+        future = self.__futures[loop_key] = loop.create_future()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            # retrieved here so that a call without followers does not log "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.__futures[loop_key]
+
+
+def single_flight(key: Callable[..., Hashable] | None = None, group: SingleFlight | None = None):
+    '''
+        Decorator deduplicating concurrent identical calls of a function or coroutine function.
+
+        Args:
+            key (Callable, optional): Called with the arguments of the call, returns its key. Defaults to the
+                arguments bound to the signature (`default_key()`). Keys are also qualified by the function.
+            group (SingleFlight, optional): Group of the calls. Defaults to one per decorated function.
+
+        Usage:
+        ```
+        @handle_exception
+        @single_flight()
+        def get_event(self, calendarId, eventId, **kwargs):
+            ...
+        ```
+    '''
+    def decorator(func: Callable[..., Any]):
+        calls = group if group is not None else SingleFlight()
+        signature = inspect.signature(func)
+        name = func.__qualname__
+
+        def call_key(args: tuple, kwargs: dict) -> Hashable:
+            if key is None:
+                return name, default_key(signature, args, kwargs)
+            # bound to the instance like the default key, so clients do not share requests
+            instance = id(args[0]) if args and 'self' in signature.parameters else None
+            return name, instance, key(*args, **kwargs)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def coroutine_wrapper(*args, **kwargs):
+                if not setting.SINGLE_FLIGHT_ENABLED:
+                    return await func(*args, **kwargs)
+                return await calls.do_async(call_key(args, kwargs), func, *args, **kwargs)
+
+            coroutine_wrapper.single_flight = calls
+            return coroutine_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not setting.SINGLE_FLIGHT_ENABLED:
+                return func(*args, **kwargs)
+            return calls.do(call_key(args, kwargs), func, *args, **kwargs)
+
+        wrapper.single_flight = calls
+        return wrapper
+
+    return decorator
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,336 @@
+'''
+    Tracing of the phases of a call: credentials, service build, requests and output.
+
+    A slow CLI call may spend its time decrypting the credentials, refreshing the token, building the discovery
+    service, waiting for the API or writing the output. The package opens a span around each of these phases:
+
+    - `client.build`: building a client in `get_client()`, containing
+        - `credentials.load`, `credentials.decrypt` and `credentials.refresh` (`GoogleCredentialService`),
+        - `service.build`: `discovery.build()`,
+    - `request.execute`: sending a request with its retries, containing one `http.attempt` per attempt and the
+      `response.parse` of the answer,
+    - `output.write`: printing or saving the result in the CLI.
+
+    Spans started while another one is open are its children; the current span follows threads that were
+    started from it only through `contextvars` (asyncio tasks do, plain threads do not).
+
+    Finished spans are handed to the exporters added with `add_exporter()`. When there is none, `span()` does
+    nothing and costs a context variable lookup.
+
+    - `FileSpanExporter` appends the spans as JSON lines (`setting.TRACE_FILE_PATH`, `RED_OFFICE_TRACE_FILE`).
+    - `OpenTelemetryExporter` forwards them to the configured OpenTelemetry tracer provider
+      (`setting.TRACE_OPENTELEMETRY`, `RED_OFFICE_TRACE_OTEL=1`, needs `pip install opentelemetry-api`).
+    - `TimingCollector` keeps them in memory; `py main.py --trace ...` uses it to print a timing breakdown.
+
+    Example:
+    ```
+    collector = add_exporter(TimingCollector())
+    with span('cli.command', command='calendar event get'):
+        ...
+    print(collector.breakdown())
+    ```
+'''
+import functools
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator
+from red_office_google_integration.src import setting
+
+
+class Span:
+    '''
+        One timed phase. Ids are hexadecimal like the OpenTelemetry ones (16 bytes trace, 8 bytes span).
+
+        Attributes:
+            name (str): The phase, e.g. `request.execute`.
+            trace_id (str): Shared by all the spans of a trace.
+            span_id (str): Identifies the span.
+            parent_id (str | None): The span this one was started in.
+            start_ns (int): Start, nanoseconds since the epoch.
+            end_ns (int | None): End, once finished.
+            attributes (dict): Details, e.g. `{'api': 'calendar'}`.
+            error (str | None): The class of the exception that ended the span, if any. The HTTP status of
+                API errors is added to the attributes.
+    '''
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error',
+                 '_started')
+
+    def __init__(self, name: str, parent: 'Span | None', attributes: dict) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        self._started = time.perf_counter_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        '''
+            Duration of the span in milliseconds, 0 while it is open.
+        '''
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns is not None else 0.0
+
+    def set(self, **attributes: Any) -> None:
+        '''
+            Add attributes, e.g. the status of the response once known.
+        '''
+        self.attributes.update(attributes)
+
+    def _finish(self) -> None:
+        # the end is measured with the monotonic clock, the start is kept in wall time for the exporters
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._started
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'trace_id': self.trace_id, 'span_id': self.span_id,
+                'parent_id': self.parent_id, 'start_ns': self.start_ns, 'end_ns': self.end_ns,
+                'duration_ms': round(self.duration_ms, 3), 'attributes': self.attributes, 'error': self.error}
+
+
+class SpanExporter(ABC):
+    '''
+        Receives the spans. `on_start()` is called when a span opens, `export()` once it is finished.
+        Both are called on the thread running the span and must not raise.
+    '''
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        pass
+
+
+_current: ContextVar[Span | None] = ContextVar('red_office_span', default=None)
+_exporters: list[SpanExporter] = []
+_exporters_lock = threading.Lock()
+
+
+def add_exporter(exporter: SpanExporter) -> SpanExporter:
+    '''
+        Start sending the spans to `exporter`. Returns it.
+    '''
+    with _exporters_lock:
+        _exporters.append(exporter)
+    return exporter
+
+
+def remove_exporter(exporter: SpanExporter) -> None:
+    '''
+        Stop sending the spans to `exporter`.
+    '''
+    with _exporters_lock:
+        if exporter in _exporters:
+            _exporters.remove(exporter)
+
+
+def current_span() -> Span | None:
+    '''
+        Return the innermost open span of the calling context.
+    '''
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    '''
+        Time the block as a span, child of the current one.
+
+        Args:
+            name (str): The phase, e.g. `service.build`.
+            attributes: Details of the span. Never pass secrets, they are exported as they are.
+
+        Yields:
+            Span | None: The span, to add attributes to, or None when tracing is off.
+
+        Example:
+        ```
+        with span('service.build', api='calendar'):
+            service = build('calendar', 'v3', credentials=cred)
+        ```
+    '''
+    exporters = _exporters
+    if not exporters:
+        yield None
+        return
+    current = Span(name, _current.get(), attributes)
+    for exporter in list(exporters):
+        exporter.on_start(current)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        # errors of the API carry their response
+        status = getattr(getattr(e, 'resp', None), 'status', None)
+        if status is not None:
+            current.attributes.setdefault('status', status)
+        raise
+    finally:
+        _current.reset(token)
+        current._finish()
+        for exporter in list(exporters):
+            exporter.export(current)
+
+
+def traced(name: str, **attributes: Any):
+    '''
+        Decorator running the function in a span.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class FileSpanExporter(SpanExporter):
+    '''
+        Append the finished spans to a file as JSON lines.
+
+        Args:
+            path (Path | str): The file, created with its directory if needed.
+    '''
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.__lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + '\n'
+        with self.__lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class OpenTelemetryExporter(SpanExporter):
+    '''
+        Mirror the spans as OpenTelemetry spans of the global tracer provider, keeping their nesting and timing.
+
+        The provider and its exporters (OTLP, Jaeger, console, ...) are configured by the application with the
+        OpenTelemetry SDK. `opentelemetry-api` is an optional dependency: `pip install opentelemetry-api`.
+
+        Args:
+            tracer_name (str, optional): Name of the instrumentation. Defaults to the package name.
+
+        Raises:
+            ImportError: When OpenTelemetry is not installed.
+    '''
+
+    def __init__(self, tracer_name: str = 'red_office_google_integration') -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError('The OpenTelemetry exporter needs opentelemetry-api, '
+                              'install it with `pip install opentelemetry-api`.')
+        self.__trace = trace
+        self.__tracer = trace.get_tracer(tracer_name)
+        self.__spans: dict[str, Any] = {}
+        self.__lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        with self.__lock:
+            parent = self.__spans.get(span.parent_id) if span.parent_id else None
+        context = self.__trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self.__tracer.start_span(span.name, context=context, start_time=span.start_ns,
+                                             attributes=_otel_attributes(span.attributes))
+        with self.__lock:
+            self.__spans[span.span_id] = otel_span
+
+    def export(self, span: Span) -> None:
+        with self.__lock:
+            otel_span = self.__spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes(_otel_attributes(span.attributes))
+        if span.error is not None:
+            otel_span.set_status(self.__trace.Status(self.__trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=span.end_ns)
+
+
+def _otel_attributes(attributes: dict) -> dict:
+    # OpenTelemetry attributes are strings, booleans and numbers
+    return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+            for key, value in attributes.items() if value is not None}
+
+
+class TimingCollector(SpanExporter):
+    '''
+        Keep the finished spans in memory and describe where the time went.
+    '''
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self.__lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self.__lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> str:
+        '''
+            Return the spans as an indented tree with their durations and share of the root span.
+
+            Example:
+            ```
+            cli.command command=spreadsheet get-data       1412.3 ms  100.0%
+              client.build class=SpreadSheet                 905.8 ms   64.1%
+                credentials.load                              402.2 ms   28.5%
+            ```
+        '''
+        with self.__lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        ids = {s.span_id for s in spans}
+        children: dict[str | None, list[Span]] = {}
+        for s in spans:
+            # a span whose parent was not collected is shown as a root
+            children.setdefault(s.parent_id if s.parent_id in ids else None, []).append(s)
+        rows: list[tuple[str, Span, float]] = []
+
+        def walk(parent_id: str | None, depth: int, total: float) -> None:
+            for s in children.get(parent_id, []):
+                total_ms = total or s.duration_ms
+                details = ' '.join(f'{k}={v}' for k, v in s.attributes.items() if v is not None)
+                label = '  ' * depth + s.name + (f' {details}' if details else '')
+                if s.error:
+                    label += f' !{s.error}'
+                rows.append((label, s, total_ms))
+                walk(s.span_id, depth + 1, total_ms)
+
+        walk(None, 0, 0.0)
+        if not rows:
+            return 'No spans recorded.'
+        width = min(max(len(label) for label, _, _ in rows), 100)
+        return '\n'.join(
+            f'{label[:width]:<{width}} {s.duration_ms:>10.1f} ms {100 * s.duration_ms / total:>6.1f}%'
+            if total else f'{label[:width]:<{width}} {s.duration_ms:>10.1f} ms'
+            for label, s, total in rows)
+
+
+def _configure() -> None:
+    '''
+        Add the exporters enabled in `setting`.
+    '''
+    if setting.TRACE_FILE_PATH:
+        add_exporter(FileSpanExporter(setting.TRACE_FILE_PATH))
+    if setting.TRACE_OPENTELEMETRY:
+        add_exporter(OpenTelemetryExporter())
+
+
+_configure()
+
+
+if __name__ == '__main__':
+    pass
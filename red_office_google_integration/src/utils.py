@@ -1,26 +1,47 @@
 import sys
+import inspect
 from googleapiclient.errors import HttpError
 from red_office_google_integration.log.log_handler import logger
+from red_office_google_integration.src.exceptions import as_typed_error
 import json
 from typing import Callable, Any
 '''
 NOTE: change exception handler documentation
 '''
 
+# In CLI mode (turned on by main.py) errors are printed as JSON and the process exits with status 1.
+# Otherwise, when the package is used as a library, they are logged and raised as typed exceptions.
+_cli_mode = False
+
+
+def set_cli_mode(enabled: bool = True) -> None:
+    '''
+    Choose how `handle_exception` reports errors: print and exit (CLI) or raise typed exceptions (library).
+
+    Parameters:
+        enabled (bool): True for the CLI behaviour. Defaults to True.
+    '''
+    global _cli_mode
+    _cli_mode = enabled
+
 
 def handle_exception(func: Callable[..., Any]):
     '''
     Decorator function for exception handling.
 
     This decorator function is used for exception handling in various modules of the project.
-    It catches specific exceptions, logs them using the project's logger, prints the error message (in dict format),
-    and exits the program with a status code of 1.
+    It catches specific exceptions and logs them using the project's logger. In CLI mode (see `set_cli_mode()`)
+    it then prints the error message (in dict format) and exits the program with a status code of 1.
+    Otherwise the error is raised again, `HttpError` as the matching typed exception of `src/exceptions.py`
+    (e.g. `NotFoundError`), so long-running programs can handle it.
 
     Parameters:
         func (function): The function to be decorated.
 
     Returns:
         wrapper (function): The wrapped function with exception handling logic.
+            Generator functions are wrapped so that exceptions raised while iterating are handled too,
+            coroutine functions and async generators so that exceptions raised while awaiting are.
 
     Exceptions Handled:
         - HttpError: Handles Google API HTTP errors, extracting relevant information such as status code and message.
@@ -44,37 +65,104 @@ def handle_exception(func: Callable[..., Any]):
         pass
     ```
     '''
+    if inspect.iscoroutinefunction(func):
+        async def coroutine_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                _raise_error(e, func)
+
+        return coroutine_wrapper
+
+    if inspect.isasyncgenfunction(func):
+        async def async_generator_wrapper(*args, **kwargs):
+            try:
+                async for item in func(*args, **kwargs):
+                    yield item
+            except Exception as e:
+                _raise_error(e, func)
+
+        return async_generator_wrapper
+
+    if inspect.isgeneratorfunction(func):
+        def generator_wrapper(*args, **kwargs):
+            try:
+                yield from func(*args, **kwargs)
+            except Exception as e:
+                _raise_error(e, func)
+
+        return generator_wrapper
+
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except HttpError as e:
-            error_message = {
-                'status': type(e).__name__,
-                'status_code': e.resp.status,
-                'message': e._get_reason(),
-                'function_name': func.__name__
-            }
-        # except (InvalidJsonError, TypeError, FileNotFoundError, FileExistsError, InvalidToken) as e:
-        #     error_message = {
-        #         'status': type(e).__name__,
-        #         'message': str(e),
-        #         'function_name': func.__name__
-        #     }
         except Exception as e:
-            error_message = {
-                'status': type(e).__name__,
-                'message': str(e),
-                'function_name': func.__name__
-            }
-
-        logger.error(error_message)
-        print(json.dumps(error_message))
-        sys.exit(1)
+            _raise_error(e, func)
 
     return wrapper
 
 
+def _raise_error(e: Exception, func: Callable[..., Any]):
+    '''
+    Handle the error raised by `func`: exit in CLI mode, otherwise log it once and raise its typed counterpart.
+    Must be called while `e` is being handled.
+
+    Parameters:
+        e (Exception): The exception raised.
+        func (function): The decorated function that raised it.
+    '''
+    if _cli_mode:
+        _exit_with_error(e, func)
+        return
+    typed = as_typed_error(e)
+    # nested decorated calls see the same error; log it where it was raised only
+    if not getattr(e, '_reported', False):
+        logger.error(_error_message(typed, func))
+    for error in (e, typed):
+        try:
+            error._reported = True
+        except AttributeError:
+            pass
+    if typed is e:
+        raise
+    raise typed from e
+
+
+def _error_message(e: Exception, func: Callable[..., Any]) -> dict:
+    '''
+    Describe an error as logged and printed by `handle_exception`.
+    '''
+    if isinstance(e, HttpError):
+        return {
+            'status': type(e).__name__,
+            'status_code': e.resp.status,
+            'message': e._get_reason(),
+            'function_name': func.__name__
+        }
+    return {
+        'status': type(e).__name__,
+        'message': str(e),
+        'function_name': func.__name__
+    }
+
+
+def _exit_with_error(e: Exception, func: Callable[..., Any]):
+    '''
+    Log and print the error raised by `func` and exit the program with a status code of 1.
+
+    Parameters:
+        e (Exception): The exception raised.
+        func (function): The decorated function that raised it.
+    '''
+    error_message = _error_message(e, func)
+    logger.error(error_message)
+    print(json.dumps(error_message))
+    sys.exit(1)
+
+
 if __name__ == '__main__':
+    set_cli_mode()
+
     @handle_exception
     def test():
         raise FileNotFoundError('blah blah')
@@ -0,0 +1,9 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# the tests write their log and metrics files to a throw-away directory instead of the package's log/
+if not os.environ.get('RED_OFFICE_LOG_DIR'):
+    os.environ['RED_OFFICE_LOG_DIR'] = tempfile.mkdtemp(prefix='red_office_tests_')
+    atexit.register(shutil.rmtree, os.environ['RED_OFFICE_LOG_DIR'], ignore_errors=True)
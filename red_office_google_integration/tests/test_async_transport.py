@@ -0,0 +1,81 @@
+import asyncio
+import json
+import unittest
+from googleapiclient.errors import HttpError
+from red_office_google_integration.google_service.async_transport import (AsyncTransport, build_request_service,
+                                                                          httpx)
+
+
+class FakeCredentials:
+    def __init__(self):
+        self.token = 'expired'
+        self.valid = False
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f'token-{self.refreshes}'
+        self.valid = True
+
+    def apply(self, headers):
+        headers['authorization'] = f'Bearer {self.token}'
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class TestAsyncTransport(unittest.TestCase):
+    '''
+    # TestAsyncTransport
+    `Unit tests for executing discovery requests on an asyncio event loop.`
+    '''
+
+    def setUp(self):
+        self.service = build_request_service('calendar', 'v3')
+        self.credentials = FakeCredentials()
+
+    def run_requests(self, handler, count, max_concurrency=5):
+        async def main():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            transport = AsyncTransport(self.credentials, max_concurrency, client=client)
+            try:
+                return await asyncio.gather(*(transport.execute(self.service.events().get(
+                    calendarId='primary', eventId=f'e{i}')) for i in range(count)))
+            finally:
+                await client.aclose()
+        return asyncio.run(main())
+
+    def test_concurrency_is_bounded_and_token_refreshed_once(self):
+        active, peak = [0], [0]
+
+        async def handler(request):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            self.assertEqual(request.headers['authorization'], 'Bearer token-1')
+            return httpx.Response(200, json={'id': request.url.path.rsplit('/', 1)[-1]})
+
+        results = self.run_requests(handler, 40, max_concurrency=5)
+        self.assertEqual([r['id'] for r in results], [f'e{i}' for i in range(40)])
+        self.assertLessEqual(peak[0], 5)
+        self.assertEqual(self.credentials.refreshes, 1)
+
+    def test_errors_raise_http_error(self):
+        def handler(request):
+            return httpx.Response(404, content=json.dumps({'error': {'code': 404, 'message': 'Not Found'}}))
+
+        with self.assertRaises(HttpError) as raised:
+            self.run_requests(handler, 1)
+        self.assertEqual(raised.exception.resp.status, 404)
+
+    def test_unauthorized_refreshes_and_retries(self):
+        def handler(request):
+            if request.headers['authorization'] == 'Bearer token-1':
+                return httpx.Response(401, json={'error': {'code': 401, 'message': 'Invalid Credentials'}})
+            return httpx.Response(200, json={'id': 'e0'})
+
+        self.assertEqual(self.run_requests(handler, 1)[0]['id'], 'e0')
+        self.assertEqual(self.credentials.refreshes, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import httplib2
+from googleapiclient.errors import HttpError
+from red_office_google_integration.google_service.batch import BatchExecutor
+from red_office_google_integration.src.retry import is_retryable
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'{"error": {"message": "failed"}}')
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        self.service.batches.append([request for _, request in self.requests])
+        for request_id, request in self.requests:
+            failures = self.service.failures.get(request, [])
+            if failures:
+                self.callback(request_id, None, http_error(failures.pop(0)))
+            else:
+                self.callback(request_id, {'id': request}, None)
+
+
+class FakeService:
+    def __init__(self, failures):
+        self.failures = failures
+        self.batches = []
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+class TestBatchExecutor(unittest.TestCase):
+    '''
+    # TestBatchExecutor
+    `Unit tests for batched execution with per sub-request retries.`
+    '''
+
+    def test_only_failed_requests_are_retried(self):
+        service = FakeService({'b': [503], 'c': [404]})
+        executor = BatchExecutor(service, batch_size=3, backoff=0)
+        results = list(executor.run((r, r) for r in 'abcd'))
+
+        self.assertEqual([r['tag'] for r in results], ['a', 'b', 'c', 'd'])
+        self.assertEqual([r['status'] for r in results], ['success', 'success', 'error', 'success'])
+        self.assertEqual(results[2]['error']['status_code'], 404)
+        self.assertEqual(service.batches, [['a', 'b', 'c'], ['b'], ['d']])
+
+    def test_retries_are_bounded(self):
+        service = FakeService({'a': [500, 500, 500]})
+        results = list(BatchExecutor(service, max_retries=2, backoff=0).run([('a', 'a')]))
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertEqual(len(service.batches), 3)
+
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(http_error(429)))
+        self.assertTrue(is_retryable(http_error(503)))
+        self.assertFalse(is_retryable(http_error(400)))
+        self.assertFalse(is_retryable(ValueError('bad')))
+
+
+if __name__ == '__main__':
+    unittest.main()
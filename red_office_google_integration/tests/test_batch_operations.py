@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+import unittest
+import httplib2
+from red_office_google_integration.CLI_handler.batch.operations import OPERATIONS, operation, run_batch
+from red_office_google_integration.src.exceptions import NotFoundError
+
+
+class FakeClient:
+    built = []
+
+    def __init__(self, key):
+        FakeClient.built.append(key)
+
+
+@operation('test.sleep', FakeClient)
+def _sleep(client, payload):
+    time.sleep(payload.get('seconds', 0))
+    if payload.get('missing'):
+        raise NotFoundError(httplib2.Response({'status': 404}), b'{"error": {"message": "Not Found"}}')
+    return {'value': payload['value'], 'client': id(client)}
+
+
+def line(value, seconds=0, key='k', **extra):
+    return json.dumps({'command': 'test.sleep', 'payload': {'key': key, 'value': value, 'seconds': seconds, **extra}})
+
+
+class TestBatchOperations(unittest.TestCase):
+    '''
+    # TestBatchOperations
+    `Unit tests for running a JSONL stream of operations with shared clients.`
+    '''
+
+    def setUp(self):
+        FakeClient.built = []
+
+    @classmethod
+    def tearDownClass(cls):
+        del OPERATIONS['test.sleep']
+
+    def test_runs_all_operations_with_shared_clients(self):
+        lines = [line(i, key='a' if i % 2 else 'b') for i in range(20)]
+        results = list(run_batch(lines, concurrency=4, ordered=True))
+        self.assertEqual([r['index'] for r in results], list(range(20)))
+        self.assertEqual([r['result']['value'] for r in results], list(range(20)))
+        self.assertTrue(all(r['status'] == 'Success' for r in results))
+        self.assertEqual(sorted(FakeClient.built), [b'a', b'b'])
+
+    def test_unordered_results_come_as_they_finish(self):
+        results = list(run_batch([line('slow', 0.3), line('fast')], concurrency=2))
+        self.assertEqual([r['result']['value'] for r in results], ['fast', 'slow'])
+        results = list(run_batch([line('slow', 0.3), line('fast')], concurrency=2, ordered=True))
+        self.assertEqual([r['result']['value'] for r in results], ['slow', 'fast'])
+
+    def test_errors_do_not_stop_the_batch(self):
+        lines = ['not json', '', json.dumps({'command': 'unknown', 'payload': {'key': 'k'}}),
+                 json.dumps({'command': 'test.sleep', 'payload': {}}), line(1, missing=True),
+                 json.dumps({'command': 'test.sleep', 'payload': {'key': 'k', 'value': 2}, 'id': 'last'})]
+        results = list(run_batch(lines, ordered=True))
+        self.assertEqual([r['status'] for r in results], ['Error'] * 4 + ['Success'])
+        self.assertEqual(results[3]['error']['status'], 'NotFoundError')
+        self.assertEqual(results[4]['id'], 'last')
+        self.assertIn('Unknown command', results[1]['error']['message'])
+
+    def test_reads_ahead_only_a_window(self):
+        read = []
+        release = threading.Event()
+
+        @operation('test.wait', FakeClient)
+        def _wait(client, payload):
+            release.wait(5)
+
+        def lines():
+            for i in range(1000):
+                read.append(i)
+                yield json.dumps({'command': 'test.wait', 'payload': {'key': 'k'}})
+
+        try:
+            results = run_batch(lines(), concurrency=2)
+            threading.Timer(0.2, release.set).start()
+            next(results)
+            self.assertLessEqual(len(read), 10)
+            self.assertEqual(len(list(results)), 999)
+        finally:
+            del OPERATIONS['test.wait']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import json
+import tempfile
+import pathlib
+import unittest
+from unittest.mock import patch
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+from red_office_google_integration.calendar.events.events import CalendarEvent
+from red_office_google_integration.calendar.events.sync_store import SyncTokenStore
+from red_office_google_integration.calendar.events.cache import EventCache
+
+
+class _StaticHttp:
+    def __init__(self, http):
+        self.http = http
+
+    def get(self):
+        return self.http
+
+
+def make_calendar(responses, sync_store, **kwargs):
+    '''
+    Build a CalendarEvent whose requests are answered by `responses` instead of Google.
+    '''
+    http = HttpMockSequence([({'status': str(status)}, body if isinstance(body, str) else json.dumps(body))
+                             for status, body in responses])
+
+    def build_service(self):
+        self._CalendarEvent__http = _StaticHttp(http)
+        return build('calendar', 'v3', http=http)
+
+    with patch.object(CalendarEvent, '_CalendarEvent__build_service', build_service):
+        event = CalendarEvent(b'key', sync_store=sync_store, **kwargs)
+    return event, http
+
+
+class TestCalendarSync(unittest.TestCase):
+    '''
+    # TestCalendarSync
+    `Unit tests for paging and syncToken based incremental sync of calendar events.`
+    '''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SyncTokenStore(pathlib.Path(self.directory.name) / 'tokens.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_iter_events_follows_pages(self):
+        event, _ = make_calendar([
+            (200, {'items': [{'id': '1'}], 'nextPageToken': 'p2'}),
+            (200, {'items': [{'id': '2'}, {'id': '3'}]}),
+        ], self.store)
+        self.assertEqual([e['id'] for e in event.iter_events('primary')], ['1', '2', '3'])
+
+    def test_sync_is_incremental(self):
+        event, http = make_calendar([
+            (200, {'items': [{'id': '1'}], 'nextSyncToken': 's1'}),
+            (200, {'items': [{'id': '1', 'status': 'cancelled'}, {'id': '2'}], 'nextSyncToken': 's2'}),
+        ], self.store)
+        first = event.sync_events('primary', {'timeMin': '2024-01-01T00:00:00Z'})
+        self.assertTrue(first['full_sync'])
+        self.assertEqual(self.store.get('primary'), 's1')
+
+        second = event.sync_events('primary', {'timeMin': '2024-01-01T00:00:00Z'})
+        self.assertFalse(second['full_sync'])
+        self.assertEqual(second['deleted'], ['1'])
+        self.assertEqual([e['id'] for e in second['changed']], ['2'])
+        self.assertEqual(self.store.get('primary'), 's2')
+
+    def test_expired_token_triggers_full_sync(self):
+        self.store.set('primary', 'expired')
+        event, _ = make_calendar([
+            (410, {'error': {'code': 410, 'message': 'Sync token is no longer valid'}}),
+            (200, {'items': [{'id': '1'}], 'nextSyncToken': 'fresh'}),
+        ], self.store)
+        result = event.sync_events('primary')
+        self.assertTrue(result['full_sync'])
+        self.assertEqual(self.store.get('primary'), 'fresh')
+
+
+class TestEventCache(unittest.TestCase):
+    '''
+    # TestEventCache
+    `Unit tests for ETag based conditional reads of cached events.`
+    '''
+
+    def test_not_modified_serves_cached_copy(self):
+        cache = EventCache()
+        stored = {'id': 'e1', 'etag': '"1"', 'summary': 'Planning'}
+        event, _ = make_calendar([
+            (200, stored),
+            (304, ''),
+            (200, {'id': 'e1', 'etag': '"2"', 'summary': 'Planning v2'}),
+        ], SyncTokenStore('unused.json'), event_cache=cache)
+
+        self.assertEqual(event.get_event('primary', 'e1'), stored)
+        self.assertEqual(event.get_event('primary', 'e1'), stored)
+        self.assertEqual(event.get_event('primary', 'e1')['summary'], 'Planning v2')
+        self.assertEqual(cache.etag('primary', 'e1'), '"2"')
+
+    def test_cancelled_and_untagged_events_are_not_cached(self):
+        cache = EventCache()
+        cache.put('primary', {'id': 'e1', 'etag': '"1"', 'status': 'cancelled'})
+        cache.put('primary', {'id': 'e2', 'summary': 'no etag'})
+        self.assertEqual(len(cache), 0)
+
+
+class TestEventPatch(unittest.TestCase):
+    '''
+    # TestEventPatch
+    `Unit tests for patching events with minimal field diffs.`
+    '''
+
+    def setUp(self):
+        self.cache = EventCache()
+        self.cache.put('primary', {'id': 'e1', 'etag': '"1"', 'summary': 'Planning',
+                                   'start': {'dateTime': '2024-05-02T07:00:00Z'},
+                                   'end': {'dateTime': '2024-05-02T08:00:00Z'}})
+
+    def test_only_changed_fields_are_sent(self):
+        event, _ = make_calendar([(200, 'echo_request_body')], SyncTokenStore('unused.json'), event_cache=self.cache)
+        result = event.patch_event('primary', 'e1', {
+            'summary': 'Planning',
+            'start': {'dateTime': '2024-05-02T09:00:00+02:00'},
+            'end': {'dateTime': '2024-05-02T09:00:00Z'},
+        })
+        self.assertEqual(result['status'], 'Patched')
+        self.assertEqual(result['event'], {'end': {'dateTime': '2024-05-02T09:00:00Z'}})
+
+    def test_unchanged_event_sends_no_request(self):
+        event, _ = make_calendar([], SyncTokenStore('unused.json'), event_cache=self.cache)
+        result = event.patch_event('primary', 'e1', {'summary': 'Planning'})
+        self.assertEqual(result['status'], 'Unchanged')
+
+    def test_patch_is_conditional_on_etag(self):
+        event, _ = make_calendar([(200, 'echo_request_headers_as_json')], SyncTokenStore('unused.json'),
+                                 event_cache=self.cache)
+        result = event.patch_event('primary', 'e1', {'summary': 'Retro'})
+        self.assertEqual(result['event']['If-Match'], '"1"')
+
+
+if __name__ == '__main__':
+    unittest.main()
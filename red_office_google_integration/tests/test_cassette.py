@@ -0,0 +1,93 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.fake_google_api import FakeAPIConfig, FakeGoogleAPI, write_fake_tokens
+from red_office_google_integration.calendar.events.events import CalendarEvent
+from red_office_google_integration.gmail.mail import Gmail
+from red_office_google_integration.google_service import cassette
+from red_office_google_integration.spreadsheets.sheets import SpreadSheet
+from red_office_google_integration.src import setting, utils
+from red_office_google_integration.src.exceptions import CassetteMismatchError
+
+
+class TestCassette(unittest.TestCase):
+    '''
+    # TestCassette
+    `Tests of recording the clients against the fake Google API and replaying them without it.`
+    '''
+
+    def setUp(self):
+        patcher = patch.object(utils, '_cli_mode', False)   # library mode, restored afterwards
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'session.jsonl'
+        self.server = FakeGoogleAPI(FakeAPIConfig(rows=3, columns=2, list_size=5)).start()
+        self.addCleanup(self.server.stop)
+        for name, value in (('SECRET_DIRECTORY_PATH', Path(directory.name)), ('API_ENDPOINT', self.server.url)):
+            patcher = patch.object(setting, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.key = write_fake_tokens(Path(directory.name)).encode()
+
+    def record(self) -> tuple:
+        with cassette.use_cassette(self.path, mode='record'):
+            data = SpreadSheet(self.key).get_data('sheet', 'A1:B3')
+            events = list(CalendarEvent(self.key).bulk_create_events(
+                'primary', [{'summary': f'Event {i}'} for i in range(3)], batch_size=2))
+        return data, events
+
+    def test_record_and_replay(self):
+        data, events = self.record()
+        self.server.stop()
+        requests = self.server.requests
+        with cassette.use_cassette(self.path, mode='replay'):
+            self.assertEqual(SpreadSheet(self.key).get_data('sheet', 'A1:B3'), data)
+            replayed = list(CalendarEvent(self.key).bulk_create_events(
+                'primary', [{'summary': f'Event {i}'} for i in range(3)], batch_size=2))
+            with self.assertRaises(CassetteMismatchError):
+                SpreadSheet(self.key).get_data('sheet', 'A1:B3')  # recorded once
+        self.assertEqual(sorted(json.dumps(e, sort_keys=True) for e in replayed),
+                         sorted(json.dumps(e, sort_keys=True) for e in events))
+        self.assertEqual(self.server.requests, requests)
+
+    def test_streamed_lists(self):
+        with cassette.use_cassette(self.path, mode='record'):
+            rows = list(SpreadSheet(self.key).iter_rows('sheet', 'A1:B3'))
+            messages = list(Gmail(self.key).iter_email_list('', maxResults=2))
+        self.assertEqual((len(rows), len(messages)), (3, 5))
+        self.assertEqual(len(self.path.read_text().splitlines()), 4)   # the rows and three pages of messages
+        self.server.stop()
+        requests = self.server.requests
+        with patch('google.auth.transport.requests.AuthorizedSession.request') as session, \
+                cassette.use_cassette(self.path, mode='replay'):
+            self.assertEqual(list(SpreadSheet(self.key).iter_rows('sheet', 'A1:B3')), rows)
+            self.assertEqual(list(Gmail(self.key).iter_email_list('', maxResults=2)), messages)
+        session.assert_not_called()
+        self.assertEqual(self.server.requests, requests)
+
+    def test_secrets_are_scrubbed(self):
+        self.record()
+        text = self.path.read_text()
+        self.assertNotIn('Bearer', text)
+        interactions = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(len(interactions), 3)
+        self.assertTrue(all('authorization' not in {name.lower() for name in i['request_headers']}
+                            for i in interactions))
+        self.assertEqual(cassette.scrub_uri('https://x/y?key=abc&q=1'), 'https://x/y?key=REDACTED&q=1')
+        self.assertEqual(json.loads(cassette.scrub_body('{"token": {"refresh_token": "r"}}')),
+                         {'token': {'refresh_token': 'REDACTED'}})
+
+    def test_load_replay(self):
+        self.record()
+        self.server.stop()
+        result = cassette.load_replay(self.path, concurrency=4, repeat=5)
+        self.assertEqual((result['requests'], result['errors']), (15, 0))
+        self.assertGreater(result['throughput_rps'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
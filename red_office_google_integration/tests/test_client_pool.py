@@ -0,0 +1,162 @@
+import datetime
+import json
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+from google.oauth2.credentials import Credentials
+from benchmarks.fake_google_api import FakeAPIConfig, FakeGoogleAPI, write_fake_tokens
+from red_office_google_integration.calendar.events.events import CalendarEvent
+from red_office_google_integration.google_service.client_pool import ClientPool
+from red_office_google_integration.google_service.file_handler import decrypt_file, encrypt_and_save_file
+from red_office_google_integration.google_service.google_credentials_service import secret_directory
+from red_office_google_integration.spreadsheets.sheets import SpreadSheet
+from red_office_google_integration.src import setting, utils
+from red_office_google_integration.src.metrics import account_label
+
+
+class TestClientPool(unittest.TestCase):
+    '''
+    # TestClientPool
+    `Unit tests for the lazily built, least recently used clients of many accounts.`
+    '''
+
+    class Client:
+        builds = 0
+
+        def __init__(self, key, account=None):
+            if key == b'bad':
+                raise ValueError('bad key')
+            time.sleep(0.05)
+            type(self).builds += 1
+            self.key, self.account = key, account
+
+    def setUp(self):
+        self.Client.builds = 0
+
+    def test_lru_eviction(self):
+        pool = ClientPool({f'user{i}@example.com': f'key{i}' for i in range(3)}, max_size=2)
+        first = pool.get(self.Client, 'user0@example.com')
+        self.assertEqual((first.key, first.account), (b'key0', 'user0@example.com'))
+        pool.get(self.Client, 'user1@example.com')
+        self.assertIs(pool.get(self.Client, 'user0@example.com'), first)   # user1 is now the least recent
+        pool.get(self.Client, 'user2@example.com')
+        self.assertIs(pool.get(self.Client, 'user0@example.com'), first)
+        self.assertIsNot(pool.get(self.Client, 'user1@example.com'), first)
+        self.assertEqual(self.Client.builds, 4)
+        self.assertEqual(pool.stats(), {'accounts': 3, 'clients': 2, 'max_size': 2, 'hits': 2, 'misses': 4,
+                                        'evictions': 2})
+
+    def test_accounts(self):
+        pool = ClientPool({'a': b'bad'})
+        with self.assertRaises(KeyError):
+            pool.get(self.Client, 'unknown')
+        with self.assertRaises(ValueError):
+            pool.get(self.Client, 'a')   # a wrong key is not remembered
+        pool.add_account('a', b'good')
+        client = pool.get(self.Client, 'a')
+        pool.add_account('a', b'good')
+        self.assertIs(pool.get(self.Client, 'a'), client)
+        pool.add_account('a', b'new')
+        self.assertEqual(pool.get(self.Client, 'a').key, b'new')
+        pool.remove_account('a')
+        self.assertEqual((len(pool), pool.accounts()), (0, []))
+        for account in ('../a', 'a/b', '..', ''):
+            with self.assertRaises(ValueError):
+                pool.add_account(account, b'key')
+
+    def test_concurrent_gets_build_once(self):
+        pool = ClientPool({'a': b'key-a', 'b': b'key-b'})
+        with ThreadPoolExecutor(16) as executor:
+            clients = list(executor.map(lambda i: pool.get(self.Client, 'ab'[i % 2]), range(64)))
+        self.assertEqual(self.Client.builds, 2)
+        self.assertEqual(len({id(client) for client in clients}), 2)
+
+
+class TestClientPoolAccounts(unittest.TestCase):
+    '''
+    # TestClientPoolAccounts
+    `Tests of pooled clients of several accounts against the fake Google API, and of their token refresh.`
+    '''
+
+    def setUp(self):
+        patcher = patch.object(utils, '_cli_mode', False)   # library mode, restored afterwards
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        secrets = tempfile.TemporaryDirectory()
+        self.addCleanup(secrets.cleanup)
+        self.server = FakeGoogleAPI(FakeAPIConfig()).start()
+        self.addCleanup(self.server.stop)
+        for name, value in (('SECRET_DIRECTORY_PATH', Path(secrets.name)), ('API_ENDPOINT', self.server.url),
+                            ('ACCOUNTS_DIRECTORY_PATH', Path(secrets.name) / 'accounts')):
+            patcher = patch.object(setting, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.keys = {}
+        for account in ('alice@example.com', 'bob@example.com'):
+            secret_directory(account).mkdir(parents=True)
+            self.keys[account] = write_fake_tokens(secret_directory(account))
+
+    def test_clients_of_each_account(self):
+        pool = ClientPool(self.keys)
+        for account in self.keys:
+            spreadsheet = pool.get(SpreadSheet, account)
+            self.assertEqual(spreadsheet.account, account)
+            self.assertIn('values', spreadsheet.get_data('sheet', 'A1:B2'))
+        self.assertEqual(pool.stats()['clients'], 2)
+        # the files of one account do not open with the key of another
+        pool.add_account('alice@example.com', self.keys['bob@example.com'])
+        with self.assertRaises(Exception):
+            pool.get(SpreadSheet, 'alice@example.com')
+
+    def test_accounts_have_their_own_limits_and_hashed_labels(self):
+        pool = ClientPool(self.keys)
+        alice, bob = (pool.get(CalendarEvent, account).executor for account in self.keys)
+        self.assertEqual(alice.account, account_label('alice@example.com'))
+        self.assertNotIn('@', alice.account)
+        self.assertIsNot(alice.limiter, bob.limiter)
+        self.assertIs(alice.limiter, CalendarEvent(self.keys['alice@example.com'].encode(),
+                                                   account='alice@example.com').executor.limiter)
+
+    def test_accounts_have_their_own_sync_tokens(self):
+        pool = ClientPool(self.keys)
+        alice, bob = (pool.get(CalendarEvent, account) for account in self.keys)
+        self.assertEqual(alice.sync_store.path,
+                         secret_directory('alice@example.com') / setting.FILE_NAME_CALENDAR_SYNC_TOKENS)
+        self.assertTrue(alice.sync_events('primary')['full_sync'])
+        self.assertTrue(bob.sync_events('primary')['full_sync'])   # not alice's token
+        self.assertFalse(alice.sync_events('primary')['full_sync'])
+        self.assertEqual(bob.sync_store.get('primary'), 'sync-token')
+
+    def test_expiring_token_is_refreshed_once(self):
+        account, key = 'alice@example.com', self.keys['alice@example.com'].encode()
+        token_path = secret_directory(account) / setting.FILE_NAME_SPREADSHEETS_TOKEN
+        token = json.loads(decrypt_file(token_path, key))
+        soon = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=10)
+        encrypt_and_save_file(token_path, json.dumps({**token, 'expiry': soon.strftime('%Y-%m-%dT%H:%M:%SZ')}), key)
+        refreshes = []
+        lock = threading.Lock()
+
+        def refresh(creds, request):
+            with lock:
+                refreshes.append(creds)
+            time.sleep(0.05)
+            creds.token = 'refreshed-token'
+            creds.expiry = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + datetime.timedelta(hours=1)
+
+        pool = ClientPool({account: key}, refresh_margin=900)
+        with patch.object(Credentials, 'refresh', refresh):
+            with ThreadPoolExecutor(8) as executor:
+                clients = list(executor.map(lambda _: pool.get(SpreadSheet, account), range(8)))
+            self.assertEqual(pool.refresh(account), 0)
+        self.assertEqual(len(refreshes), 1)
+        self.assertEqual(clients[0].credential_service.credentials.token, 'refreshed-token')
+        self.assertEqual(json.loads(decrypt_file(token_path, key))['token'], 'refreshed-token')
+        self.assertIn('values', clients[0].get_data('sheet', 'A1:B2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
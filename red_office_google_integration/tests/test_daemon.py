@@ -0,0 +1,144 @@
+import io
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import click
+from red_office_google_integration.CLI_handler.clients import cached_clients, enable_client_cache, get_client
+from red_office_google_integration.src.daemon import (DaemonError, DaemonServer, daemon_request, forward_to_daemon,
+                                                   peer_uid)
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.argument('name')
+def hello(name):
+    click.echo(f'hello {name}')
+    click.echo('warning', err=True)
+
+
+@cli.command()
+def where():
+    click.echo(os.getcwd())
+
+
+@cli.command()
+def fail():
+    raise click.ClickException('failed')
+
+
+class TestDaemon(unittest.TestCase):
+    '''
+    # TestDaemon
+    `Unit tests for running CLI commands in the local daemon and the client cache.`
+    '''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = Path(self.directory.name) / 'daemon.sock'
+        self.server = DaemonServer(cli, self.socket_path, status=lambda: {'clients': []})
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.directory.cleanup()
+
+    def forward(self, argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        exit_code = forward_to_daemon(argv, self.socket_path, stdout, stderr)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_runs_commands(self):
+        self.assertEqual(self.forward(['hello', 'world']), (0, 'hello world\n', 'warning\n'))
+        exit_code, _, stderr = self.forward(['fail'])
+        self.assertEqual(exit_code, 1)
+        self.assertIn('Error: failed', stderr)
+        self.assertEqual(self.forward(['nosuch'])[0], 2)
+        self.assertEqual(self.server.commands, 3)
+
+    def test_runs_in_the_working_directory_of_the_client(self):
+        previous = os.getcwd()
+        os.chdir(self.directory.name)
+        try:
+            _, stdout, _ = self.forward(['where'])
+        finally:
+            os.chdir(previous)
+        self.assertEqual(os.path.realpath(stdout.strip()), os.path.realpath(self.directory.name))
+        self.assertEqual(os.getcwd(), previous)
+
+    def test_status_and_socket(self):
+        status = daemon_request('status', self.socket_path)['status']
+        self.assertEqual(status['pid'], os.getpid())
+        self.assertEqual(status['clients'], [])
+        self.assertEqual(oct(self.socket_path.stat().st_mode & 0o777), oct(0o600))
+        with self.assertRaises(DaemonError):
+            DaemonServer(cli, self.socket_path)
+
+    def test_runs_in_process_with_other_settings(self):
+        with patch.dict(os.environ, {'RED_OFFICE_API_ENDPOINT': 'http://127.0.0.1:1/'}):
+            self.assertIsNone(forward_to_daemon(['hello', 'world'], self.socket_path))
+        with patch.dict(os.environ, {'RED_OFFICE_NO_DAEMON': ''}):
+            self.assertEqual(self.forward(['hello', 'world'])[0], 0)
+        self.assertEqual(self.server.commands, 1)
+
+    def test_only_talks_to_the_same_user(self):
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(str(self.socket_path))
+            self.assertIn(peer_uid(sock), (None, os.getuid()))
+        with patch('red_office_google_integration.src.daemon.peer_uid', return_value=os.getuid() + 1):
+            self.assertIsNone(forward_to_daemon(['hello', 'world'], self.socket_path))
+            self.assertIsNone(daemon_request('status', self.socket_path))
+        self.assertEqual(self.server.commands, 0)
+        shared = Path(self.directory.name) / 'shared'
+        shared.mkdir(mode=0o777)
+        shared.chmod(0o777)
+        with self.assertRaises(DaemonError):
+            DaemonServer(cli, shared / 'daemon.sock')
+
+    def test_falls_back_without_daemon(self):
+        missing = Path(self.directory.name) / 'missing.sock'
+        self.assertIsNone(forward_to_daemon(['hello', 'world'], missing))
+        self.assertIsNone(daemon_request('status', missing))
+        self.assertIsNone(forward_to_daemon(['daemon', 'status'], self.socket_path))
+
+
+class TestClientCache(unittest.TestCase):
+    '''
+    # TestClientCache
+    `Unit tests for reusing clients in daemon mode.`
+    '''
+
+    class Client:
+        def __init__(self, key):
+            if key == b'bad':
+                raise ValueError('bad key')
+            self.key = key
+
+    def tearDown(self):
+        enable_client_cache(False)
+
+    def test_builds_a_client_per_call_by_default(self):
+        self.assertIsNot(get_client(self.Client, b'key'), get_client(self.Client, b'key'))
+
+    def test_reuses_clients_in_daemon_mode(self):
+        enable_client_cache()
+        client = get_client(self.Client, b'key')
+        self.assertIs(get_client(self.Client, b'key'), client)
+        self.assertIsNot(get_client(self.Client, b'other'), client)
+        with self.assertRaises(ValueError):
+            get_client(self.Client, b'bad')
+        self.assertEqual(cached_clients(), ['Client', 'Client'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from red_office_google_integration.calendar.events.diff import event_diff
+
+
+CURRENT = {
+    'id': 'e1',
+    'etag': '"1"',
+    'summary': 'Planning',
+    'start': {'dateTime': '2024-05-02T09:00:00+02:00', 'timeZone': 'Europe/Berlin'},
+    'end': {'dateTime': '2024-05-02T10:00:00+02:00', 'timeZone': 'Europe/Berlin'},
+    'attendees': [{'email': 'jane@example.com', 'responseStatus': 'accepted'}],
+    'reminders': {'useDefault': False, 'overrides': [{'method': 'popup', 'minutes': 10}]},
+}
+
+
+class TestEventDiff(unittest.TestCase):
+    '''
+    # TestEventDiff
+    `Unit tests for the minimal patch body of calendar events.`
+    '''
+
+    def test_same_state_is_empty(self):
+        desired = {'id': 'e1', 'summary': 'Planning', 'start': {'dateTime': '2024-05-02T07:00:00Z',
+                                                                  'timeZone': 'Europe/Berlin'},
+                   'attendees': [{'email': 'jane@example.com'}]}
+        self.assertEqual(event_diff(CURRENT, desired), {})
+
+    def test_changed_fields_only(self):
+        desired = {'summary': 'Planning', 'end': {'dateTime': '2024-05-02T11:00:00+02:00',
+                                                  'timeZone': 'Europe/Berlin'},
+                   'reminders': {'useDefault': True}}
+        self.assertEqual(event_diff(CURRENT, desired), {
+            'end': {'dateTime': '2024-05-02T11:00:00+02:00', 'timeZone': 'Europe/Berlin'},
+            'reminders': {'useDefault': True},
+        })
+
+    def test_move_to_all_day_clears_date_time(self):
+        body = event_diff(CURRENT, {'start': {'date': '2024-05-02'}})
+        self.assertEqual(body, {'start': {'date': '2024-05-02', 'dateTime': None}})
+
+    def test_none_clears_a_field(self):
+        self.assertEqual(event_diff(CURRENT, {'summary': None, 'location': None}), {'summary': None})
+
+    def test_lists_are_sent_whole(self):
+        desired = {'attendees': [{'email': 'jane@example.com'}, {'email': 'joe@example.com'}]}
+        self.assertEqual(event_diff(CURRENT, desired), desired)
+
+
+if __name__ == '__main__':
+    unittest.main()
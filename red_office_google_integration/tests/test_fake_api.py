@@ -0,0 +1,56 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.fake_google_api import FakeAPIConfig, FakeGoogleAPI, write_fake_tokens
+from red_office_google_integration.calendar.events.events import CalendarEvent
+from red_office_google_integration.spreadsheets.sheets import SpreadSheet
+from red_office_google_integration.src import setting, utils
+from red_office_google_integration.src.exceptions import ServerError
+
+
+class TestFakeAPI(unittest.TestCase):
+    '''
+    # TestFakeAPI
+    `Tests of the API clients against the fake Google API of the benchmarks, through setting.API_ENDPOINT.`
+    '''
+
+    def setUp(self):
+        patcher = patch.object(utils, '_cli_mode', False)   # library mode, restored afterwards
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        secrets = tempfile.TemporaryDirectory()
+        self.addCleanup(secrets.cleanup)
+        self.server = FakeGoogleAPI(FakeAPIConfig(rows=3, columns=2)).start()
+        self.addCleanup(self.server.stop)
+        for name, value in (('SECRET_DIRECTORY_PATH', Path(secrets.name)), ('API_ENDPOINT', self.server.url)):
+            patcher = patch.object(setting, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.key = write_fake_tokens(Path(secrets.name)).encode()
+
+    def test_sheets_values(self):
+        spreadsheet = SpreadSheet(self.key)
+        data = spreadsheet.get_data('sheet', 'A1:B3')
+        self.assertEqual((data['range'], len(data['values']), len(data['values'][0])), ('A1:B3', 3, 2))
+        update = spreadsheet.append_data('sheet', 'A1', 'RAW', [[1, 2], [3, 4]])
+        self.assertEqual(update['updates']['updatedCells'], 4)
+
+    def test_calendar_batch_requests(self):
+        results = list(CalendarEvent(self.key).bulk_create_events(
+            'primary', [{'summary': f'Event {i}'} for i in range(5)], batch_size=2))
+        self.assertEqual(sorted(result['index'] for result in results), list(range(5)))
+        self.assertEqual({result['status'] for result in results}, {'Created'})
+        self.assertEqual(self.server.requests, 5)
+
+    @patch('red_office_google_integration.src.executor.time.sleep')
+    def test_injected_errors_are_retried(self, mock_sleep):
+        self.server.config.error_rate = 1.0
+        event = CalendarEvent(self.key)
+        with self.assertRaises(ServerError):
+            event.get_event('primary', 'e1')
+        self.assertEqual(self.server.requests, setting.RETRY_MAX_RETRIES + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
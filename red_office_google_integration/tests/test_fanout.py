@@ -0,0 +1,85 @@
+import threading
+import unittest
+from red_office_google_integration.calendar.events.fanout import merge_sorted
+
+
+class TestFanOut(unittest.TestCase):
+    '''
+    # TestFanOut
+    `Unit tests for the concurrent k-way merge of sorted sources.`
+    '''
+
+    def test_merges_in_order(self):
+        sources = {
+            'a': iter([[1, 4], [7, 10]]),
+            'b': iter([[2, 3], [], [8]]),
+            'c': iter([[4, 5, 6, 9]]),
+        }
+        merged = list(merge_sorted(sources, key=lambda item: item, max_concurrency=2, buffer_pages=1))
+        self.assertEqual([item for _, item in merged], [1, 2, 3, 4, 4, 5, 6, 7, 8, 9, 10])
+        self.assertEqual(merged[3], ('a', 4))
+
+    def test_reads_ahead_only_a_few_pages(self):
+        fetched = []
+
+        def pages():
+            for number in range(100):
+                fetched.append(number)
+                yield [number]
+
+        stream = merge_sorted({'a': pages()}, key=lambda item: item, buffer_pages=1)
+        self.assertEqual(next(stream), ('a', 0))
+        stream.close()
+        self.assertLess(len(fetched), 10)
+
+    def test_errors(self):
+        def failing():
+            yield [1]
+            raise ConnectionError('boom')
+
+        with self.assertRaises(ConnectionError):
+            list(merge_sorted({'a': failing(), 'b': iter([[2]])}, key=lambda item: item))
+
+        errors = []
+        merged = merge_sorted({'a': failing(), 'b': iter([[2]])}, key=lambda item: item,
+                              on_error=lambda name, e: errors.append(name))
+        self.assertEqual([item for _, item in merged], [1, 2])
+        self.assertEqual(errors, ['a'])
+
+    def test_concurrency_is_bounded(self):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def pages():
+            for number in range(3):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                threading.Event().wait(0.01)
+                with lock:
+                    active[0] -= 1
+                yield [number]
+
+        sources = {name: pages() for name in range(10)}
+        self.assertEqual(len(list(merge_sorted(sources, key=lambda item: item, max_concurrency=3))), 30)
+        self.assertLessEqual(peak[0], 3)
+
+    def test_threads_are_bounded(self):
+        threads = set()
+
+        def pages(name):
+            for number in range(3):
+                threads.add(threading.current_thread())
+                yield [name * 3 + number]
+
+        before = threading.active_count()
+        sources = {name: pages(name) for name in range(50)}
+        stream = merge_sorted(sources, key=lambda item: item, max_concurrency=4)
+        self.assertEqual(next(stream), (0, 0))
+        self.assertLessEqual(threading.active_count() - before, 4)
+        self.assertEqual([item for _, item in stream], list(range(1, 150)))
+        self.assertLessEqual(len(threads), 4)
+        self.assertEqual(threading.active_count(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from red_office_google_integration.src.fields import field_mask, with_fields, CALENDAR_EVENTS_PAGE_FIELDS
+
+
+class TestFieldMask(unittest.TestCase):
+    '''
+    # TestFieldMask
+    `Unit tests for building partial response field masks.`
+    '''
+
+    def test_no_fields(self):
+        self.assertIsNone(field_mask(None))
+        self.assertIsNone(field_mask([]))
+        self.assertEqual(with_fields({'maxResults': 1}, None), {'maxResults': 1})
+
+    def test_raw_mask_is_passed_through(self):
+        self.assertEqual(field_mask('items(id)', 'items'), 'items(id)')
+
+    def test_resource_fields(self):
+        self.assertEqual(field_mask(['id', 'payload.headers', 'id']), 'id,payload/headers')
+
+    def test_collection_fields_keep_pagination(self):
+        mask = field_mask(['id', 'start.dateTime'], 'items', CALENDAR_EVENTS_PAGE_FIELDS)
+        self.assertEqual(mask, 'nextPageToken,nextSyncToken,items(id,start/dateTime)')
+
+    def test_page_field_named_by_caller(self):
+        mask = field_mask(['nextPageToken', 'id'], 'items', CALENDAR_EVENTS_PAGE_FIELDS)
+        self.assertEqual(mask, 'nextSyncToken,nextPageToken,items(id)')
+
+
+if __name__ == '__main__':
+    unittest.main()
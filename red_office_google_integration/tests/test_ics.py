@@ -0,0 +1,68 @@
+import io
+import unittest
+from red_office_google_integration.calendar.events.ics import (fold_line, read_ics, unfold_lines, write_ics)
+
+
+SAMPLE = (
+    'BEGIN:VCALENDAR\r\n'
+    'VERSION:2.0\r\n'
+    'BEGIN:VTIMEZONE\r\n'
+    'TZID:Europe/Berlin\r\n'
+    'END:VTIMEZONE\r\n'
+    'BEGIN:VEVENT\r\n'
+    'UID:weekly@example.com\r\n'
+    'DTSTART;TZID=Europe/Berlin:20240502T090000\r\n'
+    'DURATION:PT1H30M\r\n'
+    'RRULE:FREQ=WEEKLY;COUNT=4\r\n'
+    'SUMMARY:Team\\, weekly\r\n'
+    'DESCRIPTION:A long description that is folded over\r\n'
+    '  two lines\r\n'
+    'ATTENDEE;CN="Doe, Jane":mailto:jane@example.com\r\n'
+    'BEGIN:VALARM\r\n'
+    'ACTION:DISPLAY\r\n'
+    'SUMMARY:Reminder\r\n'
+    'END:VALARM\r\n'
+    'END:VEVENT\r\n'
+    'BEGIN:VEVENT\r\n'
+    'UID:holiday@example.com\r\n'
+    'DTSTART;VALUE=DATE:20240501\r\n'
+    'TRANSP:TRANSPARENT\r\n'
+    'END:VEVENT\r\n'
+    'END:VCALENDAR\r\n'
+)
+
+
+class TestIcs(unittest.TestCase):
+    '''
+    # TestIcs
+    `Unit tests for reading and writing iCalendar files.`
+    '''
+
+    def test_read_events(self):
+        weekly, holiday = list(read_ics(io.StringIO(SAMPLE, newline='')))
+        self.assertEqual(weekly['iCalUID'], 'weekly@example.com')
+        self.assertEqual(weekly['summary'], 'Team, weekly')
+        self.assertEqual(weekly['description'], 'A long description that is folded over two lines')
+        self.assertEqual(weekly['start'], {'dateTime': '2024-05-02T09:00:00+02:00', 'timeZone': 'Europe/Berlin'})
+        self.assertEqual(weekly['end'], {'dateTime': '2024-05-02T10:30:00+02:00', 'timeZone': 'Europe/Berlin'})
+        self.assertEqual(weekly['recurrence'], ['RRULE:FREQ=WEEKLY;COUNT=4'])
+        self.assertEqual(weekly['attendees'], [{'email': 'jane@example.com', 'displayName': 'Doe, Jane'}])
+        self.assertEqual(holiday['start'], {'date': '2024-05-01'})
+        self.assertEqual(holiday['end'], {'date': '2024-05-02'})
+        self.assertEqual(holiday['transparency'], 'transparent')
+
+    def test_round_trip(self):
+        events = list(read_ics(io.StringIO(SAMPLE, newline='')))
+        out = io.StringIO(newline='')
+        self.assertEqual(write_ics(iter(events), out, calendar_name='Team'), 2)
+        self.assertEqual(list(read_ics(io.StringIO(out.getvalue(), newline=''))), events)
+
+    def test_fold_line(self):
+        line = 'DESCRIPTION:' + 'é' * 100
+        folded = fold_line(line)
+        self.assertTrue(all(len(part.encode('utf-8')) <= 75 for part in folded.split('\r\n')))
+        self.assertEqual(list(unfold_lines(io.StringIO(folded, newline=''))), [line])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.fake_google_api import FakeAPIConfig, FakeGoogleAPI, write_fake_tokens
+from red_office_google_integration.calendar.events.events import CalendarEvent
+from red_office_google_integration.gmail.mail import Gmail
+from red_office_google_integration.spreadsheets.sheets import SpreadSheet
+from red_office_google_integration.src import setting, utils
+from red_office_google_integration.src.exceptions import ServerError
+from red_office_google_integration.src.json_stream import JsonArrayStream
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonStream(unittest.TestCase):
+    '''
+    # TestJsonStream
+    `Unit tests for the incremental parsing of list responses and the streaming client methods.`
+    '''
+
+    def test_items_and_fields(self):
+        document = {'range': 'A1:C2', 'values': [[1, 'a"],{', {'b': [None, True]}], [2.5e3, 'é😀', []], 12345],
+                    'nextPageToken': 'next', 'other': {'items': [1]}}
+        for indent in (None, 2):
+            data = json.dumps(document, ensure_ascii=False, indent=indent).encode()
+            for size in (1, 3, 16, len(data)):
+                stream = JsonArrayStream(chunked(data, size), 'values')
+                self.assertEqual(list(stream), document['values'])
+                self.assertEqual(stream.fields, {k: v for k, v in document.items() if k != 'values'})
+
+    def test_numbers_split_by_chunks(self):
+        data = b'{"values": [-25000000000.0, -2, 1.5e-3, 7]}'
+        for size in range(1, len(data) + 1):
+            self.assertEqual(list(JsonArrayStream(chunked(data, size), 'values')), [-25000000000.0, -2, 1.5e-3, 7])
+        with self.assertRaises(ValueError):
+            list(JsonArrayStream([b'{"values": [{"a": 1} 2]}'], 'values'))
+
+    def test_empty_missing_and_truncated(self):
+        stream = JsonArrayStream([b'{"items": [ ], "nextSyncToken": "s"}'], 'items')
+        self.assertEqual((list(stream), stream.fields), ([], {'nextSyncToken': 's'}))
+        self.assertEqual(list(JsonArrayStream([b'{"kind": "x"}'], 'items')), [])
+        for body in (b'{"items": [1, 2', b'{"items": [{"a": 1}', b'{"items": []'):
+            with self.assertRaises(ValueError):
+                list(JsonArrayStream(chunked(body, 4), 'items'))
+
+    def test_buffer_holds_one_item(self):
+        item = {'id': 'x' * 1000}
+        consumed = []
+
+        def chunks():
+            yield b'{"items": ['
+            for i in range(1000):
+                consumed.append(i)
+                yield json.dumps(item).encode() + (b',' if i < 999 else b']}')
+
+        for position, decoded in enumerate(JsonArrayStream(chunks(), 'items')):
+            self.assertEqual(decoded, item)
+            self.assertLessEqual(len(consumed), position + 2)  # decoded while reading, not at the end
+
+
+class TestStreamingClients(unittest.TestCase):
+    '''
+    # TestStreamingClients
+    `Tests of the streaming client methods against the fake Google API.`
+    '''
+
+    def setUp(self):
+        patcher = patch.object(utils, '_cli_mode', False)   # library mode, restored afterwards
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        secrets = tempfile.TemporaryDirectory()
+        self.addCleanup(secrets.cleanup)
+        self.server = FakeGoogleAPI(FakeAPIConfig(rows=50, columns=3, list_size=25)).start()
+        self.addCleanup(self.server.stop)
+        for name, value in (('SECRET_DIRECTORY_PATH', Path(secrets.name)), ('API_ENDPOINT', self.server.url)):
+            patcher = patch.object(setting, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.key = write_fake_tokens(Path(secrets.name)).encode()
+
+    def test_rows(self):
+        rows = list(SpreadSheet(self.key).iter_rows('sheet', 'A1:C50'))
+        self.assertEqual(rows, SpreadSheet(self.key).get_data('sheet', 'A1:C50')['values'])
+
+    def test_pages(self):
+        messages = list(Gmail(self.key).iter_email_list('', maxResults=10))
+        self.assertEqual([message['id'] for message in messages], [f'm{i}' for i in range(25)])
+        self.assertEqual(self.server.requests, 3)
+        events = list(CalendarEvent(self.key).iter_events('primary', {'maxResults': 10}, stream=True))
+        self.assertEqual(events, list(CalendarEvent(self.key).iter_events('primary', {'maxResults': 10})))
+
+    @patch('red_office_google_integration.src.executor.time.sleep')
+    def test_errors_are_retried(self, mock_sleep):
+        self.server.config.error_rate = 1.0
+        with self.assertRaises(ServerError):
+            list(SpreadSheet(self.key).iter_rows('sheet', 'A1:C50'))
+        self.assertEqual(self.server.requests, setting.RETRY_MAX_RETRIES + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
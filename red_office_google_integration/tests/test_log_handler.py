@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import time
+import unittest
+from red_office_google_integration.log.log_handler import (JSONLinesFormatter, NonBlockingQueueHandler,
+                                                           SamplingFilter, SizeAndTimeRotatingFileHandler, truncate)
+
+
+def make_record(msg, level=logging.INFO, args=None):
+    return logging.LogRecord('test', level, __file__, 1, msg, args, None)
+
+
+class TestLogHandler(unittest.TestCase):
+    '''
+    # TestLogHandler
+    `Unit tests for the non-blocking JSON lines logging pipeline.`
+    '''
+
+    def test_structured_fields_and_truncation(self):
+        formatter = JSONLinesFormatter()
+        line = json.loads(formatter.format(make_record(
+            {'event': 'api_request', 'operation': 'calendar.events.get', 'status': 200, 'body': 'x' * 5000})))
+        self.assertEqual((line['level'], line['operation'], line['status']), ('INFO', 'calendar.events.get', 200))
+        self.assertNotIn('message', line)
+        self.assertLess(len(line['body']), 2100)
+        self.assertTrue(line['body'].endswith('[3000 more characters]'))
+        line = json.loads(formatter.format(make_record('created %s', args=('event',))))
+        self.assertEqual(line['message'], 'created event')
+        self.assertEqual(truncate({'a': ['abcdef']}, 3), {'a': ['abc...[3 more characters]']})
+
+    def test_sampling_keeps_warnings(self):
+        sampler = SamplingFilter({'DEBUG': 0.0, 'INFO': 0.5})
+        self.assertFalse(sampler.filter(make_record('m', logging.DEBUG)))
+        self.assertTrue(sampler.filter(make_record('m', logging.WARNING)))
+        kept = sum(sampler.filter(make_record('m', logging.INFO)) for _ in range(2000))
+        self.assertTrue(600 < kept < 1400)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        args = {'key': 'value'}
+        started = time.perf_counter()
+        for _ in range(5):
+            handler.handle(make_record('%(key)s', args=(args,)))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.queue.get().msg, 'value')
+        self.assertEqual(handler.take_dropped(), 3)
+        self.assertEqual(handler.take_dropped(), 0)
+
+    def test_rotates_by_size_and_age(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'log.jsonl')
+            handler = SizeAndTimeRotatingFileHandler(path, maxBytes=200, backupCount=2, interval=3600, delay=True)
+            handler.setFormatter(JSONLinesFormatter())
+            for _ in range(5):
+                handler.handle(make_record('message'))
+            self.assertTrue(os.path.exists(path + '.1'))
+            handler.rollover_at = time.time() - 1
+            handler.handle(make_record('late'))
+            self.assertGreater(handler.rollover_at, time.time())
+            with open(path) as f:
+                self.assertEqual(json.loads(f.read())['message'], 'late')
+            handler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import pathlib
+import tempfile
+import unittest
+from red_office_google_integration.gmail.message_creation import AttachmentCache, EmailCreation, EmailTemplate
+
+
+class TestAttachmentCache(unittest.TestCase):
+    '''
+    # TestAttachmentCache
+    `Unit tests for the shared attachment cache and the precompiled email template.`
+    '''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = pathlib.Path(self.directory.name) / 'brochure.pdf'
+        self.file_path.write_bytes(b'%PDF-1.4 brochure')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_part_is_encoded_once(self):
+        cache = AttachmentCache()
+        first = cache.get_part(self.file_path)
+        second = cache.get_part(self.file_path)
+        self.assertIs(first, second)
+        self.assertEqual(first.get_content_type(), 'application/pdf')
+        self.assertEqual(first['Content-Transfer-Encoding'], 'base64')
+        self.assertEqual(len(cache), 1)
+
+    def test_changed_file_is_reencoded(self):
+        cache = AttachmentCache()
+        first = cache.get_part(self.file_path)
+        self.file_path.write_bytes(b'%PDF-1.4 new brochure')
+        os.utime(self.file_path, ns=(0, 0))
+        second = cache.get_part(self.file_path)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.get_content(), b'%PDF-1.4 new brochure')
+
+    def test_evicted_parts_are_forgotten(self):
+        cache = AttachmentCache(max_entries=2)
+        for number in range(10):
+            path = pathlib.Path(self.directory.name) / f'file{number}.txt'
+            path.write_text(f'content {number}')
+            cache.get_part(path)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(len(cache._AttachmentCache__digests), 2)
+        self.assertEqual(cache.get_part(path).get_content(), 'content 9')
+
+    def test_cached_attachment_matches_uncached(self):
+        cache = AttachmentCache()
+        cached = EmailCreation({'To': 'a@example.com'}, 'body')
+        cached.add_file(self.file_path, cache=cache)
+        plain = EmailCreation({'To': 'a@example.com'}, 'body')
+        plain.add_file(self.file_path)
+
+        def attachments(email):
+            return [(p.get_filename(), p.get_content()) for p in email.get_mime_message().iter_attachments()]
+        self.assertEqual(attachments(cached), attachments(plain))
+
+    def test_template_render(self):
+        template = EmailTemplate({'To': '$email', 'Subject': 'Hello ${name}', 'From': 'me@example.com'},
+                                 'Dear $name', attachments=[self.file_path])
+        message = template.render({'email': 'b@example.com'}, name='Bob').get_mime_message()
+        self.assertEqual(message['To'], 'b@example.com')
+        self.assertEqual(message['Subject'], 'Hello Bob')
+        self.assertEqual(message['From'], 'me@example.com')
+        self.assertEqual(message.get_body().get_content().strip(), 'Dear Bob')
+        self.assertEqual(len(list(message.iter_attachments())), 1)
+        with self.assertRaises(KeyError):
+            template.render(email='c@example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+from red_office_google_integration.src.executor import RequestExecutor
+from red_office_google_integration.src.metrics import MetricsRegistry, account_label
+from red_office_google_integration.src.rate_limit import TokenBucket
+from red_office_google_integration.src.retry import RetryPolicy
+
+
+class TestMetrics(unittest.TestCase):
+    '''
+    # TestMetrics
+    `Unit tests for the request metrics, their Prometheus and JSONL outputs and the executor instrumentation.`
+    '''
+
+    def test_summary_and_percentiles(self):
+        registry = MetricsRegistry()
+        for latency in [0.01] * 90 + [0.7] * 10:
+            registry.record('sheets', 'sheets.spreadsheets.values.get', 'acct', 200, latency, 10, 100)
+        registry.record('sheets', 'sheets.spreadsheets.values.get', 'acct', 429, 0.02, 10, 50, retry=True,
+                        quota_error=True)
+        line, = registry.summary()
+        self.assertEqual((line['count'], line['errors'], line['retries'], line['quota_errors']), (101, 1, 1, 1))
+        self.assertEqual(line['statuses'], {'200': 90 + 10, '429': 1})
+        self.assertLess(line['p50_ms'], 25)
+        self.assertTrue(500 < line['p95_ms'] <= 1000)
+        self.assertEqual((line['request_bytes'], line['response_bytes']), (1010, 10050))
+
+    def test_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.record('gmail', 'gmail.users.messages.get', 'a"b', 200, 0.2, 0, 1000)
+        text = registry.to_prometheus()
+        labels = 'api="gmail",operation="gmail.users.messages.get",account="a\\"b"'
+        self.assertIn(f'google_api_requests_total{{{labels},status="200"}} 1', text)
+        self.assertIn(f'google_api_request_duration_seconds_bucket{{{labels},le="0.25"}} 1', text)
+        self.assertIn(f'google_api_request_duration_seconds_bucket{{{labels},le="0.1"}} 0', text)
+        self.assertIn(f'google_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', text)
+        self.assertIn(f'google_api_response_bytes_total{{{labels}}} 1000', text)
+        with tempfile.TemporaryDirectory() as directory:
+            registry.write_prometheus(Path(directory) / 'metrics.prom')
+            registry.write_summary(Path(directory) / 'metrics.jsonl')
+            self.assertEqual((Path(directory) / 'metrics.prom').read_text(), text)
+            summary = json.loads((Path(directory) / 'metrics.jsonl').read_text())
+            self.assertEqual(summary['operation'], 'gmail.users.messages.get')
+
+    def test_account_label_hides_the_key(self):
+        label = account_label(b'secret-key')
+        self.assertEqual(len(label), 12)
+        self.assertNotIn('secret', label)
+        self.assertEqual(label, account_label('secret-key'))
+
+    @patch('red_office_google_integration.src.executor.time.sleep')
+    def test_executor_records_every_attempt(self, mock_sleep):
+        registry = MetricsRegistry()
+        http = HttpMockSequence([
+            ({'status': '429'}, json.dumps({'error': {'code': 429, 'message': 'Slow down'}})),
+            ({'status': '200'}, json.dumps({'id': 'e1'})),
+        ])
+        service = build('calendar', 'v3', http=http)
+        executor = RequestExecutor('calendar', RetryPolicy(max_retries=1, base_delay=0.1),
+                                   TokenBucket(rate=1000, capacity=1000), account='acct')
+        with patch('red_office_google_integration.src.executor.metrics', registry):
+            executor.execute(service.events().insert(calendarId='primary', body={'summary': 'Standup'}))
+        line, = registry.summary()
+        self.assertEqual((line['api'], line['operation'], line['account']), ('calendar', 'calendar.events.insert', 'acct'))
+        self.assertEqual(line['statuses'], {'429': 1, '200': 1})
+        self.assertEqual((line['retries'], line['quota_errors']), (1, 1))
+        self.assertEqual(line['request_bytes'], 2 * len(json.dumps({'summary': 'Standup'})))
+        self.assertEqual(line['response_bytes'], len(json.dumps({'error': {'code': 429, 'message': 'Slow down'}}))
+                         + len(json.dumps({'id': 'e1'})))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+from red_office_google_integration.src.executor import RequestExecutor
+from red_office_google_integration.src.quota import QuotaTracker, operation_cost
+from red_office_google_integration.src.retry import RetryPolicy
+
+LIMITS = {'gmail': {'rate': 100, 'capacity': 200}, 'sheets.read': {'rate': 1, 'capacity': 2}}
+
+
+def _reserve(path: str, method: str) -> float:
+    return QuotaTracker(path, LIMITS).reserve([method])
+
+
+class TestQuota(unittest.TestCase):
+    '''
+    # TestQuota
+    `Unit tests for the operation costs and the quota tracker shared by processes.`
+    '''
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'quota.db'
+
+    def test_operation_cost(self):
+        self.assertEqual(operation_cost('gmail.users.messages.send'), ('gmail', 100))
+        self.assertEqual(operation_cost('gmail.users.messages.get'), ('gmail', 5))
+        self.assertEqual(operation_cost('gmail.users.settings.getVacation'), ('gmail', 5))
+        self.assertEqual(operation_cost('sheets.spreadsheets.values.batchGet'), ('sheets.read', 1))
+        self.assertEqual(operation_cost('sheets.spreadsheets.values.append'), ('sheets.write', 1))
+        self.assertEqual(operation_cost('calendar.events.insert'), ('calendar', 1))
+
+    @patch('red_office_google_integration.src.quota.time.time', return_value=1000.0)
+    def test_reservations_are_shared(self, mock_time):
+        first, second = QuotaTracker(self.path, LIMITS), QuotaTracker(self.path, LIMITS)
+        self.assertEqual(first.reserve(['gmail.users.messages.send', 'gmail.users.messages.get']), 0)
+        self.assertEqual(second.available()['gmail'], 95)
+        # 100 + 5 more units: 10 are missing, at 100 units per second
+        self.assertAlmostEqual(second.reserve(['gmail.users.messages.send', 'gmail.users.messages.get']), 0.1)
+        mock_time.return_value = 1000.5
+        self.assertAlmostEqual(first.available()['gmail'], 40)
+        self.assertEqual(first.reserve(['calendar.events.get']), 0)  # not limited
+
+    @patch('red_office_google_integration.src.quota.time.time', return_value=1000.0)
+    def test_per_user_buckets_are_per_account(self, mock_time):
+        tracker = QuotaTracker(self.path, LIMITS, account_buckets=['gmail'])
+        self.assertEqual(tracker.reserve(['gmail.users.messages.send', 'sheets.spreadsheets.values.get'], 'a'), 0)
+        self.assertEqual(tracker.reserve(['gmail.users.messages.send', 'sheets.spreadsheets.values.get'], 'b'), 0)
+        self.assertEqual(tracker.available('a'), {'gmail': 100, 'sheets.read': 0})   # sheets: per project
+        self.assertEqual(tracker.available(), {'gmail': 200, 'sheets.read': 0})
+
+    def test_processes_share_the_quota(self):
+        with multiprocessing.get_context('spawn').Pool(2) as pool:
+            waits = pool.starmap(_reserve, [(str(self.path), 'sheets.spreadsheets.values.get')] * 4)
+        # a capacity of 2: two reservations go through, the next ones wait about 1 and 2 seconds
+        self.assertEqual(sum(wait == 0 for wait in waits), 2)
+        self.assertAlmostEqual(max(waits), 2, delta=0.5)
+
+    @patch('red_office_google_integration.src.executor.time.sleep')
+    def test_executor_uses_the_quota(self, mock_sleep):
+        quota = QuotaTracker(self.path, LIMITS)
+        executor = RequestExecutor('gmail', RetryPolicy(max_retries=0), quota=quota)
+        self.assertIsNone(executor.limiter)
+        service = build('gmail', 'v1', http=HttpMockSequence([({'status': '200'}, json.dumps({'id': 'm1'}))]))
+        executor.execute(service.users().messages().send(userId='me', body={}))
+        self.assertLessEqual(quota.available()['gmail'], 101)
+
+
+if __name__ == '__main__':
+    unittest.main()
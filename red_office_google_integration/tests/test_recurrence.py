@@ -0,0 +1,56 @@
+import unittest
+from red_office_google_integration.calendar.events.recurrence import expand_event, expand_events
+
+
+class TestRecurrence(unittest.TestCase):
+    '''
+    # TestRecurrence
+    `Unit tests for the local expansion of recurring events.`
+    '''
+
+    def setUp(self):
+        self.standup = {
+            'id': 'standup',
+            'summary': 'Standup',
+            'start': {'dateTime': '2024-03-25T09:00:00+01:00', 'timeZone': 'Europe/Berlin'},
+            'end': {'dateTime': '2024-03-25T09:15:00+01:00', 'timeZone': 'Europe/Berlin'},
+            'recurrence': ['RRULE:FREQ=DAILY;COUNT=8', 'EXDATE;TZID=Europe/Berlin:20240327T090000'],
+        }
+
+    def test_daily_rule_with_exdate_and_dst(self):
+        instances = list(expand_event(self.standup, '2024-03-01T00:00:00Z', '2024-04-05T00:00:00Z'))
+        self.assertEqual([i['id'] for i in instances], ['standup_20240325T080000Z', 'standup_20240326T080000Z',
+                                                        'standup_20240328T080000Z', 'standup_20240329T080000Z',
+                                                        'standup_20240330T080000Z', 'standup_20240331T070000Z',
+                                                        'standup_20240401T070000Z'])
+        # Berlin switched to summer time on 2024-03-31, wall-clock time stays the same
+        self.assertEqual([i['start']['dateTime'][11:] for i in instances],
+                         ['09:00:00+01:00'] * 5 + ['09:00:00+02:00'] * 2)
+        self.assertEqual(instances[-1]['end']['dateTime'], '2024-04-01T09:15:00+02:00')
+        self.assertEqual(instances[0]['summary'], 'Standup')
+        self.assertEqual(instances[0]['recurringEventId'], 'standup')
+        self.assertNotIn('recurrence', instances[0])
+
+    def test_window_limits_expansion(self):
+        instances = list(expand_event(self.standup, '2024-03-26T08:10:00Z', '2024-03-28T08:00:00Z'))
+        self.assertEqual([i['id'] for i in instances], ['standup_20240326T080000Z'])
+
+    def test_exceptions_and_ordering(self):
+        moved = {'id': 'standup_20240326T080000Z', 'recurringEventId': 'standup', 'summary': 'Late standup',
+                 'originalStartTime': {'dateTime': '2024-03-26T08:00:00Z'},
+                 'start': {'dateTime': '2024-03-26T15:00:00Z'}, 'end': {'dateTime': '2024-03-26T15:15:00Z'}}
+        cancelled = {'id': 'standup_20240328T080000Z', 'recurringEventId': 'standup', 'status': 'cancelled',
+                     'originalStartTime': {'dateTime': '2024-03-28T09:00:00+01:00'}}
+        single = {'id': 'review', 'start': {'dateTime': '2024-03-26T12:00:00Z'},
+                  'end': {'dateTime': '2024-03-26T13:00:00Z'}}
+        weekly = {'id': 'holiday', 'start': {'date': '2024-03-25'}, 'end': {'date': '2024-03-26'},
+                  'recurrence': ['RRULE:FREQ=WEEKLY;UNTIL=20240405']}
+        instances = expand_events([self.standup, moved, cancelled, single, weekly],
+                                  '2024-03-25T00:00:00Z', '2024-03-30T00:00:00Z')
+        self.assertEqual([i['id'] for i in instances], ['holiday_20240325', 'standup_20240325T080000Z',
+                                                        'review', 'standup_20240326T080000Z',
+                                                        'standup_20240329T080000Z'])
+
+
+if __name__ == '__main__':
+    unittest.main()
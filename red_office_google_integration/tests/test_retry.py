@@ -0,0 +1,92 @@
+import json
+import unittest
+from unittest.mock import patch
+import httplib2
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+from red_office_google_integration.src.exceptions import (PreconditionFailedError, QuotaExceededError,
+                                                          RateLimitError, ServerError, from_http_error)
+from red_office_google_integration.src.executor import RequestExecutor
+from red_office_google_integration.src.rate_limit import TokenBucket
+from red_office_google_integration.src.retry import RetryPolicy
+
+
+def http_error(status, reason=None, headers=None):
+    error = {'code': status, 'message': 'failed'}
+    if reason:
+        error['errors'] = [{'reason': reason}]
+    return HttpError(httplib2.Response({'status': status, **(headers or {})}), json.dumps({'error': error}).encode())
+
+
+class TestRetry(unittest.TestCase):
+    '''
+    # TestRetry
+    `Unit tests for typed errors, the retry policy, the token bucket and the request executor.`
+    '''
+
+    def test_typed_errors(self):
+        self.assertIsInstance(from_http_error(http_error(429)), RateLimitError)
+        self.assertIsInstance(from_http_error(http_error(403, 'userRateLimitExceeded')), RateLimitError)
+        self.assertIsInstance(from_http_error(http_error(403, 'dailyLimitExceeded')), QuotaExceededError)
+        self.assertIsInstance(from_http_error(http_error(412)), PreconditionFailedError)
+        self.assertIsInstance(from_http_error(http_error(503)), ServerError)
+        self.assertEqual(from_http_error(http_error(429, headers={'retry-after': '7'})).retry_after, 7)
+
+    def test_policy(self):
+        policy = RetryPolicy(max_retries=2, base_delay=1, max_delay=4)
+        self.assertTrue(policy.should_retry(http_error(503), 0))
+        self.assertTrue(policy.should_retry(ConnectionResetError(), 1))
+        self.assertFalse(policy.should_retry(http_error(503), 2))
+        self.assertFalse(policy.should_retry(http_error(404), 0))
+        self.assertFalse(policy.should_retry(http_error(403), 0))
+        # not idempotent: only rate limit responses, the others may have been applied
+        self.assertTrue(policy.should_retry(http_error(429), 0, idempotent=False))
+        self.assertTrue(policy.should_retry(http_error(403, 'rateLimitExceeded'), 0, idempotent=False))
+        self.assertFalse(policy.should_retry(http_error(503), 0, idempotent=False))
+        self.assertFalse(policy.should_retry(ConnectionResetError(), 0, idempotent=False))
+        self.assertTrue(all(0 <= policy.delay(10) <= 4 for _ in range(100)))
+        self.assertGreaterEqual(policy.delay(0, http_error(429, headers={'retry-after': '30'})), 30)
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+    @patch('red_office_google_integration.src.executor.time.sleep')
+    def test_executor_retries_then_raises_typed_errors(self, mock_sleep):
+        http = HttpMockSequence([
+            ({'status': '503'}, json.dumps({'error': {'code': 503, 'message': 'Backend Error'}})),
+            ({'status': '429', 'retry-after': '2'}, json.dumps({'error': {'code': 429, 'message': 'Slow down'}})),
+            ({'status': '200'}, json.dumps({'id': 'e1'})),
+            ({'status': '412'}, json.dumps({'error': {'code': 412, 'message': 'Precondition Failed'}})),
+        ])
+        service = build('calendar', 'v3', http=http)
+        executor = RequestExecutor('calendar', RetryPolicy(max_retries=3, base_delay=0.5),
+                                   TokenBucket(rate=1000, capacity=1000))
+
+        self.assertEqual(executor.execute(service.events().get(calendarId='primary', eventId='e1'))['id'], 'e1')
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertGreaterEqual(mock_sleep.call_args_list[1].args[0], 2)
+
+        with self.assertRaises(PreconditionFailedError):
+            executor.execute(service.events().delete(calendarId='primary', eventId='e1'))
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch('red_office_google_integration.src.executor.time.sleep')
+    def test_executor_does_not_resend_inserts_after_server_errors(self, mock_sleep):
+        http = HttpMockSequence([
+            ({'status': '429'}, json.dumps({'error': {'code': 429, 'message': 'Slow down'}})),
+            ({'status': '503'}, json.dumps({'error': {'code': 503, 'message': 'Backend Error'}})),
+        ])
+        service = build('calendar', 'v3', http=http)
+        executor = RequestExecutor('calendar', RetryPolicy(max_retries=3), TokenBucket(rate=1000, capacity=1000))
+        with self.assertRaises(ServerError):
+            executor.execute(service.events().insert(calendarId='primary', body={'summary': 'x'}))
+        self.assertEqual(mock_sleep.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from datetime import datetime, timezone
+from red_office_google_integration.calendar.events.scheduling import CalendarIndex, ScheduleIndex, parse_event_time
+
+
+def make_event(id, start, end, **extra):
+    return {'id': id, 'start': {'dateTime': start}, 'end': {'dateTime': end}, **extra}
+
+
+class TestScheduleIndex(unittest.TestCase):
+    '''
+    # TestScheduleIndex
+    `Unit tests for the local free/busy and conflict detection index.`
+    '''
+
+    def setUp(self):
+        self.schedule = ScheduleIndex()
+        self.schedule.load('room-a', [
+            make_event('a1', '2024-05-02T09:00:00Z', '2024-05-02T10:00:00Z'),
+            make_event('a2', '2024-05-02T09:30:00Z', '2024-05-02T10:30:00Z'),
+            make_event('a3', '2024-05-02T13:00:00Z', '2024-05-02T14:00:00Z'),
+            make_event('free', '2024-05-02T11:00:00Z', '2024-05-02T12:00:00Z', transparency='transparent'),
+        ])
+        self.schedule.load('room-b', [
+            make_event('b1', '2024-05-02T10:30:00+02:00', '2024-05-02T13:00:00+02:00'),
+        ])
+
+    def test_conflicts(self):
+        found = self.schedule.conflicts(['room-a', 'room-b'], '2024-05-02T09:45:00Z', '2024-05-02T10:15:00Z')
+        self.assertEqual([c['event']['id'] for c in found], ['b1', 'a1', 'a2'])
+        self.assertTrue(self.schedule.is_free(['room-a'], '2024-05-02T10:30:00Z', '2024-05-02T13:00:00Z'))
+
+    def test_free_busy_merges_overlaps(self):
+        busy = self.schedule.free_busy(['room-a'], '2024-05-02T00:00:00Z', '2024-05-03T00:00:00Z')['room-a']
+        utc = timezone.utc
+        self.assertEqual([(b['start'], b['end']) for b in busy], [
+            (datetime(2024, 5, 2, 9, 0, tzinfo=utc), datetime(2024, 5, 2, 10, 30, tzinfo=utc)),
+            (datetime(2024, 5, 2, 13, 0, tzinfo=utc), datetime(2024, 5, 2, 14, 0, tzinfo=utc)),
+        ])
+
+    def test_first_free_slot_across_calendars(self):
+        slot = self.schedule.first_free_slot(['room-a', 'room-b'], 60, '2024-05-02T09:00:00Z',
+                                             '2024-05-02T18:00:00Z')
+        self.assertEqual(slot['start'], datetime(2024, 5, 2, 11, 0, tzinfo=timezone.utc))
+        slot = self.schedule.first_free_slot(['room-a', 'room-b'], 150, '2024-05-02T09:00:00Z',
+                                             '2024-05-02T18:00:00Z')
+        self.assertEqual(slot['start'], datetime(2024, 5, 2, 14, 0, tzinfo=timezone.utc))
+        self.assertIsNone(self.schedule.first_free_slot(['room-a'], 60, '2024-05-02T09:00:00Z',
+                                                        '2024-05-02T10:30:00Z'))
+
+    def test_incremental_updates(self):
+        self.schedule.remove_events('room-a', ['a1', 'a2'])
+        self.schedule.add_events('room-a', [make_event('a4', '2024-05-02T08:00:00Z', '2024-05-02T08:30:00Z'),
+                                            make_event('a3', '2024-05-02T13:00:00Z', '2024-05-02T14:00:00Z',
+                                                       status='cancelled')])
+        found = self.schedule.conflicts(['room-a'], '2024-05-02T00:00:00Z', '2024-05-03T00:00:00Z')
+        self.assertEqual([c['event']['id'] for c in found], ['a4'])
+
+    def test_events_without_times_keep_the_indexed_interval(self):
+        self.schedule.add_events('room-a', [{'id': 'a3', 'summary': 'renamed'}])   # e.g. fields=id,summary
+        found = self.schedule.conflicts(['room-a'], '2024-05-02T13:00:00Z', '2024-05-02T14:00:00Z')
+        self.assertEqual([c['event']['id'] for c in found], ['a3'])
+        self.schedule.add_events('room-a', [{'id': 'a3', 'status': 'cancelled'}])   # deleted, as in a sync
+        self.assertTrue(self.schedule.is_free(['room-a'], '2024-05-02T13:00:00Z', '2024-05-02T14:00:00Z'))
+
+    def test_long_events_do_not_widen_the_scan(self):
+        index = CalendarIndex()
+        for day in range(1, 29):
+            index.add(make_event(f'm{day}', f'2024-02-{day:02d}T09:00:00Z', f'2024-02-{day:02d}T10:00:00Z'))
+        index.add(make_event('leave', '2024-01-01T00:00:00Z', '2024-12-31T00:00:00Z'))
+        index.add(make_event('offsite', '2024-02-05T08:00:00Z', '2024-02-06T04:00:00Z'))   # 20 hours
+        self.assertEqual(index.max_duration, 20 * 3600)
+        index.remove('offsite')
+        self.assertEqual(index.max_duration, 3600)   # lowered again, the leave never counted
+        window = (parse_event_time({'dateTime': '2024-02-10T09:30:00Z'}).timestamp(),
+                  parse_event_time({'dateTime': '2024-02-10T11:00:00Z'}).timestamp())
+        self.assertEqual([entry[2] for entry in index.overlapping(*window)], ['leave', 'm10'])
+        index.remove('leave')
+        self.assertEqual([entry[2] for entry in index.overlapping(*window)], ['m10'])
+
+    def test_all_day_event(self):
+        start = parse_event_time({'date': '2024-05-02'})
+        self.assertEqual(start, datetime(2024, 5, 2, tzinfo=timezone.utc))
+
+
+if __name__ == '__main__':
+    unittest.main()
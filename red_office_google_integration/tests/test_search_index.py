@@ -0,0 +1,85 @@
+import base64
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.fake_google_api import FakeGoogleAPI, write_fake_tokens
+from red_office_google_integration.gmail.mail import Gmail
+from red_office_google_integration.gmail.search_index import MailSearchIndex, message_text
+from red_office_google_integration.src import setting, utils
+
+
+def make_message(id, subject, sender, body, mime_type='text/plain'):
+    data = base64.urlsafe_b64encode(body.encode()).decode().rstrip('=')
+    return {
+        'id': id,
+        'threadId': id,
+        'internalDate': '1700000000000',
+        'snippet': body[:20],
+        'payload': {
+            'mimeType': 'multipart/alternative',
+            'headers': [{'name': 'Subject', 'value': subject},
+                        {'name': 'From', 'value': sender},
+                        {'name': 'To', 'value': 'team@example.com'}],
+            'parts': [{'mimeType': mime_type, 'filename': '', 'body': {'data': data}}],
+        },
+    }
+
+
+class TestMailSearchIndex(unittest.TestCase):
+    '''
+    # TestMailSearchIndex
+    `Unit tests for the local Gmail full-text search index.`
+    '''
+
+    def setUp(self):
+        self.index = MailSearchIndex(':memory:')
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_search_subject_sender_and_body(self):
+        self.index.add_messages([
+            make_message('1', 'Invoice March', 'billing@acme.com', 'Please pay the attached invoice.'),
+            make_message('2', 'Lunch', 'bob@example.com', 'Pizza on friday?'),
+        ])
+        self.assertEqual([r['id'] for r in self.index.search('invoice')], ['1'])
+        self.assertEqual([r['id'] for r in self.index.search('sender:bob')], ['2'])
+        self.assertEqual([r['id'] for r in self.index.search('body:pizza')], ['2'])
+        self.assertEqual(self.index.search('lunch')[0]['from'], 'bob@example.com')
+
+    def test_reindex_replaces_message(self):
+        self.index.add_message(make_message('1', 'Draft', 'a@example.com', 'old text'))
+        self.index.add_message(make_message('1', 'Draft', 'a@example.com', 'new text'))
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.index.search('old'), [])
+        self.assertEqual(self.index.known_ids(['1', '2']), {'1'})
+
+    def test_ids_are_looked_up_by_key(self):
+        self.index.add_message(make_message('1', 'Draft', 'a@example.com', 'text'))
+        connection = self.index._MailSearchIndex__conn
+        plan = ' '.join(row[-1] for row in connection.execute(
+            'EXPLAIN QUERY PLAN SELECT rowid FROM message_ids WHERE id = ?', ('1',)))
+        self.assertIn('USING', plan)   # an index, not a scan
+
+    def test_only_full_messages_are_indexed(self):
+        patcher = patch.object(utils, '_cli_mode', False)   # library mode, restored afterwards
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with tempfile.TemporaryDirectory() as secrets, FakeGoogleAPI() as server, \
+                patch.object(setting, 'SECRET_DIRECTORY_PATH', Path(secrets)), \
+                patch.object(setting, 'API_ENDPOINT', server.url):
+            gmail = Gmail(write_fake_tokens(Path(secrets)).encode(), search_index=self.index)
+            for format in ('metadata', 'minimal', 'raw'):
+                gmail.get_email('m1', format=format)
+            self.assertEqual(len(self.index), 0)
+            gmail.get_email('m1')
+            self.assertEqual(self.index.known_ids(['m1']), {'m1'})
+
+    def test_html_body_is_stripped(self):
+        message = make_message('1', 'News', 'a@example.com', '<p>Hello&nbsp;<b>world</b></p>', 'text/html')
+        self.assertEqual(message_text(message), 'Hello world')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.fake_google_api import FakeAPIConfig, FakeGoogleAPI, write_fake_tokens
+from red_office_google_integration.spreadsheets.sheets import SpreadSheet
+from red_office_google_integration.src import setting, utils
+from red_office_google_integration.src.singleflight import SingleFlight, single_flight
+
+
+class Reader:
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    @single_flight()
+    def get(self, sheet: str, cells: str = 'A1', options: dict | None = None) -> dict:
+        self.calls += 1
+        self.release.wait(5)
+        if sheet == 'missing':
+            raise KeyError(sheet)
+        return {'sheet': sheet, 'cells': cells}
+
+    @single_flight(key=lambda self, sheet, cells='A1': (sheet, cells.upper()))
+    async def aget(self, sheet: str, cells: str = 'A1') -> dict:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return {'sheet': sheet, 'cells': cells}
+
+
+class TestSingleFlight(unittest.TestCase):
+    '''
+    # TestSingleFlight
+    `Unit tests for the deduplication of concurrent identical calls, threaded and asyncio.`
+    '''
+
+    def run_concurrently(self, reader: Reader, calls: list[tuple]) -> list:
+        with ThreadPoolExecutor(len(calls)) as pool:
+            futures = [pool.submit(reader.get, *args, **kwargs) for args, kwargs in calls]
+            # every call started: either running or waiting for the one in flight
+            for _ in range(500):
+                if reader.get.single_flight.shared + reader.calls >= len(calls):
+                    break
+                time.sleep(0.01)
+            reader.release.set()
+            return [future.exception() or future.result() for future in futures]
+
+    def test_threads_share_one_call(self):
+        reader = Reader()
+        results = self.run_concurrently(reader, [(('s1',), {}), (('s1', 'A1'), {}),
+                                                 ((), {'sheet': 's1', 'options': None})] * 2)
+        self.assertEqual(reader.calls, 1)
+        self.assertTrue(all(result == {'sheet': 's1', 'cells': 'A1'} for result in results))
+        self.assertEqual(len({id(result) for result in results}), len(results))  # followers get copies
+
+    def test_different_arguments_and_errors(self):
+        reader = Reader()
+        results = self.run_concurrently(reader, [(('missing',), {}), (('missing',), {}), (('s2',), {})])
+        self.assertEqual(reader.calls, 2)
+        self.assertIsInstance(results[0], KeyError)
+        self.assertIs(results[0], results[1])
+        self.assertEqual(results[2], {'sheet': 's2', 'cells': 'A1'})
+
+    def test_disabled(self):
+        reader = Reader()
+        reader.release.set()
+        with patch.object(setting, 'SINGLE_FLIGHT_ENABLED', False):
+            self.run_concurrently(reader, [(('s1',), {})] * 3)
+        self.assertEqual(reader.calls, 3)
+
+    def test_asyncio_custom_key(self):
+        reader, other = Reader(), Reader()
+
+        async def main():
+            return await asyncio.gather(reader.aget('s1', 'a1'), reader.aget('s1', cells='A1'), reader.aget('s1'),
+                                        other.aget('s1'))
+
+        results = asyncio.run(main())
+        self.assertEqual((reader.calls, other.calls), (1, 1))
+        self.assertEqual(results[1], {'sheet': 's1', 'cells': 'a1'})
+
+    def test_group_async_error(self):
+        group = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('failed')
+
+        async def main():
+            return await asyncio.gather(group.do_async('k', fail), group.do_async('k', fail),
+                                        return_exceptions=True)
+
+        first, second = asyncio.run(main())
+        self.assertIs(first, second)
+        self.assertEqual(group.shared, 1)
+
+    def test_spreadsheet_reads(self):
+        with tempfile.TemporaryDirectory() as secrets, FakeGoogleAPI(FakeAPIConfig(latency=0.2)) as server, \
+                patch.object(utils, '_cli_mode', False), \
+                patch.object(setting, 'SECRET_DIRECTORY_PATH', Path(secrets)), \
+                patch.object(setting, 'API_ENDPOINT', server.url):
+            spreadsheet = SpreadSheet(write_fake_tokens(Path(secrets)).encode())
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(lambda _: spreadsheet.get_data('sheet', 'A1:B2'), range(8)))
+        self.assertLess(server.requests, 8)
+        self.assertTrue(all(result == results[0] for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
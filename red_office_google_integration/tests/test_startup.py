@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+
+MAIN = Path(__file__).resolve().parent.parent.parent / 'main.py'
+
+# run main.py in-process and report which heavy modules were imported
+PROBE = '''
+import json, runpy, sys
+sys.argv = ['main.py'] + json.loads(sys.argv[1])
+try:
+    runpy.run_path({main!r}, run_name='__main__')
+except SystemExit:
+    pass
+heavy = ('pandas', 'googleapiclient.discovery', 'google.auth', 'cryptography', 'httplib2',
+         'red_office_google_integration.CLI_handler.calendar.events')
+print(json.dumps(sorted(name for name in heavy if name in sys.modules)), file=sys.stderr)
+'''
+
+
+class TestStartup(unittest.TestCase):
+    '''
+    # TestStartup
+    `Regression tests for the lazy loading of the CLI subcommands.`
+    '''
+
+    def heavy_modules(self, *args):
+        process = subprocess.run([sys.executable, '-c', PROBE.format(main=str(MAIN)), json.dumps(args)],
+                                 capture_output=True, text=True, env={**os.environ, 'RED_OFFICE_NO_DAEMON': '1'})
+        return process.stdout, json.loads(process.stderr.strip().splitlines()[-1])
+
+    def test_help_imports_no_service(self):
+        output, heavy = self.heavy_modules('--help')
+        self.assertEqual(heavy, [])
+        for command in ('batch', 'calendar', 'daemon', 'init-cred', 'mail', 'spreadsheet'):
+            self.assertIn(command, output)
+
+    def test_daemon_commands_import_no_service(self):
+        _, heavy = self.heavy_modules('daemon', '--help')
+        self.assertEqual(heavy, [])
+
+    def test_subcommand_loads_its_modules(self):
+        output, heavy = self.heavy_modules('spreadsheet', '--help')
+        self.assertIn('get-data', output)
+        self.assertIn('googleapiclient.discovery', heavy)
+        self.assertNotIn('pandas', heavy)
+
+    def test_commands_do_not_load_other_command_groups(self):
+        for command in ('batch', 'mail', 'spreadsheet'):
+            _, heavy = self.heavy_modules(command, '--help')
+            self.assertNotIn('red_office_google_integration.CLI_handler.calendar.events', heavy)
+
+
+if __name__ == '__main__':
+    unittest.main()
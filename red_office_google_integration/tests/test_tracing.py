@@ -0,0 +1,126 @@
+import asyncio
+import json
+import tempfile
+import unittest
+import httplib2
+from pathlib import Path
+from unittest.mock import patch
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+from red_office_google_integration.src import tracing
+from red_office_google_integration.src.executor import RequestExecutor
+from red_office_google_integration.src.exceptions import NotFoundError
+from red_office_google_integration.src.rate_limit import TokenBucket
+from red_office_google_integration.src.retry import RetryPolicy
+
+
+class TestTracing(unittest.TestCase):
+    '''
+    # TestTracing
+    `Unit tests for the spans, their exporters, the timing breakdown and the executor spans.`
+    '''
+
+    def setUp(self):
+        self.collector = tracing.add_exporter(tracing.TimingCollector())
+
+    def tearDown(self):
+        tracing.remove_exporter(self.collector)
+
+    def spans(self) -> dict:
+        return {span.name: span for span in self.collector.spans}
+
+    def test_nested_spans(self):
+        with tracing.span('outer', command='get') as outer:
+            with tracing.span('inner'):
+                self.assertEqual(tracing.current_span().name, 'inner')
+            self.assertIs(tracing.current_span(), outer)
+        self.assertIsNone(tracing.current_span())
+        spans = self.spans()
+        self.assertEqual(spans['inner'].parent_id, spans['outer'].span_id)
+        self.assertEqual(spans['inner'].trace_id, spans['outer'].trace_id)
+        self.assertIsNone(spans['outer'].parent_id)
+        self.assertGreaterEqual(spans['outer'].duration_ms, spans['inner'].duration_ms)
+        self.assertEqual(spans['outer'].attributes, {'command': 'get'})
+
+    def test_no_exporter_no_span(self):
+        tracing.remove_exporter(self.collector)
+        with tracing.span('ignored') as span:
+            self.assertIsNone(span)
+            self.assertIsNone(tracing.current_span())
+
+    def test_error_and_status(self):
+        error = NotFoundError(httplib2.Response({'status': 404}), b'')
+        with self.assertRaises(NotFoundError):
+            with tracing.span('request.execute'):
+                raise error
+        span = self.spans()['request.execute']
+        self.assertEqual((span.error, span.attributes['status']), ('NotFoundError', 404))
+
+    def test_spans_follow_asyncio_tasks(self):
+        async def child(name):
+            with tracing.span(name):
+                await asyncio.sleep(0)
+
+        async def main():
+            with tracing.span('root'):
+                await asyncio.gather(child('a'), child('b'))
+
+        asyncio.run(main())
+        spans = self.spans()
+        self.assertEqual(spans['a'].parent_id, spans['root'].span_id)
+        self.assertEqual(spans['b'].parent_id, spans['root'].span_id)
+
+    def test_exporters_implement_export(self):
+        with self.assertRaises(TypeError):
+            tracing.SpanExporter()
+
+        class Exporter(tracing.SpanExporter):
+            def export(self, span):
+                pass
+
+        self.assertIsInstance(Exporter(), tracing.SpanExporter)
+
+    def test_file_exporter(self):
+        with tempfile.TemporaryDirectory() as directory:
+            exporter = tracing.add_exporter(tracing.FileSpanExporter(Path(directory) / 'trace' / 'spans.jsonl'))
+            try:
+                with tracing.span('service.build', api='calendar'):
+                    pass
+            finally:
+                tracing.remove_exporter(exporter)
+            line = json.loads((Path(directory) / 'trace' / 'spans.jsonl').read_text())
+        self.assertEqual((line['name'], line['attributes']), ('service.build', {'api': 'calendar'}))
+        self.assertEqual((len(line['trace_id']), len(line['span_id'])), (32, 16))
+        self.assertGreaterEqual(line['end_ns'], line['start_ns'])
+
+    def test_breakdown(self):
+        with tracing.span('cli.command', command='calendar'):
+            with tracing.span('credentials.load'):
+                pass
+        lines = self.collector.breakdown().splitlines()
+        self.assertTrue(lines[0].startswith('cli.command command=calendar'))
+        self.assertTrue(lines[0].endswith('100.0%'))
+        self.assertTrue(lines[1].startswith('  credentials.load'))
+
+    @patch('red_office_google_integration.src.executor.time.sleep')
+    def test_executor_spans(self, mock_sleep):
+        http = HttpMockSequence([
+            ({'status': '503'}, 'unavailable'),
+            ({'status': '200'}, json.dumps({'id': 'e1'})),
+        ])
+        service = build('calendar', 'v3', http=http)
+        executor = RequestExecutor('calendar', RetryPolicy(max_retries=1, base_delay=0.1),
+                                   TokenBucket(rate=1000, capacity=1000))
+        executor.execute(service.events().get(calendarId='primary', eventId='e1'))
+        execute = self.spans()['request.execute']
+        attempts = [span for span in self.collector.spans if span.name == 'http.attempt']
+        parse, = [span for span in self.collector.spans if span.name == 'response.parse']
+        self.assertEqual(execute.attributes, {'api': 'calendar', 'operation': 'calendar.events.get'})
+        self.assertEqual([(span.attributes['attempt'], span.attributes['status']) for span in attempts],
+                         [(0, 503), (1, 200)])
+        self.assertTrue(all(span.parent_id == execute.span_id for span in attempts))
+        self.assertEqual(parse.parent_id, attempts[1].span_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
+import httplib2
 from unittest.mock import patch, MagicMock
+from googleapiclient.errors import HttpError
 from red_office_google_integration.src.utils import handle_exception
+from red_office_google_integration.src.exceptions import NotFoundError
 
 
 class TestHandleException(unittest.TestCase):
@@ -33,6 +36,7 @@ class TestHandleException(unittest.TestCase):
         - Test the handle_exception decorator for an exception that should be raised.
     '''
 
+    @patch('red_office_google_integration.src.utils._cli_mode', True)
     @patch('red_office_google_integration.src.utils.sys.exit')
     @patch('red_office_google_integration.log.log_handler.logger.error')
     def test_handle_exception(self, mock_logger_error, mock_sys_exit):
@@ -52,6 +56,28 @@ class TestHandleException(unittest.TestCase):
         # Check that sys.exit was called with the correct code
         mock_sys_exit.assert_called_once_with(1)
 
+    @patch('red_office_google_integration.log.log_handler.logger.error')
+    def test_handle_exception_raises_typed_errors_in_library_mode(self, mock_logger_error):
+        @handle_exception
+        def inner():
+            raise HttpError(httplib2.Response({'status': 404}), b'{"error": {"message": "Not Found"}}')
+
+        @handle_exception
+        def outer():
+            return inner()
+
+        with self.assertRaises(NotFoundError) as raised:
+            outer()
+        self.assertIsInstance(raised.exception, HttpError)
+        self.assertEqual(raised.exception.status_code, 404)
+        # logged once, where it was raised
+        mock_logger_error.assert_called_once_with({
+            'status': 'NotFoundError',
+            'status_code': 404,
+            'message': 'Not Found',
+            'function_name': 'inner'
+        })
+
 
 if __name__ == '__main__':
     unittest.main()